@@ -2,23 +2,21 @@ import sys
 import traceback
 import uuid
 
-from langchain_core.messages import AIMessageChunk, HumanMessage
-
-from src.graph.game_orchestrator import create_game_graph, create_sqlite_checkpointer
+from langchain_core.messages import HumanMessage
+
+from src.agents.dice_roller import DiceRollerAgent
+from src.graph.archive import MessageArchive, archive_cold_messages
+from src.graph.game_orchestrator import (
+    create_game_graph,
+    create_sqlite_checkpointer,
+    run_fast_dice_turn,
+    run_turn,
+)
 from src.graph.game_state import create_default_game_state
+from src.graph.retention import BackgroundCompactor
 
 EXIT_COMMANDS = {"quit", "exit"}
 
-# Nodes whose output is prose the player reads, so it is worth showing token by
-# token. At 4.4 tok/s a finished narration is ~25 s away; the first token is ~3.5 s
-# away. Everything else in the graph — routing decisions, the dice parse — emits
-# tokens too, and none of it is for the player.
-STREAMING_NODES = {"dungeon_master", "researcher"}
-
-# A node can make more than one LLM call — the DM narrates, then extracts world
-# state into JSON. Both carry the same node name, so the second is tagged.
-INTERNAL_TAG = "internal"
-
 
 def _render(message) -> None:
     """Prints one assistant message with its agent name, if it carries one."""
@@ -27,47 +25,40 @@ def _render(message) -> None:
     print(f"\n[{name or 'assistant'}] {content}\n")
 
 
-def _run_turn(game_graph, turn, config) -> dict:
-    """Streams a turn, printing prose as it arrives.
-
-    Returns {agent name: text already printed live}, so the caller can skip
-    reprinting it — and can still show anything the node appended after the
-    model finished, such as the researcher's list of sources.
-    """
-    streamed = {}
-
-    for chunk, metadata in game_graph.stream(
-        turn, config=config, stream_mode="messages"
-    ):
-        # Two kinds of thing arrive here: AIMessageChunk for each token, and the
-        # finished AIMessage the node writes to state. Printing both shows every
-        # narration twice.
-        if not isinstance(chunk, AIMessageChunk):
-            continue
-
-        node = metadata.get("langgraph_node")
-        if node not in STREAMING_NODES:
-            continue
-        if INTERNAL_TAG in (metadata.get("tags") or ()):
-            continue
-
-        text = getattr(chunk, "content", "")
-        if not text:
-            continue
+def _print_tokens():
+    """An `on_token` callback for `run_turn` that prints prose as it arrives."""
+    started = set()
 
-        if node not in streamed:
+    def on_token(node: str, text: str) -> None:
+        if node not in started:
             print(f"\n[{node}] ", end="", flush=True)
-            streamed[node] = ""
-        streamed[node] += text
+            started.add(node)
         print(text, end="", flush=True)
 
-    return streamed
+    return on_token
+
+
+def _archive(game_graph, archive: MessageArchive, config) -> None:
+    """Keeps the live message history short. Never ends the session."""
+    try:
+        archive_cold_messages(game_graph, archive, config)
+    except Exception as exc:
+        # The messages stay live and the next turn tries again.
+        print(f"Archiving old messages failed: {exc}")
 
 
 def main() -> None:
     try:
         checkpointer = create_sqlite_checkpointer()
+        # Prunes old checkpoints as the session runs, so the file stops growing
+        # with every step ever taken. See src/graph/retention.py.
+        BackgroundCompactor(checkpointer).start()
+        # Old messages move here between turns, so each turn carries only the
+        # recent history. See src/graph/archive.py.
+        archive = MessageArchive(checkpointer)
         game_graph = create_game_graph(checkpointer=checkpointer)
+        # Answers written-out rolls outside the graph; see run_fast_dice_turn.
+        dice_roller = DiceRollerAgent()
     except Exception as exc:
         print(f"Failed to create game graph: {exc}")
         traceback.print_exc()
@@ -109,17 +100,21 @@ def main() -> None:
             turn = {**pending_state, **turn}
             seeded = True
 
-        # How many messages existed before this turn, so we can print only the
-        # new ones. A thread with no checkpoint yet has no values at all.
+        # "roll 2d6+3" needs no model and no routing. It is answered directly,
+        # with nothing to stream and no state to read back.
         try:
-            snapshot = game_graph.get_state(config)
-            before = len(snapshot.values.get("messages", [])) if snapshot.values else 0
-        except Exception:
-            before = 0
+            rolled = run_fast_dice_turn(game_graph, dice_roller, turn, config)
+        except Exception as exc:
+            print(f"\nAn error occurred: {exc}")
+            traceback.print_exc()
+            continue
+        if rolled is not None:
+            _render(rolled)
+            _archive(game_graph, archive, config)
+            continue
 
         try:
-            streamed = _run_turn(game_graph, turn, config)
-            messages = game_graph.get_state(config).values.get("messages", [])
+            result = run_turn(game_graph, turn, config, on_token=_print_tokens())
         except Exception as exc:
             print(f"\nAn error occurred: {exc}")
             traceback.print_exc()
@@ -128,18 +123,15 @@ def main() -> None:
         # Show only what this turn produced, and only what was not already
         # printed token by token. The session continues until the user asks to
         # leave — no agent decides that on their behalf.
-        for message in messages[before:]:
-            if isinstance(message, HumanMessage):
-                continue
-
+        for message in result.messages:
             name = getattr(message, "name", None)
             content = getattr(message, "content", "")
 
-            if name in streamed:
+            if name in result.streamed:
                 # A node may add to its answer after the model stops — the
                 # researcher appends the passages it used. Show the tail rather
                 # than reprinting the whole thing.
-                already = streamed[name]
+                already = result.streamed[name]
                 tail = content[len(already):] if content.startswith(already) else ""
                 if tail.strip():
                     print(tail, end="", flush=True)
@@ -148,6 +140,8 @@ def main() -> None:
 
             _render(message)
 
+        _archive(game_graph, archive, config)
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+"""Inspect, purge and calibrate the researcher's semantic answer cache.
+
+    python scripts/answer_cache.py stats                     # entries, hits, misses
+    python scripts/answer_cache.py list                      # every kept question
+    python scripts/answer_cache.py purge --all               # empty it
+    python scripts/answer_cache.py purge --older-than 30     # unused for 30 days
+    python scripts/answer_cache.py purge --matching grapple  # by question text
+    python scripts/answer_cache.py purge --stale             # passages gone from the index
+    python scripts/answer_cache.py calibrate                 # pick the threshold
+
+The cache is `answer_cache.db` unless `DND_ANSWER_CACHE_DB` or `--db` says
+otherwise. `purge --stale` and `calibrate` load the index's embedding model;
+the rest only read the database, and are safe while a server runs.
+
+`calibrate` embeds a labelled set of question pairs — rewordings that should
+share an answer, and near-misses about the same rule that must not — and
+prints the similarity of each and the lowest threshold that lets no near-miss
+through. Set it with `DND_ANSWER_CACHE_THRESHOLD`.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Allow `python scripts/answer_cache.py` from the repo root without installing.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.data.answer_cache import AnswerCache, passages_current, resolve_cache_db
+
+# Same question, different words: these should hit.
+SAME = [
+    ("How does grappling work?", "What are the rules for grappling?"),
+    ("How does grappling work?", "how do grapples work"),
+    ("What does the prone condition do?", "What happens when a creature is prone?"),
+    ("How does sneak attack work?", "When can a rogue use sneak attack?"),
+    ("How long does a short rest take?", "What is the duration of a short rest?"),
+    ("How does concentration work?", "What are the rules for concentrating on a spell?"),
+    ("What is the range of fireball?", "How far can fireball reach?"),
+    ("How do opportunity attacks work?", "When do I get an attack of opportunity?"),
+    ("How much does plate armor cost?", "What's the price of plate armour?"),
+    ("What does advantage do?", "How does rolling with advantage work?"),
+]
+
+# Same rule, different question: these must miss.
+DIFFERENT = [
+    ("How does grappling work?", "How do I escape a grapple?"),
+    ("What does the prone condition do?", "How do I stand up from prone?"),
+    ("How long does a short rest take?", "How long does a long rest take?"),
+    ("What is the range of fireball?", "How much damage does fireball do?"),
+    ("How does concentration work?", "Which spells need concentration?"),
+    ("How much does plate armor cost?", "What AC does plate armor give?"),
+    ("What does advantage do?", "What does disadvantage do?"),
+    ("How does sneak attack work?", "How much damage does sneak attack do at level 5?"),
+    ("How do opportunity attacks work?", "How does the disengage action work?"),
+    ("What does a potion of healing do?", "What does a potion of greater healing do?"),
+]
+
+
+def stats(cache: AnswerCache) -> None:
+    s = cache.stats()
+    print(f"{s['path']}: {s['entries']} entries, {s['bytes'] / 1e6:.2f} MB, "
+          f"threshold {s['threshold']}")
+    print(f"  lookups {s['lookups']}   hits {s['hits']}   misses {s['misses']}   "
+          f"stale {s['stale']}   stored {s['stored']}   hit rate {s['hit_rate']:.1%}")
+    if s["oldest"]:
+        print(f"  oldest entry {time.strftime('%Y-%m-%d %H:%M', time.localtime(s['oldest']))}")
+
+
+def list_entries(cache: AnswerCache) -> None:
+    for entry in cache.entries():
+        used = time.strftime("%Y-%m-%d", time.localtime(entry["last_used"]))
+        print(f"{entry['id']:>6}  {entry['hits']:>4} hits  last {used}  "
+              f"{len(entry['passages'])} passages  {entry['question']}")
+
+
+def purge(cache: AnswerCache, args) -> None:
+    stale = None
+    if args.stale:
+        from src.data.vectorstore import load_vectorstore
+        vectorstore = load_vectorstore()
+
+        def stale(passages):
+            return passages_current(vectorstore, passages)
+
+    if not (args.all or args.older_than is not None or args.matching or args.stale):
+        sys.exit("purge needs --all, --older-than, --matching or --stale")
+    removed = cache.purge(
+        older_than=None if args.older_than is None else args.older_than * 86400,
+        matching=args.matching,
+        stale=stale,
+    )
+    print(f"purged {removed} entries; {cache.stats()['entries']} left")
+
+
+def calibrate(cache: AnswerCache) -> None:
+    import numpy as np
+
+    from src.data.vectorstore import create_embeddings
+
+    cache.embeddings = create_embeddings()
+
+    def similarity(a: str, b: str) -> float:
+        return float(np.dot(cache.embed(a), cache.embed(b)))
+
+    same = [(similarity(a, b), a, b) for a, b in SAME]
+    different = [(similarity(a, b), a, b) for a, b in DIFFERENT]
+    for label, pairs in (("same question", same), ("different question", different)):
+        print(f"{label}:")
+        for score, a, b in sorted(pairs, reverse=True):
+            print(f"  {score:.3f}  {a!r} / {b!r}")
+
+    ceiling = max(score for score, _, _ in different)
+    hits = sum(score > ceiling for score, _, _ in same)
+    print(f"\nhighest near-miss {ceiling:.3f}: a threshold above it serves "
+          f"{hits}/{len(same)} rewordings and no near-miss (current {cache.threshold}).")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=None, help="default: DND_ANSWER_CACHE_DB or answer_cache.db")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("stats", help="entries and hit/miss counters")
+    commands.add_parser("list", help="every kept question")
+    purge_parser = commands.add_parser("purge", help="delete entries")
+    purge_parser.add_argument("--all", action="store_true")
+    purge_parser.add_argument("--older-than", type=float, metavar="DAYS",
+                              help="not used for this many days")
+    purge_parser.add_argument("--matching", metavar="TEXT", help="question contains TEXT")
+    purge_parser.add_argument("--stale", action="store_true",
+                              help="a passage is gone from the index, or changed")
+    purge_parser.add_argument("--reset-counters", action="store_true")
+    commands.add_parser("calibrate", help="similarities of labelled question pairs")
+    args = parser.parse_args()
+
+    cache = AnswerCache(resolve_cache_db(args.db))
+    try:
+        if args.command == "stats":
+            stats(cache)
+        elif args.command == "list":
+            list_entries(cache)
+        elif args.command == "purge":
+            purge(cache, args)
+            if args.reset_counters:
+                cache.reset_counters()
+        else:
+            calibrate(cache)
+    finally:
+        cache.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+"""Per-turn cost as a campaign grows, with and without archiving cold messages.
+
+Plays written-out dice rolls through the fast lane — two messages a turn, no
+model — against an on-disk checkpointer, then runs one graph step the way a
+turn does: `get_state`, which hands the live channel to every node. At each
+checkpoint along the way it reports:
+
+- **live** — messages in the live channel.
+- **state ms** — median `get_state` over the last 20 turns: loading and
+  rehydrating the live history, as each node step does.
+- **cached** — messages the saver holds in memory for reuse.
+
+    python scripts/bench_archive.py
+    python scripts/bench_archive.py --turns 5000 --horizon 20
+
+No model daemon needed.
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Allow `python scripts/bench_archive.py` from the repo root without installing.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from langchain_core.messages import HumanMessage
+
+from src.agents.dice_roller import DiceRollerAgent
+from src.graph.archive import DEFAULT_ARCHIVE_BATCH, MessageArchive, archive_cold_messages
+from src.graph.game_orchestrator import (
+    create_game_graph,
+    create_sqlite_checkpointer,
+    run_fast_dice_turn,
+)
+
+WINDOW = 20
+
+
+def run(db: str, turns: int, horizon: int, report_every: int) -> None:
+    saver = create_sqlite_checkpointer(db)
+    game_graph = create_game_graph(checkpointer=saver)
+    dice_roller, archive = DiceRollerAgent(), MessageArchive(saver)
+    config = {"configurable": {"thread_id": "campaign"}}
+    key = ("campaign", "")
+    timings = []
+    for i in range(1, turns + 1):
+        turn = {"messages": [HumanMessage(content="roll 1d20")], "current_task": "roll 1d20"}
+        run_fast_dice_turn(game_graph, dice_roller, turn, config)
+        archive_cold_messages(game_graph, archive, config, horizon=horizon)
+        started = time.perf_counter()
+        state = game_graph.get_state(config)
+        timings.append(time.perf_counter() - started)
+        if i % report_every == 0:
+            print(f"  {i:>6} {len(state.values['messages']):>7} "
+                  f"{statistics.median(timings[-WINDOW:]) * 1000:>9.2f} "
+                  f"{len(saver._logged.get(key, {})):>8}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=2000)
+    parser.add_argument("--horizon", type=int, default=20)
+    args = parser.parse_args()
+    report_every = max(args.turns // 5, 1)
+
+    with tempfile.TemporaryDirectory(dir=".") as tmp:
+        for label, horizon in (("no archiving", 0),
+                               (f"horizon {args.horizon}, batch {DEFAULT_ARCHIVE_BATCH}",
+                                args.horizon)):
+            print(f"{label}\n  {'turn':>6} {'live':>7} {'state ms':>9} {'cached':>8}")
+            run(f"{tmp}/{horizon}.db", args.turns, horizon, report_every)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+"""Concurrent turns: the sync path on threads against the async path on one loop.
+
+Starts `scripts/fake_ollama.py` as a separate process, builds one graph against
+it and a throwaway SQLite file, then for each concurrency level runs that many
+sessions at once, each playing `--turns` narrated turns:
+
+- **sync** — `run_turn` on a thread pool with one thread per session, the way
+  a server on the sync path has to hold a thread for every turn in flight.
+- **async** — `arun_turn` for every session, gathered on one event loop.
+
+Reported per level: turns/s, median turn time, and the most threads alive at
+once in this process.
+
+    python scripts/bench_async_turns.py
+    python scripts/bench_async_turns.py --levels 1 16 64 256 --rate 4.4
+
+No model daemon needed. The fake answers at `--rate` tokens per second, so
+the difference between the two paths is what each costs to wait.
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+# Allow `python scripts/bench_async_turns.py` from the repo root without installing.
+sys.path.insert(0, str(ROOT))
+
+from langchain_core.messages import HumanMessage
+
+from src.graph.game_orchestrator import (
+    arun_turn,
+    create_game_graph,
+    create_sqlite_checkpointer,
+    run_turn,
+)
+from src.utils.llm_logger import LLMLogger
+
+# Not matched by any pre-filter rule, so every turn makes both model calls:
+# the router's, then the narration's.
+TEXT = "The innkeeper eyes me warily. I lean in and ask about the missing caravan."
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for(port: int, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with socket.socket() as sock:
+            if sock.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.1)
+    raise TimeoutError(f"fake Ollama did not come up on :{port}")
+
+
+class ThreadPeak:
+    """Samples `threading.active_count()` in the background; keeps the max."""
+
+    def __init__(self):
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self) -> None:
+        while not self._stop.wait(0.01):
+            self.peak = max(self.peak, threading.active_count())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def turn(text: str) -> dict:
+    return {"messages": [HumanMessage(content=text)], "current_task": text}
+
+
+def run_sync(game_graph, sessions: int, turns: int, label: str) -> list:
+    def session(i: int) -> list:
+        config = {"configurable": {"thread_id": f"{label}-{i}"}}
+        timings = []
+        for _ in range(turns):
+            started = time.perf_counter()
+            run_turn(game_graph, turn(TEXT), config)
+            timings.append(time.perf_counter() - started)
+        return timings
+
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        return [t for timings in pool.map(session, range(sessions)) for t in timings]
+
+
+async def run_async(game_graph, sessions: int, turns: int, label: str) -> list:
+    async def session(i: int) -> list:
+        config = {"configurable": {"thread_id": f"{label}-{i}"}}
+        timings = []
+        for _ in range(turns):
+            started = time.perf_counter()
+            await arun_turn(game_graph, turn(TEXT), config)
+            timings.append(time.perf_counter() - started)
+        return timings
+
+    done = await asyncio.gather(*(session(i) for i in range(sessions)))
+    return [t for timings in done for t in timings]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--turns", type=int, default=3, help="turns per session")
+    parser.add_argument("--rate", type=float, default=20.0, help="fake tokens per second")
+    parser.add_argument("--first-token", type=float, default=0.5)
+    parser.add_argument("--tokens", type=int, default=40, help="words per narration")
+    args = parser.parse_args()
+
+    port = _free_port()
+    fake = subprocess.Popen([sys.executable, str(ROOT / "scripts" / "fake_ollama.py"),
+                             "--port", str(port), "--rate", str(args.rate),
+                             "--first-token", str(args.first_token),
+                             "--tokens", str(args.tokens)])
+    try:
+        _wait_for(port)
+        os.environ["OLLAMA_HOST"] = f"http://127.0.0.1:{port}"
+        with tempfile.TemporaryDirectory() as tmp:
+            # Keep the bench's turns out of the real logs.
+            LLMLogger._get_current_log_file = lambda self: Path(tmp) / "bench_log.jsonl"
+            game_graph = create_game_graph(create_sqlite_checkpointer(f"{tmp}/bench.db"))
+
+            print(f"{'sessions':>8} {'path':>6} {'turns/s':>8} {'p50 turn s':>11} {'threads':>8}")
+            for sessions in args.levels:
+                for path in ("sync", "async"):
+                    label = f"{path}-{sessions}"
+                    with ThreadPeak() as threads:
+                        started = time.perf_counter()
+                        if path == "sync":
+                            timings = run_sync(game_graph, sessions, args.turns, label)
+                        else:
+                            timings = asyncio.run(
+                                run_async(game_graph, sessions, args.turns, label))
+                        wall = time.perf_counter() - started
+                    print(f"{sessions:>8} {path:>6} {len(timings) / wall:>8.1f} "
+                          f"{statistics.median(timings):>11.2f} {threads.peak:>8}")
+    finally:
+        fake.terminate()
+        fake.wait(timeout=10)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+"""Compare checkpoint storage and latency: stock `SqliteSaver` vs `MessageLogSaver`.
+
+Simulates a campaign at the saver level: each turn appends a player message and
+a ~300-character narration, then writes one checkpoint. (A real graph turn writes
+three, so real databases are larger still.) For each campaign length it reports:
+
+- **size** — database plus WAL on disk after the last turn.
+- **put** — median time to write a checkpoint over the last 50 turns.
+- **cold load** — `get_tuple` of the latest checkpoint from a fresh saver, the
+  cost of resuming a campaign after a restart.
+
+    python scripts/bench_checkpoints.py                    # 1,000 and 10,000 turns
+    python scripts/bench_checkpoints.py --turns 500 2000
+
+The stock saver writes the whole history every turn, so 10,000 turns would write
+~60 GB. Past `--stock-max` turns it is not run in full. Its put and cold-load
+times are measured on one checkpoint of the full length, and its size is
+extrapolated from that checkpoint's size. Those rows are marked `*`.
+
+No model daemon needed.
+"""
+
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Allow `python scripts/bench_checkpoints.py` from the repo root without installing.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.base.id import uuid6
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+from src.graph.message_log import MessageLogSaver
+
+NARRATION = ("Torchlight gutters across wet stone. Somewhere ahead, water drips into "
+             "a pool you cannot see, and the draught carries the smell of old smoke. "
+             "The passage forks: left, a stair descends; right, a door hangs ajar. ")
+TAIL = 50
+
+
+def turn_messages(i: int):
+    return [HumanMessage(content=f"I take the passage, turn {i}."),
+            AIMessage(content=NARRATION, name="dungeon_master")]
+
+
+def checkpoint_of(messages):
+    checkpoint = empty_checkpoint()
+    checkpoint["id"] = str(uuid6())
+    checkpoint["channel_values"] = {
+        "messages": messages,
+        "current_task": "I take the passage.",
+        "last_response": NARRATION,
+        "game_state": {"location": "the forked passage"},
+    }
+    return checkpoint
+
+
+def disk_size(db: str, conn: sqlite3.Connection) -> int:
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return sum(os.path.getsize(p) for p in (db, f"{db}-wal") if os.path.exists(p))
+
+
+def put(saver, config, messages):
+    started = time.perf_counter()
+    saved = saver.put(config, checkpoint_of(messages), {"source": "loop"}, {})
+    return saved, time.perf_counter() - started
+
+
+def cold_load(saver_class, db: str, config) -> float:
+    saver = saver_class(sqlite3.connect(db, check_same_thread=False))
+    started = time.perf_counter()
+    saver.get_tuple(config)
+    return time.perf_counter() - started
+
+
+def run(saver_class, db: str, turns: int) -> dict:
+    conn = sqlite3.connect(db, check_same_thread=False)
+    saver = saver_class(conn)
+    config = {"configurable": {"thread_id": "campaign", "checkpoint_ns": ""}}
+    messages, timings = [], []
+    for i in range(turns):
+        messages = messages + turn_messages(i)
+        config, elapsed = put(saver, config, messages)
+        timings.append(elapsed)
+    return {
+        "size": disk_size(db, conn),
+        "put": statistics.median(timings[-TAIL:]),
+        "load": cold_load(saver_class, db, config),
+        "estimated": False,
+    }
+
+
+def run_extrapolated(db: str, turns: int) -> dict:
+    """One full-length stock checkpoint, and the campaign's size inferred from it."""
+    conn = sqlite3.connect(db, check_same_thread=False)
+    saver = SqliteSaver(conn)
+    config = {"configurable": {"thread_id": "campaign", "checkpoint_ns": ""}}
+    messages = [m for i in range(turns) for m in turn_messages(i)]
+    config, elapsed = put(saver, config, messages)
+    last = len(conn.execute("SELECT checkpoint FROM checkpoints").fetchone()[0])
+    per_turn = last / turns
+    # Checkpoint i holds i turns of history: the sum is per_turn * n(n+1)/2.
+    return {
+        "size": int(per_turn * turns * (turns + 1) / 2),
+        "put": elapsed,
+        "load": cold_load(SqliteSaver, db, config),
+        "estimated": True,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, nargs="+", default=[1_000, 10_000])
+    parser.add_argument("--stock-max", type=int, default=2_000,
+                        help="longest campaign the stock saver is run in full")
+    args = parser.parse_args()
+
+    print(f"{'turns':>7} {'saver':12} {'size':>12} {'put':>10} {'cold load':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for turns in args.turns:
+            for name, saver_class in (("stock", SqliteSaver), ("message_log", MessageLogSaver)):
+                db = f"{tmp}/{name}-{turns}.db"
+                if saver_class is SqliteSaver and turns > args.stock_max:
+                    r = run_extrapolated(db, turns)
+                else:
+                    r = run(saver_class, db, turns)
+                mark = "*" if r["estimated"] else " "
+                print(f"{turns:>7} {name:12} {r['size'] / 1e6:>10.1f}MB{mark}"
+                      f"{r['put'] * 1000:>8.2f}ms {r['load'] * 1000:>9.2f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
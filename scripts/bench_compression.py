@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+"""Checkpoint size on disk and resume time, with and without compression.
+
+Writes the same campaign three ways through `MessageLogSaver`:
+
+- **plain** — the msgpack blobs as the stock serializer writes them.
+- **zlib** — each blob deflated on its own, no dictionary.
+- **zlib+dict** — `CompressingSerializer`, deflated against the trained dictionary.
+
+Each turn appends a player message and an answer, then writes one checkpoint.
+The answers are SRD entries the dictionary was *not* built from (see
+`HOLD_OUT_EVERY` in `scripts/train_zdict.py`), cut to `--answer-chars`, so the
+dictionary gets no credit for having seen the text. For each mode it reports:
+
+- **size** — database plus WAL on disk after the last turn.
+- **put** — median time to write a checkpoint.
+- **resume** — median `get_tuple` of the latest checkpoint from a fresh saver:
+  reading and decompressing every message, as after a restart.
+
+    python scripts/bench_compression.py
+    python scripts/bench_compression.py --turns 5000 --answer-chars 1200
+
+No model daemon needed.
+"""
+
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+import zlib
+from pathlib import Path
+
+# Allow `python scripts/bench_compression.py` from the repo root without installing.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.base.id import uuid6
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from scripts.train_zdict import load_samples
+from src.graph.compressed_serde import CompressingSerializer
+from src.graph.message_log import MessageLogSaver
+from src.graph.sqlite_connection import connect_sqlite, resolve_pragmas
+
+RESUMES = 5
+
+
+class ZlibOnly(JsonPlusSerializer):
+    """Deflate without a dictionary, for comparison. Not a supported format."""
+
+    def dumps_typed(self, obj):
+        type_, data = super().dumps_typed(obj)
+        return type_ + "+deflate", zlib.compress(data, 6)
+
+    def loads_typed(self, data):
+        type_, blob = data
+        return super().loads_typed((type_.removesuffix("+deflate"), zlib.decompress(blob)))
+
+
+MODES = {
+    "plain": JsonPlusSerializer,
+    "zlib": ZlibOnly,
+    "zlib+dict": lambda: CompressingSerializer(compress=True),
+}
+
+
+def disk_size(db: str, conn: sqlite3.Connection) -> int:
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return sum(os.path.getsize(p) for p in (db, f"{db}-wal") if os.path.exists(p))
+
+
+def campaign_turns(turns: int, answer_chars: int):
+    _, held_out = load_samples()
+    for i in range(turns):
+        answer = held_out[i % len(held_out)][:answer_chars]
+        yield [HumanMessage(content=f"What does the rule say about this, turn {i}?",
+                            id=str(uuid.uuid4())),
+               AIMessage(content=answer, name="researcher", id=str(uuid.uuid4()))]
+
+
+def run(db: str, serde_factory, turns: int, answer_chars: int):
+    pragmas = resolve_pragmas()
+    saver = MessageLogSaver(connect_sqlite(db, pragmas), serde=serde_factory())
+    saver.setup()
+    config = {"configurable": {"thread_id": "campaign", "checkpoint_ns": ""}}
+    messages, puts = [], []
+    for new in campaign_turns(turns, answer_chars):
+        messages = messages + new
+        checkpoint = empty_checkpoint()
+        checkpoint["id"] = str(uuid6())
+        checkpoint["channel_values"] = {"messages": messages, "current_task": "x",
+                                        "last_response": new[-1].content}
+        started = time.perf_counter()
+        config = saver.put(config, checkpoint, {"source": "loop"}, {})
+        puts.append(time.perf_counter() - started)
+    size = disk_size(db, saver.conn)
+
+    resumes = []
+    for _ in range(RESUMES):
+        fresh = MessageLogSaver(connect_sqlite(db, pragmas), serde=serde_factory())
+        started = time.perf_counter()
+        loaded = fresh.get_tuple(config).checkpoint["channel_values"]["messages"]
+        resumes.append(time.perf_counter() - started)
+        assert len(loaded) == len(messages)
+        fresh.conn.close()
+    return size, statistics.median(puts), statistics.median(resumes)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=2000)
+    parser.add_argument("--answer-chars", type=int, default=600,
+                        help="length each answer is cut to (default: 600)")
+    args = parser.parse_args()
+
+    print(f"{args.turns} turns, answers up to {args.answer_chars} characters\n")
+    print(f"{'mode':10} {'size MB':>8} {'put ms':>7} {'resume ms':>10}")
+    with tempfile.TemporaryDirectory(dir=".") as tmp:
+        base = None
+        for mode, factory in MODES.items():
+            size, put, resume = run(f"{tmp}/{mode}.db", factory, args.turns, args.answer_chars)
+            base = base or size
+            print(f"{mode:10} {size / 1e6:>8.2f} {put * 1000:>7.2f} {resume * 1000:>10.1f}"
+                  f"   {size / base:.0%} of plain")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+"""Time a written-out dice turn through the graph and through the fast lane.
+
+Both paths run against a throwaway SQLite checkpointer, on a thread that already
+holds `--history` messages, so the checkpoint write is realistic. Three numbers
+per turn:
+
+- **graph** — `game_graph.stream(...)` plus the two `get_state` reads `main.py`
+  makes to find the new messages. What a dice turn cost before the fast lane.
+- **fast lane** — `run_fast_dice_turn`, end to end.
+- **handling** — the fast lane minus its `update_state`: rule table, roll, and
+  log line. The checkpoint write is excluded because it grows with the thread
+  and belongs to the saver, not to the turn.
+
+    python scripts/bench_fast_lane.py                 # 200 turns, 40-message thread
+    python scripts/bench_fast_lane.py --history 400   # a long campaign
+
+No model daemon needed. A dice turn never reaches one.
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Allow `python scripts/bench_fast_lane.py` from the repo root without installing.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from src.agents.dice_roller import DiceRollerAgent
+from src.graph.game_orchestrator import (
+    create_game_graph,
+    create_sqlite_checkpointer,
+    run_fast_dice_turn,
+)
+from src.graph.game_state import create_default_game_state
+from src.utils.llm_logger import LLMLogger
+
+REQUEST = "roll 2d6+3 for damage"
+
+
+def seeded_thread(game_graph, thread_id: str, history: int) -> dict:
+    config = {"configurable": {"thread_id": thread_id}}
+    messages = []
+    for i in range(history // 2):
+        messages.append(HumanMessage(content=f"I search the room, turn {i}."))
+        messages.append(AIMessage(content="Dust, and a draught from the north wall. " * 8,
+                                  name="dungeon_master"))
+    game_graph.update_state(
+        config, {**create_default_game_state(), "messages": messages}, as_node="dungeon_master"
+    )
+    return config
+
+
+def turn() -> dict:
+    return {"messages": [HumanMessage(content=REQUEST)], "current_task": REQUEST}
+
+
+def through_graph(game_graph, config) -> None:
+    game_graph.get_state(config)
+    for _ in game_graph.stream(turn(), config=config, stream_mode="messages"):
+        pass
+    game_graph.get_state(config)
+
+
+def summary(name: str, timings) -> str:
+    ms = sorted(t * 1000 for t in timings)
+    return (f"{name:12} mean {statistics.mean(ms):8.3f} ms   "
+            f"p50 {ms[len(ms) // 2]:8.3f} ms   p95 {ms[int(0.95 * (len(ms) - 1))]:8.3f} ms")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--history", type=int, default=40,
+                        help="messages already in the thread (default: 40)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Every agent logs each turn. Keep the bench's rolls out of the real
+        # logs, where they would swamp `scripts/log_report.py`.
+        LLMLogger._get_current_log_file = lambda self: Path(tmp) / "bench_log.jsonl"
+
+        game_graph = create_game_graph(create_sqlite_checkpointer(f"{tmp}/bench.db"))
+        dice_roller = DiceRollerAgent()
+
+        graph_config = seeded_thread(game_graph, "graph", args.history)
+        fast_config = seeded_thread(game_graph, "fast", args.history)
+
+        graph, fast, handling = [], [], []
+        real_update_state = game_graph.update_state
+        for _ in range(args.turns):
+            started = time.perf_counter()
+            through_graph(game_graph, graph_config)
+            graph.append(time.perf_counter() - started)
+
+            written = []
+
+            def timed_update_state(*a, **k):
+                t = time.perf_counter()
+                result = real_update_state(*a, **k)
+                written.append(time.perf_counter() - t)
+                return result
+
+            game_graph.update_state = timed_update_state
+            started = time.perf_counter()
+            run_fast_dice_turn(game_graph, dice_roller, turn(), fast_config)
+            fast.append(time.perf_counter() - started)
+            handling.append(fast[-1] - written[0])
+            game_graph.update_state = real_update_state
+
+    print(f"{args.turns} turns of {REQUEST!r}, thread starting at {args.history} messages\n")
+    print(summary("graph", graph))
+    print(summary("fast lane", fast))
+    print(summary("handling", handling))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+"""Passages sent per question, and whether the right one is among them.
+
+Runs the labelled retrieval suite below against the index and compares two
+ways of choosing what goes into the answer prompt:
+
+- **fixed** — the top `RETRIEVAL_K` (4) passages, as before.
+- **adaptive** — `select_passages` over `RETRIEVAL_CANDIDATES`: passages within
+  the score margin of the best, under the token budget, with further pieces
+  of an entry already chosen marked down by `--penalty`. One row per margin.
+
+For each it reports **recall** — the share of questions where a passage from
+an expected entry was sent — **precision** — the share of passages sent that
+came from an expected entry — and the mean passages and estimated prompt
+tokens of context per question, with the saving against fixed. Tokens are
+estimated at `CHARS_PER_TOKEN`, as `select_passages` does.
+
+With `--shards` (an index built with `ingest.py --shards`) every policy runs
+again over candidates from the category shards the router picks, and the
+search time per question is reported for both: the whole index, and routed
+shards with their fallback.
+
+    python scripts/bench_retrieval.py
+    python scripts/bench_retrieval.py --margins 0.05 0.1 0.2 --budget 600
+    python scripts/bench_retrieval.py --penalty 0      # no preference for new entries
+    python scripts/bench_retrieval.py --misses      # list what each policy lost
+    python scripts/bench_retrieval.py --shards      # whole index against routed shards
+
+Needs the SRD index (`python scripts/ingest.py`) and the embedding model; no
+model daemon.
+"""
+
+import argparse
+import statistics
+import sys
+import time
+import warnings
+from pathlib import Path
+
+# Allow `python scripts/bench_retrieval.py` from the repo root without installing.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.agents.researcher import (
+    CHARS_PER_TOKEN,
+    CONTEXT_TOKEN_BUDGET,
+    DIVERSITY_PENALTY,
+    RELEVANCE_THRESHOLD,
+    RETRIEVAL_CANDIDATES,
+    RETRIEVAL_K,
+    SCORE_MARGIN,
+    select_passages,
+)
+from src.config import CHROMA_DB_DIRECTORY
+from src.data.shards import ShardedVectorStore, load_shards
+from src.data.vectorstore import load_vectorstore
+from src.pipelines.shard_router import route_categories
+
+# (question as a player asks it, SRD entries that answer it). A question is
+# recalled if any passage sent comes from one of its entries.
+RETRIEVAL_SUITE = [
+    ("How does sneak attack work?", {"Sneak Attack"}),
+    ("How much damage does a fireball do?", {"Fireball"}),
+    ("How does grappling work in combat?", {"Making an Attack"}),
+    ("What does the grappled condition do?", {"Grappled"}),
+    ("What happens when I'm knocked prone?", {"Prone"}),
+    ("What's a goblin's armor class?", {"Goblin"}),
+    ("How does concentration work?", {"Casting a Spell"}),
+    ("When can I make an opportunity attack?", {"Making an Attack", "Actions in Combat"}),
+    ("How long is a short rest and what can I do during it?", {"Resting"}),
+    ("What does the finesse property do?", {"Finesse"}),
+    ("How much does a potion of healing heal?", {"Potion of Healing"}),
+    ("How much does plate armor cost?", {"Plate Armor"}),
+    ("How do advantage and disadvantage work?", {"Advantage and Disadvantage"}),
+    ("What does half cover give me?", {"Cover"}),
+    ("What does a barbarian's rage do?", {"Rage"}),
+    ("What traits does a dragonborn get?", {"Dragonborn"}),
+    ("How much does cure wounds heal?", {"Cure Wounds"}),
+    ("How many darts does magic missile fire?", {"Magic Missile"}),
+    ("How much can a bag of holding carry?", {"Bag of Holding"}),
+    ("What attacks does an owlbear have?", {"Owlbear"}),
+    ("How do death saving throws work?", {"Damage and Healing"}),
+    ("How does fighting with two weapons work?", {"Making an Attack"}),
+    ("What are the levels of exhaustion?", {"Exhaustion"}),
+    ("What does being invisible do in combat?", {"Invisible"}),
+    ("Can I use counterspell on a counterspell?", {"Counterspell"}),
+    ("How does lay on hands work?", {"Lay on Hands"}),
+    ("What is the breath weapon of an ancient red dragon?", {"Ancient Red Dragon"}),
+    ("How does surprise work at the start of combat?", {"The Order of Combat"}),
+    ("How much damage do I take from falling?", {"The Environment", "Damage and Healing"}),
+    ("What does divine smite do?", {"Divine Smite"}),
+    ("How does difficult terrain affect movement?", {"Movement and Position", "Movement"}),
+    ("Can I fight from horseback?", {"Mounted Combat"}),
+]
+
+
+def context_tokens(docs) -> int:
+    return sum(len(doc.page_content) for doc in docs) // CHARS_PER_TOKEN
+
+
+def recalled(docs, expected) -> bool:
+    return any(doc.metadata.get("name") in expected for doc in docs)
+
+
+def precision(docs, expected) -> float:
+    return sum(doc.metadata.get("name") in expected for doc in docs) / len(docs) if docs else 0.0
+
+
+def search_suite(store) -> tuple:
+    """Every suite question's candidates from `store`, and the ms each search took."""
+    candidates, latencies = [], []
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        store.similarity_search_with_relevance_scores("warm up", k=1)
+        for question, _ in RETRIEVAL_SUITE:
+            started = time.perf_counter()
+            candidates.append(store.similarity_search_with_relevance_scores(
+                question, k=RETRIEVAL_CANDIDATES))
+            latencies.append((time.perf_counter() - started) * 1000)
+    return candidates, latencies
+
+
+def run(candidates, choose) -> dict:
+    sent = [choose(scored) for scored in candidates]
+    hits = [recalled(docs, expected) for docs, (_, expected) in zip(sent, RETRIEVAL_SUITE)]
+    return {
+        "recall": sum(hits) / len(hits),
+        "precision": statistics.mean(precision(docs, expected)
+                                     for docs, (_, expected) in zip(sent, RETRIEVAL_SUITE)),
+        "passages": statistics.mean(len(docs) for docs in sent),
+        "tokens": statistics.mean(context_tokens(docs) for docs in sent),
+        "misses": [q for hit, (q, _) in zip(hits, RETRIEVAL_SUITE) if not hit],
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--persist-dir", default=CHROMA_DB_DIRECTORY)
+    parser.add_argument("--margins", type=float, nargs="+",
+                        default=[0.05, SCORE_MARGIN, 0.15, 0.2])
+    parser.add_argument("--budget", type=int, default=CONTEXT_TOKEN_BUDGET,
+                        help="context token budget for the adaptive rows")
+    parser.add_argument("--penalty", type=float, default=DIVERSITY_PENALTY,
+                        help="score taken off each further piece of a chosen entry")
+    parser.add_argument("--shards", action="store_true",
+                        help="also run every policy over the routed category shards")
+    parser.add_argument("--misses", action="store_true")
+    args = parser.parse_args()
+
+    store = load_vectorstore(args.persist_dir)
+    indexes = [("", *search_suite(store))]
+    if args.shards:
+        shards = load_shards(args.persist_dir)
+        if not shards:
+            print(f"No shards at {args.persist_dir}; build them with "
+                  f"`python scripts/ingest.py --rebuild --shards`.", file=sys.stderr)
+            return 1
+        sharded = ShardedVectorStore(store, shards, route_categories, RELEVANCE_THRESHOLD)
+        indexes.append(("sharded ", *search_suite(sharded)))
+
+    policies = [(f"fixed k={RETRIEVAL_K}", lambda scored: [d for d, _ in scored[:RETRIEVAL_K]])]
+    for margin in args.margins:
+        policies.append((f"adaptive margin={margin:g}",
+                         lambda scored, m=margin: select_passages(scored, m, args.budget,
+                                                                  args.penalty)))
+
+    results = [(prefix + name, run(candidates, choose))
+               for prefix, candidates, _ in indexes for name, choose in policies]
+    baseline = results[0][1]["tokens"]
+    print(f"{len(RETRIEVAL_SUITE)} questions, {RETRIEVAL_CANDIDATES} candidates each, "
+          f"budget {args.budget} tokens, diversity penalty {args.penalty:g}\n")
+    print(f"{'policy':32} {'recall':>7} {'precision':>9} {'passages':>9} {'tokens':>7} {'saved':>7}")
+    for name, result in results:
+        saved = 1 - result["tokens"] / baseline if baseline else 0.0
+        print(f"{name:32} {result['recall']:7.1%} {result['precision']:9.1%} "
+              f"{result['passages']:9.2f} {result['tokens']:7.0f} {saved:7.1%}")
+
+    print()
+    for prefix, _, latencies in indexes:
+        print(f"{(prefix or 'whole ') + 'index search':32} mean {statistics.mean(latencies):6.1f} ms"
+              f"   p50 {statistics.median(latencies):6.1f} ms   max {max(latencies):6.1f} ms")
+    if args.shards:
+        routed = sum(bool(route_categories(q)) for q, _ in RETRIEVAL_SUITE)
+        print(f"routed to shards: {routed} of {len(RETRIEVAL_SUITE)} questions")
+
+    if args.misses:
+        for name, result in results:
+            for question in result["misses"]:
+                print(f"  {name}: missed {question!r}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+"""Compare the supervisor's routing modes for accuracy and wall time.
+
+Runs the model routers over the labelled set in `src/agents/routing_cases.py` —
+the same inputs the pre-filter tests pin — and reports, per mode, how many cases
+landed on the right agent and how long a warm decision took. The pre-filter is bypassed on purpose: it answers the easy
+cases identically in both modes, and would hide the difference being measured.
+
+    python scripts/bench_routing.py                  # both modes
+    python scripts/bench_routing.py --mode letter    # one mode
+    python scripts/bench_routing.py --repeat 3       # three timed passes
+
+Needs a running Ollama daemon with the supervisor's model pulled. The first call
+per mode is a warm-up and is not timed: a cold model load is ~11 s on the
+target machine and would swamp everything else (docs/REFACTOR_NOTES.md).
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Allow `python scripts/bench_routing.py` from the repo root without installing.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.agents.routing_cases import ROUTING_CASES
+from src.agents.supervisor import ROUTER_MODES, GameSupervisor
+from src.models.llm import OllamaUnavailableError
+
+
+def bench_mode(mode: str, repeat: int) -> dict:
+    supervisor = GameSupervisor(router_mode=mode)
+    supervisor.decide(ROUTING_CASES[0][0])  # warm-up: load the model
+
+    timings, correct, confidences, misses = [], 0, [], []
+    for _ in range(repeat):
+        for text, expected in ROUTING_CASES:
+            started = time.perf_counter()
+            try:
+                goto, confidence = supervisor.decide(text)
+            except ValueError:
+                goto, confidence = None, None
+            timings.append(time.perf_counter() - started)
+
+            if goto == expected:
+                correct += 1
+            else:
+                misses.append((text, expected, goto))
+            if confidence is not None:
+                confidences.append(confidence)
+
+    return {
+        "mode": mode,
+        "correct": correct,
+        "total": len(ROUTING_CASES) * repeat,
+        "mean": statistics.mean(timings),
+        "p95": sorted(timings)[int(0.95 * (len(timings) - 1))],
+        "confidence": statistics.mean(confidences) if confidences else None,
+        "misses": misses,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=ROUTER_MODES, action="append",
+                        help="mode to measure; repeatable (default: all)")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="timed passes over the case set (default: 1)")
+    args = parser.parse_args()
+
+    results = []
+    for mode in args.mode or ROUTER_MODES:
+        print(f"Routing {len(ROUTING_CASES)} cases in {mode} mode...")
+        try:
+            results.append(bench_mode(mode, args.repeat))
+        except OllamaUnavailableError as exc:
+            print(f"{exc}", file=sys.stderr)
+            return 1
+
+    print(f"\n{'mode':12} {'accuracy':>10} {'mean':>9} {'p95':>9} {'confidence':>11}")
+    for r in results:
+        confidence = f"{r['confidence']:.3f}" if r["confidence"] is not None else "—"
+        print(
+            f"{r['mode']:12} {r['correct']:>4}/{r['total']:<5} "
+            f"{r['mean']:>8.3f}s {r['p95']:>8.3f}s {confidence:>11}"
+        )
+
+    for r in results:
+        for text, expected, goto in r["misses"]:
+            print(f"  [{r['mode']}] {text!r}: expected {expected}, got {goto}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
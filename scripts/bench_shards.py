@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+"""Concurrent sessions writing turns, against 1, 2, 4 and 8 checkpoint shards.
+
+Each of `--sessions` threads plays its own campaign. A turn is what the graph
+does to the checkpointer: load the latest checkpoint, then write three (input,
+supervisor, worker), each with a pending write. Sessions start together and
+run `--turns` turns each, with no think time, so this is the ceiling a host
+reaches, not what a table of players produces.
+
+    python scripts/bench_shards.py
+    python scripts/bench_shards.py --sessions 64 --turns 50 --synchronous FULL
+
+Reports turns per second across all sessions, and the median and p95 time a
+single turn took. `--synchronous FULL` fsyncs every commit, as on a database
+opened without this repo's pragmas; there the shards' disks work in parallel.
+"""
+
+import argparse
+import multiprocessing
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Allow `python scripts/bench_shards.py` from the repo root without installing.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.base.id import uuid6
+
+from src.graph.game_orchestrator import create_sqlite_checkpointer
+
+SHARD_COUNTS = (1, 2, 4, 8)
+STEPS = ("input", "supervisor", "dungeon_master")
+NARRATION = ("Torchlight gutters across wet stone. Somewhere ahead, water drips into "
+             "a pool you cannot see, and the passage forks.")
+
+
+def play(saver, session: int, turns: int, start: threading.Barrier, latencies: list) -> None:
+    config = {"configurable": {"thread_id": f"session-{session}", "checkpoint_ns": ""}}
+    messages = []
+    start.wait()
+    for i in range(turns):
+        started = time.perf_counter()
+        saver.get_tuple(config)
+        messages = messages + [HumanMessage(content=f"I press on, turn {i}.", id=f"h{i}"),
+                               AIMessage(content=NARRATION, name="dungeon_master", id=f"a{i}")]
+        for step in STEPS:
+            checkpoint = empty_checkpoint()
+            checkpoint["id"] = str(uuid6())
+            checkpoint["channel_values"] = {"messages": messages, "active_agent": step}
+            config = saver.put(config, checkpoint, {"source": "loop", "step": i}, {})
+            saver.put_writes(config, [("active_agent", step)], task_id=f"{i}-{step}")
+        latencies.append(time.perf_counter() - started)
+
+
+def sessions_in_process(db: str, shards: int, sessions: range, turns: int,
+                        synchronous: str, start, results) -> None:
+    saver = create_sqlite_checkpointer(db, pragmas={"synchronous": synchronous},
+                                       readers=2, shards=shards)
+    saver.setup()
+    latencies: list = []
+    threads = [threading.Thread(target=play, args=(saver, s, turns, start, latencies))
+               for s in sessions]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    results.put(latencies)
+
+
+def run(db: str, shards: int, sessions: int, turns: int, synchronous: str, processes: int):
+    # Every process opens the files before any session starts: the first
+    # `setup()` of a shard must not race another process's.
+    create_sqlite_checkpointer(db, readers=0, shards=shards).setup()
+    start = multiprocessing.Barrier(sessions + 1)
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=sessions_in_process, args=(
+        db, shards, range(p, sessions, processes), turns, synchronous, start, results))
+        for p in range(processes)]
+    for w in workers:
+        w.start()
+    start.wait()
+    started = time.perf_counter()
+    latencies = [x for _ in workers for x in results.get()]
+    elapsed = time.perf_counter() - started
+    for w in workers:
+        w.join()
+    latencies.sort()
+    return (len(latencies) / elapsed, latencies[len(latencies) // 2],
+            latencies[int(0.95 * (len(latencies) - 1))])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=64)
+    parser.add_argument("--turns", type=int, default=30)
+    parser.add_argument("--synchronous", default="NORMAL", choices=("OFF", "NORMAL", "FULL"))
+    parser.add_argument("--processes", type=int, default=1,
+                        help="server processes the sessions are split across (default: 1)")
+    args = parser.parse_args()
+
+    print(f"{args.sessions} sessions x {args.turns} turns in {args.processes} process(es), "
+          f"synchronous={args.synchronous}")
+    print(f"{'shards':>6} {'turns/s':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    with tempfile.TemporaryDirectory(dir=".") as tmp:
+        for shards in SHARD_COUNTS:
+            Path(f"{tmp}/s{shards}").mkdir()
+            rate, p50, p95 = run(f"{tmp}/s{shards}/game.db", shards, args.sessions,
+                                 args.turns, args.synchronous, args.processes)
+            print(f"{shards:>6} {rate:>8.0f} {p50 * 1000:>8.1f} {p95 * 1000:>8.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+"""Checkpoint write throughput under different SQLite settings, with and without readers.
+
+Each mode writes `--turns` checkpoints through `MessageLogSaver` to a fresh file
+on disk, one per turn, as a session would:
+
+- **rollback** — `journal_mode=DELETE`, `synchronous=FULL`: a bare connection
+  before `SqliteSaver.setup()` switches it to WAL.
+- **wal-full** — WAL with the default `synchronous=FULL`: the stock saver.
+- **tuned** — `DEFAULT_SQLITE_PRAGMAS`: WAL, `synchronous=NORMAL`, cache, mmap.
+
+Then the tuned mode again while `--readers` threads keep loading a long
+stock-format campaign. The loads go first through the saver's single locked
+connection, then through a `ReaderPool`. The put latency shows how long the
+writer waits behind readers.
+
+    python scripts/bench_sqlite.py
+    python scripts/bench_sqlite.py --turns 2000 --readers 8
+
+Numbers depend heavily on the disk. Run it where the database will live.
+"""
+
+import argparse
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Allow `python scripts/bench_sqlite.py` from the repo root without installing.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.base.id import uuid6
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+from src.graph.message_log import MessageLogSaver
+from src.graph.sqlite_connection import (
+    DEFAULT_SQLITE_PRAGMAS,
+    ReaderPool,
+    connect_sqlite,
+)
+
+MODES = {
+    "rollback": {"journal_mode": "DELETE", "synchronous": "FULL"},
+    "wal-full": {"journal_mode": "WAL", "synchronous": "FULL"},
+    "tuned": DEFAULT_SQLITE_PRAGMAS,
+}
+NARRATION = "Torchlight gutters across wet stone; the passage forks ahead. " * 4
+
+
+def make_saver(db: str, pragmas: dict, pool: bool, readers: int) -> MessageLogSaver:
+    saver = MessageLogSaver(connect_sqlite(db, pragmas),
+                            readers=ReaderPool(db, readers, pragmas) if pool else None)
+    saver.setup()
+    # `setup()` forces WAL. Put the mode under test back.
+    saver.conn.execute(f"PRAGMA journal_mode={pragmas['journal_mode']}")
+    return saver
+
+
+def write_turns(saver: MessageLogSaver, turns: int, timings: list = None) -> float:
+    config = {"configurable": {"thread_id": "campaign", "checkpoint_ns": ""}}
+    messages = []
+    started = time.perf_counter()
+    for i in range(turns):
+        messages = messages + [HumanMessage(content=f"I press on, turn {i}."),
+                               AIMessage(content=NARRATION, name="dungeon_master")]
+        checkpoint = empty_checkpoint()
+        checkpoint["id"] = str(uuid6())
+        checkpoint["channel_values"] = {"messages": messages, "current_task": "x"}
+        put_started = time.perf_counter()
+        config = saver.put(config, checkpoint, {"source": "loop"}, {})
+        if timings is not None:
+            timings.append(time.perf_counter() - put_started)
+    return turns / (time.perf_counter() - started)
+
+
+def seed_old_campaign(saver: MessageLogSaver, messages: int) -> dict:
+    """A stock-format checkpoint holding a long history, for readers to load."""
+    config = {"configurable": {"thread_id": "old-campaign", "checkpoint_ns": ""}}
+    checkpoint = empty_checkpoint()
+    checkpoint["id"] = str(uuid6())
+    checkpoint["channel_values"] = {"messages": [
+        AIMessage(content=NARRATION, name="dungeon_master") for _ in range(messages)
+    ]}
+    return SqliteSaver.put(saver, config, checkpoint, {}, {})
+
+
+def read_loop(saver: MessageLogSaver, config: dict, stop: threading.Event,
+              counts: list, pause: float) -> None:
+    # The parent's `get_tuple`, as any session resuming an old campaign pays
+    # it. The stock saver deserialises inside its cursor block, so on a single
+    # connection the writer waits for the whole load.
+    n = 0
+    while not stop.is_set():
+        SqliteSaver.get_tuple(saver, config)
+        n += 1
+        stop.wait(pause)
+    counts.append(n)
+
+
+def with_readers(db: str, turns: int, readers: int, pool: bool, history: int, pause: float):
+    saver = make_saver(db, DEFAULT_SQLITE_PRAGMAS, pool, readers)
+    old = seed_old_campaign(saver, history)
+    stop, counts, timings = threading.Event(), [], []
+    threads = [threading.Thread(target=read_loop, args=(saver, old, stop, counts, pause))
+               for _ in range(readers)]
+    for t in threads:
+        t.start()
+    started = time.perf_counter()
+    write_turns(saver, turns, timings)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    for t in threads:
+        t.join()
+    timings.sort()
+    return (timings[len(timings) // 2], timings[int(0.95 * (len(timings) - 1))],
+            sum(counts) / elapsed)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=1000)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--history", type=int, default=2000,
+                        help="messages in the campaign the readers load (default: 2000)")
+    parser.add_argument("--pause", type=float, default=0.01,
+                        help="seconds each reader waits between loads (default: 0.01)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=".") as tmp:
+        print(f"{args.turns} checkpoint writes, no readers")
+        for mode, pragmas in MODES.items():
+            rate = write_turns(make_saver(f"{tmp}/{mode}.db", pragmas, False, 1), args.turns)
+            print(f"  {mode:10} {rate:>9.0f} writes/s")
+
+        print(f"\n{args.turns} writes in tuned mode while {args.readers} readers load a "
+              f"{args.history}-message campaign")
+        for label, pool in (("one conn", False), ("pool", True)):
+            p50, p95, reads = with_readers(f"{tmp}/readers-{label}.db", args.turns,
+                                           args.readers, pool, args.history, args.pause)
+            print(f"  {label:10} put p50 {p50 * 1000:6.2f} ms  p95 {p95 * 1000:6.2f} ms  "
+                  f"{reads:>6.0f} loads/s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
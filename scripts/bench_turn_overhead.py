@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+"""Measure per-turn overhead against history length, old REPL loop vs `run_turn`.
+
+For each history length, a thread is seeded in a throwaway SQLite checkpointer
+and the same model-free turn (`"roll 1d6"`, through the graph) is run both ways:
+
+- **diff** — what `main.py` did before `run_turn`: `get_state` to count the
+  messages, stream the turn, then `get_state` again to slice off the new ones.
+- **run_turn** — the turn API, which reads the new messages off the stream.
+
+`get_state` is the cost of a single full-state read, for scale. The turn itself
+also writes a checkpoint that grows with the thread. Both paths pay for that
+equally, so the gap between them is the overhead that was removed.
+
+    python scripts/bench_turn_overhead.py                       # 10 … 10,000
+    python scripts/bench_turn_overhead.py --lengths 100 1000    # chosen lengths
+
+No model daemon needed.
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Allow `python scripts/bench_turn_overhead.py` from the repo root without installing.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from src.graph.game_orchestrator import create_game_graph, create_sqlite_checkpointer, run_turn
+from src.graph.game_state import create_default_game_state
+from src.utils.llm_logger import LLMLogger
+
+REQUEST = "roll 1d6"
+DEFAULT_LENGTHS = (10, 100, 1_000, 10_000)
+
+
+def seed(game_graph, thread_id: str, length: int) -> dict:
+    config = {"configurable": {"thread_id": thread_id}}
+    messages = []
+    for i in range(length // 2):
+        messages.append(HumanMessage(content=f"I search the room, turn {i}."))
+        messages.append(AIMessage(content="Dust, and a draught from the north wall. " * 8,
+                                  name="dungeon_master"))
+    game_graph.update_state(
+        config, {**create_default_game_state(), "messages": messages}, as_node="dungeon_master"
+    )
+    return config
+
+
+def turn() -> dict:
+    return {"messages": [HumanMessage(content=REQUEST)], "current_task": REQUEST}
+
+
+def diff_turn(game_graph, config) -> list:
+    before = len(game_graph.get_state(config).values.get("messages", []))
+    for _ in game_graph.stream(turn(), config=config, stream_mode="messages"):
+        pass
+    return game_graph.get_state(config).values.get("messages", [])[before:]
+
+
+def timed(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lengths", type=int, nargs="+", default=DEFAULT_LENGTHS)
+    parser.add_argument("--repeat", type=int, default=10,
+                        help="turns per length and path; the median is reported")
+    args = parser.parse_args()
+
+    print(f"{'history':>8} {'get_state':>11} {'diff':>11} {'run_turn':>11} {'saved':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        # Keep the bench's rolls out of the real interaction logs.
+        LLMLogger._get_current_log_file = lambda self: Path(tmp) / "bench_log.jsonl"
+        game_graph = create_game_graph(create_sqlite_checkpointer(f"{tmp}/bench.db"))
+
+        for length in args.lengths:
+            diff_config = seed(game_graph, f"diff-{length}", length)
+            turn_config = seed(game_graph, f"turn-{length}", length)
+
+            read = timed(lambda: game_graph.get_state(diff_config), args.repeat)
+            diff = timed(lambda: diff_turn(game_graph, diff_config), args.repeat)
+            new = timed(lambda: run_turn(game_graph, turn(), turn_config), args.repeat)
+            print(f"{length:>8} {read:>9.2f}ms {diff:>9.2f}ms {new:>9.2f}ms {diff - new:>9.2f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+"""Inspect and shrink a checkpoint database: report, prune, vacuum, tag.
+
+    python scripts/checkpoints.py report                  # per-thread storage
+    python scripts/checkpoints.py prune --keep 10         # apply the retention policy
+    python scripts/checkpoints.py prune --dry-run         # say what would go
+    python scripts/checkpoints.py vacuum                  # give freed pages back
+    python scripts/checkpoints.py tag <thread> "boss fight"   # keep its latest checkpoint
+
+`main.py` prunes in the background as it runs (`DND_COMPACT_INTERVAL`, default
+every 300 s), so `prune` is for databases that grew before that existed, or for a
+stricter `--keep`. Pruning frees pages for SQLite to reuse but does not shrink
+the file. `vacuum` does, by rewriting the whole database. Do not run it while a
+session has the database open.
+
+A sharded database (`DND_CHECKPOINT_SHARDS`) is found from the same `--db`:
+every command covers all the files in `<stem>-shards/`.
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+from pathlib import Path
+
+# Allow `python scripts/checkpoints.py` from the repo root without installing.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.graph.game_orchestrator import DEFAULT_CHECKPOINT_DB
+from src.graph.message_log import MessageLogSaver
+from src.graph.retention import RetentionPolicy, compact, storage_report, tag_milestone
+from src.graph.sharding import ShardedSaver, existing_shard_paths, savers_of
+
+
+def disk_size(db: str, conn: sqlite3.Connection) -> int:
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return sum(os.path.getsize(p) for p in (db, f"{db}-wal") if os.path.exists(p))
+
+
+def free_bytes(conn: sqlite3.Connection) -> int:
+    pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    return pages * conn.execute("PRAGMA page_size").fetchone()[0]
+
+
+def open_saver(db: str):
+    """The database at `db`, or its shards if it has been sharded."""
+    paths = existing_shard_paths(db) or [db]
+    savers = [MessageLogSaver(sqlite3.connect(p, check_same_thread=False)) for p in paths]
+    for saver in savers:
+        saver.setup()
+    return (ShardedSaver(savers) if len(paths) > 1 else savers[0]), paths
+
+
+def total_size(saver, paths) -> int:
+    return sum(disk_size(p, s.conn) for p, s in zip(paths, savers_of(saver)))
+
+
+def report(saver: MessageLogSaver, db: str, paths) -> None:
+    threads = storage_report(saver)
+    free = sum(free_bytes(s.conn) for s in savers_of(saver))
+    where = db if len(paths) == 1 else f"{db} ({len(paths)} shards)"
+    print(f"{where}: {total_size(saver, paths) / 1e6:.1f} MB on disk, "
+          f"{free / 1e6:.1f} MB free for reuse\n")
+    print(f"{'thread':38} {'ckpts':>6} {'ckpt MB':>8} {'writes MB':>10} "
+          f"{'msgs':>7} {'msgs MB':>8}  milestones")
+    for t in threads:
+        name = t.thread_id + (f" [{t.checkpoint_ns}]" if t.checkpoint_ns else "")
+        print(f"{name[:38]:38} {t.checkpoints:>6} {t.checkpoint_bytes / 1e6:>8.2f} "
+              f"{t.write_bytes / 1e6:>10.2f} {t.message_rows:>7} "
+              f"{t.message_bytes / 1e6:>8.2f}  {', '.join(t.milestones)}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=DEFAULT_CHECKPOINT_DB)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("report", help="per-thread storage")
+    prune = commands.add_parser("prune", help="drop checkpoints outside the policy")
+    prune.add_argument("--keep", type=int, default=None,
+                       help="checkpoints kept per thread (default: DND_CHECKPOINT_KEEP or 10)")
+    prune.add_argument("--dry-run", action="store_true")
+    commands.add_parser("vacuum", help="rewrite the file to return freed space")
+    tag = commands.add_parser("tag", help="keep a thread's latest checkpoint forever")
+    tag.add_argument("thread_id")
+    tag.add_argument("name")
+    args = parser.parse_args()
+
+    if not Path(args.db).exists() and not existing_shard_paths(args.db):
+        print(f"No checkpoint database at {args.db}.", file=sys.stderr)
+        return 1
+    saver, paths = open_saver(args.db)
+
+    if args.command == "report":
+        report(saver, args.db, paths)
+    elif args.command == "prune":
+        policy = RetentionPolicy(args.keep) if args.keep else RetentionPolicy.from_env()
+        result = compact(saver, policy, dry_run=args.dry_run)
+        verb = "Would drop" if args.dry_run else "Dropped"
+        print(f"{verb} {result.checkpoints} checkpoints, {result.writes} pending writes "
+              f"and {result.messages} unreferenced messages (keeping {policy.keep_last} "
+              f"per thread, plus milestones).")
+    elif args.command == "vacuum":
+        before = total_size(saver, paths)
+        for shard in savers_of(saver):
+            shard.conn.execute("VACUUM")
+        print(f"{before / 1e6:.1f} MB -> {total_size(saver, paths) / 1e6:.1f} MB")
+    elif args.command == "tag":
+        config = {"configurable": {"thread_id": args.thread_id, "checkpoint_ns": ""}}
+        try:
+            tagged = tag_milestone(saver, config, args.name)
+        except ValueError as exc:
+            print(exc, file=sys.stderr)
+            return 1
+        print(f"Tagged {tagged['configurable']['checkpoint_id']} as {args.name!r}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+"""Serve the embedding model on a Unix socket, shared by every game process.
+
+    python scripts/embedding_service.py --socket /tmp/dnd-embed.sock
+    DND_EMBEDDINGS_SOCKET=/tmp/dnd-embed.sock python server.py   # in each process
+    python scripts/embedding_service.py --socket /tmp/dnd-embed.sock --metrics
+
+Loads the index's model once and embeds queries from every client in shared
+batches: texts arriving within `--max-wait-ms` of each other, up to
+`--max-batch`, go through the model in one forward pass. `--metrics` asks a
+running service how many batches it has run and how full they were.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+from pathlib import Path
+
+# Allow `python scripts/embedding_service.py` from the repo root without installing.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.config import EMBEDDING_MODEL_NAME
+from src.data.embedding_service import (
+    DEFAULT_MAX_BATCH,
+    DEFAULT_MAX_WAIT_MS,
+    EmbeddingServer,
+    RemoteEmbeddings,
+    resolve_socket,
+)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--socket", default=None, help="default: DND_EMBEDDINGS_SOCKET")
+    parser.add_argument("--model", default=EMBEDDING_MODEL_NAME)
+    parser.add_argument("--max-batch", type=int, default=None,
+                        help=f"default: DND_EMBED_MAX_BATCH or {DEFAULT_MAX_BATCH}")
+    parser.add_argument("--max-wait-ms", type=float, default=None,
+                        help=f"default: DND_EMBED_MAX_WAIT_MS or {DEFAULT_MAX_WAIT_MS}")
+    parser.add_argument("--metrics", action="store_true",
+                        help="print a running service's batch counters and exit")
+    args = parser.parse_args()
+
+    path = resolve_socket(args.socket)
+    if path is None:
+        parser.error("give --socket or set DND_EMBEDDINGS_SOCKET")
+
+    if args.metrics:
+        remote = RemoteEmbeddings(path, args.model)
+        print(json.dumps(remote.metrics(), indent=2))
+        remote.close()
+        return 0
+
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    server = EmbeddingServer(HuggingFaceEmbeddings(model_name=args.model), args.model, path,
+                             args.max_batch, args.max_wait_ms)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        Path(path).unlink(missing_ok=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+"""A stand-in Ollama daemon for load tests: canned replies at a set pace.
+
+Answers `/api/chat` the way Ollama does — NDJSON chunks when streaming, one
+object when not — after `--first-token` seconds of "prompt evaluation", then
+one word every 1/`--rate` seconds. A request with a `format` schema gets JSON
+built from the schema: the first value of each enum, empty strings and lists
+otherwise. The supervisor's router therefore always picks the first option,
+`dungeon_master`, and the DM's scene extraction finds nothing.
+
+    python scripts/fake_ollama.py                     # :11500, 20 tok/s
+    python scripts/fake_ollama.py --rate 4.4 --first-token 3.5   # the M1 laptop
+    OLLAMA_HOST=http://127.0.0.1:11500 python server.py
+
+By default requests are served concurrently with no limit, unlike a real
+daemon's `OLLAMA_NUM_PARALLEL`, so what a load test measures is the server's
+own overhead and fairness, not the model's. `--parallel N` generates for N
+requests at a time and queues the rest, as the daemon does.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+# Allow `python scripts/fake_ollama.py` from the repo root without installing.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from aiohttp import web
+
+DEFAULT_PORT = 11500
+NARRATION = (
+    "The torchlight gutters as you step forward. Somewhere below, water drips "
+    "onto stone, and the goblin's eyes narrow. It raises a rusted blade, weighing "
+    "its chances against yours, then hisses a word in its own tongue."
+).split()
+
+
+def fill_schema(schema: dict):
+    """The least a schema accepts: first enum value, empty strings and lists."""
+    if "enum" in schema:
+        return schema["enum"][0]
+    kind = schema.get("type")
+    if kind == "object" or "properties" in schema:
+        return {key: fill_schema(value)
+                for key, value in (schema.get("properties") or {}).items()}
+    if kind == "array":
+        return []
+    if kind in ("integer", "number"):
+        return 0
+    if kind == "boolean":
+        return False
+    if "anyOf" in schema:
+        return fill_schema(schema["anyOf"][0])
+    return ""
+
+
+def _chunk(model: str, content: str, done: bool, **extra) -> dict:
+    return {
+        "model": model,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "message": {"role": "assistant", "content": content},
+        "done": done,
+        **extra,
+    }
+
+
+def create_app(rate: float, first_token: float, tokens: int,
+               parallel: int = 0) -> web.Application:
+    slots = asyncio.Semaphore(parallel) if parallel else None
+
+    async def tags(request: web.Request) -> web.Response:
+        return web.json_response({"models": []})
+
+    async def chat(request: web.Request) -> web.StreamResponse:
+        if slots is None:
+            return await generate(request)
+        async with slots:
+            return await generate(request)
+
+    async def generate(request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        model = body.get("model", "fake")
+        schema = body.get("format")
+        if isinstance(schema, dict):
+            pieces = [json.dumps(fill_schema(schema))]
+        elif schema == "json":
+            pieces = ["{}"]
+        elif (body.get("options") or {}).get("num_predict") == 1:
+            pieces = ["A"]
+        else:
+            words = [NARRATION[i % len(NARRATION)] for i in range(tokens)]
+            pieces = [word if i == 0 else " " + word for i, word in enumerate(words)]
+        started = time.perf_counter()
+        await asyncio.sleep(first_token)
+        # What the real daemon reports, in nanoseconds: `eval_duration` is
+        # the generation alone, which is how the admission controller reads
+        # the model's tokens/s.
+        done_extra = {"done_reason": "stop", "prompt_eval_count": 1,
+                      "prompt_eval_duration": int(first_token * 1e9),
+                      "eval_count": len(pieces),
+                      "eval_duration": int(len(pieces) / rate * 1e9)}
+
+        if not body.get("stream", True):
+            await asyncio.sleep(len(pieces) / rate)
+            done_extra["total_duration"] = int((time.perf_counter() - started) * 1e9)
+            return web.json_response(_chunk(model, "".join(pieces), True, **done_extra))
+
+        response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+        await response.prepare(request)
+        for piece in pieces:
+            await response.write(json.dumps(_chunk(model, piece, False)).encode() + b"\n")
+            await asyncio.sleep(1 / rate)
+        done_extra["total_duration"] = int((time.perf_counter() - started) * 1e9)
+        await response.write(json.dumps(_chunk(model, "", True, **done_extra)).encode() + b"\n")
+        return response
+
+    app = web.Application()
+    app.router.add_get("/api/tags", tags)
+    app.router.add_post("/api/chat", chat)
+    return app
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--rate", type=float, default=20.0, help="tokens per second")
+    parser.add_argument("--first-token", type=float, default=0.5,
+                        help="seconds before the first token")
+    parser.add_argument("--tokens", type=int, default=60, help="words per narration")
+    parser.add_argument("--parallel", type=int, default=0,
+                        help="requests generated at once; 0 for no limit")
+    args = parser.parse_args()
+    web.run_app(create_app(args.rate, args.first_token, args.tokens, args.parallel),
+                host=args.host, port=args.port, print=None)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
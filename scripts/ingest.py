@@ -9,6 +9,7 @@ now the index could not be reproduced from the repository (KNOWN_ISSUES #12).
     python scripts/ingest.py              # build, refusing to touch an existing index
     python scripts/ingest.py --rebuild    # replace an existing index
     python scripts/ingest.py --dry-run    # load and chunk, but do not embed
+    python scripts/ingest.py --rebuild --shards   # also one collection per SRD category
 
 The PDFs are gitignored (they are commercial Wizards of the Coast books), so a
 fresh clone will not have them. `Documents/README.md` lists the filenames
@@ -35,7 +36,9 @@ from src.config import (
 )
 from src.data.loader import load_documents
 from src.data.processing import CHUNK_OVERLAP, CHUNK_SIZE, split_documents
-from src.data.srd_loader import load_srd_documents
+from src.data.entry_store import build_entry_store
+from src.data.shards import build_shards
+from src.data.srd_loader import load_srd_documents, load_srd_entries
 from src.data.vectorstore import build_vectorstore
 
 
@@ -93,6 +96,13 @@ def main() -> int:
              f"--source srd and {FULL_CHROMA_DB_DIRECTORY} for --source "
              f"rulebooks, so the two never overwrite each other.",
     )
+    parser.add_argument(
+        "--shards",
+        action="store_true",
+        help="also write one collection per SRD category, which the researcher "
+             "searches by the categories a question names. Copies the vectors; "
+             "embeds nothing twice. --source srd only.",
+    )
     parser.add_argument(
         "--chunk-size", type=int, default=CHUNK_SIZE,
         help=f"characters per chunk (default: {CHUNK_SIZE})",
@@ -111,6 +121,10 @@ def main() -> int:
             else FULL_CHROMA_DB_DIRECTORY
         )
 
+    if args.shards and args.source != "srd":
+        print("--shards needs --source srd: PDF pages have no category.", file=sys.stderr)
+        return 1
+
     if args.source == "rulebooks":
         missing = find_missing_documents(DOCUMENT_PATHS)
         if missing:
@@ -127,6 +141,7 @@ def main() -> int:
         return 1
 
     started = time.perf_counter()
+    entries = []
 
     if args.source == "srd":
         # The SRD loader chunks as it goes: it renders one document per entry and
@@ -141,6 +156,12 @@ def main() -> int:
             print(f"{exc}", file=sys.stderr)
             return 1
         print(f"  {len(chunks)} chunks")
+        # Entries split across several chunks are also kept whole, so the
+        # researcher can send the stat block a matched piece came from.
+        split = {c.metadata["entry_id"] for c in chunks if c.metadata["chunk_count"] > 1}
+        entries = [e for e in load_srd_entries(SRD_DIRECTORY)
+                   if e.metadata["entry_id"] in split]
+        print(f"  {len(entries)} entries split, kept whole in the entry store")
     else:
         print(f"Loading {len(DOCUMENT_PATHS)} documents...")
         docs = load_documents(DOCUMENT_PATHS)
@@ -157,6 +178,13 @@ def main() -> int:
     print(f"Embedding with {EMBEDDING_MODEL_NAME} (this is the slow part)...")
     store = build_vectorstore(chunks, args.persist_directory, rebuild=args.rebuild)
 
+    if entries:
+        build_entry_store(entries, args.persist_directory).close()
+    if args.shards:
+        counts = build_shards(store, args.persist_directory)
+        print(f"Wrote {len(counts)} category shards: "
+              + ", ".join(f"{category} {count}" for category, count in sorted(counts.items())))
+
     indexed = store._collection.count()
     print(
         f"\nIndexed {indexed} chunks into {args.persist_directory} "
@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+"""Load-test the game server: many concurrent sessions, each playing turns.
+
+Every session opens its own websocket — its own campaign — and plays
+`--turns` turns back to back. Reported per turn, across all sessions:
+
+- **first token** — from sending the turn to its first event. What a player
+  waits before anything appears.
+- **turn** — from sending to `done`.
+- **tok/s** — narration tokens per second of each turn's streaming phase,
+  i.e. whether a session still streams at the model's pace under load.
+
+    python scripts/load_test_server.py --spawn                   # fake Ollama + server
+    python scripts/load_test_server.py --spawn --sessions 64 --rate 4.4
+    python scripts/load_test_server.py --spawn --sessions 64 --parallel 4  # + /metrics
+    python scripts/load_test_server.py --url http://box.local:8765   # a running server
+
+`--spawn` starts `scripts/fake_ollama.py` and `server.py` against a throwaway
+database, so no model daemon is needed. Against a real Ollama the numbers are
+the model's; against the fake they are the server's.
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+# Allow `python scripts/load_test_server.py` from the repo root without installing.
+sys.path.insert(0, str(ROOT))
+
+import aiohttp
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_until_up(url: str, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as http:
+        while True:
+            try:
+                async with http.get(url) as response:
+                    if response.status < 500:
+                        return
+            except aiohttp.ClientError:
+                pass
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"{url} did not come up in {timeout:.0f} s")
+            await asyncio.sleep(0.2)
+
+
+@contextmanager
+def spawned(args):
+    """Fake Ollama and a server on free ports. Yields the server's URL."""
+    ollama_port, server_port = _free_port(), _free_port()
+    env = {**os.environ, "PYTHONPATH": str(ROOT),
+           "OLLAMA_HOST": f"http://127.0.0.1:{ollama_port}"}
+    with tempfile.TemporaryDirectory() as tmp:
+        processes = [
+            subprocess.Popen([sys.executable, str(ROOT / "scripts" / "fake_ollama.py"),
+                              "--port", str(ollama_port), "--rate", str(args.rate),
+                              "--first-token", str(args.first_token),
+                              "--parallel", str(args.parallel)], env=env),
+            subprocess.Popen([sys.executable, str(ROOT / "server.py"),
+                              "--port", str(server_port), "--workers", str(args.workers)],
+                             env=env, cwd=tmp, stdout=subprocess.DEVNULL,
+                             stderr=subprocess.DEVNULL),
+        ]
+        try:
+            yield f"http://127.0.0.1:{server_port}"
+        finally:
+            for process in processes:
+                process.terminate()
+                process.wait(timeout=10)
+
+
+async def play_session(http: aiohttp.ClientSession, url: str, turns: int,
+                       text: str, results: list) -> None:
+    async with http.ws_connect(f"{url}/ws") as ws:
+        await ws.receive_json()  # {"type": "session", ...}
+        for _ in range(turns):
+            sent = time.perf_counter()
+            first = streaming = None
+            tokens, error = 0, None
+            await ws.send_json({"text": text})
+            while True:
+                event = await ws.receive_json()
+                now = time.perf_counter()
+                if event["type"] == "done":
+                    break
+                if first is None:
+                    first = now - sent
+                if event["type"] == "token":
+                    tokens += 1
+                    streaming = streaming or now
+                elif event["type"] == "error":
+                    error = event["error"]
+            elapsed = time.perf_counter() - sent
+            rate = (tokens / (now - streaming)) if streaming and now > streaming else None
+            results.append({"first": first, "turn": elapsed, "rate": rate, "error": error})
+
+
+def _p(values, q):
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)] if values else float("nan")
+
+
+async def run(url: str, sessions: int, turns: int, text: str) -> None:
+    await _wait_until_up(f"{url}/health")
+    results = []
+    started = time.perf_counter()
+    timeout = aiohttp.ClientTimeout(total=None)
+    async with aiohttp.ClientSession(timeout=timeout) as http:
+        outcomes = await asyncio.gather(
+            *(play_session(http, url, turns, text, results) for _ in range(sessions)),
+            return_exceptions=True,
+        )
+    wall = time.perf_counter() - started
+
+    failed = [o for o in outcomes if isinstance(o, BaseException)]
+    errors = [r["error"] for r in results if r["error"]]
+    ok = [r for r in results if not r["error"]]
+    firsts = [r["first"] for r in ok if r["first"] is not None]
+    lengths = [r["turn"] for r in ok]
+    rates = [r["rate"] for r in ok if r["rate"]]
+    print(f"{sessions} sessions x {turns} turns in {wall:.1f} s "
+          f"({len(results) / wall:.1f} turns/s)")
+    print(f"  errors        {len(errors)} turns, {len(failed)} sessions"
+          + (f"  e.g. {(errors or failed)[0]!r}" if errors or failed else ""))
+    if ok:
+        print(f"  first token   p50 {_p(firsts, .5) * 1000:7.0f} ms   p95 {_p(firsts, .95) * 1000:7.0f} ms")
+        print(f"  turn          p50 {_p(lengths, .5) * 1000:7.0f} ms   p95 {_p(lengths, .95) * 1000:7.0f} ms")
+    if rates:
+        print(f"  tok/s         p50 {statistics.median(rates):7.1f}      min {min(rates):7.1f}")
+
+    # The server's admission counters: how many turns it shed and which
+    # optional model calls it skipped to keep up.
+    async with aiohttp.ClientSession() as http:
+        async with http.get(f"{url}/metrics") as response:
+            if response.status == 200:
+                for line in (await response.text()).splitlines():
+                    if line.startswith(("dnd_llm_shed_total", "dnd_llm_degraded_total",
+                                        "dnd_llm_tokens_per_second")):
+                        print(f"  {line}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8765")
+    parser.add_argument("--sessions", type=int, default=16)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--text", default="I push open the door and look around.")
+    parser.add_argument("--spawn", action="store_true",
+                        help="start a fake Ollama and a server for the run")
+    parser.add_argument("--workers", type=int, default=8, help="with --spawn: server workers")
+    parser.add_argument("--rate", type=float, default=20.0,
+                        help="with --spawn: fake model tokens per second")
+    parser.add_argument("--first-token", type=float, default=0.5,
+                        help="with --spawn: fake model seconds to first token")
+    parser.add_argument("--parallel", type=int, default=4,
+                        help="with --spawn: fake model requests generated at once")
+    args = parser.parse_args()
+
+    if args.spawn:
+        with spawned(args) as url:
+            asyncio.run(run(url, args.sessions, args.turns, args.text))
+    else:
+        asyncio.run(run(args.url, args.sessions, args.turns, args.text))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+"""Report how turns were routed, from the JSONL interaction logs.
+
+Two numbers, because they answer different questions:
+
+- **Logged** — what the supervisor actually did. Each routing entry records
+  `metadata.router`: `prefilter` (no model) or `llm`. Logs written before the
+  pre-filter existed have no `router` key and count as model-routed.
+  Rolls answered outside the graph (`run_fast_dice_turn`) have no supervisor
+  entry; they are counted from the dice roller's `fast_lane` entry instead.
+- **Replayed** — what the current rule table would do with the same player
+  messages. This is how a rule change is judged before it ships: the share it
+  would take off the model, and whether it agrees with what the model chose.
+
+    python scripts/log_report.py                       # every log file
+    python scripts/log_report.py --since 2026-08-01    # files from that day on
+    python scripts/log_report.py --tier likely         # replay at the likely tier
+
+It also reports how the researcher's answers were produced: shown from an SRD
+entry as written (`extractive`), served from a kept answer, or generated.
+
+Only routing decisions on *player* messages count as turns. The pre-PR-04 logs
+also hold the supervisor re-routing on an agent's own output (KNOWN_ISSUES #6);
+those are not turns and are skipped.
+"""
+
+import argparse
+import ast
+import json
+import sys
+from collections import Counter
+from pathlib import Path
+
+# Allow `python scripts/log_report.py` from the repo root without installing.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.agents.supervisor import PREFILTER_TIERS, classify_request, prefilter_route
+
+LOG_DIRECTORY = "logs/llm_interactions"
+
+
+def read_entries(directory: str, since: str = ""):
+    """Every log line, oldest file first. Unparseable lines are skipped."""
+    for path in sorted(Path(directory).glob("llm_log_*.jsonl")):
+        if since and path.stem.removeprefix("llm_log_") < since:
+            continue
+        with path.open(encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+def player_request(entry: dict):
+    """The player message a routing entry was about, or None if it was not one.
+
+    Current logs store the request text. Pre-PR-04 logs stored the repr of the
+    whole message list; the turn is the last message, and only a `user` one is
+    a player's.
+    """
+    query = entry.get("query") or ""
+    if not query.startswith("[{"):
+        return query.strip() or None
+    try:
+        messages = ast.literal_eval(query)
+    except (ValueError, SyntaxError):
+        return None
+    last = messages[-1] if messages else {}
+    if not isinstance(last, dict) or last.get("role") != "user":
+        return None
+    return str(last.get("content", "")).strip() or None
+
+
+def is_fast_lane(entry: dict) -> bool:
+    return entry.get("agent") == "dice_roller" and bool((entry.get("metadata") or {}).get("fast_lane"))
+
+
+def router_of(entry: dict) -> str:
+    if is_fast_lane(entry):
+        return "fast_lane"
+    return (entry.get("metadata") or {}).get("router", "llm")
+
+
+def logged_destination(entry: dict):
+    metadata = entry.get("metadata") or {}
+    return metadata.get("routed_to") or metadata.get("next_agent") or entry.get("response")
+
+
+def answer_source(entry: dict):
+    """How a researcher log entry's answer was produced; None for a sub-step."""
+    metadata = entry.get("metadata") or {}
+    if metadata.get("stage"):
+        return None  # a failed rewrite or cache lookup, logged mid-turn
+    if metadata.get("error"):
+        return "failed"
+    for key in ("extractive", "answer_cache", "cached", "coalesced"):
+        if metadata.get(key):
+            return key
+    return "generated"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--log-dir", default=LOG_DIRECTORY)
+    parser.add_argument("--since", default="", help="YYYY-MM-DD; skip older files")
+    parser.add_argument("--tier", choices=PREFILTER_TIERS, default=PREFILTER_TIERS[0],
+                        help="weakest rule tier the replay routes without a model")
+    args = parser.parse_args()
+
+    turns, answers = [], Counter()
+    for entry in read_entries(args.log_dir, args.since):
+        if entry.get("agent") == "researcher" and answer_source(entry):
+            answers[answer_source(entry)] += 1
+        if is_fast_lane(entry):
+            turns.append((entry.get("query") or "", entry))
+            continue
+        if entry.get("agent") != "supervisor":
+            continue
+        request = player_request(entry)
+        if request is not None:
+            turns.append((request, entry))
+
+    if not turns:
+        print(f"No routing decisions in {args.log_dir}.")
+        return 1
+
+    routers = Counter(router_of(entry) for _, entry in turns)
+    total = len(turns)
+    print(f"{total} routed turns in {args.log_dir}\n")
+    print("Logged")
+    for router, count in routers.most_common():
+        print(f"  {router:12} {count:>6}  {count / total:6.1%}")
+    print(f"  without a model: {(routers['prefilter'] + routers['fast_lane']) / total:.1%}")
+
+    rules, agree, disagree = Counter(), 0, []
+    for request, entry in turns:
+        if prefilter_route(request, args.tier) is None:
+            continue
+        match = classify_request(request)
+        rules[(match.rule, match.tier)] += 1
+
+        logged = logged_destination(entry)
+        if router_of(entry) in ("prefilter", "fast_lane"):
+            continue
+        if isinstance(logged, list):
+            continue  # a split turn; the rule table routes turns whole
+        if logged == match.destination:
+            agree += 1
+        elif logged not in (None, "__end__"):
+            disagree.append((request, logged, match.destination))
+
+    replayed = sum(rules.values())
+    print(f"\nReplayed against the current rule table (tier: {args.tier})")
+    for (rule, tier), count in rules.most_common():
+        print(f"  {rule:22} {tier:8} {count:>6}  {count / total:6.1%}")
+    print(f"  without a model: {replayed / total:.1%}")
+    print(f"  agrees with the model's logged choice: {agree}, disagrees: {len(disagree)}")
+    for request, logged, routed in disagree[:20]:
+        print(f"    {request!r}: model said {logged}, rules say {routed}")
+
+    answered = sum(answers.values())
+    if answered:
+        print(f"\nResearcher answers ({answered})")
+        for source, count in answers.most_common():
+            print(f"  {source:12} {count:>6}  {count / answered:6.1%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
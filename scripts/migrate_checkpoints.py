@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+"""Move a checkpoint database's message history into the append-only side table.
+
+Databases written before `MessageLogSaver` hold the full message list in every
+checkpoint. They keep working unmigrated, but they keep their size. This rewrites
+each checkpoint so its history lives once in `message_log`, then `VACUUM`s to
+return the freed space to the filesystem.
+
+    python scripts/migrate_checkpoints.py                     # ./game_state.db
+    python scripts/migrate_checkpoints.py saves/campaign.db
+
+The database is copied to `<name>.bak` first unless `--no-backup` is given. Do
+not run this while a session has the database open.
+"""
+
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+from pathlib import Path
+
+# Allow `python scripts/migrate_checkpoints.py` from the repo root without installing.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.graph.game_orchestrator import DEFAULT_CHECKPOINT_DB
+from src.graph.message_log import MessageLogSaver
+
+
+def disk_size(db: str, conn: sqlite3.Connection) -> int:
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return sum(os.path.getsize(p) for p in (db, f"{db}-wal") if os.path.exists(p))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("db", nargs="?", default=DEFAULT_CHECKPOINT_DB)
+    parser.add_argument("--no-backup", action="store_true")
+    args = parser.parse_args()
+
+    if not Path(args.db).exists():
+        print(f"No checkpoint database at {args.db}.", file=sys.stderr)
+        return 1
+
+    conn = sqlite3.connect(args.db, check_same_thread=False)
+    before = disk_size(args.db, conn)
+    if not args.no_backup:
+        shutil.copy2(args.db, f"{args.db}.bak")
+        print(f"Backed up to {args.db}.bak")
+
+    rewritten = MessageLogSaver(conn).migrate()
+    conn.execute("VACUUM")
+    after = disk_size(args.db, conn)
+    conn.close()
+
+    print(f"Rewrote {rewritten} checkpoints: {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
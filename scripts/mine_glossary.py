@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+"""Mine glossary synonyms from the researcher's logged rewrites.
+
+A rewrite that turned a miss into a match says what the player's words meant
+in the rules' vocabulary: "can my guy do the thing where he hides and stabs"
+became "Can a character use Sneak Attack after Hiding?". Each word the
+rewrite dropped is paired with each SRD entry name it introduced. Pairs seen
+in at least `--min-support` different questions are written as a glossary,
+which the researcher then tries before calling the rewriter again
+(`src/pipelines/expansion.py`).
+
+    python scripts/mine_glossary.py                    # write query_glossary.json
+    python scripts/mine_glossary.py --dry-run          # print the pairs only
+    python scripts/mine_glossary.py --min-support 3 --out /tmp/glossary.json
+
+It also reports how misses were recovered: by a glossary variant, by a
+rewrite, or not at all. Restart the app to pick up a new glossary.
+"""
+
+import argparse
+import json
+import sys
+from collections import Counter, defaultdict
+from pathlib import Path
+
+# Allow `python scripts/mine_glossary.py` from the repo root without installing.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.agents.researcher import RELEVANCE_THRESHOLD
+from src.data.srd_loader import mentioned_srd_entries, normalise_name
+from src.pipelines.expansion import resolve_glossary_path
+
+LOG_DIRECTORY = "logs/llm_interactions"
+
+# Words a rewrite drops because they are phrasing, not meaning.
+STOPWORDS = {
+    "a", "an", "and", "are", "can", "could", "do", "does", "for", "he", "her",
+    "his", "how", "i", "i'm", "if", "in", "is", "it", "me", "my", "of", "on",
+    "or", "she", "that", "the", "their", "they", "thing", "to", "what", "when",
+    "where", "which", "who", "will", "with", "work", "would", "you", "your",
+    "guy", "gal", "someone", "character", "happens", "get",
+}
+
+
+def read_entries(directory: str):
+    """Every log line, oldest file first. Unparseable lines are skipped."""
+    for path in sorted(Path(directory).glob("llm_log_*.jsonl")):
+        with path.open(encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+def successful_rewrites(entries):
+    """(question, rewrite) for every logged rewrite that turned a miss into a match."""
+    for entry in entries:
+        metadata = entry.get("metadata") or {}
+        if entry.get("agent") != "researcher" or not metadata.get("rewritten"):
+            continue
+        retried = metadata.get("retried_score")
+        if retried is None or retried < RELEVANCE_THRESHOLD:
+            continue
+        if retried <= metadata.get("score", float("-inf")):
+            continue
+        yield entry.get("query", ""), metadata.get("rewritten_query", "")
+
+
+def pairs(question: str, rewrite: str):
+    """(player word, SRD name) for each word the rewrite dropped and name it added."""
+    asked = normalise_name(question).split()
+    kept = set(normalise_name(rewrite).split())
+    dropped = {w for w in asked if w not in kept and w not in STOPWORDS and len(w) >= 3}
+    named = set(mentioned_srd_entries(question))
+    added = [name for name in mentioned_srd_entries(rewrite) if name not in named]
+    return {(word, name) for word in dropped for name in added}
+
+
+def mine(entries, min_support: int) -> dict:
+    """{player word: [SRD names]} for pairs seen in `min_support` questions or more."""
+    support = Counter()
+    for question, rewrite in dict(successful_rewrites(entries)).items():
+        support.update(pairs(question, rewrite))
+    glossary = defaultdict(list)
+    for (word, name), count in support.most_common():
+        if count >= min_support:
+            glossary[word].append(name)
+    return dict(sorted(glossary.items()))
+
+
+def recoveries(entries) -> Counter:
+    """How each turn whose first retrieval missed ended up."""
+    outcomes = Counter()
+    for entry in entries:
+        metadata = entry.get("metadata") or {}
+        if entry.get("agent") != "researcher" or metadata.get("stage"):
+            continue
+        if "score" not in metadata or metadata["score"] >= RELEVANCE_THRESHOLD:
+            continue
+        if metadata.get("relevant") and "glossary_query" in metadata and not metadata.get("rewritten"):
+            outcomes["glossary"] += 1
+        elif metadata.get("relevant") and metadata.get("rewritten"):
+            outcomes["rewrite"] += 1
+        else:
+            outcomes["still missed"] += 1
+    return outcomes
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--log-dir", default=LOG_DIRECTORY)
+    parser.add_argument("--out", default=None,
+                        help="glossary to write (default: DND_GLOSSARY or query_glossary.json)")
+    parser.add_argument("--min-support", type=int, default=2,
+                        help="questions a pair must be seen in to be kept")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    entries = list(read_entries(args.log_dir))
+    outcomes = recoveries(entries)
+    print(f"Missed first retrievals: {sum(outcomes.values())}")
+    for outcome in ("glossary", "rewrite", "still missed"):
+        print(f"  {outcome:13} {outcomes[outcome]}")
+
+    glossary = mine(entries, args.min_support)
+    print(f"\n{len(glossary)} player words mined (min support {args.min_support})")
+    for word, names in glossary.items():
+        print(f"  {word:20} -> {', '.join(names)}")
+
+    if args.dry_run:
+        return 0
+    out = resolve_glossary_path(args.out)
+    Path(out).write_text(json.dumps(glossary, indent=2) + "\n", encoding="utf-8")
+    print(f"\nWrote {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+"""Move campaigns between checkpoint shards after the shard count changes.
+
+Each thread belongs in shard `crc32(thread_id) % N` (see `src/graph/sharding.py`).
+This reads every thread from the unsharded database and from any shard files
+already in `<stem>-shards/`, and moves each one that is not in its shard.
+
+    python scripts/rebalance_shards.py --shards 8              # game_state.db -> 8 shards
+    python scripts/rebalance_shards.py --shards 4 --dry-run    # say what would move
+    python scripts/rebalance_shards.py --shards 1              # back into game_state.db
+
+Then set `DND_CHECKPOINT_SHARDS` to the same N. A thread is copied to its new
+file and only then deleted from the old one, so an interrupted run leaves at
+most a duplicate, and running it again finishes the job. Shard files left empty
+are removed; the unsharded file is kept. Do not run this while a session has the
+database open.
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+from collections import Counter
+from pathlib import Path
+
+# Allow `python scripts/rebalance_shards.py` from the repo root without installing.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.graph.game_orchestrator import DEFAULT_CHECKPOINT_DB
+from src.graph.message_log import MessageLogSaver
+from src.graph.sharding import (
+    ENV_SHARDS,
+    existing_shard_paths,
+    shard_dir,
+    shard_index,
+    shard_paths,
+)
+
+TABLES = ("checkpoints", "writes", "message_log")
+
+
+def tables_in(conn: sqlite3.Connection, schema: str = "main") -> set:
+    return {name for (name,) in conn.execute(
+        f"SELECT name FROM {schema}.sqlite_master WHERE type = 'table'")}
+
+
+def thread_ids(conn: sqlite3.Connection) -> list:
+    present = [t for t in TABLES if t in tables_in(conn)]
+    if not present:
+        return []
+    union = " UNION ".join(f"SELECT thread_id FROM {t}" for t in present)
+    return [thread_id for (thread_id,) in conn.execute(union)]
+
+
+def move_thread(conn: sqlite3.Connection, thread_id: str) -> None:
+    """Copy a thread into the attached `dst`, then delete it here."""
+    present = [t for t in TABLES if t in tables_in(conn)]
+    with conn:
+        for table in present:
+            conn.execute(f"INSERT OR REPLACE INTO dst.{table} "
+                         f"SELECT * FROM main.{table} WHERE thread_id = ?", (thread_id,))
+    with conn:
+        for table in present:
+            conn.execute(f"DELETE FROM main.{table} WHERE thread_id = ?", (thread_id,))
+
+
+def create(path: str) -> None:
+    """Make sure `path` exists with the full schema."""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    saver = MessageLogSaver(sqlite3.connect(path, check_same_thread=False))
+    saver.setup()
+    saver.conn.close()
+
+
+def remove_database(path: str) -> None:
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=DEFAULT_CHECKPOINT_DB)
+    parser.add_argument("--shards", type=int, required=True)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    if args.shards < 1:
+        print("--shards must be at least 1.", file=sys.stderr)
+        return 1
+
+    targets = [args.db] if args.shards == 1 else shard_paths(args.db, args.shards)
+    sources = ([args.db] if Path(args.db).exists() else []) + existing_shard_paths(args.db)
+    if not sources:
+        print(f"No checkpoint database at {args.db} or beside it.", file=sys.stderr)
+        return 1
+    if not args.dry_run:
+        for path in targets:
+            create(path)
+
+    moved, kept = Counter(), 0
+    for source in sources:
+        conn = sqlite3.connect(source)
+        plan = {}
+        for thread_id in thread_ids(conn):
+            target = targets[shard_index(thread_id, args.shards)]
+            if target == source:
+                kept += 1
+            else:
+                plan.setdefault(target, []).append(thread_id)
+        for target, ids in plan.items():
+            moved[(source, target)] = len(ids)
+            if args.dry_run:
+                continue
+            conn.execute("ATTACH DATABASE ? AS dst", (target,))
+            for thread_id in ids:
+                move_thread(conn, thread_id)
+            conn.execute("DETACH DATABASE dst")
+        conn.close()
+        if source not in targets and source != args.db and not args.dry_run:
+            remove_database(source)
+
+    leftover = shard_dir(args.db)
+    if args.shards == 1 and not args.dry_run and leftover.exists() and not any(leftover.iterdir()):
+        leftover.rmdir()
+
+    verb = "Would move" if args.dry_run else "Moved"
+    for (source, target), count in sorted(moved.items()):
+        print(f"{verb} {count:>5} threads {source} -> {target}")
+    print(f"{sum(moved.values())} threads {'to move' if args.dry_run else 'moved'}, "
+          f"{kept} already in place. Set {ENV_SHARDS}={args.shards}.")
+    if args.shards > 1 and args.db in sources and not args.dry_run:
+        print(f"{args.db} no longer holds any campaign and can be deleted.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+"""Build the preset dictionary the checkpoint serializer compresses with.
+
+A message row is a few hundred bytes of msgpack. That is too short for zlib
+to find repeats on its own. A preset dictionary gives it text it can refer
+back to before the first byte: the msgpack layout every message shares, and
+the phrases that keep turning up in narration and rules answers. This collects
+those from the SRD corpus and the LLM interaction logs and writes them as one
+blob of at most 32 KB, zlib's window size.
+
+    python scripts/train_zdict.py                 # print what it would write
+    python scripts/train_zdict.py --write --version 2   # write a new version
+
+The dictionary is part of the on-disk format. Rows compressed with it can only
+be read back with the same bytes, so `--write` refuses to replace a published
+version. To change it, add `checkpoint_zdict_v2.bin` and a new format in
+`src/graph/compressed_serde.py`, and leave v1 in place for old databases.
+"""
+
+import argparse
+import json
+import sys
+import zlib
+from collections import Counter
+from pathlib import Path
+
+# Allow `python scripts/train_zdict.py` from the repo root without installing.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from src.graph.compressed_serde import COMPRESSION_LEVEL, WBITS, ZDICT_SIZE, zdict_path
+
+ROOT = Path(__file__).resolve().parent.parent
+SRD_DIR = ROOT / "corpus" / "srd"
+LOG_DIR = ROOT / "logs" / "llm_interactions"
+AGENTS = ("dungeon_master", "researcher", "dice_roller")
+# Every fifth SRD entry is held out, to measure the dictionary on text it
+# was not built from.
+HOLD_OUT_EVERY = 5
+MIN_WORDS, MAX_WORDS = 2, 6
+
+
+def descriptions(node):
+    """Every string under a `desc` key, however deep."""
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key == "desc":
+                yield from ([value] if isinstance(value, str) else
+                            [v for v in value if isinstance(v, str)])
+            else:
+                yield from descriptions(value)
+    elif isinstance(node, list):
+        for item in node:
+            yield from descriptions(item)
+
+
+def load_samples():
+    """(training texts, held-out texts), one text per SRD entry or log response."""
+    train, held_out = [], []
+    for path in sorted(SRD_DIR.glob("*.json")):
+        for i, entry in enumerate(json.loads(path.read_text(encoding="utf-8"))):
+            text = "\n".join(descriptions(entry))
+            if text:
+                (held_out if i % HOLD_OUT_EVERY == 0 else train).append(text)
+    for path in sorted(LOG_DIR.glob("*.jsonl")):
+        for line in path.read_text(encoding="utf-8").splitlines():
+            response = json.loads(line).get("response")
+            if isinstance(response, str) and response:
+                train.append(response)
+    return train, held_out
+
+
+def skeletons() -> bytes:
+    """The serialized form of each message kind, with empty content.
+
+    Goes at the end of the dictionary: it is in every row, and zlib codes
+    nearer matches in fewer bits.
+    """
+    serde = JsonPlusSerializer()
+    messages = [HumanMessage(content="", id="")]
+    messages += [AIMessage(content="", name=name, id="") for name in AGENTS]
+    return b"".join(serde.dumps_typed(m)[1] for m in messages)
+
+
+def frequent_phrases(texts, budget: int):
+    """Word n-grams worth their bytes, weakest first.
+
+    Scored by how many texts contain them times their length: a phrase in
+    many messages saves bytes in each. Counting documents rather than
+    occurrences keeps one long monster entry from filling the dictionary.
+    """
+    counts = Counter()
+    for text in texts:
+        words = text.split()
+        counts.update({
+            " ".join(words[i:i + n])
+            for n in range(MIN_WORDS, MAX_WORDS + 1)
+            for i in range(len(words) - n + 1)
+        })
+    scored = sorted(
+        ((docs * len(phrase.encode("utf-8")), phrase)
+         for phrase, docs in counts.items() if docs >= 3),
+        reverse=True,
+    )
+    chosen, used = [], 0
+    joined = ""
+    for _, phrase in scored:
+        size = len(phrase.encode("utf-8")) + 1
+        if used + size > budget:
+            continue
+        # A phrase inside one already chosen adds nothing zlib cannot find.
+        if phrase in joined:
+            continue
+        chosen.append(phrase)
+        joined += phrase + " "
+        used += size
+        if budget - used < 8:
+            break
+    return list(reversed(chosen))
+
+
+def build() -> tuple:
+    train, held_out = load_samples()
+    tail = skeletons()
+    phrases = frequent_phrases(train, ZDICT_SIZE - len(tail))
+    zdict = (" ".join(phrases) + " ").encode("utf-8") + tail
+    return zdict[-ZDICT_SIZE:], held_out
+
+
+def evaluate(zdict: bytes, held_out) -> None:
+    serde = JsonPlusSerializer()
+    plain = packed = with_dict = 0
+    for text in held_out:
+        _, data = serde.dumps_typed(AIMessage(content=text, name="researcher",
+                                              id="00000000-0000-0000-0000-000000000000"))
+        compressor = zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, WBITS, zdict=zdict)
+        plain += len(data)
+        packed += len(zlib.compress(data, COMPRESSION_LEVEL))
+        with_dict += len(compressor.compress(data) + compressor.flush())
+    print(f"{len(held_out)} held-out SRD entries as messages: {plain / 1e3:.0f} KB serialized, "
+          f"{packed / 1e3:.0f} KB zlib ({packed / plain:.0%}), "
+          f"{with_dict / 1e3:.0f} KB zlib + dictionary ({with_dict / plain:.0%})")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--version", type=int, default=1)
+    parser.add_argument("--write", action="store_true",
+                        help="write the dictionary (refuses to overwrite one)")
+    args = parser.parse_args()
+
+    zdict, held_out = build()
+    print(f"dictionary: {len(zdict)} bytes")
+    evaluate(zdict, held_out)
+
+    if args.write:
+        path = zdict_path(args.version)
+        if path.exists():
+            print(f"{path} exists and databases may depend on it; bump --version.",
+                  file=sys.stderr)
+            return 1
+        path.write_bytes(zdict)
+        print(f"wrote {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,33 @@
+"""Serves many campaigns from one process: one graph, one set of agents.
+
+    python server.py
+    python server.py --port 9000 --workers 4
+
+Connect a websocket to `/ws` (or `/ws?thread_id=<id>` to resume), send
+`{"text": "I open the door"}`, and read events until `{"type": "done"}`.
+`POST /sessions/<id>/turns` does the same over plain HTTP as NDJSON. See
+`src/server/app.py`; `scripts/load_test_server.py` drives it.
+"""
+
+import argparse
+import logging
+
+from aiohttp import web
+
+from src.server.app import DEFAULT_PORT, create_app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="turns in flight at once (default: DND_SERVER_WORKERS or 8)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    web.run_app(create_app(workers=args.workers), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
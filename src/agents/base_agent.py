@@ -1,8 +1,10 @@
+import asyncio
 from abc import ABC, abstractmethod
 from typing import Dict, Any
 from langchain_core.messages import SystemMessage
 from src.utils.llm_logger import LLMLogger, LLMInteraction  
 from src.graph.game_state import GameState
+from src.models.admission import admission_for
 
 class BaseAgent(ABC):
     """Abstract base class for all agents"""
@@ -28,7 +30,22 @@ class BaseAgent(ABC):
     def process_task(self, state: GameState) -> GameState:
         """Main processing method to be implemented by subclasses"""
         pass
+
+    async def aprocess_task(self, state: GameState) -> GameState:
+        """`process_task` for `astream`. Runs the sync one on a thread by default.
+
+        Agents that wait on a model override this to await it instead, so a
+        turn in flight holds no thread while the model generates.
+        """
+        return await asyncio.to_thread(self.process_task, state)
     
+    def _skips(self, step: str) -> bool:
+        """True when load on this agent's Ollama host says to skip `step`.
+
+        See `OPTIONAL_STEPS` in `src/models/admission.py`. A skip is counted.
+        """
+        return admission_for(getattr(self.llm, "base_url", None)).degraded_step(step)
+
     @abstractmethod
     def get_definition(self) -> str:
         """Return system prompt definition for the agent"""
@@ -1,6 +1,7 @@
-from typing import Literal, Tuple
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Literal, Tuple
 from typing_extensions import TypedDict
-from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
 from src.utils.llm_logger import LLMLogger, LLMInteraction
 from src.graph.game_state import GameState
 from src.utils.dice import DiceRoller
@@ -89,6 +90,133 @@ def extract_roll_flags(message: str):
     return advantage, disadvantage, description
 
 
+def roll_literal_request(message: str) -> Tuple[str, Dict[str, Any]]:
+    """Roll exactly what the request spells out, with no model anywhere.
+
+    The common path through `DiceRollerAgent`, lifted out so the supervisor can
+    roll a dice sub-intent at split time. Returns the result line and the parsed
+    fields that go into the log.
+
+    Raises:
+        DiceParseError: if the request names no dice, or names dice that cannot
+            be rolled. "roll for initiative" is the model's job, not this one's.
+    """
+    notation, modifier = extract_dice_expression(message)
+    if notation is None:
+        raise DiceParseError(f"no dice notation in {message!r}")
+    try:
+        DiceRoller.parse_dice_string(notation)
+    except ValueError as exc:
+        raise DiceParseError(f"could not read a dice roll from {message!r}: {exc}") from exc
+
+    has_advantage, has_disadvantage, description = extract_roll_flags(message)
+    details = {
+        "dice_notation": notation,
+        "modifier": modifier,
+        "has_advantage": has_advantage,
+        "has_disadvantage": has_disadvantage,
+        "description": description,
+    }
+    return execute_dice_roll(**details), details
+
+
+def execute_dice_roll(dice_notation: str, modifier: int,
+                      has_advantage: bool, has_disadvantage: bool,
+                      description: str) -> str:
+    """Execute the dice roll using the DiceRoller utility."""
+    try:
+        # Handle advantage/disadvantage
+        if has_advantage or has_disadvantage:
+            # For advantage/disadvantage, determine the base dice type
+            # Usually this is just d20, but we'll handle any dice type
+            dice_match = re.search(r'(\d*)d(\d+)', dice_notation)
+            if dice_match:
+                count = dice_match.group(1) or "1"
+                sides = dice_match.group(2)
+                base_roll = f"{count}d{sides}"
+            else:
+                base_roll = dice_notation
+
+            # Roll the dice twice
+            first_result = DiceRoller.roll_multiple(base_roll)
+            second_result = DiceRoller.roll_multiple(base_roll)
+
+            # Calculate totals
+            first_total = sum(roll.total for roll in first_result)
+            second_total = sum(roll.total for roll in second_result)
+
+            # Format details for display
+            first_details = ", ".join(str(roll) for roll in first_result)
+            second_details = ", ".join(str(roll) for roll in second_result)
+
+            # Choose result based on advantage/disadvantage
+            if has_advantage:
+                final_total = max(first_total, second_total)
+                advantage_text = f"with advantage (rolls: {first_total} and {second_total}, took higher)"
+            else:  # disadvantage
+                final_total = min(first_total, second_total)
+                advantage_text = f"with disadvantage (rolls: {first_total} and {second_total}, took lower)"
+
+            # Add modifier
+            total_with_modifier = final_total + modifier
+            modifier_text = f" + {modifier}" if modifier > 0 else f" - {abs(modifier)}" if modifier < 0 else ""
+
+            # Format result
+            if description:
+                result = f"🎲 Rolled {base_roll} {advantage_text}{modifier_text} for {description}: **{total_with_modifier}**"
+            else:
+                result = f"🎲 Rolled {base_roll} {advantage_text}{modifier_text}: **{total_with_modifier}**"
+
+            # Add roll details
+            result += f"\nFirst roll: {first_details}\nSecond roll: {second_details}"
+
+            return result
+
+        # Standard dice rolls
+        rolls = DiceRoller.roll_multiple(dice_notation)
+
+        if not rolls:
+            return "No valid dice roll found in the request."
+
+        # Calculate total with modifier
+        base_total = sum(roll.total for roll in rolls)
+        total = base_total + modifier
+
+        # Format result
+        modifier_text = f" + {modifier}" if modifier > 0 else f" - {abs(modifier)}" if modifier < 0 else ""
+
+        if description:
+            result = f"🎲 Rolled {dice_notation}{modifier_text} for {description}: **{total}**"
+        else:
+            result = f"🎲 Rolled {dice_notation}{modifier_text}: **{total}**"
+
+        # Add details about individual dice
+        if len(rolls) == 1 and len(rolls[0].results) > 1:
+            result += f" (rolled {rolls[0].results})"
+        elif len(rolls) > 1:
+            details = " + ".join(str(roll) for roll in rolls)
+            result += f" ({details})"
+
+        return result
+
+    except Exception as e:
+        return f"Error processing dice roll: {str(e)}"
+
+
+@contextmanager
+def _read_as_roll(message: str) -> Iterator[None]:
+    """Raise anything that goes wrong reading `message` as `DiceParseError`."""
+    try:
+        yield
+    except Exception as exc:
+        # A dice request that cannot be parsed must not silently become
+        # 1d20 — that returns a confident number for a roll nobody asked
+        # for. Let the caller report it.
+        raise DiceParseError(
+            f"could not read a dice roll from {message!r}: {exc}"
+        ) from exc
+
+
 class DiceRollerAgent(BaseAgent):
     """Agent that handles rolling dice for game mechanics."""
 
@@ -107,30 +235,54 @@ class DiceRollerAgent(BaseAgent):
         """Processes dice roll requests and returns results."""
         # Extract the dice roll request from the state
         latest_message = self._get_latest_message(state)
-        
+
+        pre_rolled = state.get("turn_roll")
+        if pre_rolled:
+            return self._record_pre_rolled(latest_message, pre_rolled)
+
         try:
-            dice_notation, modifier, has_advantage, has_disadvantage, description = (
-                self._parse_dice_request(latest_message)
-            )
+            parsed = self._parse_dice_request(latest_message)
         except DiceParseError as exc:
-            # Say what went wrong. The old code fell back to 1d20 here, which
-            # answered an unasked question with a confident number.
-            result_message = (
-                f"I could not tell what to roll. Try dice notation — "
-                f"`2d6+3`, `1d20 with advantage`. ({exc})"
-            )
-            self._log_interaction(
-                query=latest_message,
-                response=result_message,
-                metadata={"error": str(exc)},
-            )
-            return Command(
-                goto=END,
-                update={
-                    "messages": [AIMessage(content=result_message, name=self.agent_type)],
-                    "last_response": result_message,
-                },
-            )
+            return self._unreadable(latest_message, exc)
+        return self._rolled(latest_message, parsed)
+
+    async def aprocess_task(self, state: GameState) -> Command[Literal["__end__"]]:
+        """`process_task`, awaiting the parse when the request names no dice."""
+        latest_message = self._get_latest_message(state)
+
+        pre_rolled = state.get("turn_roll")
+        if pre_rolled:
+            return self._record_pre_rolled(latest_message, pre_rolled)
+
+        try:
+            parsed = await self._aparse_dice_request(latest_message)
+        except DiceParseError as exc:
+            return self._unreadable(latest_message, exc)
+        return self._rolled(latest_message, parsed)
+
+    def _unreadable(self, latest_message: str, exc: DiceParseError) -> Command[Literal["__end__"]]:
+        # Say what went wrong. The old code fell back to 1d20 here, which
+        # answered an unasked question with a confident number.
+        result_message = (
+            f"I could not tell what to roll. Try dice notation — "
+            f"`2d6+3`, `1d20 with advantage`. ({exc})"
+        )
+        self._log_interaction(
+            query=latest_message,
+            response=result_message,
+            metadata={"error": str(exc)},
+        )
+        return Command(
+            goto=END,
+            update={
+                "messages": [AIMessage(content=result_message, name=self.agent_type)],
+                "last_response": result_message,
+            },
+        )
+
+    def _rolled(self, latest_message: str,
+                parsed: Tuple[str, int, bool, bool, str]) -> Command[Literal["__end__"]]:
+        dice_notation, modifier, has_advantage, has_disadvantage, description = parsed
 
         # Execute the dice roll using DiceRoller
         result_message = self._execute_dice_roll(
@@ -172,6 +324,49 @@ class DiceRollerAgent(BaseAgent):
         )
     
     
+    def roll_outside_graph(self, request: str) -> Dict[str, Any]:
+        """The state update for a dice turn answered without running the graph.
+
+        `main.py` calls this for turns the rule table already calls a roll, so
+        neither the supervisor nor this node runs. Returns what `process_task`
+        would have written, for the caller to apply in one `update_state`.
+
+        Raises:
+            DiceParseError: if the request does not spell out its dice. The
+                caller then runs the turn through the graph as usual.
+        """
+        result, details = roll_literal_request(request)
+        self._log_interaction(
+            query=request,
+            response=result,
+            metadata={"dice_roll": details, "fast_lane": True},
+        )
+        return {
+            "messages": [AIMessage(content=result, name=self.agent_type)],
+            "last_response": result,
+            "active_agent": self.agent_type,
+        }
+
+    def _record_pre_rolled(self, request: str, roll: Dict[str, Any]) -> Command[Literal["__end__"]]:
+        """Record a roll the supervisor made when it split a multi-intent turn.
+
+        The supervisor rolls at split time — deterministic and sub-millisecond —
+        so the narration running alongside this node can use the same number.
+        Rolling again here would put two different totals in one turn.
+
+        No `last_response`: the narration writes it in the same step, and two
+        writers to a plain channel in one step is an error in LangGraph.
+        """
+        self._log_interaction(
+            query=request,
+            response=roll["result"],
+            metadata={"dice_roll": roll["dice_roll"], "multi_intent": True},
+        )
+        return Command(
+            goto=END,
+            update={"messages": [AIMessage(content=roll["result"], name=self.agent_type)]},
+        )
+
     def _parse_dice_request(self, message: str) -> Tuple[str, int, bool, bool, str]:
         """Parse the dice request into structured fields.
 
@@ -194,127 +389,75 @@ class DiceRollerAgent(BaseAgent):
         Returns:
             Tuple with (dice_notation, modifier, has_advantage, has_disadvantage, description)
         """
-        try:
-            notation, modifier = extract_dice_expression(message)
-            has_advantage, has_disadvantage, description = extract_roll_flags(message)
-
-            if notation is None:
-                parsed = self.parser.invoke([
-                    SystemMessage(content=DICE_PARSE_PROMPT),
-                    HumanMessage(content=message),
-                ])
-                if not isinstance(parsed, dict):
-                    raise ValueError(f"parser returned {parsed!r}")
-
-                notation = str(parsed.get("dice_notation") or "").strip()
-                if not notation:
-                    raise ValueError("no dice notation in the parsed request")
-
-                # The model is allowed to name the dice, and nothing else. It
-                # will fold a bonus into the notation given the chance —
-                # "roll for initiative" came back as "1d20+2" — so the notation
-                # is re-read and the modifier is taken from the player's own
-                # words, which is the only place a real one can come from.
-                notation, _ = extract_dice_expression(notation)
-                if notation is None:
-                    raise ValueError("the model returned no rollable dice")
-                modifier = sum(
-                    int(f"{sign}{value}")
-                    for sign, value in FLAT_MODIFIER.findall(message.replace(" ", ""))
-                )
-
-                description = description or str(parsed.get("description") or "").strip()
-
-            # The notation has to be rollable. Typed does not mean meaningful.
-            DiceRoller.parse_dice_string(notation)
-
-            return notation, modifier, has_advantage, has_disadvantage, description
-        except Exception as exc:
-            # A dice request that cannot be parsed must not silently become
-            # 1d20 — that returns a confident number for a roll nobody asked
-            # for. Let the caller report it.
-            raise DiceParseError(
-                f"could not read a dice roll from {message!r}: {exc}"
-            ) from exc
+        with _read_as_roll(message):
+            request = self._read_literal(message)
+            if request[0] is None:
+                parsed = self.parser.invoke(self._parse_messages(message))
+                request = self._with_parsed(message, request, parsed)
+            return self._rollable(request)
+
+    async def _aparse_dice_request(self, message: str) -> Tuple[str, int, bool, bool, str]:
+        """`_parse_dice_request`, awaiting the model when it is needed at all."""
+        with _read_as_roll(message):
+            request = self._read_literal(message)
+            if request[0] is None:
+                parsed = await self.parser.ainvoke(self._parse_messages(message))
+                request = self._with_parsed(message, request, parsed)
+            return self._rollable(request)
+
+    @staticmethod
+    def _read_literal(message: str) -> Tuple[Any, int, bool, bool, str]:
+        """Whatever the request states outright; the notation is None if no dice."""
+        notation, modifier = extract_dice_expression(message)
+        has_advantage, has_disadvantage, description = extract_roll_flags(message)
+        return notation, modifier, has_advantage, has_disadvantage, description
+
+    def _with_parsed(self, message: str, request: Tuple[Any, int, bool, bool, str],
+                     parsed: Any) -> Tuple[str, int, bool, bool, str]:
+        """`request` with the dice the model named. The flags stay the request's own."""
+        _, _, has_advantage, has_disadvantage, description = request
+        notation, modifier, description = self._read_parsed(message, parsed, description)
+        return notation, modifier, has_advantage, has_disadvantage, description
+
+    @staticmethod
+    def _rollable(request: Tuple[str, int, bool, bool, str]) -> Tuple[str, int, bool, bool, str]:
+        # The notation has to be rollable. Typed does not mean meaningful.
+        DiceRoller.parse_dice_string(request[0])
+        return request
+
+    @staticmethod
+    def _parse_messages(message: str) -> List[BaseMessage]:
+        return [SystemMessage(content=DICE_PARSE_PROMPT), HumanMessage(content=message)]
+
+    @staticmethod
+    def _read_parsed(message: str, parsed: Any, description: str) -> Tuple[str, int, str]:
+        """The notation, modifier and description from the model's parse."""
+        if not isinstance(parsed, dict):
+            raise ValueError(f"parser returned {parsed!r}")
+
+        notation = str(parsed.get("dice_notation") or "").strip()
+        if not notation:
+            raise ValueError("no dice notation in the parsed request")
+
+        # The model is allowed to name the dice, and nothing else. It
+        # will fold a bonus into the notation given the chance —
+        # "roll for initiative" came back as "1d20+2" — so the notation
+        # is re-read and the modifier is taken from the player's own
+        # words, which is the only place a real one can come from.
+        notation, _ = extract_dice_expression(notation)
+        if notation is None:
+            raise ValueError("the model returned no rollable dice")
+        modifier = sum(
+            int(f"{sign}{value}")
+            for sign, value in FLAT_MODIFIER.findall(message.replace(" ", ""))
+        )
+
+        return notation, modifier, description or str(parsed.get("description") or "").strip()
     
-    def _execute_dice_roll(self, dice_notation: str, modifier: int, 
-                          has_advantage: bool, has_disadvantage: bool, 
+    def _execute_dice_roll(self, dice_notation: str, modifier: int,
+                          has_advantage: bool, has_disadvantage: bool,
                           description: str) -> str:
         """Execute the dice roll using the DiceRoller utility."""
-        try:
-            # Handle advantage/disadvantage
-            if has_advantage or has_disadvantage:
-                # For advantage/disadvantage, determine the base dice type
-                # Usually this is just d20, but we'll handle any dice type
-                dice_match = re.search(r'(\d*)d(\d+)', dice_notation)
-                if dice_match:
-                    count = dice_match.group(1) or "1"
-                    sides = dice_match.group(2)
-                    base_roll = f"{count}d{sides}"
-                else:
-                    base_roll = dice_notation
-                
-                # Roll the dice twice
-                first_result = DiceRoller.roll_multiple(base_roll)
-                second_result = DiceRoller.roll_multiple(base_roll)
-                
-                # Calculate totals
-                first_total = sum(roll.total for roll in first_result)
-                second_total = sum(roll.total for roll in second_result)
-                
-                # Format details for display
-                first_details = ", ".join(str(roll) for roll in first_result)
-                second_details = ", ".join(str(roll) for roll in second_result)
-                
-                # Choose result based on advantage/disadvantage
-                if has_advantage:
-                    final_total = max(first_total, second_total)
-                    advantage_text = f"with advantage (rolls: {first_total} and {second_total}, took higher)"
-                else:  # disadvantage
-                    final_total = min(first_total, second_total)
-                    advantage_text = f"with disadvantage (rolls: {first_total} and {second_total}, took lower)"
-                
-                # Add modifier
-                total_with_modifier = final_total + modifier
-                modifier_text = f" + {modifier}" if modifier > 0 else f" - {abs(modifier)}" if modifier < 0 else ""
-                
-                # Format result
-                if description:
-                    result = f"🎲 Rolled {base_roll} {advantage_text}{modifier_text} for {description}: **{total_with_modifier}**"
-                else:
-                    result = f"🎲 Rolled {base_roll} {advantage_text}{modifier_text}: **{total_with_modifier}**"
-                
-                # Add roll details
-                result += f"\nFirst roll: {first_details}\nSecond roll: {second_details}"
-                
-                return result
-            
-            # Standard dice rolls
-            rolls = DiceRoller.roll_multiple(dice_notation)
-            
-            if not rolls:
-                return "No valid dice roll found in the request."
-                
-            # Calculate total with modifier
-            base_total = sum(roll.total for roll in rolls)
-            total = base_total + modifier
-            
-            # Format result
-            modifier_text = f" + {modifier}" if modifier > 0 else f" - {abs(modifier)}" if modifier < 0 else ""
-            
-            if description:
-                result = f"🎲 Rolled {dice_notation}{modifier_text} for {description}: **{total}**"
-            else:
-                result = f"🎲 Rolled {dice_notation}{modifier_text}: **{total}**"
-            
-            # Add details about individual dice
-            if len(rolls) == 1 and len(rolls[0].results) > 1:
-                result += f" (rolled {rolls[0].results})"
-            elif len(rolls) > 1:
-                details = " + ".join(str(roll) for roll in rolls)
-                result += f" ({details})"
-            
-            return result
-                
-        except Exception as e:
-            return f"Error processing dice roll: {str(e)}"
+        return execute_dice_roll(
+            dice_notation, modifier, has_advantage, has_disadvantage, description
+        )
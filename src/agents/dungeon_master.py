@@ -77,6 +77,18 @@ class DungeonMaster(BaseAgent):
         if briefing:
             system = f"{system}\n\nEstablished so far: {briefing}"
 
+        # A multi-intent turn ("I swing at the goblin — roll 1d20+5"). The roll
+        # was made when the supervisor split the turn, so the narration can land
+        # on the same number the player sees.
+        roll = state.get("turn_roll")
+        if roll:
+            result = roll["result"].splitlines()[0]
+            system = (
+                f"{system}\n\nThe player already rolled for this action: {result}. "
+                f"Narrate an outcome that agrees with that roll, and do not ask "
+                f"for it again."
+            )
+
         history = [
             message
             for message in list(state.get("messages") or [])[-CONTEXT_WINDOW:]
@@ -89,27 +101,51 @@ class DungeonMaster(BaseAgent):
 
         return [SystemMessage(content=system), *history]
 
+    def _extraction_messages(self, narration: str) -> List[BaseMessage]:
+        return [SystemMessage(content=SCENE_EXTRACTION_PROMPT), HumanMessage(content=narration)]
+
     def _extract_scene(self, narration: str) -> Dict[str, Any]:
-        """Pull durable facts out of a narration. Never raises."""
+        """Pull durable facts out of a narration. Never raises.
+
+        Skipped when the model host is queued deep: the player already has
+        the narration, and a missed location update costs less than a second
+        model call in front of every other session's turn.
+        """
+        if self._skips("scene_extraction"):
+            return {}
         try:
             update = self.extractor.invoke(
-                [
-                    SystemMessage(content=SCENE_EXTRACTION_PROMPT),
-                    HumanMessage(content=narration),
-                ],
+                self._extraction_messages(narration),
                 # This call runs inside the same node as the narration, so a
                 # consumer streaming by node name cannot tell them apart and
                 # would print raw JSON at the player. The tag is that signal.
                 config={"tags": [INTERNAL_TAG]},
             )
         except Exception as exc:
-            self._log_interaction(
-                query=narration,
-                response=f"scene extraction failed: {exc}",
-                metadata={"error": str(exc), "stage": "extract"},
-            )
+            return self._extraction_failed(narration, exc)
+        return self._scene_of(update)
+
+    async def _aextract_scene(self, narration: str) -> Dict[str, Any]:
+        if self._skips("scene_extraction"):
             return {}
+        try:
+            update = await self.extractor.ainvoke(
+                self._extraction_messages(narration), config={"tags": [INTERNAL_TAG]}
+            )
+        except Exception as exc:
+            return self._extraction_failed(narration, exc)
+        return self._scene_of(update)
 
+    def _extraction_failed(self, narration: str, exc: Exception) -> Dict[str, Any]:
+        self._log_interaction(
+            query=narration,
+            response=f"scene extraction failed: {exc}",
+            metadata={"error": str(exc), "stage": "extract"},
+        )
+        return {}
+
+    @staticmethod
+    def _scene_of(update: Any) -> Dict[str, Any]:
         if not isinstance(update, dict):
             return {}
 
@@ -161,27 +197,50 @@ class DungeonMaster(BaseAgent):
             # this through the streaming path anyway, so `main.py` receives
             # tokens as they are produced — first token ~3.5 s, against ~25 s to
             # wait for a finished narration.
-            response = self.llm.invoke(messages)
-            narration = getattr(response, "content", str(response)).strip()
-            if not narration:
-                raise ValueError("the model returned an empty narration")
+            narration = self._narration_of(self.llm.invoke(messages))
         except Exception as exc:
-            error_message = f"The story falters: {exc}"
-            self._log_interaction(
-                query=request,
-                response=error_message,
-                metadata={"error": str(exc), "stage": "narrate"},
-            )
-            return Command(
-                goto=END,
-                update={
-                    "messages": [AIMessage(content=error_message, name=self.agent_type)],
-                    "last_response": error_message,
-                },
-            )
+            return self._faltered(request, exc)
 
         scene = self._extract_scene(narration)
+        return self._narrated(state, request, messages, narration, scene)
+
+    async def aprocess_task(self, state: GameState) -> Command[Literal["__end__"]]:
+        """`process_task`, awaiting the model. Streams the same way under `astream`."""
+        request = self._get_latest_message(state)
+        messages = self._narration_messages(state)
+
+        try:
+            narration = self._narration_of(await self.llm.ainvoke(messages))
+        except Exception as exc:
+            return self._faltered(request, exc)
+
+        scene = await self._aextract_scene(narration)
+        return self._narrated(state, request, messages, narration, scene)
+
+    @staticmethod
+    def _narration_of(response: Any) -> str:
+        narration = getattr(response, "content", str(response)).strip()
+        if not narration:
+            raise ValueError("the model returned an empty narration")
+        return narration
+
+    def _faltered(self, request: str, exc: Exception) -> Command[Literal["__end__"]]:
+        error_message = f"The story falters: {exc}"
+        self._log_interaction(
+            query=request,
+            response=error_message,
+            metadata={"error": str(exc), "stage": "narrate"},
+        )
+        return Command(
+            goto=END,
+            update={
+                "messages": [AIMessage(content=error_message, name=self.agent_type)],
+                "last_response": error_message,
+            },
+        )
 
+    def _narrated(self, state: GameState, request: str, messages: List[BaseMessage],
+                  narration: str, scene: Dict[str, Any]) -> Command[Literal["__end__"]]:
         self._log_interaction(
             query=request,
             response=narration,
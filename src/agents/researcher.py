@@ -1,5 +1,9 @@
+import hashlib
+import os
+import threading
 import warnings
-from typing import Any, Dict, List, Literal, Tuple
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Literal, Optional, Tuple
 
 from langchain_core.documents import Document
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
@@ -9,20 +13,74 @@ from langgraph.graph import END
 from langgraph.types import Command
 
 from src.agents.base_agent import BaseAgent
+from src.config import CHROMA_DB_DIRECTORY
+from src.data.answer_cache import content_digest, open_answer_cache, passages_current
+from src.data.entry_store import open_entry_store
+from src.data.rewrite_cache import MISS, REWRITE, open_rewrite_cache
+from src.data.shards import ShardedVectorStore, open_sharded, scored_by_vector
+from src.data.srd_loader import mentioned_srd_entries, normalise_name
 from src.data.vectorstore import VectorStoreMissingError, load_vectorstore
 from src.graph.game_state import GameState
 from src.models.llm import create_llm
+from src.pipelines.compressor import compress_passages
+from src.pipelines.context import assemble_passages, entry_key, expand_to_entries
+from src.pipelines.expansion import expand_query, glossary_fingerprint, load_glossary
+from src.pipelines.shard_router import route_categories
 from src.pipelines.rewriter import create_question_rewriter
 from src.prompts.prompts import RESEARCHER_PROMPT
+from src.utils.offload import BoundedExecutor
+from src.utils.single_flight import ReplayChat, SingleFlight, publishing
 
 # Rules answers are read, not skimmed, and every token costs ~0.25 s here. One
 # unbounded answer measured 461 tokens and 181 s.
 MAX_ANSWER_TOKENS = 400
 
-# Chunks per query. Each is ~1000 characters, so this is the dominant term in
-# prompt-eval time — which is what the player experiences as silence.
+# Chunks per query, before passages were chosen by score (`select_passages`).
+# Each is up to ~1000 characters, so this was the dominant term in prompt-eval
+# time — which is what the player experiences as silence. Still what the plain
+# retriever returns, and the baseline `scripts/bench_retrieval.py` compares to.
 RETRIEVAL_K = 4
 
+# Candidates fetched per query; `select_passages` keeps the ones worth sending.
+RETRIEVAL_CANDIDATES = 8
+
+# A passage is sent only if it scores within this of the best one. Per-chunk
+# scores are a weak signal — for "sneak attack" the old index's four chunks
+# scored 0.428, 0.369, 0.349 and 0.301, and only the 0.301 one was unrelated —
+# so the margin drops the tail, not the middle.
+SCORE_MARGIN = 0.1
+
+# Prompt tokens of passages sent at most: four full chunks, the old worst
+# case, so the budget never makes a prompt longer than it was; the margin is
+# what makes it shorter. Estimated at `CHARS_PER_TOKEN`, the usual figure for
+# English prose under a BPE tokenizer.
+CONTEXT_TOKEN_BUDGET = 1000
+CHARS_PER_TOKEN = 4
+
+# Taken off the score of a candidate for each piece of its entry already
+# chosen, maximal-marginal-relevance style: a second piece of the Goblin has
+# to beat the next entry by this much to be sent instead. Redundancy is judged
+# by entry, not by vector — the pieces of one entry are the near-duplicates
+# this index has. Not tuned; `scripts/bench_retrieval.py --penalty` compares.
+DIVERSITY_PENALTY = 0.05
+
+# Prompt tokens of passages once matched pieces are widened to their whole
+# entries (`src/pipelines/context.py`), before compression: the same ceiling
+# as `CONTEXT_TOKEN_BUDGET`, so a widened context is never longer than four
+# full chunks. The median split entry is ~1,450 characters (~360 tokens).
+# `DND_ENTRY_BUDGET=0` sends the matched pieces only.
+ENTRY_TOKEN_BUDGET = CONTEXT_TOKEN_BUDGET
+ENV_ENTRY_BUDGET = "DND_ENTRY_BUDGET"
+
+# Context tokens left after the passages are cut to their sentences most like
+# the question (`src/pipelines/compressor.py`). KNOWN_ISSUES #26 puts prompt
+# evaluation at ~22 ms a token on the target machine (195 tokens, 4.4 s), so
+# a full 1,000-token context is ~22 s of silence and 400 is ~9 s. What the
+# cut costs in answer quality is not measured yet. `DND_COMPRESS_BUDGET=0`
+# sends passages whole.
+COMPRESSED_TOKEN_BUDGET = 400
+ENV_COMPRESS_BUDGET = "DND_COMPRESS_BUDGET"
+
 # Below this, the best retrieved passage is treated as a miss and the question is
 # restated once. Measured over this index: on-topic questions score 0.363-0.529,
 # off-topic ones -0.154-0.053. The gap is wide, so the exact value is not
@@ -30,11 +88,78 @@ RETRIEVAL_K = 4
 # need re-measuring after a corpus change.
 RELEVANCE_THRESHOLD = 0.25
 
+# Embedding a query and searching Chroma is CPU work with no async form. Under
+# `astream` it runs here rather than on the event loop, where it would stall
+# every other session's stream; two at once, because the encoder already
+# spreads one query over the cores and more would only queue in torch.
+RETRIEVAL_EXECUTOR = BoundedExecutor("retrieval", 2, "DND_RETRIEVAL_WORKERS")
+
+# Answers kept for serving again when the model host is overloaded (the
+# "cached" admission level). Exact questions only — normalised for case and
+# spacing. Rules questions repeat across a table far more than narration does:
+# "how does grappling work" is asked every session that has a grapple.
+RECENT_ANSWERS = 256
+
+# Longest SRD entry, in characters, answered by showing it instead of having
+# the model paraphrase it. 1,499 of the SRD's 1,974 entries fit in one chunk,
+# and 90% of those are under 786 characters — about 200 tokens the player
+# reads in seconds, against up to `MAX_ANSWER_TOKENS` written at ~4 tok/s.
+# `DND_EXTRACTIVE_MAX_CHARS=0` turns extractive answers off.
+EXTRACTIVE_MAX_CHARS = 800
+ENV_EXTRACTIVE_MAX_CHARS = "DND_EXTRACTIVE_MAX_CHARS"
+
 # Marks the rewriter call, which runs inside this node but is not for the
 # player. `main.py` streams by node name and would otherwise print it.
 INTERNAL_TAG = "internal"
 
 
+def select_passages(scored: List[Tuple[Document, float]], margin: float = SCORE_MARGIN,
+                    budget: int = CONTEXT_TOKEN_BUDGET,
+                    penalty: float = DIVERSITY_PENALTY) -> List[Document]:
+    """The passages worth sending, in the order they were chosen.
+
+    Candidates within `margin` of the best score are eligible. Each round
+    takes the eligible one with the highest score less `penalty` for every
+    piece of its entry already taken; one that does not fit the token budget
+    is skipped, and a shorter one may still go. The best passage always goes.
+    """
+    if not scored:
+        return []
+    best = max(score for _, score in scored)
+    eligible = sorted(((doc, score) for doc, score in scored if score >= best - margin),
+                      key=lambda pair: pair[1], reverse=True)
+    kept, spent, taken = [], 0, Counter()
+
+    def adjusted(pair: Tuple[Document, float]) -> float:
+        key = entry_key(pair[0])
+        return pair[1] - (penalty * taken[key] if key is not None else 0.0)
+
+    while eligible:
+        doc, _ = eligible.pop(max(range(len(eligible)), key=lambda i: adjusted(eligible[i])))
+        cost = len(doc.page_content) // CHARS_PER_TOKEN
+        if kept and spent + cost > budget:
+            continue
+        kept.append(doc)
+        spent += cost
+        taken[entry_key(doc)] += 1
+    return kept
+
+
+def resolve_compress_budget() -> int:
+    value = os.environ.get(ENV_COMPRESS_BUDGET, "").strip()
+    return int(value) if value else COMPRESSED_TOKEN_BUDGET
+
+
+def resolve_entry_budget() -> int:
+    value = os.environ.get(ENV_ENTRY_BUDGET, "").strip()
+    return int(value) if value else ENTRY_TOKEN_BUDGET
+
+
+def resolve_extractive_max_chars() -> int:
+    value = os.environ.get(ENV_EXTRACTIVE_MAX_CHARS, "").strip()
+    return int(value) if value else EXTRACTIVE_MAX_CHARS
+
+
 class ResearcherAgent(BaseAgent):
     """Agent that provides information about D&D rules and lore."""
 
@@ -53,6 +178,18 @@ class ResearcherAgent(BaseAgent):
         # replaced it — but the rewriter earns its call when retrieval misses.
         self.rewriter = create_question_rewriter(self.llm)
 
+        # Tried before the rewriter on a miss, for the price of an embedding
+        # batch; see `src/pipelines/expansion.py`.
+        self.glossary = load_glossary()
+
+        self.recent_answers: "OrderedDict[str, str]" = OrderedDict()
+        self._recent_lock = threading.Lock()
+
+        # One graph serves every session, so a rules question the whole table
+        # asks at once arrives here several times over. Identical requests in
+        # flight together share one generation; see `_answer`.
+        self.flights = SingleFlight()
+
         try:
             # Read-only. This used to be `get_vectorstore([])` — passing an
             # empty document list to a build-or-load function and relying on it
@@ -63,6 +200,12 @@ class ResearcherAgent(BaseAgent):
             self.retriever = self.vectorstore.as_retriever(
                 search_kwargs={"k": RETRIEVAL_K}
             )
+            # Built with `scripts/ingest.py --shards`: questions are searched in
+            # the categories they name, falling back to the whole index when
+            # that misses. See `src/data/shards.py`.
+            self.vectorstore = open_sharded(self.vectorstore, CHROMA_DB_DIRECTORY,
+                                            route_categories,
+                                            RELEVANCE_THRESHOLD) or self.vectorstore
         except VectorStoreMissingError as exc:
             print(f"Warning: {exc} Answering without retrieval.")
             self.vectorstore = None
@@ -72,6 +215,21 @@ class ResearcherAgent(BaseAgent):
             self.vectorstore = None
             self.retriever = None
 
+        # Answers kept by question meaning, checked against the index before
+        # they are served; see `src/data/answer_cache.py`. Needs the index —
+        # both its embedding model and its passages to check against.
+        self.answer_cache = open_answer_cache(getattr(self.vectorstore, "embeddings", None))
+
+        # Rewrites that found a match, and questions no retry could, for this
+        # build of the index and this glossary; see `src/data/rewrite_cache.py`.
+        self.rewrite_cache = open_rewrite_cache(self.vectorstore,
+                                                glossary=glossary_fingerprint(self.glossary))
+
+        # Whole SRD entries, written beside the index by `scripts/ingest.py`;
+        # None for an index built without one. See `src/data/entry_store.py`.
+        self.entry_store = (open_entry_store(CHROMA_DB_DIRECTORY)
+                            if self.vectorstore is not None else None)
+
     def get_definition(self) -> str:
         return "I am a researcher assistant that provides information about D&D rules, lore, monsters, spells, and game mechanics."
 
@@ -135,7 +293,8 @@ class ResearcherAgent(BaseAgent):
         listed = "\n".join(f"- {citation}" for citation in seen)
         return f"{answer.rstrip()}\n\n---\n**Passages consulted:**\n{listed}"
 
-    def _retrieve_scored(self, question: str) -> Tuple[List[Document], float]:
+    def _retrieve_scored(self, question: str,
+                         vector: Optional[Any] = None) -> Tuple[List[Document], float]:
         """Retrieve, and report how well the best passage matched.
 
         The score *is* the relevance grade. PR-08 originally wired
@@ -147,17 +306,56 @@ class ResearcherAgent(BaseAgent):
         The retriever already knows. Measured over this index, on-topic
         questions score 0.363–0.529 and off-topic ones -0.154–0.053, so a
         threshold separates them with room to spare, for free.
+
+        `vector` is the question's embedding where the answer cache already
+        made it, so the question is not embedded twice.
         """
         with warnings.catch_warnings():
             # Chroma warns when a cosine distance maps outside [0, 1]. Expected
             # here, and the ordering is what matters.
             warnings.simplefilter("ignore", UserWarning)
-            scored = self.vectorstore.similarity_search_with_relevance_scores(
-                question, k=RETRIEVAL_K
-            )
+            scored = self._search(question, vector)
         if not scored:
             return [], 0.0
-        return [doc for doc, _ in scored], max(score for _, score in scored)
+        return select_passages(scored), max(score for _, score in scored)
+
+    def _search(self, question: str, vector: Optional[Any]) -> List[Tuple[Document, float]]:
+        if vector is None:
+            return self.vectorstore.similarity_search_with_relevance_scores(
+                question, k=RETRIEVAL_CANDIDATES)
+        # The cache's vector is normalised; the model's already are, so the
+        # scores are the same either way.
+        vector = [float(x) for x in vector]
+        if isinstance(self.vectorstore, ShardedVectorStore):
+            return self.vectorstore.search_routed(question, vector, RETRIEVAL_CANDIDATES)
+        return scored_by_vector(self.vectorstore, vector, RETRIEVAL_CANDIDATES)
+
+    async def _aretrieve_scored(self, question: str,
+                                vector: Optional[Any] = None) -> Tuple[List[Document], float]:
+        return await RETRIEVAL_EXECUTOR.run(self._retrieve_scored, question, vector)
+
+    def _embeddings(self) -> Any:
+        return getattr(self.vectorstore, "embeddings", None)
+
+    def _retrieve_variants(self, variants: List[str]) -> Tuple[List[Document], float, str]:
+        """The best-matching glossary variant's passages, its score, and itself.
+
+        Every variant is embedded in one `embed_documents` batch — one forward
+        pass, where a query each would be several — and searched by vector.
+        Queries and documents embed alike under `all-MiniLM-L6-v2`.
+        """
+        vectors = self._embeddings().embed_documents(variants)
+        relevance = self.vectorstore._select_relevance_score_fn()
+        best: Tuple[List[Document], float, str] = ([], float("-inf"), "")
+        for variant, vector in zip(variants, vectors):
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", UserWarning)
+                found = self.vectorstore.similarity_search_by_vector_with_relevance_scores(
+                    vector, k=RETRIEVAL_CANDIDATES)
+            scored = [(doc, relevance(distance)) for doc, distance in found]
+            if scored and max(score for _, score in scored) > best[1]:
+                best = (select_passages(scored), max(score for _, score in scored), variant)
+        return best
 
     def _rewrite(self, question: str) -> str:
         """Restate a question in rulebook language. Returns the original on failure."""
@@ -165,45 +363,168 @@ class ResearcherAgent(BaseAgent):
             rewritten = self.rewriter.invoke(
                 {"question": question}, config={"tags": [INTERNAL_TAG]}
             )
-            rewritten = str(rewritten).strip()
-            return rewritten or question
         except Exception as exc:
-            self._log_interaction(
-                query=question,
-                response=f"rewrite failed: {exc}",
-                metadata={"error": str(exc), "stage": "rewrite"},
+            return self._rewrite_failed(question, exc)
+        return str(rewritten).strip() or question
+
+    async def _arewrite(self, question: str) -> str:
+        try:
+            rewritten = await self.rewriter.ainvoke(
+                {"question": question}, config={"tags": [INTERNAL_TAG]}
             )
-            return question
+        except Exception as exc:
+            return self._rewrite_failed(question, exc)
+        return str(rewritten).strip() or question
+
+    def _rewrite_failed(self, question: str, exc: Exception) -> str:
+        self._log_interaction(
+            query=question,
+            response=f"rewrite failed: {exc}",
+            metadata={"error": str(exc), "stage": "rewrite"},
+        )
+        return question
 
-    def retrieve(self, question: str) -> Tuple[List[Document], Dict[str, Any]]:
+    def retrieve(self, question: str,
+                 vector: Optional[Any] = None) -> Tuple[List[Document], Dict[str, Any]]:
         """Retrieve passages, correcting the query once if the first try misses.
 
         Returns the passages and a metadata dict describing what happened, which
         goes straight into the JSONL log — the corrective path is invisible
-        otherwise.
+        otherwise. A question retried on an earlier turn is not retried again:
+        its kept rewrite is searched directly, or a known miss stands.
+        `vector`, if given, is the question's embedding.
         """
         info: Dict[str, Any] = {"rag_used": False, "rewritten": False}
         if self.vectorstore is None:
             return [], info
 
-        docs, score = self._retrieve_scored(question)
-        info.update(rag_used=True, retrieved=len(docs), score=round(score, 3))
-
-        if score >= RELEVANCE_THRESHOLD:
-            info["relevant"] = True
-            info["citations"] = [self.citation_for(d) for d in docs]
-            return docs, info
+        docs, score = self._retrieve_scored(question, vector)
+        if self._matched(info, docs, score):
+            return docs, self._cited(info, docs)
+
+        known = self._known(question, info)
+        if known is not None and known.kind == MISS:
+            return docs, self._cited(info, docs)
+        if known is not None:
+            retried, retried_score = self._retrieve_scored(known.rewritten)
+            return self._better_of(info, docs, score, known.rewritten, retried, retried_score)
+
+        variants = expand_query(question, self.glossary)
+        if variants and self._embeddings() is not None:
+            docs, score = self._better_variant(info, docs, score,
+                                               *self._retrieve_variants(variants))
+            if info["relevant"]:
+                return docs, self._cited(info, docs)
+        if self._skips_rewrite(info):
+            return docs, self._cited(info, docs)
 
         # One retry, never a loop. Player phrasing and rulebook phrasing sit far
         # apart in embedding space, so a restatement is worth one model call —
         # but only when the first attempt actually missed.
-        info["relevant"] = False
         rewritten = self._rewrite(question)
         if rewritten == question:
-            info["citations"] = [self.citation_for(d) for d in docs]
-            return docs, info
+            return docs, self._cited(info, docs)
 
         retried, retried_score = self._retrieve_scored(rewritten)
+        return self._learned(question, *self._better_of(info, docs, score, rewritten,
+                                                        retried, retried_score))
+
+    async def aretrieve(self, question: str,
+                        vector: Optional[Any] = None) -> Tuple[List[Document], Dict[str, Any]]:
+        """`retrieve`, with the search on `RETRIEVAL_EXECUTOR` and the rewrite awaited."""
+        info: Dict[str, Any] = {"rag_used": False, "rewritten": False}
+        if self.vectorstore is None:
+            return [], info
+
+        docs, score = await self._aretrieve_scored(question, vector)
+        if self._matched(info, docs, score):
+            return docs, self._cited(info, docs)
+
+        known = self._known(question, info)
+        if known is not None and known.kind == MISS:
+            return docs, self._cited(info, docs)
+        if known is not None:
+            retried, retried_score = await self._aretrieve_scored(known.rewritten)
+            return self._better_of(info, docs, score, known.rewritten, retried, retried_score)
+
+        variants = expand_query(question, self.glossary)
+        if variants and self._embeddings() is not None:
+            retried = await RETRIEVAL_EXECUTOR.run(self._retrieve_variants, variants)
+            docs, score = self._better_variant(info, docs, score, *retried)
+            if info["relevant"]:
+                return docs, self._cited(info, docs)
+        if self._skips_rewrite(info):
+            return docs, self._cited(info, docs)
+
+        rewritten = await self._arewrite(question)
+        if rewritten == question:
+            return docs, self._cited(info, docs)
+
+        retried, retried_score = await self._aretrieve_scored(rewritten)
+        return self._learned(question, *self._better_of(info, docs, score, rewritten,
+                                                        retried, retried_score))
+
+    @staticmethod
+    def _matched(info: Dict[str, Any], docs: List[Document], score: float) -> bool:
+        """Record the first attempt; True if it needs no correcting."""
+        info.update(rag_used=True, retrieved=len(docs), score=round(score, 3),
+                    relevant=score >= RELEVANCE_THRESHOLD)
+        return info["relevant"]
+
+    def _skips_rewrite(self, info: Dict[str, Any]) -> bool:
+        """The retry is a model call; under load the first attempt stands."""
+        if self._skips("rewrite_retry"):
+            info["rewrite_skipped"] = True
+            return True
+        return False
+
+    def _cited(self, info: Dict[str, Any], docs: List[Document]) -> Dict[str, Any]:
+        info["citations"] = [self.citation_for(d) for d in docs]
+        return info
+
+    def _known(self, question: str, info: Dict[str, Any]):
+        """What an earlier turn learned about retrying this question, if anything."""
+        if self.rewrite_cache is None:
+            return None
+        try:
+            known = self.rewrite_cache.lookup(question)
+        except Exception as exc:
+            self._log_interaction(query=question, response=f"rewrite cache failed: {exc}",
+                                  metadata={"error": str(exc), "stage": "rewrite_cache"})
+            return None
+        if known is not None:
+            info["rewrite_cache"] = known.kind
+        return known
+
+    def _learned(self, question: str, docs: List[Document],
+                 info: Dict[str, Any]) -> Tuple[List[Document], Dict[str, Any]]:
+        """Keep a rewrite that matched, or the fact that even it missed."""
+        if self.rewrite_cache is not None:
+            kind = REWRITE if info["relevant"] else MISS
+            try:
+                self.rewrite_cache.store(question, kind, info["rewritten_query"],
+                                         info["score"], info["retried_score"])
+            except Exception as exc:
+                self._log_interaction(query=question, response=f"rewrite cache failed: {exc}",
+                                      metadata={"error": str(exc), "stage": "rewrite_cache"})
+        return docs, info
+
+    @staticmethod
+    def _better_variant(info: Dict[str, Any], docs: List[Document], score: float,
+                        expanded: List[Document], expanded_score: float,
+                        variant: str) -> Tuple[List[Document], float]:
+        """Record the glossary attempt; keep it if it matched better."""
+        if not variant:
+            return docs, score
+        info.update(glossary_query=variant, glossary_score=round(expanded_score, 3))
+        if expanded and expanded_score > score:
+            info["relevant"] = expanded_score >= RELEVANCE_THRESHOLD
+            return expanded, expanded_score
+        return docs, score
+
+    def _better_of(self, info: Dict[str, Any], docs: List[Document], score: float,
+                   rewritten: str, retried: List[Document],
+                   retried_score: float) -> Tuple[List[Document], Dict[str, Any]]:
         info.update(
             rewritten=True,
             rewritten_query=rewritten,
@@ -215,8 +536,7 @@ class ResearcherAgent(BaseAgent):
             docs = retried
             info["relevant"] = retried_score >= RELEVANCE_THRESHOLD
 
-        info["citations"] = [self.citation_for(d) for d in docs]
-        return docs, info
+        return docs, self._cited(info, docs)
 
     def process_task(self, state: GameState) -> Command[Literal["__end__"]]:
         """Retrieves and provides D&D-related information.
@@ -227,63 +547,285 @@ class ResearcherAgent(BaseAgent):
         latent bug rather than a documentation slip.
         """
         latest_message = self._get_latest_message(state)
+        cached = self._cached(latest_message)
+        if cached is not None:
+            return cached
 
         try:
-            docs, info = self.retrieve(latest_message)
-
-            if docs:
-                messages = self.prompt_template.invoke({
-                    "context": self.format_docs(docs),
-                    "question": latest_message,
-                })
-            else:
-                # No index, or nothing retrieved. Answer from the model alone
-                # and say so — `metadata.rag_used` records which path ran.
-                messages = [
-                    SystemMessage(content=self.system_prompt),
-                    HumanMessage(content=latest_message),
-                ]
-
-            # A plain `invoke`: under `stream_mode="messages"` LangChain routes
-            # it through the streaming path, so the answer reaches the player
-            # token by token instead of arriving whole after a minute.
-            response = self.llm.invoke(messages)
-            response_content = StrOutputParser().invoke(response)
-            response_content = self.append_sources(response_content, docs)
-
-            self._log_interaction(
-                query=latest_message,
-                response=response_content,
-                metadata=info,
-            )
+            vector, recalled = self._recall(latest_message)
+            if recalled is not None:
+                return recalled
+            docs, info = self.retrieve(latest_message, vector)
+            entry = self._extractive(latest_message, docs, info)
+            if entry is not None:
+                return self._extracted(latest_message, entry, info)
+            passages = self._compress(latest_message, docs, info)
+            response = self._answer(latest_message, passages, info)
+            command = self._answered(latest_message, response, passages, info)
+            self._keep(latest_message, vector, command, docs, info)
+            return command
+        except Exception as e:
+            return self._failed(latest_message, e)
 
-            # Return only the message this node produced — the add_messages
-            # reducer appends it. Returning the whole history would duplicate it.
-            return Command(
-                goto="__end__",
-                update={
-                    "messages": [
-                        AIMessage(content=response_content, name=self.agent_type)
-                    ],
-                    "last_response": response_content,
-                },
-            )
+    async def aprocess_task(self, state: GameState) -> Command[Literal["__end__"]]:
+        """`process_task`, awaiting the model and offloading the search."""
+        latest_message = self._get_latest_message(state)
+        cached = self._cached(latest_message)
+        if cached is not None:
+            return cached
 
+        try:
+            vector, recalled = await RETRIEVAL_EXECUTOR.run(self._recall, latest_message)
+            if recalled is not None:
+                return recalled
+            docs, info = await self.aretrieve(latest_message, vector)
+            entry = self._extractive(latest_message, docs, info)
+            if entry is not None:
+                return self._extracted(latest_message, entry, info)
+            passages = await RETRIEVAL_EXECUTOR.run(self._compress, latest_message, docs, info)
+            response = await self._aanswer(latest_message, passages, info)
+            command = self._answered(latest_message, response, passages, info)
+            await RETRIEVAL_EXECUTOR.run(self._keep, latest_message, vector, command, docs, info)
+            return command
         except Exception as e:
-            error_message = f"Error researching D&D information: {str(e)}"
+            return self._failed(latest_message, e)
 
-            self._log_interaction(
-                query=latest_message,
-                response=error_message,
-                metadata={"error": str(e)},
-            )
+    def _compress(self, question: str, docs: List[Document],
+                  info: Dict[str, Any]) -> List[Document]:
+        """The passages as the prompt gets them: each entry's pieces joined
+        into one passage, widened to the whole entry where the entry store
+        has it, then cut to the question's sentences.
 
-            return Command(
-                goto="__end__",
-                update={
-                    "messages": [
-                        AIMessage(content=error_message, name=self.agent_type)
-                    ],
-                    "last_response": error_message,
-                },
+        The retrieved `docs` themselves are what the answer cache checks
+        against the index later, so they are left as they are. A compression
+        failure sends the passages whole.
+        """
+        docs = assemble_passages(docs)
+        entry_budget = resolve_entry_budget()
+        if self.entry_store is not None and entry_budget > 0:
+            docs = expand_to_entries(docs, self.entry_store, entry_budget)
+            info["expanded"] = sum(1 for d in docs if d.metadata.get("expanded"))
+        budget = resolve_compress_budget()
+        embeddings = getattr(self.vectorstore, "embeddings", None)
+        if budget <= 0 or embeddings is None or not docs:
+            return docs
+        try:
+            passages = compress_passages(question, docs, embeddings, budget)
+        except Exception as exc:
+            self._log_interaction(query=question, response=f"compression failed: {exc}",
+                                  metadata={"error": str(exc), "stage": "compress"})
+            return docs
+        if passages is not docs:
+            info.update(
+                context_tokens=sum(len(d.page_content) for d in docs) // CHARS_PER_TOKEN,
+                compressed_tokens=sum(len(d.page_content) for d in passages) // CHARS_PER_TOKEN,
             )
+        return passages
+
+    def _extractive(self, question: str, docs: List[Document],
+                    info: Dict[str, Any]) -> Optional[Document]:
+        """The SRD entry to show as the answer, if the question asks for exactly it.
+
+        The top passage must be a whole entry (`chunk_count` 1 — an index
+        built before that key existed never qualifies), short enough to read,
+        and the only entry the question names. A first-attempt relevant hit
+        only: a question that needed rewriting or a glossary variant did not
+        name anything cleanly. "What does the grappled condition do?" qualifies; "can I cast fire
+        bolt while grappled?" names two entries and is answered by the model.
+        """
+        budget = resolve_extractive_max_chars()
+        if (budget <= 0 or not docs or not info.get("relevant") or info.get("rewritten")
+                or "glossary_query" in info):
+            return None
+        top = docs[0]
+        name = top.metadata.get("name")
+        if (not name or top.metadata.get("chunk_count") != 1
+                or len(top.page_content) > budget):
+            return None
+        if mentioned_srd_entries(question) != [normalise_name(name)]:
+            return None
+        return top
+
+    def _extracted(self, question: str, entry: Document,
+                   info: Dict[str, Any]) -> Command[Literal["__end__"]]:
+        """The entry as written, under its name, with its citation."""
+        name = entry.metadata["name"]
+        body = entry.page_content.strip().removeprefix(f"# {name}").strip()
+        content = self.append_sources(f"**{name}**\n{body}", [entry])
+        info.update(extractive=True, citations=[self.citation_for(entry)])
+        self._log_interaction(query=question, response=content, metadata=info)
+        self._remember(question, content)
+        return self._reply(content)
+
+    @staticmethod
+    def _answer_key(question: str) -> str:
+        return " ".join(question.lower().split())
+
+    @staticmethod
+    def passage_id(doc: Document) -> str:
+        """The index's id for a passage, or a digest of it where there is none."""
+        if getattr(doc, "id", None):
+            return doc.id
+        metadata = doc.metadata
+        text = f"{metadata.get('book', '')}|{metadata.get('page_number', '')}|{doc.page_content}"
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+    def _flight_key(self, question: str, docs: List[Document]) -> Tuple[str, Tuple[str, ...], str]:
+        """Same question, same passages, same model: the same prompt, so one answer."""
+        return (self._answer_key(question), tuple(self.passage_id(d) for d in docs),
+                getattr(self.llm, "model", ""))
+
+    def _answer(self, question: str, docs: List[Document], info: Dict[str, Any]) -> Any:
+        """The model's answer — or, if the same request is already being
+        answered, that one, token by token as it is generated.
+
+        Both are a plain `invoke`: under `stream_mode="messages"` LangChain
+        routes it through the streaming path, so the answer reaches the player
+        token by token instead of arriving whole after a minute. A follower's
+        `ReplayChat` streams the leader's tokens the same way.
+        """
+        messages = self._answer_messages(question, docs)
+        flight, leader = self.flights.join(self._flight_key(question, docs))
+        if not leader:
+            info["coalesced"] = True
+            return ReplayChat(flight=flight).invoke(messages)
+        try:
+            response = self.llm.invoke(messages, config=publishing(flight))
+        except BaseException as exc:
+            self.flights.land(flight, error=exc)
+            raise
+        self.flights.land(flight, response)
+        return response
+
+    async def _aanswer(self, question: str, docs: List[Document], info: Dict[str, Any]) -> Any:
+        messages = self._answer_messages(question, docs)
+        flight, leader = self.flights.join(self._flight_key(question, docs))
+        if not leader:
+            info["coalesced"] = True
+            return await ReplayChat(flight=flight).ainvoke(messages)
+        try:
+            response = await self.llm.ainvoke(messages, config=publishing(flight))
+        except BaseException as exc:
+            # Cancelled too: followers must not wait on a call nobody is making.
+            self.flights.land(flight, error=exc)
+            raise
+        self.flights.land(flight, response)
+        return response
+
+    def _remember(self, question: str, answer: str) -> None:
+        key = self._answer_key(question)
+        with self._recent_lock:
+            self.recent_answers[key] = answer
+            self.recent_answers.move_to_end(key)
+            while len(self.recent_answers) > RECENT_ANSWERS:
+                self.recent_answers.popitem(last=False)
+
+    def _cached(self, question: str):
+        """A recent answer to the same question, if the model host is overloaded.
+
+        Returns the node's Command, or None to answer afresh. The load check
+        comes second so a skip is only counted when there is something to
+        serve instead.
+        """
+        with self._recent_lock:
+            answer = self.recent_answers.get(self._answer_key(question))
+        if answer is None or not self._skips("fresh_answer"):
+            return None
+
+        self._log_interaction(query=question, response=answer,
+                              metadata={"cached": True, "rag_used": False})
+        return self._reply(answer)
+
+    def _recall(self, question: str):
+        """An answer kept for a question close enough to this one.
+
+        Returns `(vector, command)`: the question's embedding, for the search
+        and `_keep` to reuse on a miss, and the node's Command on a hit. A cache that fails
+        is a miss — it costs a generation, never the answer.
+        """
+        if self.answer_cache is None:
+            return None, None
+        try:
+            vector = self.answer_cache.embed(question)
+            hit = self.answer_cache.lookup(vector, self._passages_current)
+        except Exception as exc:
+            self._log_interaction(query=question, response=f"answer cache failed: {exc}",
+                                  metadata={"error": str(exc), "stage": "answer_cache"})
+            return None, None
+        if hit is None:
+            return vector, None
+
+        self._log_interaction(
+            query=question,
+            response=hit.answer,
+            metadata={"answer_cache": True, "similarity": round(hit.similarity, 3),
+                      "cached_question": hit.question, "rag_used": False},
+        )
+        return vector, self._reply(hit.answer)
+
+    def _passages_current(self, passages) -> bool:
+        return passages_current(self.vectorstore, passages)
+
+    def _keep(self, question: str, vector, command: Command, docs: List[Document],
+              info: Dict[str, Any]) -> None:
+        """Keeps a grounded answer for questions that mean the same.
+
+        Only answers written from relevant passages that the index can vouch
+        for later; a follower's answer is its leader's, kept once already.
+        """
+        if (vector is None or not docs or not info.get("relevant")
+                or info.get("coalesced") or not all(getattr(d, "id", None) for d in docs)):
+            return
+        passages = [(d.id, content_digest(d.page_content)) for d in docs]
+        try:
+            self.answer_cache.store(question, vector, command.update["last_response"], passages)
+        except Exception as exc:
+            self._log_interaction(query=question, response=f"answer cache failed: {exc}",
+                                  metadata={"error": str(exc), "stage": "answer_cache"})
+
+    def _reply(self, content: str) -> Command[Literal["__end__"]]:
+        # Return only the message this node produced — the add_messages
+        # reducer appends it. Returning the whole history would duplicate it.
+        return Command(
+            goto="__end__",
+            update={
+                "messages": [AIMessage(content=content, name=self.agent_type)],
+                "last_response": content,
+            },
+        )
+
+    def _answer_messages(self, question: str, docs: List[Document]):
+        if docs:
+            return self.prompt_template.invoke({
+                "context": self.format_docs(docs),
+                "question": question,
+            })
+        # No index, or nothing retrieved. Answer from the model alone
+        # and say so — `metadata.rag_used` records which path ran.
+        return [
+            SystemMessage(content=self.system_prompt),
+            HumanMessage(content=question),
+        ]
+
+    def _answered(self, question: str, response: Any, docs: List[Document],
+                  info: Dict[str, Any]) -> Command[Literal["__end__"]]:
+        response_content = StrOutputParser().invoke(response)
+        response_content = self.append_sources(response_content, docs)
+
+        self._log_interaction(
+            query=question,
+            response=response_content,
+            metadata=info,
+        )
+        self._remember(question, response_content)
+        return self._reply(response_content)
+
+    def _failed(self, question: str, e: Exception) -> Command[Literal["__end__"]]:
+        error_message = f"Error researching D&D information: {str(e)}"
+
+        self._log_interaction(
+            query=question,
+            response=error_message,
+            metadata={"error": str(e)},
+        )
+        return self._reply(error_message)
@@ -0,0 +1,26 @@
+"""The labelled routing set: a request and the agent it belongs to.
+
+`tests/test_supervisor_routing.py` pins what the pre-filter may do with these
+cases, and `scripts/bench_routing.py` runs the model routers over them, so an
+accuracy number and a test failure always refer to the same inputs.
+"""
+
+ROUTING_CASES = [
+    ("roll a d20", "dice_roller"),
+    ("2d6 + 1d8", "dice_roller"),
+    ("roll for initiative", "dice_roller"),
+    ("attack roll with advantage", "dice_roller"),
+    ("how does sneak attack work", "researcher"),
+    ("what is the AC of a goblin", "researcher"),
+    ("explain grappling", "researcher"),
+    ("my sword does 2d6 slashing damage, is that right?", "researcher"),
+    ("what does d20 mean", "researcher"),
+    ("can a wizard cast two spells in one turn", "researcher"),
+    ("I open the door", "dungeon_master"),
+    ("I attack the goblin", "dungeon_master"),
+    ("what do I see", "dungeon_master"),
+    ("I talk to the guard about the missing caravan", "dungeon_master"),
+    ("thanks, that's all", "FINISH"),
+    ("ok cool", "FINISH"),
+    ("goodbye", "FINISH"),
+]
@@ -1,13 +1,18 @@
+import math
+import os
 import re
-from typing import Optional, TypedDict, Literal
+from dataclasses import dataclass
+from typing import Any, List, Optional, Tuple, TypedDict, Literal
 
-from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
 from langgraph.graph import END
-from langgraph.types import Command
+from langgraph.types import Command, Send
 
-from src.prompts.prompts import SUPERVISOR_PROMPT
+from src.data.srd_loader import mentioned_srd_entries, normalise_name, srd_entry_names
+from src.prompts.prompts import SUPERVISOR_LETTER_PROMPT, SUPERVISOR_PROMPT
 from src.models.llm import create_llm
 from src.agents.base_agent import BaseAgent
+from src.agents.dice_roller import DICE_EXPRESSION, DiceParseError, roll_literal_request
 from src.graph.game_state import GameState
 
 AGENT_TYPES = ["dungeon_master", "researcher", "dice_roller"]
@@ -20,6 +25,86 @@ class Router(TypedDict):
     next: Literal[*ROUTING_OPTIONS]
 
 
+# --- routing modes -----------------------------------------------------------
+#
+# `json_schema` decodes a whole object under a grammar — `{"next":
+# "dungeon_master"}` is ~10 output tokens for what is a four-way choice. `letter`
+# asks for one option letter and stops the model after it with `num_predict=1`.
+# Ollama returns the top logprobs of that token, which is a confidence the JSON
+# path cannot give: the decision and how sure the model was, in one token.
+#
+# `json_schema` stays the default. It is the mode the 12/12 measurement in
+# docs/REFACTOR_NOTES.md was taken on; `scripts/bench_routing.py` compares the two
+# on the same cases before anyone switches.
+ROUTER_MODES = ("json_schema", "letter")
+DEFAULT_ROUTER_MODE = "json_schema"
+ENV_ROUTER_MODE = "DND_ROUTER_MODE"
+
+# Must agree with SUPERVISOR_LETTER_PROMPT, which names the options by letter.
+ROUTING_LETTERS = {
+    "A": "dungeon_master",
+    "B": "researcher",
+    "C": "dice_roller",
+    "D": "FINISH",
+}
+
+
+def resolve_router_mode(mode: Optional[str] = None) -> str:
+    """The routing mode, honouring `DND_ROUTER_MODE`. Unknown values raise."""
+    mode = (mode or os.environ.get(ENV_ROUTER_MODE, "").strip() or DEFAULT_ROUTER_MODE)
+    mode = mode.lower()
+    if mode not in ROUTER_MODES:
+        raise ValueError(
+            f"unknown router mode {mode!r}; expected one of {', '.join(ROUTER_MODES)}"
+        )
+    return mode
+
+
+def _letter_of(token: Any) -> Optional[str]:
+    """`"B"`, `" B"`, `"b."` all mean option B. Anything else means nothing."""
+    text = str(token or "").strip().strip("\"'().:").upper()
+    return text if text in ROUTING_LETTERS else None
+
+
+def read_letter_decision(response: Any) -> Tuple[Optional[str], Optional[float]]:
+    """Turn a one-token reply into `(destination, confidence)`.
+
+    Confidence is the probability of the chosen letter, renormalised over the
+    option letters among the token's top logprobs — so it reads "how sure among
+    the four", not "how sure among the whole vocabulary". It is None when the
+    server sent no logprobs, which older Ollama builds do not.
+
+    The logprobs can also rescue a reply whose text is not a clean letter: if
+    the model's first token was whitespace or a quote, the best-scoring option
+    letter is still in the top list.
+    """
+    letter = _letter_of(getattr(response, "content", response))
+
+    metadata = getattr(response, "response_metadata", None) or {}
+    logprobs = metadata.get("logprobs") or []
+    if not logprobs:
+        return ROUTING_LETTERS.get(letter), None
+
+    first = logprobs[0] or {}
+    candidates = first.get("top_logprobs") or [first]
+
+    mass = {}
+    for candidate in candidates:
+        option = _letter_of(candidate.get("token"))
+        if option is None or candidate.get("logprob") is None:
+            continue
+        mass[option] = mass.get(option, 0.0) + math.exp(candidate["logprob"])
+
+    if not mass:
+        return ROUTING_LETTERS.get(letter), None
+
+    if letter is None:
+        letter = max(mass, key=mass.get)
+
+    confidence = mass.get(letter, 0.0) / sum(mass.values())
+    return ROUTING_LETTERS[letter], confidence
+
+
 # --- deterministic pre-filter ------------------------------------------------
 #
 # A dice request is one of the few things in this domain with an exact syntax, so
@@ -28,9 +113,25 @@ class Router(TypedDict):
 # already measures ~0.65 s and got 6/6 right in benchmarking. Saving that call is
 # a bonus.
 #
-# The bias is deliberately conservative: the pre-filter only fires when it is
-# certain, and falls through to the model whenever it is not. A wrong fast answer
-# is worse than a slow right one.
+# Dice are not the only obvious surface form. "thanks", "ok cool", "I open the
+# door" and "how does sneak attack work" each cost a ~2.7 s routing call on the
+# 7B for an answer nobody could get wrong. `PREFILTER_RULES` is the table of
+# those forms, checked in order, each with a confidence tier:
+#
+#   certain — the surface form decides it. Routed without a model by default.
+#   likely  — usually right, but a phrasing exists that fools it ("what is the
+#             goblin doing" is a scene question that mentions a monster).
+#             Routed without a model only under DND_PREFILTER_TIER=likely.
+#
+# The bias is still deliberately conservative: no rule fires unless it matches,
+# and anything unmatched goes to the model. A wrong fast answer is worse than a
+# slow right one.
+
+CERTAIN = "certain"
+LIKELY = "likely"
+PREFILTER_TIERS = (CERTAIN, LIKELY)  # strongest first
+DEFAULT_PREFILTER_TIER = CERTAIN
+ENV_PREFILTER_TIER = "DND_PREFILTER_TIER"
 
 DICE_NOTATION = re.compile(r"\b\d*d\d+\b", re.IGNORECASE)
 ROLL_VERB = re.compile(r"\broll(s|ed|ing)?\b", re.IGNORECASE)
@@ -46,42 +147,269 @@ QUESTION_OPENER = re.compile(
 # A message that is nothing but notation and arithmetic — "2d6+1d8", "d20 + 3".
 BARE_NOTATION = re.compile(r"^[\dd\s+\-]+$", re.IGNORECASE)
 
+# Small talk. A message made only of these words, with at least one anchor, is a
+# greeting, thanks or sign-off: "thanks, that's all", "ok cool", "see ya".
+SOCIAL_ANCHORS = {
+    "ok", "okay", "k", "cool", "thanks", "thank", "thx", "ty", "cheers", "bye",
+    "goodbye", "farewell", "hi", "hello", "hey", "yo", "alright", "gotcha",
+    "great", "nice", "awesome", "perfect", "goodnight",
+}
+SOCIAL_WORDS = SOCIAL_ANCHORS | {
+    "you", "that", "that's", "thats", "all", "for", "now", "got", "it", "sounds",
+    "good", "see", "ya", "later", "sure", "np", "lol", "haha", "understood",
+    "night", "so", "much", "very", "then",
+}
+MAX_SOCIAL_WORDS = 6
+
+# "I open the door", "we sneak past", "let's search the room" — a player acting
+# in the world. Only verbs that are unambiguously actions: "I roll" is dice, and
+# "I wonder how grappling works" is a rules question, so neither is here.
+ACTION_VERBS = (
+    "open|close|shut|attack|strike|swing|stab|slash|shoot|fire|throw|hit|punch|"
+    "kick|charge|cast|draw|sheathe|move|walk|run|dash|climb|jump|swim|crawl|"
+    "sneak|hide|search|look|peer|listen|inspect|examine|investigate|check|read|"
+    "grab|take|pick|pocket|loot|push|pull|lift|drop|give|offer|hand|put|place|"
+    "light|drink|eat|rest|sleep|enter|leave|exit|approach|follow|retreat|flee|"
+    "head|go|return|wait|duck|dodge|block|parry|shove|grapple|bow|kneel|pray|"
+    "say|shout|yell|whisper|call|ask|tell|talk|speak|greet|wave|nod|knock|"
+    "touch|pour|break|smash|unlock|lockpick|cut|tie|untie|mount|dismount|ride|"
+    "buy|sell|trade|bribe|intimidate|persuade|threaten"
+)
+FIRST_PERSON_ACTION = re.compile(
+    r"^\s*(?:i|we|let'?s)\s+(?:\w+ly\s+)?(?:(?:try|attempt|start)\s+to\s+)?"
+    rf"(?:{ACTION_VERBS})\b",
+    re.IGNORECASE,
+)
+# Any other first-person statement — "I whistle a tune" — is probably an action
+# too, unless the verb is one of thinking, asking, or rolling.
+FIRST_PERSON = re.compile(r"^\s*(?:i|we)\s+(\w+)", re.IGNORECASE)
+NOT_ACTIONS = {
+    "think", "wonder", "want", "need", "know", "don't", "dont", "do", "did",
+    "was", "am", "have", "had", "can", "could", "should", "would", "will", "may",
+    "might", "forgot", "forget", "remember", "guess", "believe", "understand",
+    "mean", "meant", "roll", "rolled", "get", "got", "just", "really",
+}
+
+# Openers that ask how something *works*, as opposed to what is happening.
+HOW_IT_WORKS = re.compile(
+    r"^\s*how\s+(?:does|do|did|is|are)\b.+\bwork(?:s|ed)?\b", re.IGNORECASE
+)
+EXPLAIN = re.compile(r"^\s*(?:explain|describe|define)\b", re.IGNORECASE)
+# "what is a beholder" asks about a kind of thing; "what is the goblin doing"
+# asks about this one. The indefinite article is the tell.
+WHAT_IS_A = re.compile(
+    r"^\s*(?:what\s+is|what's|whats|what\s+are)\s+(?:a|an)\b", re.IGNORECASE
+)
+# Game statistics. A question opener, a stat and an SRD name together — "what
+# is the AC of a goblin" — is a lookup, whatever the article.
+STAT_TERMS = re.compile(
+    r"\b(?:ac|armou?r\s+class|hit\s+points|hp|cr|challenge(?:\s+rating)?|"
+    r"damage|range|speed|duration|casting\s+time|components|saving\s+throws?|"
+    r"resistances?|immunit(?:y|ies)|vulnerabilit(?:y|ies)|weight|cost|price|"
+    r"level|school|stats?|stat\s+block)\b",
+    re.IGNORECASE,
+)
+# A stat asked about as it stands in this fight, not as the SRD gives it: "how
+# much damage did the goblin take", "how many hit points does it have left".
+# Past tense and state words are the tell; such a question is only LIKELY a
+# lookup, and the model decides it.
+IN_SCENE_STATE = re.compile(
+    r"\b(?:did|was|were|took|taken|dealt|left|now|still|remaining|currently|so\s+far)\b",
+    re.IGNORECASE,
+)
+# The player is asking about the scene, not the rules: "what do I see".
+SCENE_QUESTION = re.compile(
+    r"\b(?:do|can|did)\s+(?:i|we)\s+(?:see|hear|smell|notice|find|spot|sense)\b",
+    re.IGNORECASE,
+)
+
+
+def mentioned_srd_entry(text: str) -> Optional[str]:
+    """The longest SRD entry name the text mentions, or None."""
+    found = mentioned_srd_entries(text)
+    return found[0] if found else None
+
+
+@dataclass(frozen=True)
+class PrefilterMatch:
+    """Which rule fired, where it sends the request, and how sure it is."""
+    destination: str
+    tier: str
+    rule: str
+
 
-def prefilter_route(request: str) -> Optional[str]:
-    """Route without a model when the request is unambiguously dice.
+def _dice_rule(text: str) -> Optional[str]:
+    if QUESTION_OPENER.match(text) or not DICE_NOTATION.search(text):
+        return None
+    # Bare notation, or notation with an explicit roll verb. Both are requests to
+    # roll; "my sword does 2d6 slashing" is neither, and goes to the model.
+    if BARE_NOTATION.match(text) or ROLL_VERB.search(text):
+        return CERTAIN
+    return None
+
+
+def _finish_rule(text: str) -> Optional[str]:
+    words = normalise_name(text).split()
+    if not words or len(words) > MAX_SOCIAL_WORDS:
+        return None
+    if all(w in SOCIAL_WORDS for w in words) and any(w in SOCIAL_ANCHORS for w in words):
+        return CERTAIN
+    return None
+
+
+def _rules_question_rule(text: str) -> Optional[str]:
+    if not QUESTION_OPENER.match(text) or SCENE_QUESTION.search(text):
+        return None
+    if mentioned_srd_entry(text) is None:
+        return None
+    if HOW_IT_WORKS.match(text) or EXPLAIN.match(text) or WHAT_IS_A.match(text):
+        return CERTAIN
+    if STAT_TERMS.search(text) and not IN_SCENE_STATE.search(text):
+        return CERTAIN
+    return LIKELY
+
+
+def _first_person_action_rule(text: str) -> Optional[str]:
+    if "?" in text or DICE_NOTATION.search(text):
+        return None
+    if FIRST_PERSON_ACTION.match(text):
+        return CERTAIN
+    first = FIRST_PERSON.match(text)
+    if first and first.group(1).lower() not in NOT_ACTIONS:
+        return LIKELY
+    return None
+
+
+# Checked in order; the first rule that fires decides. Dice first, because
+# "I attack — roll 1d20+5" has an exact syntax the other rules can only guess at.
+PREFILTER_RULES = [
+    ("dice_notation", "dice_roller", _dice_rule),
+    ("finish_phrase", "FINISH", _finish_rule),
+    ("rules_question", "researcher", _rules_question_rule),
+    ("first_person_action", "dungeon_master", _first_person_action_rule),
+]
 
-    Returns an agent type, or None to mean "no confident answer — ask the model".
+
+# --- multi-intent turns ------------------------------------------------------
+#
+# "I swing at the goblin — roll 1d20+5" is an action *and* a roll. Routed whole,
+# it reaches one worker and the other half is lost, or costs a second turn and a
+# second routing call. Where the dice regex finds notation in a clause of its
+# own, the turn is split there — no model involved — and both halves run in the
+# same graph step.
+#
+# Clause breaks are punctuation a player uses to join two things, plus "and" /
+# "then" directly before a roll verb. " - " only counts when it is not
+# arithmetic: "roll 1d20 - 1" is one clause.
+CLAUSE_BREAK = re.compile(
+    r"\s*(?:[—–;,]|\s-\s(?!\s*\d)|\.\s|\s(?:and|then|and\s+then)\s(?=roll))\s*",
+    re.IGNORECASE,
+)
+
+
+@dataclass(frozen=True)
+class MultiIntent:
+    """A turn split into a narrated action and a roll."""
+    action: str
+    dice: str
+
+
+def split_intents(request: str) -> Optional[MultiIntent]:
+    """Split a request into an action and a dice roll, or None if it is not both.
+
+    A dice clause must stand as a roll request on its own — notation with a roll
+    verb, or bare notation — and something else has to be left over. Which
+    agent the leftover goes to is the caller's decision, not this function's.
     """
     text = (request or "").strip()
-    if not text:
+    if not text or not DICE_EXPRESSION.search(text):
         return None
 
-    if QUESTION_OPENER.match(text):
+    clauses = [c.strip() for c in CLAUSE_BREAK.split(text) if c and c.strip()]
+    if len(clauses) < 2:
         return None
 
-    if not DICE_NOTATION.search(text):
+    dice = [c for c in clauses if _dice_rule(c) == CERTAIN]
+    action = [c for c in clauses if c not in dice]
+    if len(dice) != 1 or not action:
         return None
 
-    # Bare notation, or notation with an explicit roll verb. Both are requests to
-    # roll; "my sword does 2d6 slashing" is neither, and goes to the model.
-    if BARE_NOTATION.match(text) or ROLL_VERB.search(text):
-        return "dice_roller"
+    return MultiIntent(action=", ".join(action), dice=dice[0])
+
+
+def resolve_prefilter_tier(tier: Optional[str] = None) -> str:
+    """The weakest tier routed without a model, honouring `DND_PREFILTER_TIER`."""
+    tier = (tier or os.environ.get(ENV_PREFILTER_TIER, "").strip()
+            or DEFAULT_PREFILTER_TIER).lower()
+    if tier not in PREFILTER_TIERS:
+        raise ValueError(
+            f"unknown pre-filter tier {tier!r}; expected one of "
+            f"{', '.join(PREFILTER_TIERS)}"
+        )
+    return tier
+
 
+def classify_request(request: str) -> Optional[PrefilterMatch]:
+    """Run the rule table. Returns the first match, whatever its tier, or None."""
+    text = (request or "").strip()
+    if not text:
+        return None
+
+    for rule, destination, matches in PREFILTER_RULES:
+        tier = matches(text)
+        if tier is not None:
+            return PrefilterMatch(destination=destination, tier=tier, rule=rule)
     return None
 
 
+def prefilter_route(request: str, min_tier: str = DEFAULT_PREFILTER_TIER) -> Optional[str]:
+    """Route without a model when a rule matches at `min_tier` or stronger.
+
+    Returns a routing option — an agent type or FINISH — or None to mean "no
+    confident answer, ask the model".
+    """
+    match = classify_request(request)
+    if match is None:
+        return None
+    if PREFILTER_TIERS.index(match.tier) > PREFILTER_TIERS.index(min_tier):
+        return None
+    return match.destination
+
+
 class GameSupervisor(BaseAgent):
     """Supervisor class that manages routing between game agents."""
 
-    def __init__(self):
+    def __init__(
+        self,
+        router_mode: Optional[str] = None,
+        prefilter_tier: Optional[str] = None,
+    ):
         super().__init__("supervisor")
-        # Constrained decoding against the Router schema. `next` is a Literal, so
-        # the model physically cannot emit a destination that is not a real node
-        # — which is what retires the old substring-match ladder.
-        self.llm = create_llm(self.agent_type).with_structured_output(
-            Router, method="json_schema"
-        )
-        self.system_prompt = SUPERVISOR_PROMPT
+        self.router_mode = resolve_router_mode(router_mode)
+        self.prefilter_tier = resolve_prefilter_tier(prefilter_tier)
+        # ~0.25 s of JSON parsing. Paid here, at graph build, rather than by
+        # whichever turn first asks a rules question.
+        srd_entry_names()
+
+        if self.router_mode == "letter":
+            # One token, and its alternatives. `top_logprobs` covers every
+            # option letter, so the confidence is computed over all four.
+            self.llm = create_llm(
+                self.agent_type,
+                num_predict=1,
+                logprobs=True,
+                top_logprobs=len(ROUTING_LETTERS),
+            )
+            self.system_prompt = SUPERVISOR_LETTER_PROMPT
+        else:
+            # Constrained decoding against the Router schema. `next` is a
+            # Literal, so the model physically cannot emit a destination that is
+            # not a real node — which is what retires the old substring-match
+            # ladder.
+            self.llm = create_llm(self.agent_type).with_structured_output(
+                Router, method="json_schema"
+            )
+            self.system_prompt = SUPERVISOR_PROMPT
 
     def get_definition(self) -> str:
         return self.system_prompt
@@ -104,75 +432,263 @@ class GameSupervisor(BaseAgent):
 
         return ""
 
-    def process_task(self, state: GameState) -> Command[Literal[*AGENT_TYPES, "__end__"]]:
-        request = self._routing_request(state)
+    def decide(self, request: str) -> Tuple[str, Optional[float]]:
+        """Ask the model where `request` goes. Returns `(destination, confidence)`.
 
-        shortcut = prefilter_route(request)
-        if shortcut is not None:
-            self._log_interaction(
-                query=request,
-                response=shortcut,
-                metadata={"routed_to": shortcut, "router": "prefilter"},
-            )
-            return Command(goto=shortcut, update={"active_agent": shortcut})
+        Confidence is only available in `letter` mode; the JSON path returns
+        None. Raises on any answer that is not a routing option — the caller
+        turns that into an explicit message rather than a guess.
+        """
+        return self._read_decision(self.llm.invoke(self._decision_messages(request)))
 
-        messages = [
+    async def adecide(self, request: str) -> Tuple[str, Optional[float]]:
+        """`decide`, awaiting the model."""
+        return self._read_decision(await self.llm.ainvoke(self._decision_messages(request)))
+
+    def _decision_messages(self, request: str) -> List[BaseMessage]:
+        return [
             SystemMessage(content=self.system_prompt),
             HumanMessage(content=request),
         ]
 
-        try:
-            decision = self.llm.invoke(messages)
+    def _read_decision(self, decision: Any) -> Tuple[str, Optional[float]]:
+        if self.router_mode == "letter":
+            goto, confidence = read_letter_decision(decision)
+        else:
             goto = decision["next"] if isinstance(decision, dict) else None
-            if goto not in ROUTING_OPTIONS:
-                raise ValueError(f"router returned {decision!r}")
+            confidence = None
+
+        if goto not in ROUTING_OPTIONS:
+            raise ValueError(f"router returned {decision!r}")
+        return goto, confidence
+
+    def _finish(self) -> Command:
+        """End the turn with a fixed acknowledgement.
+
+        Ending the turn with no message at all reads as the app having hung. A
+        fixed string, not a generation — there is nothing to say that is worth
+        40 s.
+        """
+        return Command(
+            goto=END,
+            update={
+                "messages": [
+                    AIMessage(
+                        content="Ready when you are, adventurer.",
+                        name=self.agent_type,
+                    )
+                ],
+                "active_agent": "FINISH",
+            },
+        )
+
+    def _action_rule(self, split: Optional[MultiIntent]) -> Optional[Tuple[str, str]]:
+        """Where the rule table sends the action half of a split turn, or None."""
+        if split is None:
+            return None
+        match = classify_request(split.action)
+        if not self._routes_without_model(match):
+            return None
+        return match.destination, "prefilter"
+
+    def _route_action(self, action: str) -> Tuple[Optional[str], str]:
+        """Ask the model where the action half of a split turn goes.
+
+        Only for a turn whose whole needs no model, so a turn makes one router
+        call at most. Returns `(None, "llm")` if the model cannot say — the
+        caller falls back to routing the whole turn.
+        """
+        try:
+            goto, _ = self.decide(action)
+        except Exception:
+            return None, "llm"
+        return goto, "llm"
+
+    async def _aroute_action(self, action: str) -> Tuple[Optional[str], str]:
+        try:
+            goto, _ = await self.adecide(action)
+        except Exception:
+            return None, "llm"
+        return goto, "llm"
+
+    def _fan_out(self, state: GameState, request: str, split: MultiIntent,
+                 destination: Optional[str], router: str) -> Optional[Command]:
+        """Dispatch the roll and the narration in one step, or None to route whole.
+
+        Only an action the narrator should handle is split off. A roll next to a
+        rules question is left to the normal path, which sends it to the dice
+        roller — the same answer it got before this existed.
+
+        The roll is made here, not in `dice_roller`. It is free and exact, and
+        both branches run concurrently, so making it up front is the only way
+        the narration can describe the number the player is shown.
+
+        `destination` and `router` say where the action goes and who decided:
+        the rule table, or the model asked about the action or the whole turn.
+        """
+        if destination != "dungeon_master":
+            return None
+
+        try:
+            result, details = roll_literal_request(split.dice)
+        except DiceParseError:
+            return None
+
+        roll = {"request": split.dice, "result": result, "dice_roll": details}
+        self._log_interaction(
+            query=request,
+            response="dice_roller+dungeon_master",
+            metadata={
+                "routed_to": ["dice_roller", "dungeon_master"],
+                "router": router,
+                "rule": "multi_intent",
+                "sub_intents": {"dice_roller": split.dice, "dungeon_master": split.action},
+            },
+        )
+        return Command(
+            goto=[
+                Send("dice_roller", {**state, "current_task": split.dice, "turn_roll": roll}),
+                Send("dungeon_master", {**state, "current_task": split.action, "turn_roll": roll}),
+            ],
+            update={"active_agent": "dungeon_master"},
+        )
+
+    def process_task(self, state: GameState) -> Command[Literal[*AGENT_TYPES, "__end__"]]:
+        """Route the turn, splitting off a roll where it can.
+
+        One router call at most. A split turn's action goes by the rule table
+        if it can; if not, and the whole turn needs no model, the model is
+        asked about the action alone. Otherwise the one call routes the whole
+        turn, and that answer decides the action half too.
+        """
+        request = self._routing_request(state)
+        split = split_intents(request)
+        match = classify_request(request)
+
+        action = self._action_rule(split)
+        if split is not None and action is None and self._routes_without_model(match):
+            action = self._route_action(split.action)
+        if action is not None:
+            fanned_out = self._fan_out(state, request, split, *action)
+            if fanned_out is not None:
+                return fanned_out
+
+        if self._routes_without_model(match):
+            return self._prefiltered(request, match)
+
+        try:
+            goto, confidence = self.decide(request)
         except Exception as exc:
-            # No silent fallback. The old code sent every failure to `researcher`,
-            # so a dead daemon or an unparseable reply became a confident-looking
-            # RAG answer to a question the player never asked. Say so instead.
-            self._log_interaction(
-                query=request,
-                response=f"Error: {exc}",
-                metadata={"error": str(exc), "routed_to": "__end__", "router": "llm"},
-            )
-            return Command(
-                goto=END,
-                update={
-                    "messages": [
-                        AIMessage(
-                            content=(
-                                "I could not work out which part of the table should "
-                                "handle that. Try rephrasing it as a rules question, "
-                                "a narrative action, or a dice roll."
-                            ),
-                            name=self.agent_type,
-                        )
-                    ],
-                    "active_agent": self.agent_type,
-                },
-            )
+            return self._undecided(request, exc)
+        if split is not None and action is None:
+            fanned_out = self._fan_out(state, request, split, goto, "llm")
+            if fanned_out is not None:
+                return fanned_out
+        return self._routed(request, match, goto, confidence)
+
+    async def aprocess_task(self, state: GameState) -> Command[Literal[*AGENT_TYPES, "__end__"]]:
+        """`process_task`, awaiting the router when the rule table cannot decide."""
+        request = self._routing_request(state)
+        split = split_intents(request)
+        match = classify_request(request)
+
+        action = self._action_rule(split)
+        if split is not None and action is None and self._routes_without_model(match):
+            action = await self._aroute_action(split.action)
+        if action is not None:
+            fanned_out = self._fan_out(state, request, split, *action)
+            if fanned_out is not None:
+                return fanned_out
 
+        if self._routes_without_model(match):
+            return self._prefiltered(request, match)
+
+        try:
+            goto, confidence = await self.adecide(request)
+        except Exception as exc:
+            return self._undecided(request, exc)
+        if split is not None and action is None:
+            fanned_out = self._fan_out(state, request, split, goto, "llm")
+            if fanned_out is not None:
+                return fanned_out
+        return self._routed(request, match, goto, confidence)
+
+    def _routes_without_model(self, match: Optional[PrefilterMatch]) -> bool:
+        """Whether `match` is strong enough at this supervisor's tier."""
+        return match is not None and (
+            PREFILTER_TIERS.index(match.tier) <= PREFILTER_TIERS.index(self.prefilter_tier)
+        )
+
+    def _prefiltered(self, request: str, match: PrefilterMatch) -> Command:
+        self._log_interaction(
+            query=request,
+            response=match.destination,
+            metadata={
+                "routed_to": match.destination,
+                "router": "prefilter",
+                "rule": match.rule,
+                "tier": match.tier,
+            },
+        )
+        if match.destination == "FINISH":
+            return self._finish()
+        return Command(
+            goto=match.destination, update={"active_agent": match.destination}
+        )
+
+    def _undecided(self, request: str, exc: Exception) -> Command:
+        # No silent fallback. The old code sent every failure to `researcher`,
+        # so a dead daemon or an unparseable reply became a confident-looking
+        # RAG answer to a question the player never asked. Say so instead.
+        self._log_interaction(
+            query=request,
+            response=f"Error: {exc}",
+            metadata={
+                "error": str(exc),
+                "routed_to": "__end__",
+                "router": "llm",
+                "router_mode": self.router_mode,
+            },
+        )
+        return Command(
+            goto=END,
+            update={
+                "messages": [
+                    AIMessage(
+                        content=(
+                            "I could not work out which part of the table should "
+                            "handle that. Try rephrasing it as a rules question, "
+                            "a narrative action, or a dice roll."
+                        ),
+                        name=self.agent_type,
+                    )
+                ],
+                "active_agent": self.agent_type,
+            },
+        )
+
+    def _routed(self, request: str, match: Optional[PrefilterMatch], goto: str,
+                confidence: Optional[float]) -> Command:
         self._log_interaction(
             query=request,
             response=goto,
-            metadata={"routed_to": goto, "router": "llm"},
+            metadata={
+                "routed_to": goto,
+                "router": "llm",
+                "router_mode": self.router_mode,
+                "confidence": None if confidence is None else round(confidence, 3),
+                # A rule that matched below the routing tier. Logged so the
+                # report can measure how often a `likely` rule agreed with the
+                # model before anyone promotes it.
+                "prefilter_hint": None if match is None else {
+                    "routed_to": match.destination,
+                    "rule": match.rule,
+                    "tier": match.tier,
+                },
+            },
         )
 
         if goto == "FINISH":
-            # Ending the turn with no message at all reads as the app having
-            # hung. A fixed string, not a generation — there is nothing to say
-            # that is worth 40 s.
-            return Command(
-                goto=END,
-                update={
-                    "messages": [
-                        AIMessage(
-                            content="Ready when you are, adventurer.",
-                            name=self.agent_type,
-                        )
-                    ],
-                    "active_agent": "FINISH",
-                },
-            )
+            return self._finish()
 
         return Command(goto=goto, update={"active_agent": goto})
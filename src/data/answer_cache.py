@@ -0,0 +1,311 @@
+"""A semantic cache of the researcher's answers, in SQLite.
+
+Rules questions repeat across sessions and players, worded differently each
+time: "how does grappling work", "what are the rules for grappling", "can I
+grab the goblin". Each one costs a retrieval and a ~400-token answer. Here
+every grounded answer is kept with the embedding of the question that got it
+and the passages it was written from. A new question whose embedding is close
+enough to a kept one gets the kept answer — `Passages consulted` block and all
+— as long as every one of those passages is still in the index unchanged.
+
+The embeddings are the index's own (`all-MiniLM-L6-v2`, normalised), kept in
+memory as one matrix, so a lookup is one embedding and one matrix-vector
+product. Entries and counters live in the database, so `scripts/answer_cache.py`
+can report on and purge the cache of a running server; a purged entry leaves
+the server's matrix the next time it is the nearest match.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.graph.sqlite_connection import connect_sqlite
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ANSWER_CACHE_DB = "answer_cache.db"
+ENV_ANSWER_CACHE_DB = "DND_ANSWER_CACHE_DB"
+
+# `DND_ANSWER_CACHE=0` turns the cache off.
+ENV_ANSWER_CACHE = "DND_ANSWER_CACHE"
+
+# Cosine similarity a question needs to a kept one to get its answer. The
+# dangerous pairs are different questions about the same rule — "how does
+# grappling work" / "how do I escape a grapple" — which share most of their
+# words. A wrong answer served with confidence costs more than a generation,
+# so the default errs high. It is not yet measured on this index's model:
+# `scripts/answer_cache.py calibrate` scores a labelled set of rewordings and
+# near-misses with the deployed model and prints the threshold that separates
+# them; set it with `DND_ANSWER_CACHE_THRESHOLD`.
+DEFAULT_THRESHOLD = 0.9
+ENV_THRESHOLD = "DND_ANSWER_CACHE_THRESHOLD"
+
+# Entries kept; the least recently used go first. 2,000 answers with their
+# 384-dim vectors is ~5 MB on disk and 3 MB of matrix in memory.
+DEFAULT_MAX_ENTRIES = 2000
+ENV_MAX_ENTRIES = "DND_ANSWER_CACHE_SIZE"
+
+COUNTERS = ("lookups", "hits", "misses", "stale", "stored")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers (
+    id INTEGER PRIMARY KEY,
+    question TEXT NOT NULL,
+    embedding BLOB NOT NULL,
+    answer TEXT NOT NULL,
+    passages TEXT NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def answer_cache_enabled() -> bool:
+    return os.environ.get(ENV_ANSWER_CACHE, "").strip() not in {"0", "off", "false"}
+
+
+def resolve_cache_db(path: Optional[str] = None) -> str:
+    return path or os.environ.get(ENV_ANSWER_CACHE_DB, "").strip() or DEFAULT_ANSWER_CACHE_DB
+
+
+def resolve_threshold(threshold: Optional[float] = None) -> float:
+    if threshold is None:
+        value = os.environ.get(ENV_THRESHOLD, "").strip()
+        threshold = float(value) if value else DEFAULT_THRESHOLD
+    if not 0.0 < threshold <= 1.0:
+        raise ValueError(f"a similarity threshold is in (0, 1], got {threshold}")
+    return threshold
+
+
+def resolve_max_entries(max_entries: Optional[int] = None) -> int:
+    if max_entries is None:
+        value = os.environ.get(ENV_MAX_ENTRIES, "").strip()
+        max_entries = int(value) if value else DEFAULT_MAX_ENTRIES
+    if max_entries < 1:
+        raise ValueError(f"the answer cache needs room for one entry, got {max_entries}")
+    return max_entries
+
+
+def content_digest(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+# (passage id in the index, digest of its text when the answer was written)
+Passage = Tuple[str, str]
+
+
+@dataclass
+class CachedAnswer:
+    id: int
+    question: str
+    answer: Optional[str]
+    passages: List[Passage]
+    similarity: float
+
+
+class AnswerCache:
+    """Kept answers, their question vectors, and hit/miss counters.
+
+    `embeddings` is anything with `embed_query` — the index's own model. It
+    may be None for a cache opened only to report on or purge.
+    """
+
+    def __init__(self, path: Optional[str] = None, embeddings: Any = None,
+                 threshold: Optional[float] = None, max_entries: Optional[int] = None):
+        self.path = resolve_cache_db(path)
+        self.embeddings = embeddings
+        self.threshold = resolve_threshold(threshold)
+        self.max_entries = resolve_max_entries(max_entries)
+        self._lock = threading.Lock()
+        self.conn = connect_sqlite(self.path)
+        with self.conn:
+            self.conn.executescript(_SCHEMA)
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO counters (name, value) VALUES (?, 0)",
+                [(name,) for name in COUNTERS])
+        self._load()
+
+    def _load(self) -> None:
+        rows = self.conn.execute("SELECT id, embedding FROM answers ORDER BY id").fetchall()
+        self._ids = [row_id for row_id, _ in rows]
+        self._matrix = (np.vstack([np.frombuffer(blob, dtype=np.float32) for _, blob in rows])
+                        if rows else np.zeros((0, 0), dtype=np.float32))
+
+    def _count(self, name: str, by: int = 1) -> None:
+        self.conn.execute("UPDATE counters SET value = value + ? WHERE name = ?", (by, name))
+
+    def embed(self, question: str) -> np.ndarray:
+        vector = np.asarray(self.embeddings.embed_query(question), dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+    def lookup(self, vector: np.ndarray,
+               is_current: Callable[[Sequence[Passage]], bool]) -> Optional[CachedAnswer]:
+        """The kept answer nearest `vector`, if it is near enough and still current.
+
+        `is_current(passages)` says whether every passage is still in the index
+        with the same text. An entry that fails it is deleted: the index has
+        been rebuilt or re-chunked under it, and it can never match again.
+        """
+        with self._lock:
+            hit = None
+            if self._ids and self._matrix.shape[1] == vector.shape[0]:
+                similarities = self._matrix @ vector
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    hit = self._fetch(self._ids[best], float(similarities[best]))
+        # Checked unlocked: it reads the index, and every other researcher turn
+        # would otherwise wait on that I/O to look up or store an answer.
+        current = hit is not None and hit.answer is not None and is_current(hit.passages)
+        with self._lock, self.conn:
+            self._count("lookups")
+            if hit is not None and hit.answer is None:
+                # Purged by another process since this one loaded it.
+                self._delete([hit.id])
+                hit = None
+            if hit is not None and not current:
+                self._delete([hit.id])
+                self._count("stale")
+                hit = None
+            if hit is None:
+                self._count("misses")
+                return None
+            self._count("hits")
+            self.conn.execute(
+                "UPDATE answers SET hits = hits + 1, last_used = ? WHERE id = ?",
+                (time.time(), hit.id))
+        return hit
+
+    def _fetch(self, row_id: int, similarity: float) -> CachedAnswer:
+        row = self.conn.execute(
+            "SELECT question, answer, passages FROM answers WHERE id = ?", (row_id,)
+        ).fetchone()
+        if row is None:
+            return CachedAnswer(row_id, "", None, [], similarity)
+        question, answer, passages = row
+        return CachedAnswer(row_id, question, answer,
+                            [tuple(p) for p in json.loads(passages)], similarity)
+
+    def store(self, question: str, vector: np.ndarray, answer: str,
+              passages: Sequence[Passage]) -> None:
+        now = time.time()
+        with self._lock, self.conn:
+            if self._ids and self._matrix.shape[1] != vector.shape[0]:
+                # A different embedding model: nothing kept can match again.
+                self._delete(list(self._ids))
+            cur = self.conn.execute(
+                "INSERT INTO answers (question, embedding, answer, passages, created, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (question, vector.astype(np.float32).tobytes(), answer,
+                 json.dumps([list(p) for p in passages]), now, now))
+            self._count("stored")
+            self._ids.append(cur.lastrowid)
+            row = vector.astype(np.float32)[None, :]
+            self._matrix = np.vstack([self._matrix, row]) if self._matrix.size else row
+            overflow = len(self._ids) - self.max_entries
+            if overflow > 0:
+                self._delete([row_id for (row_id,) in self.conn.execute(
+                    "SELECT id FROM answers ORDER BY last_used LIMIT ?", (overflow,))])
+
+    def _delete(self, row_ids: Sequence[int]) -> int:
+        """Deletes rows and drops them from the matrix. Caller holds the lock."""
+        if not row_ids:
+            return 0
+        self.conn.executemany("DELETE FROM answers WHERE id = ?", [(i,) for i in row_ids])
+        gone = set(row_ids)
+        keep = [i for i, row_id in enumerate(self._ids) if row_id not in gone]
+        self._ids = [self._ids[i] for i in keep]
+        self._matrix = self._matrix[keep] if keep else np.zeros((0, 0), dtype=np.float32)
+        return len(row_ids)
+
+    # --- maintenance ------------------------------------------------------------
+
+    def entries(self) -> List[Dict[str, Any]]:
+        rows = self.conn.execute(
+            "SELECT id, question, passages, created, last_used, hits FROM answers ORDER BY id")
+        return [{"id": row_id, "question": question,
+                 "passages": [tuple(p) for p in json.loads(passages)],
+                 "created": created, "last_used": last_used, "hits": hits}
+                for row_id, question, passages, created, last_used, hits in rows]
+
+    def purge(self, *, older_than: Optional[float] = None,
+              matching: Optional[str] = None,
+              stale: Optional[Callable[[Sequence[Passage]], bool]] = None) -> int:
+        """Deletes entries and returns how many. With no filter, deletes all.
+
+        Args:
+            older_than: seconds since the entry was last used.
+            matching: a substring of the question, case-insensitive.
+            stale: `is_current` as for `lookup`; entries failing it go.
+        """
+        now = time.time()
+        doomed = []
+        for entry in self.entries():
+            if older_than is not None and now - entry["last_used"] < older_than:
+                continue
+            if matching is not None and matching.lower() not in entry["question"].lower():
+                continue
+            if stale is not None and stale(entry["passages"]):
+                continue
+            doomed.append(entry["id"])
+        with self._lock, self.conn:
+            return self._delete(doomed)
+
+    def stats(self) -> Dict[str, Any]:
+        counters = dict(self.conn.execute("SELECT name, value FROM counters"))
+        entries, oldest = self.conn.execute(
+            "SELECT COUNT(*), MIN(created) FROM answers").fetchone()
+        lookups = counters.get("lookups", 0)
+        return {
+            "path": self.path,
+            "entries": entries,
+            "threshold": self.threshold,
+            **counters,
+            "hit_rate": round(counters.get("hits", 0) / lookups, 3) if lookups else 0.0,
+            "oldest": oldest,
+            "bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+        }
+
+    def reset_counters(self) -> None:
+        with self._lock, self.conn:
+            self.conn.execute("UPDATE counters SET value = 0")
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def passages_current(vectorstore: Any, passages: Sequence[Passage]) -> bool:
+    """Every passage is still in `vectorstore`, with the text it had."""
+    if not passages or vectorstore is None:
+        return False
+    found = vectorstore.get(ids=[pid for pid, _ in passages], include=["documents"])
+    current = dict(zip(found["ids"], found["documents"]))
+    return all(pid in current and content_digest(current[pid]) == digest
+               for pid, digest in passages)
+
+
+def open_answer_cache(embeddings: Any, path: Optional[str] = None) -> Optional[AnswerCache]:
+    """The researcher's cache, or None if it is turned off or cannot be opened.
+
+    A cache that fails to open costs generations, never answers, so it is
+    logged and skipped rather than raised.
+    """
+    if embeddings is None or not answer_cache_enabled():
+        return None
+    try:
+        return AnswerCache(path, embeddings)
+    except Exception:
+        logger.exception("could not open the answer cache; answering without it")
+        return None
@@ -0,0 +1,332 @@
+"""Micro-batched query embeddings, in-process or shared over a local socket.
+
+Every researcher turn embeds its question with `embed_query`, and so does the
+answer cache. Called from concurrent turns, each call is its own forward pass
+of the model at batch size 1, one after another on the same CPU. A batch of
+eight costs the model little more than one: most of a pass is fixed overhead
+for a 30-token sentence.
+
+`EmbeddingBatcher` puts every text on one queue in front of one worker. The
+worker takes the first text, keeps collecting for up to `max_wait` or until it
+has `max_batch` texts, and embeds them in one call. While that call runs, new
+texts queue, so under load the next batch is already waiting and no time is
+spent waiting at all; alone, a query pays at most `max_wait`.
+
+`BatchedEmbeddings` is a LangChain `Embeddings` over a batcher, which is what
+`create_embeddings` hands to Chroma. `EmbeddingServer` serves a batcher on a
+Unix socket, and `RemoteEmbeddings` is its client: several game processes
+pointed at one socket (`DND_EMBEDDINGS_SOCKET`) share one loaded model and
+one batch, instead of each holding its own copy of both.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import queue
+import socket
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+# Most texts one forward pass takes. MiniLM's cost per text is near flat well
+# past this; the cap bounds how long the last text in a batch waits for the
+# first. Not measured in this repo's CI, which has no sentence-transformers.
+DEFAULT_MAX_BATCH = 32
+ENV_MAX_BATCH = "DND_EMBED_MAX_BATCH"
+
+# Longest the worker waits for company once it has a text. An unbatched
+# MiniLM query is ~10 ms on a laptop CPU, so a lone query pays at most half
+# again. 0 embeds whatever has queued, without waiting.
+DEFAULT_MAX_WAIT_MS = 5.0
+ENV_MAX_WAIT_MS = "DND_EMBED_MAX_WAIT_MS"
+
+# A Unix socket path. When set, `create_embeddings` uses the service there.
+ENV_EMBEDDINGS_SOCKET = "DND_EMBEDDINGS_SOCKET"
+
+
+class EmbeddingServiceError(RuntimeError):
+    """The embedding service refused a request or could not be reached."""
+
+
+def resolve_max_batch(max_batch: Optional[int] = None) -> int:
+    if max_batch is None:
+        value = os.environ.get(ENV_MAX_BATCH, "").strip()
+        max_batch = int(value) if value else DEFAULT_MAX_BATCH
+    if max_batch < 1:
+        raise ValueError(f"{ENV_MAX_BATCH} must be at least 1, got {max_batch}")
+    return max_batch
+
+
+def resolve_max_wait(max_wait_ms: Optional[float] = None) -> float:
+    """The wait in seconds."""
+    if max_wait_ms is None:
+        value = os.environ.get(ENV_MAX_WAIT_MS, "").strip()
+        max_wait_ms = float(value) if value else DEFAULT_MAX_WAIT_MS
+    if max_wait_ms < 0:
+        raise ValueError(f"{ENV_MAX_WAIT_MS} cannot be negative, got {max_wait_ms}")
+    return max_wait_ms / 1000.0
+
+
+def resolve_socket(path: Optional[str] = None) -> Optional[str]:
+    return path or os.environ.get(ENV_EMBEDDINGS_SOCKET, "").strip() or None
+
+
+class EmbeddingBatcher:
+    """One queue, one worker, one model call per batch.
+
+    `embed_batch` takes a list of texts and returns their vectors in order —
+    an `Embeddings.embed_documents`. The worker starts with the first text.
+    """
+
+    def __init__(self, embed_batch: Callable[[List[str]], List[List[float]]],
+                 max_batch: Optional[int] = None, max_wait_ms: Optional[float] = None):
+        self.embed_batch = embed_batch
+        self.max_batch = resolve_max_batch(max_batch)
+        self.max_wait = resolve_max_wait(max_wait_ms)
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.texts = 0
+        self.largest = 0
+
+    def submit(self, text: str) -> Future:
+        """A future for `text`'s vector."""
+        future: Future = Future()
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="embedding-batcher",
+                                                daemon=True)
+                self._worker.start()
+        self._queue.put((text, future))
+        return future
+
+    def embed(self, text: str) -> List[float]:
+        return self.submit(text).result()
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            try:
+                # Whatever has already queued joins without waiting.
+                batch.append(self._queue.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            texts = [text for text, _ in batch]
+            try:
+                vectors = self.embed_batch(texts)
+            except Exception as exc:
+                for _, future in batch:
+                    future.set_exception(exc)
+                continue
+            self.batches += 1
+            self.texts += len(texts)
+            self.largest = max(self.largest, len(texts))
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(list(vector))
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "texts": self.texts,
+            "mean_batch": round(self.texts / self.batches, 2) if self.batches else 0.0,
+            "largest_batch": self.largest,
+            "queued": self._queue.qsize(),
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000.0,
+        }
+
+
+class BatchedEmbeddings(Embeddings):
+    """`inner`'s embeddings, with single queries batched together.
+
+    Queries go through `inner.embed_documents` in a batch. For a symmetric
+    model such as MiniLM a query and a document are embedded the same way;
+    a model with a query prefix or prompt must not be wrapped.
+    `embed_documents` is already a batch and goes straight to `inner`.
+    """
+
+    def __init__(self, inner: Embeddings, max_batch: Optional[int] = None,
+                 max_wait_ms: Optional[float] = None):
+        self.inner = inner
+        self.batcher = EmbeddingBatcher(inner.embed_documents, max_batch, max_wait_ms)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.batcher.embed(text)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await asyncio.wrap_future(self.batcher.submit(text))
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.inner.embed_documents(texts)
+
+
+# --- the socket service -----------------------------------------------------
+#
+# One JSON object per line each way. A request is {"model": ..., "texts": [...]}
+# and gets {"vectors": [...]} or {"error": ...}; {"metrics": true} gets the
+# batcher's counters. The model name is checked on every request: a vector
+# from a different model would query the index and silently match nothing.
+
+class EmbeddingServer:
+    """Serves a batcher on a Unix socket. Every text joins the shared batch."""
+
+    def __init__(self, embeddings: Embeddings, model_name: str, path: str,
+                 max_batch: Optional[int] = None, max_wait_ms: Optional[float] = None):
+        self.model_name = model_name
+        self.path = path
+        self.batcher = EmbeddingBatcher(embeddings.embed_documents, max_batch, max_wait_ms)
+        self.requests = 0
+        self._server: Optional[asyncio.base_events.Server] = None
+
+    async def _reply(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        if request.get("metrics"):
+            return {"model": self.model_name, "requests": self.requests,
+                    **self.batcher.metrics()}
+        if request.get("model") != self.model_name:
+            return {"error": f"this service embeds with {self.model_name!r}, "
+                             f"not {request.get('model')!r}"}
+        self.requests += 1
+        vectors = await asyncio.gather(*(asyncio.wrap_future(self.batcher.submit(text))
+                                         for text in request.get("texts", [])))
+        return {"vectors": vectors}
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while line := await reader.readline():
+                try:
+                    reply = await self._reply(json.loads(line))
+                except Exception as exc:
+                    reply = {"error": f"{type(exc).__name__}: {exc}"}
+                writer.write(json.dumps(reply).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self) -> None:
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # left by a service that did not shut down
+        # A 384-dim vector is ~8 KB of JSON; a document batch is many.
+        self._server = await asyncio.start_unix_server(self._handle, path=self.path,
+                                                       limit=64 * 1024 * 1024)
+        logger.info("Embedding %s for clients on %s", self.model_name, self.path)
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+class RemoteEmbeddings(Embeddings):
+    """Embeddings from an `EmbeddingServer`, over a pool of kept connections."""
+
+    def __init__(self, path: str, model_name: str, timeout: float = 30.0):
+        self.path = path
+        self.model_name = model_name
+        self.timeout = timeout
+        self._idle: List[tuple] = []
+        self._lock = threading.Lock()
+
+    def _connect(self) -> tuple:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.path)
+        except OSError as exc:
+            sock.close()
+            raise EmbeddingServiceError(f"no embedding service on {self.path}: {exc}") from exc
+        return sock, sock.makefile("rb")
+
+    def request(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Send `payload` and return the reply.
+
+        A kept connection that fails is retried once on a new one: after the
+        service restarts, every kept connection is dead, and only the first
+        write to each finds out.
+
+        Raises:
+            EmbeddingServiceError: on any socket or protocol failure, or an
+                error reply.
+        """
+        line = json.dumps(payload).encode() + b"\n"
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        reply = None
+        if conn is not None:
+            try:
+                reply = self._exchange(conn, line)
+            except EmbeddingServiceError as exc:
+                logger.debug("kept embedding connection failed (%s); reconnecting", exc)
+        if reply is None:
+            reply = self._exchange(self._connect(), line)
+        if "error" in reply:
+            raise EmbeddingServiceError(reply["error"])
+        return reply
+
+    def _exchange(self, conn: tuple, line: bytes) -> Dict[str, Any]:
+        """One request and its reply on `conn`, which goes back to the pool
+        only if both went through."""
+        sock, stream = conn
+        try:
+            sock.sendall(line)
+            answer = stream.readline()
+            if not answer:
+                raise EmbeddingServiceError(f"the embedding service on {self.path} hung up")
+            reply = json.loads(answer)
+        except BaseException as exc:
+            stream.close()
+            sock.close()
+            if isinstance(exc, (OSError, ValueError)):
+                raise EmbeddingServiceError(
+                    f"embedding service on {self.path} failed: {exc}") from exc
+            raise
+        with self._lock:
+            self._idle.append(conn)
+        return reply
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return self.request({"model": self.model_name, "texts": list(texts)})["vectors"]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def metrics(self) -> Dict[str, Any]:
+        return self.request({"metrics": True})
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for sock, stream in idle:
+            stream.close()
+            sock.close()
@@ -0,0 +1,103 @@
+"""The SRD's split entries, whole, beside the vector index.
+
+The index holds pieces of at most ~1,000 characters, because small pieces
+embed well. But 415 of the SRD's 2,036 entries are longer than that, and the
+answer to a question about one is not always in the piece that matched: "what
+can an adult red dragon do" matches the piece with its name and statistics,
+while the legendary actions are three pieces further on. Here each of those
+entries is kept whole, keyed by the loader's `entry_id`, so a matched piece
+can be widened to its stat block or spell (`src/pipelines/context.py`).
+
+Single-piece entries are not stored; their piece already is the entry. The
+415 entries are 830 KB of text, zlib-compressed to 384 KB in one SQLite file
+in the index directory, which `scripts/ingest.py` writes with the index and
+`--rebuild` replaces with it.
+"""
+
+import logging
+import threading
+import zlib
+from pathlib import Path
+from typing import Iterable, Optional
+
+from langchain_core.documents import Document
+
+from src.graph.sqlite_connection import connect_sqlite
+
+logger = logging.getLogger(__name__)
+
+ENTRY_STORE_FILE = "srd_entries.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    entry_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    body BLOB NOT NULL
+);
+"""
+
+
+def entry_store_path(persist_directory: str) -> str:
+    return str(Path(persist_directory) / ENTRY_STORE_FILE)
+
+
+class EntryStore:
+    """Whole entries by `entry_id`, read once per retrieved entry."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = connect_sqlite(path)
+        with self.conn:
+            self.conn.executescript(_SCHEMA)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def get(self, entry_id: str) -> Optional[str]:
+        """The entry's full text, headed `# Name`, or None if it is not stored."""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT body FROM entries WHERE entry_id = ?", (entry_id,)).fetchone()
+        return zlib.decompress(row[0]).decode("utf-8") if row else None
+
+    def add(self, entries: Iterable[Document]) -> int:
+        """Store `entries` — documents carrying an `entry_id` — replacing any
+        with the same id. Returns how many were written."""
+        rows = [(doc.metadata["entry_id"], doc.metadata.get("name", ""),
+                 zlib.compress(doc.page_content.encode("utf-8"), 9)) for doc in entries]
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO entries (entry_id, name, body) VALUES (?, ?, ?)", rows)
+        return len(rows)
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def build_entry_store(entries: Iterable[Document], persist_directory: str) -> EntryStore:
+    """Write `entries` to the store in `persist_directory`, replacing any there."""
+    path = Path(entry_store_path(persist_directory))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    for stale in (path, Path(f"{path}-wal"), Path(f"{path}-shm")):
+        stale.unlink(missing_ok=True)
+    store = EntryStore(str(path))
+    store.add(entries)
+    return store
+
+
+def open_entry_store(persist_directory: str) -> Optional[EntryStore]:
+    """The store beside the index at `persist_directory`, or None.
+
+    An index built before the store existed, or from the PDFs, has none;
+    retrieval then sends the pieces it matched, as it always has.
+    """
+    path = entry_store_path(persist_directory)
+    if not Path(path).is_file():
+        return None
+    try:
+        return EntryStore(path)
+    except Exception:
+        logger.exception("could not open the entry store at %s; sending pieces only", path)
+        return None
@@ -0,0 +1,165 @@
+"""What the researcher learned from its rewrites, kept across restarts.
+
+A question whose retrieval misses costs a model rewrite before the retry —
+the "hides and stabs" question spends seconds on it every time it is asked.
+Two outcomes are worth remembering:
+
+- **rewrite** — the rewrite found a match. Next time the question is
+  searched with the kept rewrite directly, and no model call is made.
+- **miss** — the retry missed as well. The question is off-topic for this
+  index ("what's the weather in Waterdeep"), and next time neither the
+  glossary nor the rewrite is tried.
+
+Both depend on the index, so every entry is keyed on `index_version`, which
+changes whenever `scripts/ingest.py` builds a new collection. After a rebuild
+nothing kept can match. A kept miss also skips the glossary, so the version
+folds in the glossary's fingerprint too: once `scripts/mine_glossary.py` adds
+a phrase, a question that missed before gets to try it. Entries from older versions are dropped when the
+cache is opened. Questions are matched exactly, after case and spacing are
+normalised.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from src.config import EMBEDDING_MODEL_NAME
+from src.graph.sqlite_connection import connect_sqlite
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REWRITE_CACHE_DB = "rewrite_cache.db"
+ENV_REWRITE_CACHE_DB = "DND_REWRITE_CACHE_DB"
+
+# `DND_REWRITE_CACHE=0` turns the cache off.
+ENV_REWRITE_CACHE = "DND_REWRITE_CACHE"
+
+# Entries kept; the least recently used go first. A row is a question and a
+# one-sentence rewrite, so 5,000 is well under a megabyte.
+DEFAULT_MAX_ENTRIES = 5000
+
+REWRITE = "rewrite"
+MISS = "miss"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rewrites (
+    question TEXT NOT NULL,
+    index_version TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    rewritten TEXT,
+    score REAL NOT NULL,
+    retried_score REAL NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (question, index_version)
+);
+"""
+
+
+def rewrite_cache_enabled() -> bool:
+    return os.environ.get(ENV_REWRITE_CACHE, "").strip() not in {"0", "off", "false"}
+
+
+def resolve_rewrite_cache_db(path: Optional[str] = None) -> str:
+    return path or os.environ.get(ENV_REWRITE_CACHE_DB, "").strip() or DEFAULT_REWRITE_CACHE_DB
+
+
+def question_key(question: str) -> str:
+    return " ".join(question.lower().split())
+
+
+def index_version(vectorstore: Any, glossary: str = "") -> Optional[str]:
+    """Which build of the index `vectorstore` is, or None if it cannot say.
+
+    A rebuild deletes the collection and creates a new one with a new id; the
+    chunk count and the embedding model are folded in too, so an index
+    re-chunked or re-embedded in place reads as a new version as well.
+    `glossary` is the fingerprint of the glossary tried before a rewrite.
+    """
+    try:
+        collection = vectorstore._collection
+        fingerprint = (f"{collection.id}:{collection.count()}:{EMBEDDING_MODEL_NAME}"
+                       f":{glossary}")
+    except Exception:
+        return None
+    return hashlib.sha1(fingerprint.encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass
+class KnownQuestion:
+    kind: str
+    rewritten: Optional[str]
+    score: float
+    retried_score: float
+
+
+class RewriteCache:
+    """Kept rewrites and known misses for one version of the index."""
+
+    def __init__(self, version: str, path: Optional[str] = None,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = resolve_rewrite_cache_db(path)
+        self.version = version
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.conn = connect_sqlite(self.path)
+        with self.conn:
+            self.conn.executescript(_SCHEMA)
+            stale = self.conn.execute(
+                "DELETE FROM rewrites WHERE index_version != ?", (version,)).rowcount
+        if stale:
+            logger.info("Dropped %d kept rewrites from an older index", stale)
+
+    def lookup(self, question: str) -> Optional[KnownQuestion]:
+        key = question_key(question)
+        with self._lock, self.conn:
+            row = self.conn.execute(
+                "SELECT kind, rewritten, score, retried_score FROM rewrites"
+                " WHERE question = ? AND index_version = ?", (key, self.version)).fetchone()
+            if row is None:
+                return None
+            self.conn.execute(
+                "UPDATE rewrites SET hits = hits + 1, last_used = ?"
+                " WHERE question = ? AND index_version = ?", (time.time(), key, self.version))
+        return KnownQuestion(*row)
+
+    def store(self, question: str, kind: str, rewritten: Optional[str],
+              score: float, retried_score: float) -> None:
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO rewrites (question, index_version, kind, rewritten,"
+                " score, retried_score, created, last_used) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (question_key(question), self.version, kind, rewritten, score, retried_score,
+                 now, now))
+            self.conn.execute(
+                "DELETE FROM rewrites WHERE rowid IN (SELECT rowid FROM rewrites"
+                " ORDER BY last_used DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM rewrites").fetchone()[0]
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def open_rewrite_cache(vectorstore: Any, path: Optional[str] = None,
+                       glossary: str = "") -> Optional[RewriteCache]:
+    """The researcher's cache, or None if it is off, has no index to key on,
+    or cannot be opened — in which case every miss is retried, as before."""
+    if vectorstore is None or not rewrite_cache_enabled():
+        return None
+    version = index_version(vectorstore, glossary)
+    if version is None:
+        return None
+    try:
+        return RewriteCache(version, path)
+    except Exception:
+        logger.exception("could not open the rewrite cache; retrying misses without it")
+        return None
@@ -0,0 +1,162 @@
+"""One Chroma collection per SRD category, searched by where a question points.
+
+The main collection holds every chunk, so "what's the AC of an owlbear" is
+ranked against 3,082 chunks — spells, items, and class features included —
+when only Monsters' 635 can answer it, and every other one is a chance to
+push a piece of the stat block out of the candidates. `scripts/ingest.py --shards` also
+writes one collection per category, beside the main one in the same
+directory. It copies the main collection's vectors, so nothing is embedded
+twice and a chunk has the same id in both. `shards.json` lists them.
+
+`ShardedVectorStore` searches the categories `route` names for the question
+and merges what they return by score. It embeds the query once, for all of
+them and for the fallback: if `route` names none, or the best routed score is
+under `min_score`, the same vector searches the main collection, so a router
+that guesses wrong costs one more search and never loses a match. A caller
+that already has the vector passes it to `search_routed`. Anything else —
+`get`, `embeddings`, search by vector alone — is the main collection's.
+"""
+
+import json
+import logging
+import os
+import re
+import warnings
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+
+from .vectorstore import create_embeddings
+
+logger = logging.getLogger(__name__)
+
+SHARD_MANIFEST = "shards.json"
+
+# `DND_SHARDS=0` searches the main collection even where shards were built.
+ENV_SHARDS = "DND_SHARDS"
+
+# Rows copied per `get`/`add` call while building; Chroma caps a batch.
+COPY_BATCH = 1000
+
+
+def shards_enabled() -> bool:
+    return os.environ.get(ENV_SHARDS, "").strip() not in {"0", "off", "false"}
+
+
+def shard_collection_name(category: str) -> str:
+    return "srd_" + re.sub(r"[^a-z0-9]+", "_", category.lower()).strip("_")
+
+
+def build_shards(store: Chroma, persist_directory: str) -> Dict[str, int]:
+    """Copy `store`'s chunks into one collection per `category`, and list them
+    in the manifest. Returns the chunk count per category."""
+    collection = store._collection
+    shards: Dict[str, Chroma] = {}
+    counts: Dict[str, int] = {}
+    total = collection.count()
+    for offset in range(0, total, COPY_BATCH):
+        rows = collection.get(include=["embeddings", "documents", "metadatas"],
+                              limit=COPY_BATCH, offset=offset)
+        grouped: Dict[str, List[int]] = {}
+        for i, metadata in enumerate(rows["metadatas"]):
+            grouped.setdefault((metadata or {}).get("category", ""), []).append(i)
+        for category, rows_in in grouped.items():
+            if not category:
+                continue
+            if category not in shards:
+                shards[category] = Chroma(collection_name=shard_collection_name(category),
+                                          persist_directory=persist_directory,
+                                          embedding_function=store.embeddings)
+            shards[category]._collection.add(
+                ids=[rows["ids"][i] for i in rows_in],
+                embeddings=[rows["embeddings"][i] for i in rows_in],
+                documents=[rows["documents"][i] for i in rows_in],
+                metadatas=[rows["metadatas"][i] for i in rows_in],
+            )
+            counts[category] = counts.get(category, 0) + len(rows_in)
+
+    manifest = {category: {"collection": shard_collection_name(category), "chunks": count}
+                for category, count in sorted(counts.items())}
+    (Path(persist_directory) / SHARD_MANIFEST).write_text(json.dumps(manifest, indent=2) + "\n")
+    return counts
+
+
+def load_shards(persist_directory: str) -> Dict[str, Chroma]:
+    """The category collections the manifest lists, or {} if there is none."""
+    path = Path(persist_directory) / SHARD_MANIFEST
+    if not path.is_file():
+        return {}
+    manifest = json.loads(path.read_text())
+    embeddings = create_embeddings()
+    return {category: Chroma(collection_name=entry["collection"],
+                             persist_directory=persist_directory,
+                             embedding_function=embeddings)
+            for category, entry in manifest.items()}
+
+
+class ShardedVectorStore:
+    """The main collection, with text search routed to category shards."""
+
+    def __init__(self, store: Chroma, shards: Dict[str, Chroma],
+                 route: Callable[[str], List[str]], min_score: float):
+        self.store = store
+        self.shards = shards
+        self.route = route
+        self.min_score = min_score
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.store, name)
+
+    def search_shards(self, vector: List[float], categories: List[str],
+                      k: int) -> List[Tuple[Document, float]]:
+        """The best `k` chunks across `categories`, by relevance score."""
+        merged: List[Tuple[Document, float]] = []
+        for category in categories:
+            merged.extend(scored_by_vector(self.shards[category], vector, k))
+        merged.sort(key=lambda pair: pair[1], reverse=True)
+        return merged[:k]
+
+    def search_routed(self, query: str, vector: List[float],
+                      k: int = 4) -> List[Tuple[Document, float]]:
+        """Search `query`'s categories with its embedding, and the main
+        collection with the same embedding if they fall short."""
+        categories = [c for c in self.route(query) if c in self.shards]
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)
+            if categories:
+                scored = self.search_shards(vector, categories, k)
+                if scored and scored[0][1] >= self.min_score:
+                    return scored
+            return scored_by_vector(self.store, vector, k)
+
+    def similarity_search_with_relevance_scores(self, query: str, k: int = 4,
+                                                **kwargs: Any) -> List[Tuple[Document, float]]:
+        if kwargs:
+            return self.store.similarity_search_with_relevance_scores(query, k=k, **kwargs)
+        return self.search_routed(query, self.store.embeddings.embed_query(query), k)
+
+
+def scored_by_vector(store: Chroma, vector: List[float], k: int) -> List[Tuple[Document, float]]:
+    """`store`'s best `k` chunks for an embedding, with relevance scores as
+    `similarity_search_with_relevance_scores` gives them."""
+    relevance = store._select_relevance_score_fn()
+    found = store.similarity_search_by_vector_with_relevance_scores(vector, k=k)
+    return [(doc, relevance(distance)) for doc, distance in found]
+
+
+def open_sharded(store: Chroma, persist_directory: str,
+                 route: Callable[[str], List[str]], min_score: float) -> Optional[ShardedVectorStore]:
+    """`store` with its shards, or None if it has none, they are turned off,
+    or they will not open."""
+    if not shards_enabled():
+        return None
+    try:
+        shards = load_shards(persist_directory)
+    except Exception:
+        logger.exception("could not open the category shards; searching the whole index")
+        return None
+    if not shards:
+        return None
+    return ShardedVectorStore(store, shards, route, min_score)
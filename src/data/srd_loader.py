@@ -16,13 +16,18 @@ Two consequences worth knowing:
   chunks unsearchable by name. `chunk_entry` re-heads each piece.
 """
 
+import functools
+import hashlib
 import json
 import logging
+import re
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional
+from typing import Any, Container, Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
 
 from langchain_core.documents import Document
 
+from src.config import SRD_DIRECTORY
+
 logger = logging.getLogger(__name__)
 
 SRD_SOURCE = "SRD 5.1"
@@ -371,12 +376,47 @@ def merge_shared_entries(entries: List[Dict], stem: str) -> List[Dict]:
     return [merged[key] for key in order]
 
 
-def load_srd_documents(
-    directory: str,
-    chunk_size: int = 1000,
-    chunk_overlap: int = 200,
-) -> List[Document]:
-    """Read the vendored SRD JSON and return chunked, labelled documents."""
+def normalise_name(text: str) -> str:
+    """Lowercase words joined by single spaces — the form names are matched in."""
+    return " ".join(re.findall(r"[a-z0-9']+", str(text).lower()))
+
+
+def load_entry_names(directory: str) -> Dict[str, str]:
+    """Every SRD entry name, normalised, mapped to its citation category.
+
+    Reads the same files the index is built from, so a name found here is a
+    name retrieval can land on. `Levels` is left out: its titles are
+    synthesised ("Bard level 3") and never appear in a player's question.
+    Returns an empty dict if the corpus is missing — callers treat "no names"
+    as "no match", never as an error.
+    """
+    root = Path(directory)
+    names: Dict[str, str] = {}
+    if not root.is_dir():
+        return names
+
+    for stem, category in SRD_FILES.items():
+        path = root / f"{stem}.json"
+        if stem == "Levels" or not path.is_file():
+            continue
+        entries = json.loads(path.read_text())
+        if isinstance(entries, dict):
+            entries = [entries]
+        for entry in entries:
+            name = normalise_name(entry_title(stem, entry))
+            if name:
+                names.setdefault(name, category)
+
+    return names
+
+
+def entry_id(title: str, body: str) -> str:
+    """A short, stable identifier for one rendered entry."""
+    return hashlib.sha1(f"# {title}\n{body}".encode("utf-8")).hexdigest()[:16]
+
+
+def _rendered_entries(directory: str) -> Iterator[Tuple[str, str, Dict[str, str]]]:
+    """(title, rendered body, metadata) for every SRD entry, file by file."""
     root = Path(directory)
     if not root.is_dir():
         raise FileNotFoundError(
@@ -384,8 +424,6 @@ def load_srd_documents(
             f"corpus/srd — see corpus/README.md."
         )
 
-    documents: List[Document] = []
-
     for stem, category in SRD_FILES.items():
         path = root / f"{stem}.json"
         if not path.is_file():
@@ -418,10 +456,130 @@ def load_srd_documents(
             if stem == "Spells":
                 metadata["level"] = str(entry.get("level", ""))
                 metadata["school"] = _name_of(entry.get("school"))
-
-            for piece in chunk_entry(body, title, chunk_size, chunk_overlap):
-                documents.append(Document(page_content=piece, metadata=dict(metadata)))
+            # Names are not unique — the barbarian's and the monk's Unarmored
+            # Defense differ, and 60 names in all are shared by different
+            # text. The entry's own text is, and survives a rebuild.
+            metadata["entry_id"] = entry_id(title, body)
+            yield title, body, metadata
 
         logger.info("Loaded %s", category)
 
+
+def load_srd_entries(directory: str) -> List[Document]:
+    """Every SRD entry whole, headed as its pieces are — one document each.
+
+    What `scripts/ingest.py` writes to the entry store, so a retrieved piece
+    can be widened to the stat block or spell it came from
+    (`src/data/entry_store.py`).
+    """
+    return [Document(page_content=f"# {title}\n{body}", metadata=metadata)
+            for title, body, metadata in _rendered_entries(directory)]
+
+
+def load_entry_categories(directory: str) -> Dict[str, FrozenSet[str]]:
+    """Every SRD entry name, normalised, mapped to each category that uses it.
+
+    `load_entry_names` keeps one category per name, which is enough for a
+    citation; the shard router needs them all — a Camel is both Equipment and
+    a Monster. Empty if the corpus is missing.
+    """
+    categories: Dict[str, set] = {}
+    root = Path(directory)
+    if not root.is_dir():
+        return {}
+    for stem, category in SRD_FILES.items():
+        path = root / f"{stem}.json"
+        if stem == "Levels" or not path.is_file():
+            continue
+        entries = json.loads(path.read_text())
+        if isinstance(entries, dict):
+            entries = [entries]
+        for entry in entries:
+            name = normalise_name(entry_title(stem, entry))
+            if name:
+                categories.setdefault(name, set()).add(category)
+    return {name: frozenset(found) for name, found in categories.items()}
+
+
+# Rules vocabulary that is not an entry name in the SRD files — grappling lives
+# inside "Actions in Combat", opportunity attacks inside "Making an Attack".
+RULES_TERMS = {
+    "grapple", "grappling", "shove", "opportunity attack", "opportunity attacks",
+    "armor class", "hit points", "hit dice", "saving throw", "saving throws",
+    "death saving throws", "spell slot", "spell slots", "concentration",
+    "initiative", "advantage", "disadvantage", "short rest", "long rest",
+    "proficiency bonus", "critical hit", "sneak attack", "bonus action",
+    "reaction", "attack of opportunity", "ritual", "cantrip", "cantrips",
+    "multiclassing", "encumbrance", "carrying capacity", "difficult terrain",
+    "two weapon fighting", "two-weapon fighting", "inspiration",
+}
+
+# SRD names that are ordinary words in a sentence far more often than they are
+# questions about the entry.
+GENERIC_NAMES = {"time", "life", "land", "book", "appendix", "objects"}
+
+# Longest name matched, in words: "ring of spell storing" is four.
+MAX_NAME_WORDS = 5
+
+
+def matchable_name(name: str) -> bool:
+    """Whether a normalised name is worth looking for in a sentence."""
+    return len(name) >= 3 and name not in GENERIC_NAMES
+
+
+def mentioned_names(text: str, names: Container[str]) -> List[str]:
+    """Every one of `names` the text mentions, longest first.
+
+    Matches whole-word n-grams, so "rage" matches "how does rage work" but not
+    "outrageous". A possessive is matched without its "'s", and a trailing
+    plural is tried singular too: "goblin's", "goblins". A name inside a
+    longer one already matched is not counted again: "sneak attack" is one
+    mention, not two.
+    """
+    words = [w[:-2] if w.endswith("'s") else w for w in normalise_name(text).split()]
+    taken = [False] * len(words)
+    found: List[str] = []
+    for size in range(min(MAX_NAME_WORDS, len(words)), 0, -1):
+        for start in range(len(words) - size + 1):
+            if any(taken[start:start + size]):
+                continue
+            phrase = " ".join(words[start:start + size])
+            if phrase not in names and phrase.endswith("s") and phrase[:-1] in names:
+                phrase = phrase[:-1]
+            if phrase in names:
+                taken[start:start + size] = [True] * size
+                if phrase not in found:
+                    found.append(phrase)
+    return found
+
+
+@functools.lru_cache(maxsize=1)
+def srd_entry_names() -> FrozenSet[str]:
+    """Normalised SRD entry names and rules terms, read once per process."""
+    names = {name for name in load_entry_names(SRD_DIRECTORY) if matchable_name(name)}
+    return frozenset(names | RULES_TERMS)
+
+
+def mentioned_srd_entries(text: str) -> List[str]:
+    """Every SRD entry name or rules term the text mentions, longest first."""
+    return mentioned_names(text, srd_entry_names())
+
+
+def load_srd_documents(
+    directory: str,
+    chunk_size: int = 1000,
+    chunk_overlap: int = 200,
+) -> List[Document]:
+    """Read the vendored SRD JSON and return chunked, labelled documents."""
+    documents: List[Document] = []
+    for title, body, metadata in _rendered_entries(directory):
+        pieces = chunk_entry(body, title, chunk_size, chunk_overlap)
+        # A piece of a one-piece entry is the whole entry, and can be shown
+        # to the player as it stands (the researcher's extractive answers).
+        # The ordinal lets neighbouring pieces retrieved together be joined
+        # back up (`src/pipelines/context.py`).
+        metadata["chunk_count"] = len(pieces)
+        for index, piece in enumerate(pieces):
+            documents.append(Document(page_content=piece,
+                                      metadata={**metadata, "chunk_index": index}))
     return documents
@@ -1,13 +1,21 @@
 import logging
 import shutil
+import threading
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from langchain_chroma import Chroma
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from langchain_huggingface import HuggingFaceEmbeddings
 
 from ..config import CHROMA_DB_DIRECTORY, EMBEDDING_MODEL_NAME
+from .embedding_service import (
+    BatchedEmbeddings,
+    EmbeddingServiceError,
+    RemoteEmbeddings,
+    resolve_socket,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -16,13 +24,42 @@ class VectorStoreMissingError(FileNotFoundError):
     """No index on disk, and the caller asked to read rather than build one."""
 
 
-def create_embeddings(model_name: str = EMBEDDING_MODEL_NAME) -> HuggingFaceEmbeddings:
+# One loaded model per name per process, shared by every store and cache.
+_EMBEDDINGS: Dict[str, Embeddings] = {}
+_EMBEDDINGS_LOCK = threading.Lock()
+
+
+def create_embeddings(model_name: str = EMBEDDING_MODEL_NAME) -> Embeddings:
     """The embedding model. Changing it invalidates the entire index.
 
     `all-MiniLM-L6-v2` produces 384-dim vectors, and the committed store is built
     from them — a store built with one model cannot be queried with another.
+
+    Concurrent queries are batched into one forward pass
+    (`src/data/embedding_service.py`). With `DND_EMBEDDINGS_SOCKET` set, the
+    model is the embedding service's, shared with every other process using
+    that socket; if nothing answers there, the model is loaded here instead.
     """
-    return HuggingFaceEmbeddings(model_name=model_name)
+    with _EMBEDDINGS_LOCK:
+        if model_name not in _EMBEDDINGS:
+            _EMBEDDINGS[model_name] = _remote_embeddings(model_name) or BatchedEmbeddings(
+                HuggingFaceEmbeddings(model_name=model_name))
+        return _EMBEDDINGS[model_name]
+
+
+def _remote_embeddings(model_name: str) -> Optional[RemoteEmbeddings]:
+    path = resolve_socket()
+    if path is None:
+        return None
+    remote = RemoteEmbeddings(path, model_name)
+    try:
+        remote.embed_query("ping")
+    except EmbeddingServiceError as exc:
+        logger.warning("Embedding service unusable (%s); loading %s in this process",
+                       exc, model_name)
+        return None
+    logger.info("Embedding with the service on %s", path)
+    return remote
 
 
 def load_vectorstore(persist_directory: str = CHROMA_DB_DIRECTORY) -> Chroma:
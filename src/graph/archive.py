@@ -0,0 +1,194 @@
+import os
+from typing import List, Optional, Sequence, Tuple
+
+from langchain_core.messages import BaseMessage, RemoveMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import BaseCheckpointSaver
+
+from src.graph.sharding import ShardedSaver
+
+# Messages kept in the live `messages` channel. Every node gets the whole
+# channel on every step, and every checkpoint serialises it, yet the DM reads
+# the last `CONTEXT_WINDOW` (4) and the supervisor routes on `current_task`.
+# Twenty is five times what anything reads, so an agent that starts reading a
+# little more history still finds it live.
+DEFAULT_ARCHIVE_HORIZON = 20
+ENV_ARCHIVE_HORIZON = "DND_ARCHIVE_HORIZON"
+
+# Archive only once the channel is this far past the horizon, so the extra
+# checkpoint that moving messages costs is paid every ten turns, not every turn.
+DEFAULT_ARCHIVE_BATCH = 20
+ENV_ARCHIVE_BATCH = "DND_ARCHIVE_BATCH"
+
+# Recorded as this node's write, like the fast dice lane records its turns as
+# `dice_roller`'s. Neither has static edges, so nothing is left pending.
+ARCHIVE_AS_NODE = "supervisor"
+
+MESSAGE_ARCHIVE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS message_archive (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    position INTEGER NOT NULL,
+    message_id TEXT NOT NULL,
+    type TEXT,
+    message BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, position),
+    UNIQUE (thread_id, checkpoint_ns, message_id)
+);
+"""
+
+
+def resolve_archive_horizon(horizon: Optional[int] = None) -> int:
+    """Messages kept live; 0 turns archiving off."""
+    if horizon is not None:
+        return horizon
+    value = os.environ.get(ENV_ARCHIVE_HORIZON, "").strip()
+    return int(value) if value else DEFAULT_ARCHIVE_HORIZON
+
+
+def resolve_archive_batch(batch: Optional[int] = None) -> int:
+    if batch is not None:
+        return batch
+    value = os.environ.get(ENV_ARCHIVE_BATCH, "").strip()
+    return int(value) if value else DEFAULT_ARCHIVE_BATCH
+
+
+def _thread_key(config: RunnableConfig) -> Tuple[str, str]:
+    configurable = config["configurable"]
+    return str(configurable["thread_id"]), str(configurable.get("checkpoint_ns", ""))
+
+
+class MessageArchive:
+    """Cold storage for messages moved out of the live state.
+
+    Rows sit in the checkpoint database — in the thread's shard, when sharded —
+    serialised by the saver's own serializer. `position` is the message's index
+    in the full transcript, so the archive followed by the live channel is the
+    campaign from its first message.
+
+    Retention never touches this table: archived messages are no longer in any
+    new checkpoint, and the archive is where they now live.
+    """
+
+    def __init__(self, saver: BaseCheckpointSaver):
+        self.saver = saver
+        self._ready = set()
+
+    def _saver_for(self, config: RunnableConfig) -> BaseCheckpointSaver:
+        saver = self.saver.shard_for(config) if isinstance(self.saver, ShardedSaver) else self.saver
+        if id(saver) not in self._ready:
+            saver.setup()
+            with saver.cursor() as cur:
+                cur.executescript(MESSAGE_ARCHIVE_SCHEMA)
+            self._ready.add(id(saver))
+        return saver
+
+    def append(self, config: RunnableConfig, messages: Sequence[BaseMessage]) -> int:
+        """Store `messages` after those already archived. Returns how many were new.
+
+        Matched by id, so archiving the same messages again — after a crash
+        between this and the state update that removes them — stores nothing.
+        """
+        saver = self._saver_for(config)
+        key = _thread_key(config)
+        with saver.cursor() as cur:
+            cur.execute(
+                "SELECT COALESCE(MAX(position) + 1, 0) FROM message_archive "
+                "WHERE thread_id = ? AND checkpoint_ns = ?", key,
+            )
+            position = cur.fetchone()[0]
+            rows = []
+            for message in messages:
+                cur.execute(
+                    "SELECT 1 FROM message_archive WHERE thread_id = ? AND "
+                    "checkpoint_ns = ? AND message_id = ?", (*key, message.id),
+                )
+                if cur.fetchone():
+                    continue
+                rows.append((*key, position, message.id, *saver.serde.dumps_typed(message)))
+                position += 1
+            cur.executemany(
+                "INSERT INTO message_archive (thread_id, checkpoint_ns, position, "
+                "message_id, type, message) VALUES (?, ?, ?, ?, ?, ?)", rows,
+            )
+        return len(rows)
+
+    def count(self, config: RunnableConfig) -> int:
+        saver = self._saver_for(config)
+        with saver.cursor(transaction=False) as cur:
+            cur.execute(
+                "SELECT COUNT(*) FROM message_archive WHERE thread_id = ? AND "
+                "checkpoint_ns = ?", _thread_key(config),
+            )
+            return cur.fetchone()[0]
+
+    def fetch(self, config: RunnableConfig, start: int = 0,
+              stop: Optional[int] = None) -> List[BaseMessage]:
+        """Archived messages `[start, stop)` by transcript position, oldest first."""
+        saver = self._saver_for(config)
+        with saver.cursor(transaction=False) as cur:
+            cur.execute(
+                "SELECT type, message FROM message_archive WHERE thread_id = ? AND "
+                "checkpoint_ns = ? AND position >= ? AND position < ? ORDER BY position",
+                (*_thread_key(config), start, stop if stop is not None else 2 ** 63 - 1),
+            )
+            rows = cur.fetchall()
+        return [saver.serde.loads_typed((type_, blob)) for type_, blob in rows]
+
+    def transcript(self, config: RunnableConfig) -> List[BaseMessage]:
+        """Every message in the campaign: the archive, then the live channel.
+
+        For tools that need the whole story — an export, a recap. Turns never
+        need it and should not call it: it reads the entire archive.
+        """
+        found = self.saver.get_tuple(config)
+        live = list((found.checkpoint["channel_values"].get("messages") or [])
+                    if found else [])
+        archived = self.fetch(config)
+        archived_ids = {m.id for m in archived}
+        # A crash between archiving and the state update leaves the overlap in both.
+        return archived + [m for m in live if m.id not in archived_ids]
+
+    def delete_thread(self, thread_id: str) -> None:
+        saver = self._saver_for({"configurable": {"thread_id": thread_id}})
+        with saver.cursor() as cur:
+            cur.execute("DELETE FROM message_archive WHERE thread_id = ?", (str(thread_id),))
+
+
+def archive_cold_messages(game_graph, archive: MessageArchive, config: RunnableConfig,
+                          horizon: Optional[int] = None,
+                          batch: Optional[int] = None) -> int:
+    """Move all but the newest `horizon` messages from the live state to `archive`.
+
+    Run between turns. Does nothing until the channel holds `horizon + batch`
+    messages, or while a run on the thread is unfinished. A saver that can
+    count the channel from its message log is asked first, so a turn that
+    archives nothing loads no messages. The messages are
+    archived first and then removed with `RemoveMessage`, in one state update,
+    so a crash in between leaves them in both places, never in neither.
+    Returns how many were moved.
+    """
+    horizon = resolve_archive_horizon(horizon)
+    batch = resolve_archive_batch(batch)
+    if horizon <= 0:
+        return 0
+    count = getattr(game_graph.checkpointer, "count_messages", None)
+    if count is not None and count(config) < horizon + batch:
+        return 0
+    snapshot = game_graph.get_state(config)
+    messages = list(snapshot.values.get("messages") or [])
+    if snapshot.next or len(messages) < horizon + batch:
+        return 0
+
+    cold = messages[:-horizon]
+    archive.append(config, cold)
+    game_graph.update_state(
+        config, {"messages": [RemoveMessage(id=m.id) for m in cold]}, as_node=ARCHIVE_AS_NODE,
+    )
+    # The saver still holds the moved messages in its caches for reuse. They
+    # will not be written or read again, so let them go.
+    release = getattr(game_graph.checkpointer, "release_messages", None)
+    if release is not None:
+        release(config, [m.id for m in cold])
+    return len(cold)
+
@@ -0,0 +1,123 @@
+import os
+import threading
+import zlib
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+# Blobs shorter than this are stored as they are: deflate's header and
+# checksum take a dozen bytes, and there is little left to save. The smallest
+# message row, a one-line player message, is about 190 bytes, so every message
+# is compressed. Most pending writes — a routing value, a flag — are not.
+DEFAULT_COMPRESS_MIN_BYTES = 128
+ENV_COMPRESS_MIN_BYTES = "DND_CHECKPOINT_COMPRESS_MIN"
+
+# "0", "off", "false" or "no" writes plain blobs. Compressed ones still load.
+ENV_COMPRESS = "DND_CHECKPOINT_COMPRESS"
+
+# Marks a compressed blob in the `type` column: "msgpack+z1" is msgpack,
+# deflated against dictionary v1. A version names a dictionary and can never
+# change its bytes; a new dictionary is a new version, and the old file stays
+# so databases written with it still load.
+FORMAT_SEPARATOR = "+"
+CURRENT_VERSION = 1
+ZDICT_SIZE = 32 * 1024       # zlib's window; a longer dictionary is cut to its tail
+COMPRESSION_LEVEL = 6
+# Raw deflate: no zlib header or Adler-32 trailer. That is 6 bytes a row, and
+# a zlib stream only takes its dictionary after reading the header, which made
+# every read rebuild the window — 22 us a row against 3.5 us raw, and a resume
+# reads thousands. SQLite checks the pages; the checksum guarded nothing new.
+WBITS = -15
+
+
+def format_tag(version: int) -> str:
+    return f"z{version}"
+
+
+def zdict_path(version: int) -> Path:
+    return Path(__file__).with_name(f"checkpoint_zdict_v{version}.bin")
+
+
+@lru_cache(maxsize=None)
+def load_zdict(version: int) -> bytes:
+    """The preset dictionary for `version`, built by `scripts/train_zdict.py`."""
+    path = zdict_path(version)
+    if not path.exists():
+        raise ValueError(
+            f"checkpoint compressed with dictionary v{version}, which this build "
+            f"does not have ({path.name})"
+        )
+    return path.read_bytes()
+
+
+def resolve_compress(compress: Optional[bool] = None) -> bool:
+    if compress is not None:
+        return compress
+    return os.environ.get(ENV_COMPRESS, "").strip().lower() not in ("0", "off", "false", "no")
+
+
+def resolve_compress_min_bytes(min_bytes: Optional[int] = None) -> int:
+    if min_bytes is not None:
+        return min_bytes
+    value = os.environ.get(ENV_COMPRESS_MIN_BYTES, "").strip()
+    return int(value) if value else DEFAULT_COMPRESS_MIN_BYTES
+
+
+class CompressingSerializer(SerializerProtocol):
+    """Wraps a serializer and deflates what it writes, against a preset dictionary.
+
+    Message rows are a few hundred bytes each, written one at a time, so plain
+    zlib has nothing to find repeats in: a 400-byte narration row comes out at
+    300. A dictionary of the msgpack layout every message shares and of phrases
+    common in SRD text lets the first bytes of a row already refer back to
+    something. The same row comes out at 165, a one-line player message at 63
+    of 189, and held-out SRD entries stored as messages at 30% of their size
+    against 55% with plain zlib.
+
+    Reading is by tag, never by setting: blobs without a `+z<n>` suffix go to
+    the wrapped serializer as they are, so databases written before this load
+    unchanged. `compress=False` only stops writing compressed blobs; the ones
+    already written still load.
+    """
+
+    def __init__(self, inner: Optional[SerializerProtocol] = None, *,
+                 compress: Optional[bool] = None, min_bytes: Optional[int] = None,
+                 version: int = CURRENT_VERSION, level: int = COMPRESSION_LEVEL):
+        self.inner = inner or JsonPlusSerializer()
+        self.compress = resolve_compress(compress)
+        self.min_bytes = resolve_compress_min_bytes(min_bytes)
+        self.version = version
+        self.level = level
+        self._suffix = FORMAT_SEPARATOR + format_tag(version)
+        # Priming a compressor hashes the whole 32 KB dictionary: 90 us a row,
+        # against 35 us to copy one primed here once and compress with that.
+        self._primed = zlib.compressobj(level, zlib.DEFLATED, WBITS,
+                                        zdict=load_zdict(version))
+        self._lock = threading.Lock()
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        type_, data = self.inner.dumps_typed(obj)
+        if not self.compress or len(data) < self.min_bytes:
+            return type_, data
+        with self._lock:
+            compressor = self._primed.copy()
+        packed = compressor.compress(data) + compressor.flush()
+        if len(packed) >= len(data):
+            return type_, data
+        return type_ + self._suffix, packed
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        type_, blob = data
+        inner_type, sep, tag = type_.rpartition(FORMAT_SEPARATOR)
+        if not sep:
+            return self.inner.loads_typed(data)
+        if not (tag.startswith("z") and tag[1:].isdigit()):
+            raise ValueError(f"unknown checkpoint compression format {tag!r} in {type_!r}")
+        decompressor = zlib.decompressobj(WBITS, zdict=load_zdict(int(tag[1:])))
+        return self.inner.loads_typed(
+            (inner_type, decompressor.decompress(blob) + decompressor.flush())
+        )
+
@@ -1,29 +1,92 @@
-import sqlite3
-from typing import Optional
+import inspect
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, get_args, get_type_hints
 
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.graph import StateGraph
 
-from src.agents.dice_roller import DiceRollerAgent
+from src.agents.base_agent import BaseAgent
+from src.agents.dice_roller import DiceParseError, DiceRollerAgent
 from src.agents.dungeon_master import DungeonMaster
 from src.agents.researcher import ResearcherAgent
-from src.agents.supervisor import GameSupervisor
+from src.agents.supervisor import GameSupervisor, prefilter_route, split_intents
 from src.graph.game_state import GameState
+from src.graph.sqlite_connection import (
+    ReaderPool,
+    connect_sqlite,
+    resolve_pragmas,
+    resolve_readers,
+)
 
 DEFAULT_CHECKPOINT_DB = "game_state.db"
 
+# Nodes whose output is prose the player reads, so it is worth showing token by
+# token. At 4.4 tok/s a finished narration is ~25 s away; the first token is ~3.5 s
+# away. Everything else in the graph — routing decisions, the dice parse — emits
+# tokens too, and none of it is for the player.
+STREAMING_NODES = {"dungeon_master", "researcher"}
 
-def create_sqlite_checkpointer(db_path: str = DEFAULT_CHECKPOINT_DB) -> BaseCheckpointSaver:
+# A node can make more than one LLM call — the DM narrates, then extracts world
+# state into JSON. Both carry the same node name, so the second is tagged.
+INTERNAL_TAG = "internal"
+
+
+def create_sqlite_checkpointer(db_path: str = DEFAULT_CHECKPOINT_DB,
+                               pragmas: Optional[Dict[str, str]] = None,
+                               readers: Optional[int] = None,
+                               compress: Optional[bool] = None,
+                               shards: Optional[int] = None) -> BaseCheckpointSaver:
     """Opens a SQLite-backed checkpointer for persistent campaign state.
 
     The connection deliberately outlives this call — the graph holds it for the
     life of the process. ``SqliteSaver.from_conn_string`` is a context manager
     and would close the connection on exit, which does not suit a REPL.
+
+    The saver keeps the message history append-only in a side table rather
+    than in every checkpoint; see ``MessageLogSaver``. It reads databases
+    written by the stock ``SqliteSaver`` as they are.
+
+    Connections are tuned by ``pragmas`` over ``DEFAULT_SQLITE_PRAGMAS`` (WAL,
+    ``synchronous=NORMAL``, a 64 MB cache, 256 MB mmap), and reads go through a
+    pool of ``readers`` connections (``DND_SQLITE_READERS``, default 4; 0 for
+    none). An in-memory database gets no pool: each connection would be a
+    separate, empty database.
+
+    Blobs of 128 bytes and up are deflated against a dictionary trained on
+    game text (``CompressingSerializer``); ``compress=False`` or
+    ``DND_CHECKPOINT_COMPRESS=0`` writes them plain. Either way, both kinds load.
+
+    With ``shards`` (``DND_CHECKPOINT_SHARDS``) above 1, campaigns are spread
+    by thread id over that many files in ``<stem>-shards/``, each with its own
+    connection, lock and reader pool; see ``ShardedSaver``. ``db_path`` itself
+    is then not opened.
     """
-    from langgraph.checkpoint.sqlite import SqliteSaver
+    from src.graph.sharding import ShardedSaver, check_layout, resolve_shards, shard_paths
 
-    conn = sqlite3.connect(db_path, check_same_thread=False)
-    return SqliteSaver(conn)
+    pragmas = resolve_pragmas(pragmas)
+    readers = resolve_readers(readers)
+    shards = resolve_shards(shards)
+    if db_path == ":memory:":
+        return _open_message_log(db_path, pragmas, readers, compress)
+    check_layout(db_path, shards)
+    if shards == 1:
+        return _open_message_log(db_path, pragmas, readers, compress)
+    paths = shard_paths(db_path, shards)
+    Path(paths[0]).parent.mkdir(parents=True, exist_ok=True)
+    return ShardedSaver([_open_message_log(p, pragmas, readers, compress) for p in paths])
+
+
+def _open_message_log(db_path: str, pragmas: Dict[str, str], readers: int,
+                      compress: Optional[bool]) -> BaseCheckpointSaver:
+    from src.graph.compressed_serde import CompressingSerializer
+    from src.graph.message_log import MessageLogSaver
+
+    conn = connect_sqlite(db_path, pragmas)
+    pool = ReaderPool(db_path, readers, pragmas) if readers and db_path != ":memory:" else None
+    return MessageLogSaver(conn, readers=pool, serde=CompressingSerializer(compress=compress))
 
 
 def create_game_graph(checkpointer: Optional[BaseCheckpointSaver] = None):
@@ -44,11 +107,169 @@ def create_game_graph(checkpointer: Optional[BaseCheckpointSaver] = None):
 
     workflow = StateGraph(GameState)
 
-    workflow.add_node("supervisor", supervisor.process_task)
-    workflow.add_node("dungeon_master", dungeon_master.process_task)
-    workflow.add_node("researcher", researcher.process_task)
-    workflow.add_node("dice_roller", dice_roller.process_task)
+    _add_agent(workflow, "supervisor", supervisor)
+    _add_agent(workflow, "dungeon_master", dungeon_master)
+    _add_agent(workflow, "researcher", researcher)
+    _add_agent(workflow, "dice_roller", dice_roller)
 
     workflow.set_entry_point("supervisor")
 
     return workflow.compile(checkpointer=checkpointer)
+
+
+def _add_agent(workflow: StateGraph, name: str, agent: BaseAgent) -> None:
+    """Adds `agent` as a node that runs `process_task` under `stream` and
+    `aprocess_task` under `astream`.
+
+    Given a plain method, LangGraph runs it on a thread under `astream` too,
+    which is the thread per turn the async path exists to avoid. Wrapped, the
+    annotation is no longer read, so the destinations are taken from it here.
+    """
+    returns = get_type_hints(agent.process_task)["return"]
+    workflow.add_node(
+        name,
+        RunnableLambda(agent.process_task, afunc=agent.aprocess_task, name=name),
+        destinations=get_args(get_args(returns)[0]),
+    )
+
+
+def run_fast_dice_turn(game_graph, dice_roller: DiceRollerAgent,
+                       turn: Dict[str, Any], config: RunnableConfig) -> Optional[AIMessage]:
+    """Answers a written-out dice roll without running the graph.
+
+    A turn the rule table routes to `dice_roller` needs no model at either
+    node, yet a graph run still paid for two node steps, a checkpoint per step,
+    and `main.py` reading the state back twice to find the new messages. Here
+    the roll is made directly and the turn lands in the thread as one
+    `update_state`. That call is recorded `as_node="dice_roller"`, so the
+    checkpoint looks the same as one left by a graph run, and the next turn
+    starts from the supervisor as usual.
+
+    Returns the dice result message, or None if the turn is not for this lane.
+    "roll for initiative" routes to `dice_roller` too, but its dice come from
+    the model. "I swing at the goblin — roll 1d20+5" routes there as well, and
+    the supervisor splits it so the swing is narrated; only a bare roll is
+    answered here. None means the caller should run the graph.
+    """
+    update = _fast_dice_update(dice_roller, turn)
+    if update is None:
+        return None
+    game_graph.update_state(config, update, as_node="dice_roller")
+    return update["messages"][-1]
+
+
+async def arun_fast_dice_turn(game_graph, dice_roller: DiceRollerAgent,
+                              turn: Dict[str, Any], config: RunnableConfig) -> Optional[AIMessage]:
+    """`run_fast_dice_turn` for the async path."""
+    update = _fast_dice_update(dice_roller, turn)
+    if update is None:
+        return None
+    await game_graph.aupdate_state(config, update, as_node="dice_roller")
+    return update["messages"][-1]
+
+
+def _fast_dice_update(dice_roller: DiceRollerAgent,
+                      turn: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """The whole turn's state update, with the roll appended, or None."""
+    request = turn.get("current_task") or ""
+    if prefilter_route(request) != "dice_roller" or split_intents(request) is not None:
+        return None
+    try:
+        update = dice_roller.roll_outside_graph(request)
+    except DiceParseError:
+        return None
+    return {**turn, **update, "messages": [*turn.get("messages", []), *update["messages"]]}
+
+
+@dataclass
+class TurnResult:
+    """What one turn added to the thread.
+
+    `messages` holds the nodes' messages in the order they were written. The
+    player's own message is not included. `streamed` maps a node name to the
+    text already passed to `on_token`, so a caller that printed it live can skip
+    reprinting it.
+    """
+    messages: List[BaseMessage] = field(default_factory=list)
+    streamed: Dict[str, str] = field(default_factory=dict)
+
+
+def run_turn(game_graph, turn: Dict[str, Any], config: RunnableConfig,
+             on_token: Optional[Callable[[str, str], None]] = None) -> TurnResult:
+    """Runs one turn and returns exactly the messages it appended.
+
+    `main.py` used to read the whole state before and after each turn and diff
+    the message counts. Each `get_state` deserialises the full history from
+    the checkpoint, so a 10,000-message campaign paid for that twice per turn
+    just to find one or two new messages. The `updates` stream already carries
+    each node's writes as they happen, so this reads them from there.
+
+    `on_token(node, text)` receives narration tokens from `STREAMING_NODES` as
+    they are produced. Tokens from calls tagged `INTERNAL_TAG` are left out.
+    """
+    result = TurnResult()
+
+    for mode, chunk in game_graph.stream(
+        turn, config=config, stream_mode=["messages", "updates"]
+    ):
+        token = _read_chunk(result, mode, chunk)
+        if token is not None and on_token is not None:
+            on_token(*token)
+
+    return result
+
+
+async def arun_turn(game_graph, turn: Dict[str, Any], config: RunnableConfig,
+                    on_token: Optional[Callable[[str, str], Any]] = None) -> TurnResult:
+    """`run_turn` on `astream`: the agents' `aprocess_task`, no thread held.
+
+    A turn in flight is a coroutine waiting on the model, so one event loop
+    serves as many concurrent turns as the daemon does. `on_token` may be a
+    coroutine function; the stream is not read further until it returns, so a
+    consumer that awaits a slow client holds the turn back with it.
+    """
+    result = TurnResult()
+
+    async for mode, chunk in game_graph.astream(
+        turn, config=config, stream_mode=["messages", "updates"]
+    ):
+        token = _read_chunk(result, mode, chunk)
+        if token is not None and on_token is not None:
+            sent = on_token(*token)
+            if inspect.isawaitable(sent):
+                await sent
+
+    return result
+
+
+def _read_chunk(result: TurnResult, mode: str, chunk: Any) -> Optional[Tuple[str, str]]:
+    """Folds one stream item into `result`. Returns `(node, text)` to show, if any."""
+    if mode == "updates":
+        for update in chunk.values():
+            if not isinstance(update, dict):
+                continue
+            written = update.get("messages") or []
+            if isinstance(written, BaseMessage):
+                written = [written]
+            result.messages.extend(written)
+        return None
+
+    message, metadata = chunk
+    # Two kinds of thing arrive here: AIMessageChunk for each token, and the
+    # finished AIMessage the node writes to state. The finished one comes
+    # through `updates` as well.
+    if not isinstance(message, AIMessageChunk):
+        return None
+
+    node = metadata.get("langgraph_node")
+    if node not in STREAMING_NODES:
+        return None
+    if INTERNAL_TAG in (metadata.get("tags") or ()):
+        return None
+
+    text = getattr(message, "content", "")
+    if not text:
+        return None
+
+    result.streamed[node] = result.streamed.get(node, "") + text
+    return node, text
@@ -1,4 +1,4 @@
-from typing import Annotated, Any, Dict, List, Sequence, TypedDict
+from typing import Annotated, Any, Dict, List, Optional, Sequence, TypedDict
 
 from langchain_core.messages import BaseMessage
 from langgraph.graph.message import add_messages
@@ -26,6 +26,10 @@ class GameState(TypedDict):
 
     messages: Annotated[Sequence[BaseMessage], add_messages]
     current_task: str
+    # The roll made when the supervisor split a turn, carried in both `Send`
+    # payloads so the dice result and the narration agree on one number.
+    # No node writes it back; it is None outside a split turn.
+    turn_roll: Optional[Dict[str, Any]]
     active_agent: str
     game_state: Dict[str, Any]
     players: Dict[str, Player]
@@ -46,6 +50,7 @@ def create_default_game_state() -> GameState:
     return GameState(
         messages=[],
         current_task="",
+        turn_roll=None,
         active_agent="supervisor",
         game_state={},
         players={},
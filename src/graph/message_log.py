@@ -0,0 +1,446 @@
+import operator
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import Checkpoint, CheckpointMetadata, CheckpointTuple
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+from src.graph.compressed_serde import CompressingSerializer
+from src.graph.sqlite_connection import ReaderPool
+from src.utils.offload import BoundedExecutor
+
+# The channel stored out of line. It is the only one that grows: every other
+# field in GameState is replaced on write and stays a few hundred bytes.
+MESSAGES_CHANNEL = "messages"
+
+# What a checkpoint holds in place of its message list: half-open `[start, stop)`
+# ranges of `seq` in `message_log`, in order. A turn that only appends extends
+# the last range, so the stored checkpoint stays the same size however long the
+# campaign runs. A replaced or removed message splits a range.
+MESSAGE_LOG_KEY = "__message_log__"
+
+MESSAGE_LOG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS message_log (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    seq INTEGER NOT NULL,
+    message_id TEXT,
+    type TEXT,
+    message BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, seq)
+);
+"""
+
+Ranges = List[List[int]]
+
+# Threads the async methods run the SQLite calls on. Writes queue on the
+# connection lock whatever this is; reads go to the reader pool, so this
+# matches `DEFAULT_READERS`. A step's checkpoint costs ~1 ms here, which on the
+# event loop would be ~1 ms of every other session's stream standing still.
+CHECKPOINT_EXECUTOR = BoundedExecutor("checkpoint", 4, "DND_CHECKPOINT_WORKERS")
+
+# Threads whose messages are kept in memory, most recently used. A server
+# process sees every campaign it serves, and without a bound it held every
+# message of each one until the process exited. A thread dropped from the cache
+# costs its next turn one read of its history. Keep this above the number
+# of turns in flight: a thread evicted between its read and its write has the
+# new checkpoint's messages written again rather than reused.
+DEFAULT_CACHED_THREADS = 64
+
+
+def is_message_log_ref(value: Any) -> bool:
+    return isinstance(value, dict) and MESSAGE_LOG_KEY in value
+
+
+def ranges_of(seqs: Sequence[int], ranges: Optional[Ranges] = None) -> Ranges:
+    """Compress `[4, 5, 6, 9, 10]` into `[[4, 7], [9, 11]]`.
+
+    Given `ranges`, the seqs are appended to a copy of them instead.
+    """
+    ranges = [list(r) for r in ranges or ()]
+    for seq in seqs:
+        if ranges and ranges[-1][1] == seq:
+            ranges[-1][1] = seq + 1
+        else:
+            ranges.append([seq, seq + 1])
+    return ranges
+
+
+def seqs_of(ranges: Ranges) -> List[int]:
+    return [seq for start, stop in ranges for seq in range(start, stop)]
+
+
+class MessageLogSaver(SqliteSaver):
+    """A `SqliteSaver` that stores the message history append-only.
+
+    The stock saver serialises the whole checkpoint on every step, and
+    `messages` is an `add_messages` channel that only grows. A 1,000-turn
+    campaign therefore stored its first message ~3,000 times, once per
+    checkpoint, and the database grew with the square of the campaign length.
+    Here each message is written once, to `message_log`. The checkpoint keeps
+    only the ranges of that table it covers (`MESSAGE_LOG_KEY`).
+
+    Reads put the list back, so the graph and `get_state` see a normal
+    checkpoint. Messages already loaded or written by this process are reused
+    rather than deserialised again. They are matched by object identity, which
+    holds because the graph carries the same message objects from one step to
+    the next.
+
+    Checkpoints written by the stock saver still hold a plain list and are read
+    as they are. `migrate()` rewrites them into the side table.
+
+    The side-table rows are committed before the checkpoint that points at
+    them. A crash in between leaves unreferenced rows, never a checkpoint with
+    missing messages.
+
+    Without a `serde`, blobs are compressed by `CompressingSerializer`, which
+    reads plain ones too — so every tool opening the database with this class
+    can read what the game wrote, whatever `DND_CHECKPOINT_COMPRESS` says.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, *, readers: Optional[ReaderPool] = None,
+                 serde=None, cached_threads: int = DEFAULT_CACHED_THREADS, **kwargs):
+        super().__init__(conn, serde=serde or CompressingSerializer(), **kwargs)
+        # Reads go through the pool when there is one, so they do not queue
+        # behind writes on `conn`. See `cursor`.
+        self.readers = readers
+        self._log_lock = threading.Lock()
+        # (thread_id, checkpoint_ns) -> message id -> (message, seq)
+        self._logged: Dict[Tuple[str, str], Dict[str, Tuple[BaseMessage, int]]] = {}
+        # (thread_id, checkpoint_ns) -> seq -> message
+        self._loaded: Dict[Tuple[str, str], Dict[int, BaseMessage]] = {}
+        self._next_seq: Dict[Tuple[str, str], int] = {}
+        # (thread_id, checkpoint_ns) -> the last list written, its seqs and ranges
+        self._last_put: Dict[Tuple[str, str], Tuple[List[BaseMessage], List[int], Ranges]] = {}
+        # Threads with anything in the caches above, least recently used first.
+        self._recent: "OrderedDict[Tuple[str, str], None]" = OrderedDict()
+        self.cached_threads = cached_threads
+
+    def setup(self) -> None:
+        if self.is_setup:
+            return
+        super().setup()
+        self.conn.executescript(MESSAGE_LOG_SCHEMA)
+
+    @contextmanager
+    def cursor(self, transaction: bool = True) -> Iterator[sqlite3.Cursor]:
+        """The parent's locked writer cursor, or a pooled reader for reads.
+
+        Every read in `SqliteSaver` and here asks for `transaction=False`, and
+        every write commits before its lock is released. A reader on its own
+        connection therefore never sees a half-written step.
+        """
+        if transaction or self.readers is None:
+            with super().cursor(transaction) as cur:
+                yield cur
+            return
+        if not self.is_setup:
+            with self.lock:
+                self.setup()
+        with self.readers.cursor() as cur:
+            yield cur
+
+    # --- writing ------------------------------------------------------------
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions,
+    ) -> RunnableConfig:
+        messages = checkpoint.get("channel_values", {}).get(MESSAGES_CHANNEL)
+        if isinstance(messages, list):
+            key = _thread_key(config)
+            ranges = self._append(key, messages)
+            # A shallow copy: the checkpoint passed in is the graph's own.
+            checkpoint = {
+                **checkpoint,
+                "channel_values": {
+                    **checkpoint["channel_values"],
+                    MESSAGES_CHANNEL: {MESSAGE_LOG_KEY: ranges},
+                },
+            }
+        return super().put(config, checkpoint, metadata, new_versions)
+
+    def _append(self, key: Tuple[str, str], messages: List[BaseMessage]) -> Ranges:
+        """Write whatever in `messages` is not in the log yet. Returns its ranges."""
+        with self._log_lock:
+            self._touch(key)
+            logged = self._logged.setdefault(key, {})
+            seqs, rows = [], []
+            next_seq = self._next_seq_for(key)
+
+            # Most puts extend the previous one by a message or two. Checking
+            # the shared prefix by identity runs in C; walking it in Python
+            # was ~5 ms per put at 10,000 turns.
+            previous, previous_seqs, previous_ranges = self._last_put.get(key, ((), [], []))
+            shared = len(previous) if (
+                len(previous) <= len(messages)
+                and all(map(operator.is_, previous, messages))
+            ) else 0
+            seqs.extend(previous_seqs[:shared])
+
+            for message in messages[shared:]:
+                message_id = getattr(message, "id", None)
+                known = logged.get(message_id) if message_id else None
+                if known is not None and known[0] is message:
+                    seqs.append(known[1])
+                    continue
+                seq = next_seq
+                next_seq += 1
+                rows.append((*key, seq, message_id, *self.serde.dumps_typed(message)))
+                if message_id:
+                    logged[message_id] = (message, seq)
+                self._loaded.setdefault(key, {})[seq] = message
+                seqs.append(seq)
+
+            if rows:
+                with self.cursor() as cur:
+                    cur.executemany(
+                        "INSERT INTO message_log (thread_id, checkpoint_ns, seq, "
+                        "message_id, type, message) VALUES (?, ?, ?, ?, ?, ?)",
+                        rows,
+                    )
+            self._next_seq[key] = next_seq
+            if shared and shared == len(previous):
+                ranges = ranges_of(seqs[shared:], previous_ranges)
+            else:
+                ranges = ranges_of(seqs)
+            self._last_put[key] = (list(messages), seqs, ranges)
+            return ranges
+
+    def _next_seq_for(self, key: Tuple[str, str]) -> int:
+        if key not in self._next_seq:
+            with self.cursor(transaction=False) as cur:
+                cur.execute(
+                    "SELECT COALESCE(MAX(seq) + 1, 0) FROM message_log "
+                    "WHERE thread_id = ? AND checkpoint_ns = ?",
+                    key,
+                )
+                self._next_seq[key] = cur.fetchone()[0]
+        return self._next_seq[key]
+
+    # --- reading ------------------------------------------------------------
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        found = super().get_tuple(config)
+        if found is not None:
+            self._rehydrate(found)
+        return found
+
+    def list(self, config, **kwargs) -> Iterator[CheckpointTuple]:
+        # Drained first: the parent holds the connection lock while it yields,
+        # and rehydrating needs the connection.
+        for found in [*super().list(config, **kwargs)]:
+            self._rehydrate(found)
+            yield found
+
+    def get_messages(self, config: RunnableConfig, start: int = 0,
+                     stop: Optional[int] = None) -> List[BaseMessage]:
+        """`messages[start:stop]` of a checkpoint, reading only those rows.
+
+        For callers that want the tail of a long campaign without paying for
+        the whole history. Negative indices count from the end, as in a slice.
+        """
+        found = super().get_tuple(config)
+        if found is None:
+            return []
+        value = found.checkpoint.get("channel_values", {}).get(MESSAGES_CHANNEL)
+        if not is_message_log_ref(value):
+            return list(value or [])[start:stop]
+        wanted = seqs_of(value[MESSAGE_LOG_KEY])[start:stop]
+        return self._load(_thread_key(found.config), wanted)
+
+    def count_messages(self, config: RunnableConfig) -> int:
+        """How many messages a checkpoint holds, from its ranges alone.
+
+        Reads the checkpoint row but none of the messages, so a caller deciding
+        whether the history has grown far enough can ask every turn.
+        """
+        found = super().get_tuple(config)
+        if found is None:
+            return 0
+        value = found.checkpoint.get("channel_values", {}).get(MESSAGES_CHANNEL)
+        if not is_message_log_ref(value):
+            return len(value or [])
+        return sum(stop - start for start, stop in value[MESSAGE_LOG_KEY])
+
+    def _rehydrate(self, found: CheckpointTuple) -> None:
+        values = found.checkpoint.get("channel_values", {})
+        value = values.get(MESSAGES_CHANNEL)
+        if is_message_log_ref(value):
+            key = _thread_key(found.config)
+            values[MESSAGES_CHANNEL] = self._load(key, seqs_of(value[MESSAGE_LOG_KEY]))
+
+    def _load(self, key: Tuple[str, str], seqs: List[int]) -> List[BaseMessage]:
+        with self._log_lock:
+            self._touch(key)
+            loaded = self._loaded.setdefault(key, {})
+            missing = [seq for seq in seqs if seq not in loaded]
+            if missing:
+                for start, stop in ranges_of(sorted(missing)):
+                    with self.cursor(transaction=False) as cur:
+                        cur.execute(
+                            "SELECT seq, type, message FROM message_log WHERE "
+                            "thread_id = ? AND checkpoint_ns = ? AND seq >= ? AND seq < ?",
+                            (*key, start, stop),
+                        )
+                        for seq, type_, blob in cur.fetchall():
+                            loaded[seq] = self.serde.loads_typed((type_, blob))
+
+            messages = [loaded[seq] for seq in seqs]
+            # Let the next `put` recognise these objects instead of writing
+            # them again.
+            logged = self._logged.setdefault(key, {})
+            for seq, message in zip(seqs, messages):
+                message_id = getattr(message, "id", None)
+                if message_id:
+                    logged[message_id] = (message, seq)
+            return messages
+
+    # --- housekeeping -------------------------------------------------------
+
+    def _touch(self, key: Tuple[str, str]) -> None:
+        """Mark `key` used, and drop the caches of the least recently used
+        threads beyond `cached_threads`. Called under `_log_lock`."""
+        self._recent[key] = None
+        self._recent.move_to_end(key)
+        while len(self._recent) > self.cached_threads:
+            evicted, _ = self._recent.popitem(last=False)
+            for cache in (self._logged, self._loaded, self._next_seq, self._last_put):
+                cache.pop(evicted, None)
+
+    def forget_messages(self, key: Tuple[str, str], ranges: Ranges) -> None:
+        """Drop cached copies of rows that were deleted from `message_log`."""
+        with self._log_lock:
+            loaded = self._loaded.get(key, {})
+            logged = self._logged.get(key, {})
+            for seq in seqs_of(ranges):
+                message = loaded.pop(seq, None)
+                message_id = getattr(message, "id", None)
+                if message_id and logged.get(message_id, (None, None))[1] == seq:
+                    del logged[message_id]
+
+    def release_messages(self, config: RunnableConfig, message_ids: Sequence[str]) -> None:
+        """Drop cached copies of messages the live state no longer holds.
+
+        The rows stay: older checkpoints still refer to them until pruned. Used
+        after archiving, so a long campaign's process does not keep every
+        message it ever saw in memory.
+        """
+        key = _thread_key(config)
+        with self._log_lock:
+            logged = self._logged.get(key, {})
+            loaded = self._loaded.get(key, {})
+            for message_id in message_ids:
+                _, seq = logged.pop(message_id, (None, None))
+                loaded.pop(seq, None)
+
+    def delete_thread(self, thread_id: str) -> None:
+        super().delete_thread(thread_id)
+        with self.cursor() as cur:
+            cur.execute("DELETE FROM message_log WHERE thread_id = ?", (str(thread_id),))
+        with self._log_lock:
+            for cache in (self._logged, self._loaded, self._next_seq, self._last_put,
+                          self._recent):
+                for key in [k for k in cache if k[0] == str(thread_id)]:
+                    del cache[key]
+
+    # --- async ------------------------------------------------------------
+    #
+    # The stock saver raises on every async method and points at
+    # `AsyncSqliteSaver`, which would mean a second implementation of all of
+    # the above on aiosqlite. These run the sync methods on
+    # `CHECKPOINT_EXECUTOR` instead: same locks, same caches, same file.
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await CHECKPOINT_EXECUTOR.run(self.get_tuple, config)
+
+    async def alist(self, config, **kwargs) -> AsyncIterator[CheckpointTuple]:
+        for found in await CHECKPOINT_EXECUTOR.run(lambda: [*self.list(config, **kwargs)]):
+            yield found
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint,
+                   metadata: CheckpointMetadata, new_versions) -> RunnableConfig:
+        return await CHECKPOINT_EXECUTOR.run(self.put, config, checkpoint, metadata,
+                                             new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]],
+                          task_id: str, task_path: str = "") -> None:
+        await CHECKPOINT_EXECUTOR.run(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await CHECKPOINT_EXECUTOR.run(self.delete_thread, thread_id)
+
+    def migrate(self) -> int:
+        """Move the message lists of stock-saver checkpoints into the side table.
+
+        Checkpoints are rewritten oldest first, per thread. A message is
+        written once and shared across checkpoints when its id and serialised
+        form match what is already logged, so the long-duplicated history
+        collapses to one copy. Returns how many checkpoints were rewritten.
+        Run `VACUUM` afterwards to give the space back to the filesystem.
+        """
+        self.setup()
+        with self.cursor(transaction=False) as cur:
+            cur.execute(
+                "SELECT thread_id, checkpoint_ns, checkpoint_id, type, checkpoint "
+                "FROM checkpoints ORDER BY thread_id, checkpoint_ns, checkpoint_id"
+            )
+            rows = cur.fetchall()
+
+        rewritten = 0
+        # (thread_id, checkpoint_ns) -> message id -> [(serialised, seq)]
+        seen: Dict[Tuple[str, str], Dict[str, List[Tuple[Tuple[str, bytes], int]]]] = {}
+        for thread_id, checkpoint_ns, checkpoint_id, type_, blob in rows:
+            checkpoint = self.serde.loads_typed((type_, blob))
+            messages = checkpoint.get("channel_values", {}).get(MESSAGES_CHANNEL)
+            if not isinstance(messages, list):
+                continue
+
+            key = (thread_id, checkpoint_ns)
+            by_id = seen.setdefault(key, {})
+            next_seq = self._next_seq_for(key)
+            seqs, new_rows = [], []
+            for message in messages:
+                serialised = self.serde.dumps_typed(message)
+                message_id = getattr(message, "id", None)
+                match = next(
+                    (seq for data, seq in by_id.get(message_id, ()) if data == serialised),
+                    None,
+                ) if message_id else None
+                if match is None:
+                    match = next_seq
+                    next_seq += 1
+                    new_rows.append((*key, match, message_id, *serialised))
+                    if message_id:
+                        by_id.setdefault(message_id, []).append((serialised, match))
+                seqs.append(match)
+
+            checkpoint["channel_values"][MESSAGES_CHANNEL] = {MESSAGE_LOG_KEY: ranges_of(seqs)}
+            with self.cursor() as cur:
+                cur.executemany(
+                    "INSERT INTO message_log (thread_id, checkpoint_ns, seq, "
+                    "message_id, type, message) VALUES (?, ?, ?, ?, ?, ?)",
+                    new_rows,
+                )
+                cur.execute(
+                    "UPDATE checkpoints SET type = ?, checkpoint = ? WHERE "
+                    "thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (*self.serde.dumps_typed(checkpoint), thread_id, checkpoint_ns,
+                     checkpoint_id),
+                )
+            self._next_seq[key] = next_seq
+            rewritten += 1
+        return rewritten
+
+
+def _thread_key(config: RunnableConfig) -> Tuple[str, str]:
+    configurable = config["configurable"]
+    return str(configurable["thread_id"]), str(configurable.get("checkpoint_ns", ""))
@@ -0,0 +1,316 @@
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import List, Optional, Set, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+from src.graph.message_log import (
+    MESSAGE_LOG_KEY,
+    MESSAGES_CHANNEL,
+    MessageLogSaver,
+    Ranges,
+    is_message_log_ref,
+    ranges_of,
+)
+from src.graph.sharding import ShardedSaver, savers_of
+
+# Checkpoints kept per thread, newest first. A turn writes three or four (input,
+# supervisor, worker, and a fan-out's second worker), so ten is the last few
+# turns — enough to inspect or fork from a recent step. Everything older is
+# history nobody reads back, and every row of it is paid for in file size.
+DEFAULT_KEEP_LAST = 10
+ENV_KEEP_LAST = "DND_CHECKPOINT_KEEP"
+
+# Seconds between background compactions. Zero turns it off.
+DEFAULT_COMPACT_INTERVAL = 300.0
+ENV_COMPACT_INTERVAL = "DND_COMPACT_INTERVAL"
+
+# A checkpoint whose metadata carries this key survives pruning, whatever its age.
+MILESTONE_KEY = "milestone"
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    """What pruning keeps: the newest `keep_last` checkpoints, plus milestones."""
+    keep_last: int = DEFAULT_KEEP_LAST
+
+    def __post_init__(self):
+        # The newest checkpoint is the campaign. Pruning it would lose the
+        # thread, and the message log relies on it to know what is still live.
+        if self.keep_last < 1:
+            raise ValueError(f"keep_last must be at least 1, got {self.keep_last}")
+
+    @classmethod
+    def from_env(cls) -> "RetentionPolicy":
+        value = os.environ.get(ENV_KEEP_LAST, "").strip()
+        return cls(keep_last=int(value)) if value else cls()
+
+
+@dataclass
+class PruneResult:
+    checkpoints: int = 0
+    writes: int = 0
+    messages: int = 0
+
+    def __iadd__(self, other: "PruneResult") -> "PruneResult":
+        self.checkpoints += other.checkpoints
+        self.writes += other.writes
+        self.messages += other.messages
+        return self
+
+
+@dataclass
+class ThreadStorage:
+    """Bytes held by one thread, by table."""
+    thread_id: str
+    checkpoint_ns: str
+    checkpoints: int = 0
+    milestones: List[str] = field(default_factory=list)
+    checkpoint_bytes: int = 0
+    write_bytes: int = 0
+    message_rows: int = 0
+    message_bytes: int = 0
+
+    @property
+    def total_bytes(self) -> int:
+        return self.checkpoint_bytes + self.write_bytes + self.message_bytes
+
+
+def tag_milestone(saver: SqliteSaver, config: RunnableConfig, name: str) -> RunnableConfig:
+    """Mark a checkpoint to be kept by every prune.
+
+    Without a `checkpoint_id` in `config`, the thread's latest checkpoint is
+    tagged. Returns the config of the tagged checkpoint.
+    """
+    if isinstance(saver, ShardedSaver):
+        saver = saver.shard_for(config)
+    found = saver.get_tuple(config)
+    if found is None:
+        raise ValueError(f"no checkpoint for {config['configurable']}")
+    configurable = found.config["configurable"]
+    metadata = {**(found.metadata or {}), MILESTONE_KEY: name}
+    with saver.cursor() as cur:
+        cur.execute(
+            "UPDATE checkpoints SET metadata = ? WHERE thread_id = ? AND "
+            "checkpoint_ns = ? AND checkpoint_id = ?",
+            (json.dumps(metadata, ensure_ascii=False).encode("utf-8"),
+             configurable["thread_id"], configurable.get("checkpoint_ns", ""),
+             configurable["checkpoint_id"]),
+        )
+    return found.config
+
+
+def _milestone_of(metadata) -> Optional[str]:
+    if metadata is None:
+        return None
+    try:
+        return json.loads(metadata).get(MILESTONE_KEY)
+    except (ValueError, AttributeError):
+        return None
+
+
+def threads(saver: SqliteSaver) -> List[Tuple[str, str]]:
+    with saver.cursor(transaction=False) as cur:
+        cur.execute("SELECT DISTINCT thread_id, checkpoint_ns FROM checkpoints")
+        return cur.fetchall()
+
+
+def prune_thread(saver: SqliteSaver, thread_id: str, checkpoint_ns: str = "",
+                 policy: Optional[RetentionPolicy] = None,
+                 dry_run: bool = False) -> PruneResult:
+    """Drop one thread's checkpoints outside the policy, and what only they used.
+
+    That is their pending writes and, under `MessageLogSaver`, message rows no
+    kept checkpoint refers to — an edited message's old version, say. One
+    transaction, so a turn running alongside waits a few milliseconds at most.
+    """
+    policy = policy or RetentionPolicy.from_env()
+    result = PruneResult()
+    # The writer's cursor even for a dry run: the scratch table of pruned ids
+    # cannot be created on a read-only pooled connection.
+    with saver.cursor() as cur:
+        cur.execute(
+            "SELECT checkpoint_id, metadata FROM checkpoints WHERE thread_id = ? "
+            "AND checkpoint_ns = ? ORDER BY checkpoint_id DESC",
+            (thread_id, checkpoint_ns),
+        )
+        rows = cur.fetchall()
+        dropped = [
+            (checkpoint_id,) for i, (checkpoint_id, metadata) in enumerate(rows)
+            if i >= policy.keep_last and _milestone_of(metadata) is None
+        ]
+        if not dropped:
+            return result
+
+        key = (thread_id, checkpoint_ns)
+        result.checkpoints = len(dropped)
+        cur.execute("CREATE TEMP TABLE IF NOT EXISTS pruned (checkpoint_id TEXT PRIMARY KEY)")
+        cur.execute("DELETE FROM pruned")
+        cur.executemany("INSERT INTO pruned VALUES (?)", dropped)
+        cur.execute(
+            "SELECT COUNT(*) FROM writes WHERE thread_id = ? AND checkpoint_ns = ? "
+            "AND checkpoint_id IN (SELECT checkpoint_id FROM pruned)", key,
+        )
+        result.writes = cur.fetchone()[0]
+
+        gaps: Ranges = []
+        if isinstance(saver, MessageLogSaver):
+            gaps = _unreferenced_messages(saver, cur, key)
+            for start, stop in gaps:
+                cur.execute(
+                    "SELECT COUNT(*) FROM message_log WHERE thread_id = ? AND "
+                    "checkpoint_ns = ? AND seq >= ? AND seq < ?", (*key, start, stop),
+                )
+                result.messages += cur.fetchone()[0]
+
+        if dry_run:
+            return result
+
+        for table in ("checkpoints", "writes"):
+            cur.execute(
+                f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_ns = ? "
+                "AND checkpoint_id IN (SELECT checkpoint_id FROM pruned)", key,
+            )
+        for start, stop in gaps:
+            cur.execute(
+                "DELETE FROM message_log WHERE thread_id = ? AND checkpoint_ns = ? "
+                "AND seq >= ? AND seq < ?", (*key, start, stop),
+            )
+
+    if gaps:
+        saver.forget_messages(key, gaps)
+    return result
+
+
+def _unreferenced_messages(saver: MessageLogSaver, cur, key: Tuple[str, str]) -> Ranges:
+    """Seq ranges only pruned checkpoints refer to.
+
+    Capped at the highest seq a kept checkpoint refers to. Rows above it were
+    written by a `put` whose checkpoint is not committed yet, and must stay.
+    """
+    cur.execute(
+        "SELECT type, checkpoint FROM checkpoints WHERE thread_id = ? AND "
+        "checkpoint_ns = ? AND checkpoint_id NOT IN (SELECT checkpoint_id FROM pruned)",
+        key,
+    )
+    referenced: Set[int] = set()
+    for type_, blob in cur.fetchall():
+        value = saver.serde.loads_typed((type_, blob)).get("channel_values", {}).get(
+            MESSAGES_CHANNEL
+        )
+        if is_message_log_ref(value):
+            for start, stop in value[MESSAGE_LOG_KEY]:
+                referenced.update(range(start, stop))
+    if not referenced:
+        return []
+    return ranges_of([seq for seq in range(max(referenced)) if seq not in referenced])
+
+
+def compact(saver: SqliteSaver, policy: Optional[RetentionPolicy] = None,
+            dry_run: bool = False) -> PruneResult:
+    """Prune every thread in the database, or in every shard. Does not `VACUUM`."""
+    policy = policy or RetentionPolicy.from_env()
+    total = PruneResult()
+    for shard in savers_of(saver):
+        for thread_id, checkpoint_ns in threads(shard):
+            total += prune_thread(shard, thread_id, checkpoint_ns, policy, dry_run)
+    return total
+
+
+def storage_report(saver: SqliteSaver) -> List[ThreadStorage]:
+    """Per-thread storage, largest first, across every shard."""
+    report = {}
+    for shard in savers_of(saver):
+        _add_storage(shard, report)
+    return sorted(report.values(), key=lambda t: t.total_bytes, reverse=True)
+
+
+def _add_storage(saver: SqliteSaver, report: dict) -> None:
+    with saver.cursor(transaction=False) as cur:
+        cur.execute(
+            "SELECT thread_id, checkpoint_ns, COUNT(*), "
+            "SUM(LENGTH(checkpoint) + COALESCE(LENGTH(metadata), 0)) "
+            "FROM checkpoints GROUP BY thread_id, checkpoint_ns"
+        )
+        for thread_id, ns, count, size in cur.fetchall():
+            report[(thread_id, ns)] = ThreadStorage(thread_id, ns, count, [], size or 0)
+
+        cur.execute("SELECT thread_id, checkpoint_ns, metadata FROM checkpoints")
+        for thread_id, ns, metadata in cur.fetchall():
+            name = _milestone_of(metadata)
+            if name is not None and (thread_id, ns) in report:
+                report[(thread_id, ns)].milestones.append(name)
+
+        cur.execute(
+            "SELECT thread_id, checkpoint_ns, SUM(LENGTH(value)) FROM writes "
+            "GROUP BY thread_id, checkpoint_ns"
+        )
+        for thread_id, ns, size in cur.fetchall():
+            entry = report.setdefault((thread_id, ns), ThreadStorage(thread_id, ns))
+            entry.write_bytes = size or 0
+
+        cur.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'message_log'")
+        if cur.fetchone():
+            cur.execute(
+                "SELECT thread_id, checkpoint_ns, COUNT(*), SUM(LENGTH(message)) "
+                "FROM message_log GROUP BY thread_id, checkpoint_ns"
+            )
+            for thread_id, ns, count, size in cur.fetchall():
+                entry = report.setdefault((thread_id, ns), ThreadStorage(thread_id, ns))
+                entry.message_rows, entry.message_bytes = count, size or 0
+
+
+class BackgroundCompactor:
+    """Runs `compact` on a daemon thread every `interval` seconds.
+
+    Pruning shares the saver's connection and lock, one thread per transaction,
+    so a turn is never blocked for longer than one thread's prune. The file does
+    not shrink — SQLite reuses the freed pages, which is what stops the growth.
+    Shrinking it is `scripts/checkpoints.py vacuum`, with the game stopped.
+    """
+
+    def __init__(self, saver: SqliteSaver, policy: Optional[RetentionPolicy] = None,
+                 interval: Optional[float] = None):
+        self.saver = saver
+        self.policy = policy or RetentionPolicy.from_env()
+        self.interval = resolve_compact_interval(interval)
+        self.last_result: Optional[PruneResult] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self) -> PruneResult:
+        self.last_result = compact(self.saver, self.policy)
+        return self.last_result
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as exc:
+                # Never take the game down over housekeeping. The next pass
+                # retries; the database is no worse than if it had not run.
+                print(f"Checkpoint compaction failed: {exc}")
+            self._stop.wait(self.interval)
+
+    def start(self) -> "BackgroundCompactor":
+        if self.interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="checkpoint-compactor",
+                                            daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+def resolve_compact_interval(interval: Optional[float] = None) -> float:
+    if interval is not None:
+        return float(interval)
+    value = os.environ.get(ENV_COMPACT_INTERVAL, "").strip()
+    return float(value) if value else DEFAULT_COMPACT_INTERVAL
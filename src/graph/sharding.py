@@ -0,0 +1,206 @@
+import heapq
+import os
+import sqlite3
+import zlib
+from pathlib import Path
+from typing import Any, AsyncIterator, Iterator, List, Optional, Sequence, Union
+
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+)
+
+from src.graph.message_log import CHECKPOINT_EXECUTOR
+
+# SQLite files the checkpoints are spread over. One is the plain
+# `game_state.db`; more puts each campaign in one of `<stem>-shards/shard-<i>.db`
+# by a hash of its thread id. Changing it strands every campaign whose shard
+# moved until `scripts/rebalance_shards.py` has run.
+DEFAULT_SHARDS = 1
+ENV_SHARDS = "DND_CHECKPOINT_SHARDS"
+
+
+def resolve_shards(shards: Optional[int] = None) -> int:
+    if shards is None:
+        value = os.environ.get(ENV_SHARDS, "").strip()
+        shards = int(value) if value else DEFAULT_SHARDS
+    if shards < 1:
+        raise ValueError(f"need at least one checkpoint shard, got {shards}")
+    return shards
+
+
+def shard_index(thread_id: str, shards: int) -> int:
+    """The shard a thread lives in.
+
+    CRC-32, not `hash()`: string hashes are salted per process, and the shard
+    must be the same in every process that opens the files.
+    """
+    return zlib.crc32(str(thread_id).encode("utf-8")) % shards
+
+
+def shard_dir(db_path: str) -> Path:
+    path = Path(db_path)
+    return path.with_name(f"{path.stem}-shards")
+
+
+def shard_paths(db_path: str, shards: int) -> List[str]:
+    return [str(shard_dir(db_path) / f"shard-{i}.db") for i in range(shards)]
+
+
+def existing_shard_paths(db_path: str) -> List[str]:
+    """Shard files already on disk for `db_path`, in index order."""
+    found = shard_dir(db_path).glob("shard-*.db")
+    return sorted((str(p) for p in found), key=lambda p: int(Path(p).stem.split("-")[1]))
+
+
+def has_checkpoints(db_path: str) -> bool:
+    """Whether the unsharded database holds any checkpoint. Opened read-only,
+    so a missing file is not created."""
+    if not Path(db_path).is_file():
+        return False
+    conn = sqlite3.connect(f"{Path(db_path).resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        tables = {name for (name,) in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'")}
+        return ("checkpoints" in tables
+                and conn.execute("SELECT 1 FROM checkpoints LIMIT 1").fetchone() is not None)
+    finally:
+        conn.close()
+
+
+def check_layout(db_path: str, shards: int) -> None:
+    """Refuse to open a layout other than the one the campaigns are stored in.
+
+    The hash would send most threads to a file that does not hold them: the
+    campaigns would look empty and start over, and the old state would sit
+    unread beside the new. That holds between two shard counts, from shards
+    back to the single file, and from a populated single file to shards.
+    """
+    found = existing_shard_paths(db_path)
+    if shards == 1:
+        stranded = f"{shard_dir(db_path)} holds {len(found)} shards" if found else None
+    elif found:
+        stranded = (f"{shard_dir(db_path)} holds {len(found)} shards"
+                    if found != shard_paths(db_path, shards) else None)
+    else:
+        stranded = f"{db_path} holds checkpoints" if has_checkpoints(db_path) else None
+    if stranded:
+        raise ValueError(
+            f"{stranded} but {shards} were asked for. "
+            f"Run `python scripts/rebalance_shards.py --shards {shards}` first."
+        )
+
+
+class ShardedSaver(BaseCheckpointSaver):
+    """Spreads threads over several savers, each with its own file and lock.
+
+    A `SqliteSaver` serialises every read and write behind one connection
+    lock, and SQLite allows one writer per file. With many sessions on one
+    host every campaign's turn waited for every other's. Threads never share
+    state, so a thread's checkpoints, pending writes and messages all live in
+    one shard, chosen by `shard_index`, and sessions on different shards do
+    not wait for each other at all.
+
+    Everything keyed by a thread goes to its shard. A `list` without a thread
+    merges the shards, newest first, as the stock saver orders it.
+    """
+
+    def __init__(self, shards: Sequence[BaseCheckpointSaver]):
+        if not shards:
+            raise ValueError("a sharded saver needs at least one shard")
+        super().__init__(serde=shards[0].serde)
+        self.shards = list(shards)
+
+    def shard_for(self, config_or_thread: Union[RunnableConfig, str]) -> BaseCheckpointSaver:
+        thread_id = (config_or_thread if isinstance(config_or_thread, str)
+                     else config_or_thread["configurable"]["thread_id"])
+        return self.shards[shard_index(thread_id, len(self.shards))]
+
+    def setup(self) -> None:
+        for shard in self.shards:
+            shard.setup()
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return self.shard_for(config).get_tuple(config)
+
+    def list(self, config: Optional[RunnableConfig], *, filter: Optional[dict] = None,
+             before: Optional[RunnableConfig] = None,
+             limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        kwargs = {"filter": filter, "before": before, "limit": limit}
+        if config is not None and "thread_id" in config.get("configurable", {}):
+            yield from self.shard_for(config).list(config, **kwargs)
+            return
+        # Checkpoint ids are uuid6, time-ordered, so merging on them keeps
+        # the stock newest-first order across shards.
+        merged = heapq.merge(
+            *(shard.list(config, **kwargs) for shard in self.shards),
+            key=lambda t: t.config["configurable"]["checkpoint_id"], reverse=True,
+        )
+        for n, found in enumerate(merged):
+            if limit is not None and n >= limit:
+                return
+            yield found
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint,
+            metadata: CheckpointMetadata, new_versions: ChannelVersions) -> RunnableConfig:
+        return self.shard_for(config).put(config, checkpoint, metadata, new_versions)
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[tuple[str, Any]],
+                   task_id: str, task_path: str = "") -> None:
+        self.shard_for(config).put_writes(config, writes, task_id, task_path)
+
+    def delete_thread(self, thread_id: str) -> None:
+        self.shard_for(str(thread_id)).delete_thread(thread_id)
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await self.shard_for(config).aget_tuple(config)
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[dict] = None,
+                    before: Optional[RunnableConfig] = None,
+                    limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        if config is not None and "thread_id" in config.get("configurable", {}):
+            async for found in self.shard_for(config).alist(
+                    config, filter=filter, before=before, limit=limit):
+                yield found
+            return
+        merged = await CHECKPOINT_EXECUTOR.run(
+            lambda: [*self.list(config, filter=filter, before=before, limit=limit)])
+        for found in merged:
+            yield found
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint,
+                   metadata: CheckpointMetadata, new_versions: ChannelVersions) -> RunnableConfig:
+        return await self.shard_for(config).aput(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[tuple[str, Any]],
+                          task_id: str, task_path: str = "") -> None:
+        await self.shard_for(config).aput_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await self.shard_for(str(thread_id)).adelete_thread(thread_id)
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        return self.shards[0].get_next_version(current, channel)
+
+    def get_messages(self, config: RunnableConfig, start: int = 0,
+                     stop: Optional[int] = None) -> List[BaseMessage]:
+        """See `MessageLogSaver.get_messages`."""
+        return self.shard_for(config).get_messages(config, start, stop)
+
+    def count_messages(self, config: RunnableConfig) -> int:
+        """See `MessageLogSaver.count_messages`."""
+        return self.shard_for(config).count_messages(config)
+
+    def release_messages(self, config: RunnableConfig, message_ids: Sequence[str]) -> None:
+        """See `MessageLogSaver.release_messages`."""
+        self.shard_for(config).release_messages(config, message_ids)
+
+
+def savers_of(saver: BaseCheckpointSaver) -> List[BaseCheckpointSaver]:
+    """The savers holding the data: a sharded saver's shards, or the saver itself."""
+    return list(saver.shards) if isinstance(saver, ShardedSaver) else [saver]
@@ -0,0 +1,110 @@
+import os
+import queue
+import sqlite3
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+# Applied to every checkpoint connection, writer and readers alike.
+#
+# - journal_mode=WAL: readers no longer block the writer, nor it them. The
+#   stock saver already switches to WAL in `setup()`; setting it here as well
+#   covers the reader connections, and any database opened before setup runs.
+# - synchronous=NORMAL: in WAL mode this fsyncs at WAL checkpoints, not on every
+#   commit. A power cut can lose the last few steps; it cannot corrupt the file.
+#   A lost step is a turn to retype. An fsync per step was most of the write cost.
+# - cache_size / mmap_size: a long campaign's message log is read in ranges.
+#   Keeping hot pages in memory avoids re-reading them on every resume.
+# - busy_timeout: a second process — the checkpoints CLI, a server worker —
+#   waits for the lock rather than failing with "database is locked".
+DEFAULT_SQLITE_PRAGMAS: Dict[str, str] = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": "-65536",      # KiB, so 64 MB
+    "mmap_size": "268435456",    # 256 MB
+    "busy_timeout": "5000",      # ms
+}
+
+# Comma-separated overrides: DND_SQLITE_PRAGMAS="synchronous=FULL,mmap_size=0".
+ENV_SQLITE_PRAGMAS = "DND_SQLITE_PRAGMAS"
+
+# Read connections kept open beside the writer. A REPL needs one; a server
+# answering several sessions wants one per concurrent request it expects.
+DEFAULT_READERS = 4
+ENV_SQLITE_READERS = "DND_SQLITE_READERS"
+
+
+def resolve_pragmas(pragmas: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """The defaults, then `DND_SQLITE_PRAGMAS`, then `pragmas`, later winning."""
+    resolved = dict(DEFAULT_SQLITE_PRAGMAS)
+    for item in os.environ.get(ENV_SQLITE_PRAGMAS, "").split(","):
+        if not item.strip():
+            continue
+        name, sep, value = item.partition("=")
+        if not sep or not name.strip():
+            raise ValueError(
+                f"{ENV_SQLITE_PRAGMAS} entries look like name=value; got {item!r}"
+            )
+        resolved[name.strip().lower()] = value.strip()
+    resolved.update({k.lower(): str(v) for k, v in (pragmas or {}).items()})
+    return resolved
+
+
+def resolve_readers(readers: Optional[int] = None) -> int:
+    if readers is not None:
+        return readers
+    value = os.environ.get(ENV_SQLITE_READERS, "").strip()
+    return int(value) if value else DEFAULT_READERS
+
+
+def apply_pragmas(conn: sqlite3.Connection, pragmas: Dict[str, str]) -> None:
+    for name, value in pragmas.items():
+        # Pragma names and values cannot be bound as parameters.
+        if not name.replace("_", "").isalnum():
+            raise ValueError(f"not a pragma name: {name!r}")
+        conn.execute(f"PRAGMA {name}={value}")
+
+
+def connect_sqlite(db_path: str, pragmas: Optional[Dict[str, str]] = None) -> sqlite3.Connection:
+    """A connection shared across threads, with `pragmas` applied.
+
+    `pragmas` is passed through as given. Use `resolve_pragmas` to start from
+    the defaults.
+    """
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    apply_pragmas(conn, pragmas if pragmas is not None else resolve_pragmas())
+    return conn
+
+
+class ReaderPool:
+    """A fixed set of read-only connections, lent out one per read.
+
+    The saver's own connection sits behind a lock, so one slow read — a cold
+    load of a 10,000-message campaign — used to stall every write queued
+    behind it. In WAL mode, readers on their own connections see the last
+    committed state and run alongside the writer.
+    """
+
+    def __init__(self, db_path: str, size: int = DEFAULT_READERS,
+                 pragmas: Optional[Dict[str, str]] = None):
+        if size < 1:
+            raise ValueError(f"a reader pool needs at least one connection, got {size}")
+        pragmas = {**(pragmas if pragmas is not None else resolve_pragmas()),
+                   "query_only": "ON"}
+        self.size = size
+        self._idle: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        for _ in range(size):
+            self._idle.put(connect_sqlite(db_path, pragmas))
+
+    @contextmanager
+    def cursor(self) -> Iterator[sqlite3.Cursor]:
+        conn = self._idle.get()
+        cur = conn.cursor()
+        try:
+            yield cur
+        finally:
+            cur.close()
+            self._idle.put(conn)
+
+    def close(self) -> None:
+        for _ in range(self.size):
+            self._idle.get().close()
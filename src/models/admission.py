@@ -0,0 +1,336 @@
+"""Admission control in front of the Ollama daemon.
+
+One daemon serves every session, and it generates for `OLLAMA_NUM_PARALLEL`
+requests at a time; the rest wait inside it, where nothing here can see how
+long the line is. So every model call first takes a slot from the host's
+`AdmissionController`. At most `DND_LLM_MAX_IN_FLIGHT` calls reach the daemon
+at once and the queue forms here, where it can be measured.
+
+From the queue, the turns admitted behind it, and the recent tokens/s the
+controller estimates how long a new call would wait, and turns that into a
+load level:
+
+    normal  everything runs
+    lean    optional model calls are skipped — the DM's scene extraction and
+            the researcher's rewrite-and-retry
+    cached  as lean, and the researcher answers from its recent answers when
+            it has answered the same question before
+    shed    new turns are refused with a retry-after; turns already running
+            finish
+
+Skipped steps and shed turns are counted. `prometheus_text()` renders every
+controller's counters and gauges for `/metrics`.
+"""
+
+import asyncio
+import os
+import threading
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Dict, List, Mapping, Optional
+
+NORMAL, LEAN, CACHED, SHED = "normal", "lean", "cached", "shed"
+LEVELS = (NORMAL, LEAN, CACHED, SHED)  # lightest first
+
+# Calls let through to the daemon at once. Ollama's own default for
+# `OLLAMA_NUM_PARALLEL` is 4 with enough memory; a call beyond it would only
+# wait inside the daemon instead of here.
+DEFAULT_MAX_IN_FLIGHT = 4
+ENV_MAX_IN_FLIGHT = "DND_LLM_MAX_IN_FLIGHT"
+
+# Estimated seconds a new call would wait before each level starts. A
+# narration's first token is ~3.5 s away unloaded; ten more is where a player
+# starts to wonder whether anything is happening, and that is when the extra
+# calls stop. Ninety seconds of queue is a turn nobody is still waiting for.
+DEFAULT_LEVEL_AFTER = {LEAN: 10.0, CACHED: 30.0, SHED: 90.0}
+ENV_LEVEL_AFTER = {
+    LEAN: "DND_ADMISSION_LEAN_AFTER",
+    CACHED: "DND_ADMISSION_CACHED_AFTER",
+    SHED: "DND_ADMISSION_SHED_AFTER",
+}
+
+# Optional steps, and the level from which each is skipped.
+OPTIONAL_STEPS = {
+    "scene_extraction": LEAN,
+    "rewrite_retry": LEAN,
+    "fresh_answer": CACHED,
+}
+
+# Weight of the newest call in the running averages. About the last ten calls
+# count, so the estimate follows a model swap or a second daemon load within
+# a turn or three.
+EWMA_ALPHA = 0.2
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.environ.get(name, "").strip()
+    return float(value) if value else default
+
+
+def resolve_max_in_flight(max_in_flight: Optional[int] = None) -> int:
+    if max_in_flight is None:
+        value = os.environ.get(ENV_MAX_IN_FLIGHT, "").strip()
+        max_in_flight = int(value) if value else DEFAULT_MAX_IN_FLIGHT
+    if max_in_flight < 1:
+        raise ValueError(f"need at least one model call in flight, got {max_in_flight}")
+    return max_in_flight
+
+
+class Overloaded(RuntimeError):
+    """A turn was refused because the daemon's queue is too deep."""
+
+    def __init__(self, host: str, retry_after: float):
+        self.host = host
+        self.retry_after = retry_after
+        super().__init__(
+            f"The table is busy — about {retry_after:.0f} s of queued model work "
+            f"on {host}. Try again shortly."
+        )
+
+
+def _ewma(current: Optional[float], sample: float) -> float:
+    return sample if current is None else current + EWMA_ALPHA * (sample - current)
+
+
+class AdmissionController:
+    """Slots, the load estimate, and the counters for one Ollama host.
+
+    Slots are granted first come, first served, to threads and coroutines
+    alike: a call on the sync path waits on an event, one on the async path
+    awaits a future, and neither holds a thread for the other.
+    """
+
+    def __init__(self, host: str, max_in_flight: Optional[int] = None,
+                 level_after: Optional[Mapping[str, float]] = None):
+        self.host = host
+        self.max_in_flight = resolve_max_in_flight(max_in_flight)
+        self.level_after = {
+            level: _env_float(ENV_LEVEL_AFTER[level], default)
+            for level, default in DEFAULT_LEVEL_AFTER.items()
+        }
+        self.level_after.update(level_after or {})
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._waiters: deque = deque()
+        self._turns = 0
+        self._turns_done = 0
+        self._call_seconds: Optional[float] = None
+        self._tokens_per_second: Optional[float] = None
+        self._tokens_per_call: Optional[float] = None
+        self._overhead_seconds: Optional[float] = None
+        self.calls = 0
+        self.shed = 0
+        self.degraded: Dict[str, int] = {step: 0 for step in OPTIONAL_STEPS}
+
+    # --- slots --------------------------------------------------------------
+
+    def acquire(self) -> None:
+        with self._lock:
+            if self._in_flight < self.max_in_flight and not self._waiters:
+                self._in_flight += 1
+                return
+            granted = threading.Event()
+            self._waiters.append(granted)
+        granted.wait()
+
+    async def aacquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._in_flight < self.max_in_flight and not self._waiters:
+                self._in_flight += 1
+                return
+            granted = loop.create_future()
+            self._waiters.append(granted)
+        try:
+            await granted
+        except asyncio.CancelledError:
+            with self._lock:
+                if granted in self._waiters:
+                    self._waiters.remove(granted)
+            # Granted, then cancelled before it could run: pass the slot on.
+            if granted.done() and not granted.cancelled():
+                self.release()
+            raise
+
+    def release(self) -> None:
+        """Hands the slot to the next waiter, or frees it."""
+        with self._lock:
+            if not self._waiters:
+                self._in_flight -= 1
+                return
+            waiter = self._waiters.popleft()
+        if isinstance(waiter, threading.Event):
+            waiter.set()
+        else:
+            waiter.get_loop().call_soon_threadsafe(self._grant, waiter)
+
+    def _grant(self, future: asyncio.Future) -> None:
+        if future.cancelled():
+            self.release()
+        else:
+            future.set_result(None)
+
+    @contextmanager
+    def slot(self):
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def aslot(self):
+        await self.aacquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    # --- the estimate -------------------------------------------------------
+
+    def record(self, seconds: float, metadata: Optional[Mapping[str, Any]] = None) -> None:
+        """Fold in one finished call: its wall time and Ollama's own counts.
+
+        Ollama reports `eval_count` and `eval_duration` (ns) on the last chunk.
+        Without them — a stand-in server, a failed call — only the wall time
+        is used.
+        """
+        metadata = metadata or {}
+        tokens = metadata.get("eval_count")
+        eval_ns = metadata.get("eval_duration")
+        with self._lock:
+            self.calls += 1
+            self._call_seconds = _ewma(self._call_seconds, seconds)
+            if tokens and eval_ns:
+                eval_seconds = eval_ns / 1e9
+                self._tokens_per_second = _ewma(self._tokens_per_second, tokens / eval_seconds)
+                self._tokens_per_call = _ewma(self._tokens_per_call, tokens)
+                self._overhead_seconds = _ewma(self._overhead_seconds,
+                                               max(seconds - eval_seconds, 0.0))
+
+    def call_seconds(self) -> float:
+        """Expected length of one call: prompt and load time, then its tokens."""
+        if self._tokens_per_second:
+            return (self._overhead_seconds or 0.0) + self._tokens_per_call / self._tokens_per_second
+        return self._call_seconds or 0.0
+
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def turns(self) -> int:
+        return self._turns
+
+    def estimated_wait(self) -> float:
+        """Seconds a call made now would wait for a slot.
+
+        Admitted turns count as well as queued calls. A turn makes its calls
+        one after another, so it holds at most one slot — but a burst of
+        turns admitted together has not reached the queue yet, and without
+        them the first seconds of a burst would read as an idle daemon.
+        """
+        with self._lock:
+            waiting, busy = len(self._waiters), self._in_flight
+            # A turn makes a router call and a narration, and more on some
+            # paths; what the finished ones averaged is what the rest will.
+            per_turn = max(self.calls / self._turns_done, 1.0) if self._turns_done else 1.0
+            waiting = max(waiting, (self._turns - self.max_in_flight) * per_turn)
+        if busy < self.max_in_flight and waiting <= 0:
+            return 0.0
+        # Each round of `max_in_flight` calls ahead takes about one call's time.
+        return (waiting + 1) / self.max_in_flight * self.call_seconds()
+
+    def level(self) -> str:
+        wait = self.estimated_wait()
+        current = NORMAL
+        for level in LEVELS[1:]:
+            if wait >= self.level_after[level]:
+                current = level
+        return current
+
+    def degraded_step(self, step: str) -> bool:
+        """True if `step` should be skipped at the current load. Counts it if so."""
+        if LEVELS.index(self.level()) < LEVELS.index(OPTIONAL_STEPS[step]):
+            return False
+        with self._lock:
+            self.degraded[step] += 1
+        return True
+
+    def admit(self) -> None:
+        """Let a new turn in, or refuse it when the queue is past the shed level.
+
+        An admitted turn counts towards the estimate until `turn_finished()`.
+
+        Raises:
+            Overloaded: with the estimated wait as `retry_after`.
+        """
+        wait = self.estimated_wait()
+        with self._lock:
+            if wait >= self.level_after[SHED]:
+                self.shed += 1
+                raise Overloaded(self.host, wait)
+            self._turns += 1
+
+    def turn_finished(self) -> None:
+        with self._lock:
+            self._turns -= 1
+            self._turns_done += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "host": self.host,
+            "level": self.level(),
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight(),
+            "queue_depth": self.queue_depth(),
+            "turns": self.turns(),
+            "estimated_wait_seconds": round(self.estimated_wait(), 3),
+            "tokens_per_second": round(self._tokens_per_second or 0.0, 2),
+            "calls": self.calls,
+            "shed": self.shed,
+            "degraded": dict(self.degraded),
+        }
+
+
+_controllers: Dict[str, AdmissionController] = {}
+_controllers_lock = threading.Lock()
+
+
+def admission_for(host: Optional[str] = None) -> AdmissionController:
+    """The controller for `host`, created on first use. None means `OLLAMA_HOST`."""
+    if host is None:
+        from src.models.llm import resolve_host
+        host = resolve_host()
+    host = host.rstrip("/")
+    with _controllers_lock:
+        if host not in _controllers:
+            _controllers[host] = AdmissionController(host)
+        return _controllers[host]
+
+
+def all_metrics() -> List[Dict[str, Any]]:
+    with _controllers_lock:
+        controllers = list(_controllers.values())
+    return [controller.metrics() for controller in controllers]
+
+
+def prometheus_text(metrics: Optional[List[Dict[str, Any]]] = None) -> str:
+    """Every controller's metrics in the Prometheus text format."""
+    metrics = all_metrics() if metrics is None else metrics
+    lines = []
+    gauges = ("in_flight", "queue_depth", "turns", "max_in_flight",
+              "estimated_wait_seconds", "tokens_per_second")
+    for name in gauges:
+        lines.append(f"# TYPE dnd_llm_{name} gauge")
+        lines.extend(f'dnd_llm_{name}{{host="{m["host"]}"}} {m[name]}' for m in metrics)
+    for name in ("calls", "shed"):
+        lines.append(f"# TYPE dnd_llm_{name}_total counter")
+        lines.extend(f'dnd_llm_{name}_total{{host="{m["host"]}"}} {m[name]}' for m in metrics)
+    lines.append("# TYPE dnd_llm_degraded_total counter")
+    for m in metrics:
+        lines.extend(f'dnd_llm_degraded_total{{host="{m["host"]}",step="{step}"}} {count}'
+                     for step, count in m["degraded"].items())
+    return "\n".join(lines) + "\n"
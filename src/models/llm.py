@@ -16,12 +16,15 @@ touching this file:
 
 import json
 import os
+import time
 import urllib.error
 import urllib.request
 from typing import Optional
 
 from langchain_ollama import ChatOllama
 
+from src.models.admission import admission_for
+
 # Ollama tags are lowercase and carry a size suffix. A bare "llama3.2" resolves
 # to the latest tag; the capitalised name this module used to default to 404s.
 DEFAULT_MODEL = "llama3.2:3b"
@@ -143,6 +146,9 @@ class OllamaChat(ChatOllama):
     `ResponseError`. Both are actionable, and neither says so. Every entry point
     the agents use (direct `.invoke`, LCEL pipes, and the streaming path PR-06
     needs) is wrapped.
+
+    Every call also waits for a slot from the host's admission controller
+    (`src/models/admission.py`) and reports its timing back to it.
     """
 
     def _translate(self, exc: BaseException) -> BaseException:
@@ -151,42 +157,73 @@ class OllamaChat(ChatOllama):
             return exc
         return OllamaUnavailableError(message)
 
+    def _admission(self):
+        return admission_for(self.base_url or resolve_host())
+
     def invoke(self, *args, **kwargs):
-        try:
-            return super().invoke(*args, **kwargs)
-        except Exception as exc:
-            translated = self._translate(exc)
-            if translated is exc:
-                raise
-            raise translated from exc
+        controller = self._admission()
+        with controller.slot():
+            started = time.perf_counter()
+            try:
+                result = super().invoke(*args, **kwargs)
+            except Exception as exc:
+                controller.record(time.perf_counter() - started)
+                translated = self._translate(exc)
+                if translated is exc:
+                    raise
+                raise translated from exc
+            controller.record(time.perf_counter() - started, result.response_metadata)
+            return result
 
     async def ainvoke(self, *args, **kwargs):
-        try:
-            return await super().ainvoke(*args, **kwargs)
-        except Exception as exc:
-            translated = self._translate(exc)
-            if translated is exc:
-                raise
-            raise translated from exc
+        controller = self._admission()
+        async with controller.aslot():
+            started = time.perf_counter()
+            try:
+                result = await super().ainvoke(*args, **kwargs)
+            except Exception as exc:
+                controller.record(time.perf_counter() - started)
+                translated = self._translate(exc)
+                if translated is exc:
+                    raise
+                raise translated from exc
+            controller.record(time.perf_counter() - started, result.response_metadata)
+            return result
+
+    # A stream holds its slot until it is exhausted or closed. Ollama's counts
+    # arrive on the last chunk.
 
     def stream(self, *args, **kwargs):
-        try:
-            yield from super().stream(*args, **kwargs)
-        except Exception as exc:
-            translated = self._translate(exc)
-            if translated is exc:
-                raise
-            raise translated from exc
+        controller = self._admission()
+        with controller.slot():
+            started, metadata = time.perf_counter(), None
+            try:
+                for chunk in super().stream(*args, **kwargs):
+                    metadata = chunk.response_metadata or metadata
+                    yield chunk
+            except Exception as exc:
+                translated = self._translate(exc)
+                if translated is exc:
+                    raise
+                raise translated from exc
+            finally:
+                controller.record(time.perf_counter() - started, metadata)
 
     async def astream(self, *args, **kwargs):
-        try:
-            async for chunk in super().astream(*args, **kwargs):
-                yield chunk
-        except Exception as exc:
-            translated = self._translate(exc)
-            if translated is exc:
-                raise
-            raise translated from exc
+        controller = self._admission()
+        async with controller.aslot():
+            started, metadata = time.perf_counter(), None
+            try:
+                async for chunk in super().astream(*args, **kwargs):
+                    metadata = chunk.response_metadata or metadata
+                    yield chunk
+            except Exception as exc:
+                translated = self._translate(exc)
+                if translated is exc:
+                    raise
+                raise translated from exc
+            finally:
+                controller.record(time.perf_counter() - started, metadata)
 
 
 def create_llm(
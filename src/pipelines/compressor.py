@@ -0,0 +1,97 @@
+"""Extractive compression of retrieved passages before they reach the prompt.
+
+A retrieved chunk is a whole stat block or rule section, up to ~1,000
+characters, and prompt evaluation is what the player waits through before the
+first token. Usually two or three of its sentences answer the question: "what
+is a goblin's armor class" needs one line of a twenty-line stat block.
+
+`compress_passages` splits every passage into sentences — and stat-block and
+list lines, which are sentences of their own — scores each by embedding
+similarity to the question, and keeps the best across all passages up to a
+token budget. Each passage keeps its heading, its metadata, and therefore its
+citation; kept sentences stay in their original order. A passage none of whose
+sentences make the cut is left out of the prompt.
+"""
+
+import re
+from typing import Any, List, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+# Same estimate as `select_passages` in the researcher.
+CHARS_PER_TOKEN = 4
+
+# A sentence scoring under this share of the best one is not kept even if the
+# budget has room: a stat block's "Scimitar." or "Speed 30 ft." would
+# otherwise fill whatever is left. Not tuned on this index.
+MIN_SCORE_SHARE = 0.5
+
+# Sentence ends inside a line: ".", "!" or "?" followed by space and a capital,
+# digit, quote or bracket — which leaves "5 ft." inside "reach 5 ft., one
+# target" and "e.g." mid-sentence alone.
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(\[])")
+
+
+def split_units(text: str) -> Tuple[str, List[str]]:
+    """A passage's heading line (the loader's `# Name`, or "") and its sentences."""
+    lines = [line.strip() for line in text.strip().splitlines()]
+    heading = lines.pop(0) if lines and lines[0].startswith("# ") else ""
+    units = []
+    for line in lines:
+        units.extend(part.strip() for part in _SENTENCE_END.split(line) if part.strip())
+    return heading, units
+
+
+def _tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+
+def _normalised(vectors: Any) -> np.ndarray:
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+
+def compress_passages(question: str, docs: List[Document], embeddings: Any,
+                      budget: int, min_score_share: float = MIN_SCORE_SHARE) -> List[Document]:
+    """`docs`, cut to their sentences most similar to `question`.
+
+    Sentences are embedded in one `embed_documents` call, and kept best first
+    while they fit `budget` and score at least `min_score_share` of the best.
+    Headings do not count against the budget. Passages that already fit are
+    returned unchanged, without embedding anything.
+    """
+    if not docs or sum(_tokens(d.page_content) for d in docs) <= budget:
+        return docs
+
+    split = [split_units(doc.page_content) for doc in docs]
+    units = [(i, j, unit) for i, (_, doc_units) in enumerate(split)
+             for j, unit in enumerate(doc_units)]
+    if not units:
+        return docs
+
+    query = _normalised(embeddings.embed_query(question))
+    scores = _normalised(embeddings.embed_documents([u for _, _, u in units])) @ query
+
+    kept = set()
+    spent = 0
+    floor = float(scores.max()) * min_score_share
+    for k in np.argsort(-scores, kind="stable"):
+        if kept and scores[k] < floor:
+            break
+        i, j, unit = units[k]
+        cost = _tokens(unit)
+        if kept and spent + cost > budget:
+            continue
+        kept.add((i, j))
+        spent += cost
+
+    compressed = []
+    for i, (doc, (heading, doc_units)) in enumerate(zip(docs, split)):
+        chosen = [unit for j, unit in enumerate(doc_units) if (i, j) in kept]
+        if not chosen:
+            continue
+        body = "\n".join(([heading] if heading else []) + chosen)
+        compressed.append(Document(id=doc.id, page_content=body, metadata=dict(doc.metadata)))
+    return compressed
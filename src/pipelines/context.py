@@ -0,0 +1,136 @@
+"""Context assembly: retrieved pieces of one SRD entry become one passage.
+
+The SRD loader splits a long entry into pieces and re-heads each one with the
+entry's name (`chunk_entry`), so every piece can be found by name. When two
+pieces of the same stat block are both retrieved, sending them as they are
+puts the heading in the prompt twice, and where the splitter overlapped them,
+the overlap twice as well — tokens of prompt evaluation for nothing.
+
+`assemble_passages` joins the pieces of each entry, in ordinal order, under
+one heading. Neighbouring pieces are joined where their text overlaps, so the
+shared stretch appears once; pieces with a gap between them are joined with an
+ellipsis. Over the SRD, 295 of the 1,108 neighbouring pairs overlap; the rest
+were split on a paragraph break and join end to end.
+
+`expand_to_entries` goes further where the index was built with an entry
+store (`src/data/entry_store.py`): a matched piece is replaced by its whole
+entry, so the stat block's legendary actions come with the piece that matched
+its name. Whole entries share one token budget per turn, and an entry that
+does not fit what is left is cut to fit, starting where the match did.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+# Same estimate as `select_passages` in the researcher.
+CHARS_PER_TOKEN = 4
+
+# The loader's overlap is 200 characters; a match is looked for this far back.
+OVERLAP_WINDOW = 400
+
+# Shorter matches are coincidence — a shared "." or "the" — not overlap.
+MIN_OVERLAP = 10
+
+
+def entry_key(doc: Document) -> Optional[Tuple[str, str, str, str]]:
+    """Which entry a piece belongs to, or None for a document with no ordinal.
+
+    The name alone is not enough: the barbarian's and the monk's Unarmored
+    Defense are different entries with one name. The loader's `entry_id`
+    tells them apart.
+    """
+    metadata = doc.metadata
+    if metadata.get("name") is None or metadata.get("chunk_index") is None:
+        return None
+    return (metadata.get("source", ""), metadata.get("category", ""), metadata["name"],
+            metadata.get("entry_id", ""))
+
+
+def _body(doc: Document) -> str:
+    heading = f"# {doc.metadata['name']}\n"
+    text = doc.page_content.strip()
+    return text[len(heading):] if text.startswith(heading) else text
+
+
+def join_overlapping(first: str, second: str) -> str:
+    """`first` then `second`, with any stretch that ends one and starts the other once."""
+    for start in range(max(0, len(first) - OVERLAP_WINDOW), len(first) - MIN_OVERLAP + 1):
+        if second.startswith(first[start:]):
+            return first + second[len(first) - start:]
+    return f"{first}\n{second}"
+
+
+def _merge(pieces: List[Document]) -> Document:
+    pieces = sorted(pieces, key=lambda d: d.metadata["chunk_index"])
+    text = _body(pieces[0])
+    for previous, piece in zip(pieces, pieces[1:]):
+        if piece.metadata["chunk_index"] == previous.metadata["chunk_index"] + 1:
+            text = join_overlapping(text, _body(piece))
+        else:
+            text = f"{text}\n…\n{_body(piece)}"
+    first = pieces[0]
+    metadata = {**first.metadata, "chunks": [p.metadata["chunk_index"] for p in pieces]}
+    return Document(id=first.id, page_content=f"# {first.metadata['name']}\n{text}",
+                    metadata=metadata)
+
+
+def assemble_passages(docs: List[Document]) -> List[Document]:
+    """`docs` with every entry's pieces merged into one passage.
+
+    Each entry takes the place of its first piece in `docs`, so the order is
+    still best first. Documents without ordinals — the PDF index, or an SRD
+    index built before ordinals were stored — pass through unchanged.
+    """
+    groups: Dict[Tuple[str, str, str, str], List[Document]] = {}
+    order: List[object] = []
+    for doc in docs:
+        key = entry_key(doc)
+        if key is None:
+            order.append(doc)
+        elif key not in groups:
+            groups[key] = [doc]
+            order.append(key)
+        elif all(d.metadata["chunk_index"] != doc.metadata["chunk_index"] for d in groups[key]):
+            groups[key].append(doc)
+
+    return [item if isinstance(item, Document)
+            else (groups[item][0] if len(groups[item]) == 1 else _merge(groups[item]))
+            for item in order]
+
+
+def _window(entry: str, doc: Document, chars: int) -> Optional[str]:
+    """`entry` cut to `chars`, from the line where `doc`'s text starts, or None."""
+    heading, _, text = entry.partition("\n")
+    start = text.find(_body(doc)[:OVERLAP_WINDOW])
+    if start < 0:
+        return None
+    start = text.rfind("\n", 0, start) + 1
+    cut = text[start:start + max(0, chars - len(heading) - 1)]
+    if start + len(cut) < len(text):
+        cut = cut[:cut.rfind("\n")] if "\n" in cut else ""
+    return f"{heading}\n{cut}" if cut else None
+
+
+def expand_to_entries(docs: List[Document], store: Any, budget: int) -> List[Document]:
+    """`docs` with every piece of a stored entry replaced by the whole entry.
+
+    Passages are taken best first against `budget` tokens. An entry longer
+    than what is left is cut at a line break to fit, from the start of the
+    piece that matched; one that cannot keep at least that piece's worth is
+    sent as the piece. Documents not in `store` pass through, and count
+    against the budget all the same.
+    """
+    expanded, spent = [], 0
+    for doc in docs:
+        entry_id = doc.metadata.get("entry_id") if entry_key(doc) is not None else None
+        entry = store.get(entry_id) if entry_id else None
+        left = (budget - spent) * CHARS_PER_TOKEN
+        if entry is not None and len(entry) > left:
+            entry = _window(entry, doc, left)
+        if entry is not None and len(entry) > len(doc.page_content):
+            doc = Document(id=doc.id, page_content=entry,
+                           metadata={**doc.metadata, "expanded": True})
+        expanded.append(doc)
+        spent += len(doc.page_content) // CHARS_PER_TOKEN
+    return expanded
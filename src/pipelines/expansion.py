@@ -0,0 +1,151 @@
+"""Glossary expansion: the cheap correction tried before the rewriter.
+
+A question whose retrieval misses is restated by `create_question_rewriter`,
+which is a full model call — seconds of prompt evaluation and generation
+before the retry can even start. Most misses are vocabulary: the player says
+"knocked out" and the rules say Unconscious. A glossary can often make that
+substitution instead.
+
+`expand_query` finds glossary phrases in the question and returns variants
+with the rules' terms substituted. The researcher embeds every variant in one
+batch and searches with each; the rewriter runs only if every variant misses
+too. The glossary has three sources:
+
+- **seed** — `SEED_GLOSSARY`, the rewriter prompt's own examples and a few
+  common table abbreviations;
+- **titles** — a word that appears in exactly one multi-word SRD entry name
+  stands for that name: "mouther" is the Gibbering Mouther;
+- **mined** — `scripts/mine_glossary.py` pairs the words a successful logged
+  rewrite dropped with the SRD names it introduced, and writes the pairs seen
+  often enough to `DND_GLOSSARY` (`query_glossary.json`).
+"""
+
+import functools
+import hashlib
+import json
+import logging
+import os
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from src.config import SRD_DIRECTORY
+from src.data.srd_loader import load_entry_names, normalise_name
+
+logger = logging.getLogger(__name__)
+
+Glossary = Dict[str, Tuple[str, ...]]
+
+DEFAULT_GLOSSARY_PATH = "query_glossary.json"
+ENV_GLOSSARY = "DND_GLOSSARY"
+
+# Variants searched per missed question, the all-terms one first. Each is one
+# more vector search after the batch embedding; the rewriter it may save is a
+# model call.
+MAX_VARIANTS = 3
+
+# The rewriter prompt's three examples come first; the rest are shorthand a
+# table uses that the SRD never does. Hand-written, not measured.
+SEED_GLOSSARY: Glossary = {
+    "hides and stabs": ("sneak attack", "hiding"),
+    "knocked out": ("unconscious", "death saving throws"),
+    "tougher": ("armor class", "hit points", "constitution"),
+    "ac": ("armor class",),
+    "hp": ("hit points",),
+    "aoo": ("opportunity attack",),
+    "crit": ("critical hit",),
+    "nat 20": ("critical hit",),
+    "dying": ("death saving throws", "unconscious"),
+    "grab": ("grapple", "grappled"),
+    "knock down": ("shove", "prone"),
+    "dual wield": ("two-weapon fighting",),
+    "sneak": ("stealth", "hiding"),
+}
+
+# A title word shorter than this is too likely to be an ordinary word.
+MIN_TITLE_WORD = 6
+
+
+def resolve_glossary_path(path: Optional[str] = None) -> str:
+    return path or os.environ.get(ENV_GLOSSARY, "").strip() or DEFAULT_GLOSSARY_PATH
+
+
+def title_glossary(names: List[str]) -> Glossary:
+    """Each word found in exactly one multi-word name, mapped to that name.
+
+    The names map to themselves, so the words of one a question already uses
+    are left alone: "sneak attack" is not restated as "stealth hiding attack".
+    """
+    counts = Counter(word for name in names for word in set(name.split()))
+    glossary: Glossary = {}
+    for name in names:
+        words = name.split()
+        if len(words) < 2:
+            continue
+        glossary[name] = (name,)
+        for word in words:
+            if counts[word] == 1 and len(word) >= MIN_TITLE_WORD:
+                glossary[word] = (name,)
+    return glossary
+
+
+def read_mined_glossary(path: str) -> Glossary:
+    """The glossary `scripts/mine_glossary.py` wrote, or {} if there is none."""
+    if not Path(path).is_file():
+        return {}
+    try:
+        mined = json.loads(Path(path).read_text(encoding="utf-8"))
+    except ValueError:
+        logger.warning("Unreadable glossary at %s; ignoring it", path)
+        return {}
+    return {normalise_name(slang): tuple(terms) for slang, terms in mined.items()}
+
+
+@functools.lru_cache(maxsize=4)
+def load_glossary(path: Optional[str] = None) -> Glossary:
+    """Title, mined and seed entries, later sources winning a shared phrase."""
+    glossary = title_glossary(sorted(load_entry_names(SRD_DIRECTORY)))
+    glossary.update(read_mined_glossary(resolve_glossary_path(path)))
+    glossary.update(SEED_GLOSSARY)
+    return glossary
+
+
+def glossary_fingerprint(glossary: Glossary) -> str:
+    """A short hash of `glossary`, changing whenever any entry does."""
+    text = json.dumps(sorted(glossary.items()), ensure_ascii=False)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+def _replace(text: str, phrase: str, terms: Tuple[str, ...]) -> str:
+    return f" {text} ".replace(f" {phrase} ", f" {' '.join(terms)} ").strip()
+
+
+def expand_query(question: str, glossary: Glossary,
+                 max_variants: int = MAX_VARIANTS) -> List[str]:
+    """`question` restated with glossary terms, or [] if no phrase matched.
+
+    Phrases match whole words, longest first, and a phrase inside one already
+    matched is not matched again; a phrase whose terms the question already
+    has matches but changes nothing. The first variant substitutes every
+    match; then one per match, while there is more than one and room for it.
+    """
+    text = normalise_name(question)
+    padded = f" {text} "
+    taken: List[str] = []
+    hits: List[Tuple[str, Tuple[str, ...]]] = []
+    for phrase in sorted(glossary, key=len, reverse=True):
+        if f" {phrase} " not in padded or any(f" {phrase} " in f" {t} " for t in taken):
+            continue
+        taken.append(phrase)
+        if not all(term in text for term in glossary[phrase]):
+            hits.append((phrase, glossary[phrase]))
+    if not hits:
+        return []
+
+    combined = text
+    for phrase, terms in hits:
+        combined = _replace(combined, phrase, terms)
+    variants = [combined]
+    if len(hits) > 1:
+        variants.extend(_replace(text, phrase, terms) for phrase, terms in hits)
+    return list(dict.fromkeys(variants))[:max_variants]
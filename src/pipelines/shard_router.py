@@ -0,0 +1,70 @@
+"""Which SRD categories a question is about, from names and keywords alone.
+
+With a sharded index (`src/data/shards.py`) a question is searched only in
+the categories it is about: "what's the AC of an owlbear" in Monsters' 635
+chunks, not all 3,082 chunks in every category. This picks them. It runs on
+every retrieval, so it is lookup only, with no model and no embedding:
+
+- **names** — every SRD entry name the question mentions, as whole words
+  (a plural or possessive is tried without its "s"), routes to each
+  category that has an entry by that name: "owlbear" to Monsters, "camel"
+  to Monsters and Equipment;
+- **keywords** — `CATEGORY_KEYWORDS`, words that say which kind of entry is
+  wanted without naming one: "spell", "cost", "condition".
+
+A question that matches nothing routes nowhere, and is searched everywhere.
+"""
+
+import functools
+from typing import Dict, FrozenSet, List
+
+from src.config import SRD_DIRECTORY
+from src.data.srd_loader import (
+    load_entry_categories,
+    matchable_name,
+    mentioned_names,
+    normalise_name,
+)
+
+# Hand-picked, not learned. Each is a word or phrase a player uses for a kind
+# of entry; a word that could mean several ("armor" — Equipment, or Armor
+# Class in a stat block) is left out rather than guessed.
+CATEGORY_KEYWORDS: Dict[str, tuple] = {
+    "Spells": ("spell", "spells", "cantrip", "cantrips", "cast", "spell slot", "ritual"),
+    "Monsters": ("monster", "monsters", "creature", "stat block", "challenge rating",
+                 "legendary actions"),
+    "Magic Items": ("magic item", "magic items", "attunement", "attune", "potion"),
+    "Equipment": ("cost", "costs", "price", "gp", "weigh", "weighs", "weight"),
+    "Conditions": ("condition", "conditions"),
+    "Rules": ("combat", "action", "bonus action", "reaction", "turn", "rest", "movement",
+              "attack roll", "saving throw", "opportunity attack", "cover"),
+    "Races": ("race", "racial", "subrace"),
+    "Classes": ("multiclass", "multiclassing", "hit die", "hit dice"),
+}
+
+
+@functools.lru_cache(maxsize=1)
+def _categories_by_name() -> Dict[str, FrozenSet[str]]:
+    return {name: categories
+            for name, categories in load_entry_categories(SRD_DIRECTORY).items()
+            if matchable_name(name)}
+
+
+def route_categories(question: str) -> List[str]:
+    """The categories to search, in the order the question implies them, or []
+    to search them all."""
+    names = _categories_by_name()
+    routed: List[str] = []
+
+    def add(categories) -> None:
+        routed.extend(sorted(c for c in categories if c not in routed))
+
+    for name in mentioned_names(question, names):
+        add(names[name])
+
+    words = [w[:-2] if w.endswith("'s") else w for w in normalise_name(question).split()]
+    padded = f" {' '.join(words)} "
+    for category, keywords in CATEGORY_KEYWORDS.items():
+        if any(f" {keyword} " in padded for keyword in keywords):
+            add([category])
+    return routed
@@ -0,0 +1,490 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiohttp import WSMsgType, web
+from langchain_core.messages import HumanMessage
+
+from src.agents.dice_roller import DiceRollerAgent
+from src.agents.supervisor import prefilter_route
+from src.graph.archive import MessageArchive, archive_cold_messages
+from src.graph.game_orchestrator import (
+    TurnResult,
+    create_game_graph,
+    create_sqlite_checkpointer,
+    run_fast_dice_turn,
+    run_turn,
+)
+from src.graph.game_state import create_default_game_state
+from src.graph.retention import BackgroundCompactor
+from src.models.admission import (
+    AdmissionController,
+    Overloaded,
+    admission_for,
+    all_metrics,
+    prometheus_text,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8765
+
+# Turns run in threads: the graph, the agents and the checkpointer are all
+# synchronous, and a turn spends nearly all of its time waiting on Ollama. One
+# thread per turn in flight, so this is also how many sessions can be mid-turn
+# at once; the rest wait for a free thread. Ollama itself serves
+# `OLLAMA_NUM_PARALLEL` requests at a time (4 by default) and queues the rest,
+# so more threads than that only moves the queue from here to the daemon.
+DEFAULT_TURN_WORKERS = 8
+ENV_TURN_WORKERS = "DND_SERVER_WORKERS"
+
+# Events a session buffers for its client. When a client reads slower than
+# the model writes, the buffer fills and the turn's thread waits for room, so
+# a slow reader slows its own turn — the model stream behind it pauses — and
+# never grows the server's memory. 256 events is about two narrations.
+DEFAULT_SESSION_BUFFER = 256
+ENV_SESSION_BUFFER = "DND_SERVER_BUFFER"
+
+# How long a turn waits for a full buffer to drain before giving up on the
+# client. A reader that stalls this long has gone; the turn stops rather than
+# holding a thread and a model slot for nobody.
+DEFAULT_SEND_TIMEOUT = 30.0
+ENV_SEND_TIMEOUT = "DND_SERVER_SEND_TIMEOUT"
+
+# Sessions held at once. Every connection and every thread id a client sends
+# makes one, so without a cap a client sending random ids grows the server
+# without bound. A session is a lock and a flag; the campaign itself is in
+# the checkpointer, so dropping one costs the next turn a `get_state`.
+DEFAULT_MAX_SESSIONS = 1024
+ENV_MAX_SESSIONS = "DND_SERVER_SESSIONS"
+
+# Seconds a session with no client and no turn is kept. Idle ones past this,
+# then the least recently used idle ones, go when a new session needs room.
+DEFAULT_SESSION_TTL = 1800.0
+ENV_SESSION_TTL = "DND_SERVER_SESSION_TTL"
+
+
+def resolve_turn_workers(workers: Optional[int] = None) -> int:
+    if workers is None:
+        value = os.environ.get(ENV_TURN_WORKERS, "").strip()
+        workers = int(value) if value else DEFAULT_TURN_WORKERS
+    if workers < 1:
+        raise ValueError(f"need at least one turn worker, got {workers}")
+    return workers
+
+
+def resolve_session_buffer(buffer: Optional[int] = None) -> int:
+    if buffer is None:
+        value = os.environ.get(ENV_SESSION_BUFFER, "").strip()
+        buffer = int(value) if value else DEFAULT_SESSION_BUFFER
+    if buffer < 1:
+        raise ValueError(f"a session buffer holds at least one event, got {buffer}")
+    return buffer
+
+
+def resolve_send_timeout(timeout: Optional[float] = None) -> float:
+    if timeout is not None:
+        return timeout
+    value = os.environ.get(ENV_SEND_TIMEOUT, "").strip()
+    return float(value) if value else DEFAULT_SEND_TIMEOUT
+
+
+def resolve_max_sessions(sessions: Optional[int] = None) -> int:
+    if sessions is None:
+        value = os.environ.get(ENV_MAX_SESSIONS, "").strip()
+        sessions = int(value) if value else DEFAULT_MAX_SESSIONS
+    if sessions < 1:
+        raise ValueError(f"need room for at least one session, got {sessions}")
+    return sessions
+
+
+def resolve_session_ttl(ttl: Optional[float] = None) -> float:
+    if ttl is not None:
+        return ttl
+    value = os.environ.get(ENV_SESSION_TTL, "").strip()
+    return float(value) if value else DEFAULT_SESSION_TTL
+
+
+class ClientGone(Exception):
+    """The session's client left, or stopped reading, mid-turn."""
+
+
+class TooManySessions(Exception):
+    """Every session slot is held by a connected client or a running turn."""
+
+
+@dataclass
+class Session:
+    """One campaign's server-side state. Never shared between campaigns."""
+    thread_id: str
+    seeded: bool = False
+    # One turn at a time: two concurrent runs on a thread would race on its
+    # checkpoints, and the second player message would land mid-turn.
+    busy: asyncio.Lock = field(default_factory=asyncio.Lock)
+    # Connections and requests holding the session; see `GameServer.leave`.
+    clients: int = 0
+    last_used: float = field(default_factory=time.monotonic)
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        return {"configurable": {"thread_id": self.thread_id}}
+
+    @property
+    def idle(self) -> bool:
+        return self.clients == 0 and not self.busy.locked()
+
+
+def turn_events(result: TurnResult):
+    """Messages a turn wrote, as events, minus the text already streamed.
+
+    The same rule `main.py` prints by: a streamed node sends only the tail it
+    added after the model stopped — the researcher's sources — and everything
+    else is sent whole.
+    """
+    for message in result.messages:
+        name = getattr(message, "name", None)
+        content = getattr(message, "content", "")
+        if name in result.streamed:
+            already = result.streamed[name]
+            tail = content[len(already):] if content.startswith(already) else ""
+            if tail.strip():
+                yield {"type": "token", "node": name, "text": tail}
+            continue
+        yield {"type": "message", "name": name or "assistant", "content": content}
+
+
+class GameServer:
+    """Many campaigns, one compiled graph and one set of agents.
+
+    The agents hold no per-campaign state — everything a turn reads comes from
+    its thread's checkpoint — so one graph serves every session, keyed by
+    `thread_id`, and the models load once per daemon rather than once per
+    player. Each session streams its own turn's tokens through a bounded
+    queue; see `DEFAULT_SESSION_BUFFER`. Sessions with no client are dropped
+    after `session_ttl`, or sooner when `max_sessions` are held.
+    """
+
+    def __init__(self, game_graph, dice_roller: DiceRollerAgent,
+                 archive: Optional[MessageArchive] = None, *,
+                 workers: Optional[int] = None, buffer: Optional[int] = None,
+                 send_timeout: Optional[float] = None,
+                 admission: Optional[AdmissionController] = None,
+                 max_sessions: Optional[int] = None,
+                 session_ttl: Optional[float] = None):
+        self.game_graph = game_graph
+        self.dice_roller = dice_roller
+        self.archive = archive
+        self.buffer = resolve_session_buffer(buffer)
+        self.send_timeout = resolve_send_timeout(send_timeout)
+        self.executor = ThreadPoolExecutor(
+            max_workers=resolve_turn_workers(workers), thread_name_prefix="turn"
+        )
+        self.admission = admission or admission_for()
+        self.max_sessions = resolve_max_sessions(max_sessions)
+        self.session_ttl = resolve_session_ttl(session_ttl)
+        # Least recently used first.
+        self.sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self.active_turns = 0
+
+    def session(self, thread_id: Optional[str] = None) -> Session:
+        """The campaign's session, made if need be, held until `leave`.
+
+        Raises:
+            TooManySessions: if a new one is needed and none can be dropped.
+        """
+        thread_id = thread_id or str(uuid.uuid4())
+        session = self.sessions.get(thread_id)
+        if session is None:
+            self._evict()
+            if len(self.sessions) >= self.max_sessions:
+                raise TooManySessions(f"{len(self.sessions)} sessions are in use")
+            session = self.sessions[thread_id] = Session(thread_id)
+        self.sessions.move_to_end(thread_id)
+        session.clients += 1
+        return session
+
+    def leave(self, session: Session) -> None:
+        """Lets go of a session `session` returned."""
+        session.clients -= 1
+        session.last_used = time.monotonic()
+        if session.thread_id in self.sessions:
+            self.sessions.move_to_end(session.thread_id)
+
+    def _evict(self) -> None:
+        """Drops idle sessions past the TTL, then the least recently used idle
+        ones until there is room for one more."""
+        expired = time.monotonic() - self.session_ttl
+        for thread_id, session in list(self.sessions.items()):
+            if not session.idle:
+                continue
+            if session.last_used <= expired or len(self.sessions) >= self.max_sessions:
+                del self.sessions[thread_id]
+
+    def _play(self, session: Session, text: str, emit) -> None:
+        """One turn, on a worker thread. `emit` blocks while the client is behind."""
+        config = session.config
+        turn = {"messages": [HumanMessage(content=text)], "current_task": text}
+        if not session.seeded:
+            # A thread with a checkpoint is a campaign being resumed; only a
+            # new one gets the default state.
+            if not self.game_graph.get_state(config).values:
+                turn = {**create_default_game_state(), **turn}
+            session.seeded = True
+
+        rolled = run_fast_dice_turn(self.game_graph, self.dice_roller, turn, config)
+        if rolled is not None:
+            emit({"type": "message", "name": rolled.name, "content": rolled.content})
+        else:
+            result = run_turn(self.game_graph, turn, config,
+                              on_token=lambda node, token: emit(
+                                  {"type": "token", "node": node, "text": token}))
+            for event in turn_events(result):
+                emit(event)
+
+        if self.archive is not None:
+            try:
+                archive_cold_messages(self.game_graph, self.archive, config)
+            except Exception:
+                # The messages stay live and the next turn tries again.
+                logger.exception("archiving old messages failed for %s", session.thread_id)
+
+    async def play(self, session: Session, text: str,
+                   send: Callable[[Dict[str, Any]], Awaitable[None]]) -> None:
+        """Runs a turn, passing each event to `send` as it is produced.
+
+        The worker thread hands events to the loop through a queue of
+        `buffer` events and waits while it is full, so a client that reads
+        slowly pauses the model stream behind its own turn. If `send` fails —
+        the client left — the turn stops at its next token.
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.buffer)
+        done = object()
+        gone = threading.Event()
+
+        def put(item) -> None:
+            if gone.is_set():
+                raise ClientGone(session.thread_id)
+            future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+            try:
+                future.result(timeout=self.send_timeout)
+            except TimeoutError:
+                future.cancel()
+                raise ClientGone(session.thread_id) from None
+
+        def work() -> None:
+            try:
+                try:
+                    self._play(session, text, put)
+                except ClientGone:
+                    raise
+                except Exception as exc:
+                    logger.exception("turn failed for %s", session.thread_id)
+                    put({"type": "error", "error": str(exc)})
+                put(done)
+            except ClientGone:
+                pass
+
+        self.active_turns += 1
+        task = loop.run_in_executor(self.executor, work)
+        try:
+            while (event := await queue.get()) is not done:
+                await send(event)
+        finally:
+            gone.set()
+            self.active_turns -= 1
+            # Free the slot a blocked worker is waiting on, so it sees `gone`
+            # now rather than after `send_timeout`.
+            while not queue.empty():
+                queue.get_nowait()
+        await task
+
+    def _admit(self, text: str) -> bool:
+        """Sheds a turn that needs the model while its queue is past the shed level.
+
+        A written roll is answered without the model, so it always gets in
+        and is not counted. Returns True if the turn was counted; the caller
+        reports it finished.
+
+        Raises:
+            Overloaded: with `retry_after`, the estimated wait in seconds.
+        """
+        if prefilter_route(text) == "dice_roller":
+            return False
+        self.admission.admit()
+        return True
+
+    async def _claim(self, session: Session) -> bool:
+        """Takes the session's turn lock if it is free. Never waits for it."""
+        if session.busy.locked():
+            return False
+        # An unheld `asyncio.Lock` is acquired without yielding, so no other
+        # request can slip in between the check and this.
+        await session.busy.acquire()
+        return True
+
+    # --- HTTP ---------------------------------------------------------------
+
+    async def health(self, request: web.Request) -> web.Response:
+        return web.json_response({"sessions": len(self.sessions),
+                                  "active_turns": self.active_turns,
+                                  "admission": self.admission.metrics()})
+
+    async def metrics(self, request: web.Request) -> web.Response:
+        """Prometheus text: queue depth, in-flight calls, shed and skip counts."""
+        hosts = {m["host"]: m for m in all_metrics()}
+        hosts[self.admission.host] = self.admission.metrics()
+        text = prometheus_text(list(hosts.values())) + (
+            "# TYPE dnd_server_sessions gauge\n"
+            f"dnd_server_sessions {len(self.sessions)}\n"
+            "# TYPE dnd_server_active_turns gauge\n"
+            f"dnd_server_active_turns {self.active_turns}\n"
+        )
+        return web.Response(text=text, content_type="text/plain")
+
+    async def websocket(self, request: web.Request) -> web.WebSocketResponse:
+        """`/ws?thread_id=...`: send `{"type": "turn", "text": ...}`, receive events.
+
+        Leave out `thread_id` to start a new campaign; the first event names it.
+        Every turn ends with a `done` event.
+        """
+        try:
+            session = self.session(request.query.get("thread_id"))
+        except TooManySessions as exc:
+            raise web.HTTPServiceUnavailable(text=str(exc))
+        ws = web.WebSocketResponse(heartbeat=30)
+        turns = set()
+        try:
+            await ws.prepare(request)
+            await ws.send_json({"type": "session", "thread_id": session.thread_id})
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                text = _turn_text(msg.data)
+                if not text:
+                    await ws.send_json({"type": "error", "error": "expected {\"text\": ...}"})
+                    continue
+                if not await self._claim(session):
+                    await ws.send_json({"type": "error", "error": "a turn is already running"})
+                    continue
+                try:
+                    admitted = self._admit(text)
+                except Overloaded as exc:
+                    session.busy.release()
+                    # Still a turn, so it still ends with `done`.
+                    await ws.send_json({"type": "error", "error": str(exc),
+                                        "retry_after": round(exc.retry_after, 1)})
+                    await ws.send_json({"type": "done"})
+                    continue
+                # Run the turn beside the read loop, so pings and close frames
+                # are still handled while it streams.
+                task = asyncio.create_task(self._stream_to_socket(session, text, ws, admitted))
+                turns.add(task)
+                task.add_done_callback(turns.discard)
+        finally:
+            if turns:
+                await asyncio.gather(*turns, return_exceptions=True)
+            self.leave(session)
+        return ws
+
+    async def _stream_to_socket(self, session: Session, text: str,
+                                ws: web.WebSocketResponse, admitted: bool) -> None:
+        try:
+            # `send_json` waits for the socket to drain, which is what lets
+            # the session queue fill up behind a slow reader.
+            await self.play(session, text, ws.send_json)
+            await ws.send_json({"type": "done"})
+        except ConnectionResetError:
+            pass
+        finally:
+            self._finished(session, admitted)
+
+    def _finished(self, session: Session, admitted: bool) -> None:
+        if admitted:
+            self.admission.turn_finished()
+        session.busy.release()
+
+    async def post_turn(self, request: web.Request) -> web.StreamResponse:
+        """`POST /sessions/{thread_id}/turns` with `{"text": ...}`: events as NDJSON."""
+        text = _turn_text(await request.text())
+        if not text:
+            raise web.HTTPBadRequest(text="expected {\"text\": ...}")
+        try:
+            session = self.session(request.match_info["thread_id"])
+        except TooManySessions as exc:
+            raise web.HTTPServiceUnavailable(text=str(exc))
+        if not await self._claim(session):
+            self.leave(session)
+            raise web.HTTPConflict(text="a turn is already running")
+        try:
+            admitted = self._admit(text)
+        except Overloaded as exc:
+            session.busy.release()
+            self.leave(session)
+            raise web.HTTPServiceUnavailable(
+                text=str(exc), headers={"Retry-After": str(max(1, round(exc.retry_after)))})
+
+        try:
+            response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+            await response.prepare(request)
+
+            async def send(event: Dict[str, Any]) -> None:
+                await response.write(json.dumps(event).encode() + b"\n")
+
+            try:
+                await self.play(session, text, send)
+                await send({"type": "done"})
+            except ConnectionResetError:
+                pass
+        finally:
+            self._finished(session, admitted)
+            self.leave(session)
+        return response
+
+    async def close(self, app: web.Application) -> None:
+        # Not `wait=True`: a running turn needs the loop to hand over its
+        # events, so waiting for it here would never return.
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+SERVER_KEY = web.AppKey("server", GameServer)
+
+
+def _turn_text(data: str) -> str:
+    try:
+        text = json.loads(data).get("text")
+    except (ValueError, AttributeError):
+        return ""
+    return text.strip() if isinstance(text, str) else ""
+
+
+def create_app(game_graph=None, dice_roller: Optional[DiceRollerAgent] = None,
+               archive: Optional[MessageArchive] = None, **kwargs) -> web.Application:
+    """The game server. With no graph, builds one as `main.py` does.
+
+    `kwargs` go to `GameServer`: `workers`, `buffer`, `send_timeout`,
+    `admission`, `max_sessions`, `session_ttl`.
+    """
+    if game_graph is None:
+        checkpointer = create_sqlite_checkpointer()
+        BackgroundCompactor(checkpointer).start()
+        archive = MessageArchive(checkpointer)
+        game_graph = create_game_graph(checkpointer=checkpointer)
+    server = GameServer(game_graph, dice_roller or DiceRollerAgent(), archive, **kwargs)
+
+    app = web.Application()
+    app[SERVER_KEY] = server
+    app.router.add_get("/health", server.health)
+    app.router.add_get("/metrics", server.metrics)
+    app.router.add_get("/ws", server.websocket)
+    app.router.add_post("/sessions/{thread_id}/turns", server.post_turn)
+    app.on_shutdown.append(server.close)
+    return app
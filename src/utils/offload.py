@@ -0,0 +1,50 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class BoundedExecutor:
+    """A named thread pool for blocking work called from async code.
+
+    The async turn path awaits the model over HTTP, but some of what a turn
+    does has no async form: embedding a query and searching Chroma burn CPU,
+    and SQLite blocks on its file. Run on the event loop, either stalls every
+    other session's stream for its duration. Run on the loop's default pool,
+    they compete with everything else there, unbounded.
+
+    Each kind of work gets its own pool, so a burst of retrievals never
+    queues checkpoint writes behind it. The size comes from `env_var`, read
+    when the pool is first used, so it can be set after import.
+    """
+
+    def __init__(self, name: str, default_workers: int, env_var: str):
+        self.name = name
+        self.default_workers = default_workers
+        self.env_var = env_var
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def workers(self) -> int:
+        value = os.environ.get(self.env_var, "").strip()
+        workers = int(value) if value else self.default_workers
+        if workers < 1:
+            raise ValueError(f"{self.env_var} must be at least 1, got {workers}")
+        return workers
+
+    def pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers,
+                                                thread_name_prefix=self.name)
+            return self._pool
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """`fn(*args, **kwargs)` on this pool, awaited."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.pool(), partial(fn, *args, **kwargs))
@@ -0,0 +1,199 @@
+"""Single-flight: one generation for many identical concurrent requests.
+
+The first request for a key leads — it makes the model call — and every
+request for the same key that arrives while it runs follows: it waits for the
+leader's result instead of making its own call, and receives the leader's
+tokens as they are produced, starting with any it missed.
+
+A follower replays the tokens through `ReplayChat`, a chat model that
+generates nothing itself. Invoked inside a graph node it is a chat model run
+like any other, so `stream_mode="messages"` delivers the shared tokens to the
+follower's own turn under its own node name, the same as if it had generated
+them.
+"""
+
+import asyncio
+import queue
+import threading
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableConfig, ensure_config
+from langchain_core.runnables.config import merge_configs
+
+_END = None
+
+
+class Flight:
+    """One generation in progress, and everyone waiting on it."""
+
+    def __init__(self, key: Any):
+        self.key = key
+        self.followers = 0
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self._lock = threading.Lock()
+        self._tokens: List[str] = []
+        self._subscribers: List[Any] = []
+        self._done = threading.Event()
+
+    def publish(self, token: str) -> None:
+        with self._lock:
+            self._tokens.append(token)
+            # Under the lock, so a subscriber joining now gets its backlog
+            # before this token. Every `push` is non-blocking.
+            for push in self._subscribers:
+                push(token)
+
+    def finish(self, result: Any = None, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            self.result, self.error = result, error
+            self._done.set()
+            for push in self._subscribers:
+                push(_END)
+            self._subscribers.clear()
+
+    def _subscribe(self, push) -> None:
+        with self._lock:
+            for token in self._tokens:
+                push(token)
+            if self._done.is_set():
+                push(_END)
+            else:
+                self._subscribers.append(push)
+
+    def tokens(self) -> Iterator[str]:
+        """Every token, from the first, as the leader produces them."""
+        received: queue.Queue = queue.Queue()
+        self._subscribe(received.put)
+        while (token := received.get()) is not _END:
+            yield token
+
+    async def atokens(self) -> AsyncIterator[str]:
+        loop = asyncio.get_running_loop()
+        received: asyncio.Queue = asyncio.Queue()
+        self._subscribe(lambda token: loop.call_soon_threadsafe(received.put_nowait, token))
+        while (token := await received.get()) is not _END:
+            yield token
+
+    def outcome(self) -> Any:
+        """The leader's result once it has landed. Raises the leader's error."""
+        self._done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class SingleFlight:
+    """The flights in progress, by key."""
+
+    def __init__(self):
+        self._flights: Dict[Any, Flight] = {}
+        self._lock = threading.Lock()
+        self.led = 0
+        self.followed = 0
+
+    def join(self, key: Any) -> Tuple[Flight, bool]:
+        """The flight for `key`, and whether the caller leads it.
+
+        A leader must `land` its flight, error or not, or its followers wait
+        forever.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.followers += 1
+                self.followed += 1
+                return flight, False
+            flight = self._flights[key] = Flight(key)
+            self.led += 1
+            return flight, True
+
+    def land(self, flight: Flight, result: Any = None,
+             error: Optional[BaseException] = None) -> None:
+        if error is not None and not isinstance(error, Exception):
+            # The leader was cancelled or interrupted. That is the leader's
+            # own business; its followers get an ordinary failure.
+            error = RuntimeError(f"the shared request was abandoned ({type(error).__name__})")
+        with self._lock:
+            if self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
+        flight.finish(result, error)
+
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+
+class _Publisher(BaseCallbackHandler):
+    """Copies a leader's tokens to its flight as the model streams them."""
+
+    # In order, on the producing thread: an async run would otherwise hand a
+    # sync handler's calls to an executor.
+    run_inline = True
+
+    def __init__(self, flight: Flight):
+        self.flight = flight
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        if token:
+            self.flight.publish(token)
+
+
+def publishing(flight: Flight) -> RunnableConfig:
+    """Config for the leader's model call: the current run's, plus a publisher.
+
+    Passing `callbacks` alone would replace the callbacks inherited from the
+    graph, and with them the leader's own token stream.
+    """
+    return merge_configs(ensure_config(), {"callbacks": [_Publisher(flight)]})
+
+
+class ReplayChat(BaseChatModel):
+    """A chat model that answers with a flight's tokens instead of generating.
+
+    If the leader's model did not stream, the whole answer arrives as one
+    chunk when it lands.
+    """
+
+    flight: Any
+
+    @property
+    def _llm_type(self) -> str:
+        return "single-flight-replay"
+
+    def _remainder(self, sent: str) -> str:
+        content = getattr(self.flight.outcome(), "content", "")
+        return content[len(sent):] if content.startswith(sent) else ""
+
+    def _stream(self, messages: List[BaseMessage], stop=None, run_manager=None,
+                **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        sent = ""
+        for token in self.flight.tokens():
+            sent += token
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+        if rest := self._remainder(sent):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=rest))
+
+    async def _astream(self, messages: List[BaseMessage], stop=None, run_manager=None,
+                       **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        sent = ""
+        async for token in self.flight.atokens():
+            sent += token
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+        # The flight has landed by now, so this does not block.
+        if rest := self._remainder(sent):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=rest))
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None,
+                  **kwargs: Any) -> ChatResult:
+        content = getattr(self.flight.outcome(), "content", "")
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop=None, run_manager=None,
+                         **kwargs: Any) -> ChatResult:
+        async for _ in self.flight.atokens():
+            pass
+        return self._generate(messages)
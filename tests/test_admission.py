@@ -0,0 +1,346 @@
+"""Contract tests for admission control in front of the Ollama daemon.
+
+No daemon: the controller is driven directly, with threads holding its slots
+to build a queue, and the agents and server see a controller pinned to a load
+level. What is pinned is how many calls reach the daemon, how the wait is
+estimated, what each level skips, and that every skip and shed is counted.
+"""
+
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+
+import pytest
+from langchain_core.messages import AIMessage
+
+import src.agents.base_agent as base_agent_module
+from src.models.admission import (
+    CACHED,
+    LEAN,
+    NORMAL,
+    SHED,
+    AdmissionController,
+    Overloaded,
+    admission_for,
+    prometheus_text,
+)
+
+pytestmark = pytest.mark.integration
+
+# 100 tokens generated in 4 s, after 1 s of prompt: a 5 s call at 25 tok/s.
+CALL = {"eval_count": 100, "eval_duration": 4_000_000_000}
+
+
+def controller(max_in_flight=1, **level_after):
+    return AdmissionController("http://test:11434", max_in_flight,
+                               {LEAN: 10.0, CACHED: 30.0, SHED: 90.0, **level_after})
+
+
+@contextmanager
+def queued(ctl, waiting):
+    """Fills every slot, then parks `waiting` threads in the queue behind them."""
+    release = threading.Event()
+
+    def hold():
+        with ctl.slot():
+            release.wait()
+
+    threads = [threading.Thread(target=hold) for _ in range(ctl.max_in_flight + waiting)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while ctl.queue_depth() < waiting and time.monotonic() < deadline:
+        time.sleep(0.005)
+    try:
+        yield
+    finally:
+        release.set()
+        for thread in threads:
+            thread.join()
+
+
+class Pinned(AdmissionController):
+    """A controller held at one load level."""
+
+    def __init__(self, level):
+        super().__init__("http://pinned:11434")
+        self.pinned = level
+
+    def level(self):
+        return self.pinned
+
+    def estimated_wait(self):
+        return {NORMAL: 0.0, LEAN: 15.0, CACHED: 45.0, SHED: 120.0}[self.pinned]
+
+
+def pin(monkeypatch, level):
+    pinned = Pinned(level)
+    monkeypatch.setattr(base_agent_module, "admission_for", lambda host=None: pinned)
+    return pinned
+
+
+# --- slots ------------------------------------------------------------------
+
+def test_no_more_than_max_in_flight_calls_run_at_once():
+    ctl = controller(max_in_flight=2)
+    running, peak, lock = [0], [0], threading.Lock()
+
+    def call():
+        with ctl.slot():
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.02)
+            with lock:
+                running[0] -= 1
+
+    threads = [threading.Thread(target=call) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert peak[0] == 2
+    assert ctl.in_flight() == 0 and ctl.queue_depth() == 0
+
+
+def test_async_waiters_are_served_in_arrival_order():
+    ctl = controller(max_in_flight=1)
+
+    async def main():
+        order = []
+
+        async def call(i):
+            async with ctl.aslot():
+                order.append(i)
+                await asyncio.sleep(0)
+
+        async with ctl.aslot():
+            tasks = [asyncio.create_task(call(i)) for i in range(4)]
+            await asyncio.sleep(0.01)
+            assert ctl.queue_depth() == 4
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(main()) == [0, 1, 2, 3]
+    assert ctl.in_flight() == 0
+
+
+def test_a_cancelled_waiter_gives_up_its_place_without_leaking_a_slot():
+    ctl = controller(max_in_flight=1)
+
+    async def main():
+        async with ctl.aslot():
+            waiter = asyncio.create_task(ctl.aacquire())
+            await asyncio.sleep(0.01)
+            waiter.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiter
+        # The slot is free again: this would hang if the cancelled waiter kept it.
+        await asyncio.wait_for(ctl.aacquire(), 1)
+        ctl.release()
+
+    asyncio.run(main())
+    assert ctl.in_flight() == 0 and ctl.queue_depth() == 0
+
+
+# --- the estimate -----------------------------------------------------------
+
+def test_a_call_is_estimated_from_ollamas_own_token_counts():
+    ctl = controller()
+    ctl.record(5.0, CALL)
+    assert ctl.metrics()["tokens_per_second"] == 25.0
+    assert ctl.call_seconds() == pytest.approx(5.0)
+
+
+def test_without_token_counts_the_wall_time_is_used():
+    ctl = controller()
+    ctl.record(3.0)
+    assert ctl.call_seconds() == pytest.approx(3.0)
+
+
+def test_there_is_no_wait_while_a_slot_is_free():
+    ctl = controller(max_in_flight=2)
+    ctl.record(5.0, CALL)
+    with ctl.slot():
+        assert ctl.estimated_wait() == 0.0
+
+
+def test_the_wait_grows_with_the_queue():
+    ctl = controller(max_in_flight=1)
+    ctl.record(5.0, CALL)
+    with queued(ctl, waiting=2):
+        # Two ahead in the queue and one in flight: three calls' time.
+        assert ctl.estimated_wait() == pytest.approx(15.0)
+        assert ctl.metrics()["queue_depth"] == 2
+
+
+@pytest.mark.parametrize("waiting,level", [(0, NORMAL), (1, LEAN), (5, CACHED), (17, SHED)])
+def test_the_level_follows_the_estimated_wait(waiting, level):
+    ctl = controller(max_in_flight=1)
+    ctl.record(5.0, CALL)
+    with queued(ctl, waiting):
+        assert ctl.level() == level
+
+
+def test_a_turn_past_the_shed_level_is_refused_and_counted():
+    ctl = controller(max_in_flight=1, **{SHED: 9.0})
+    ctl.record(5.0, CALL)
+    with queued(ctl, waiting=1):
+        with pytest.raises(Overloaded) as refused:
+            ctl.admit()
+    assert refused.value.retry_after == pytest.approx(10.0)
+    assert ctl.shed == 1
+    ctl.admit()  # the queue has drained
+
+
+def test_a_burst_of_turns_is_shed_before_it_reaches_the_queue():
+    ctl = controller(max_in_flight=1)
+    ctl.record(5.0, CALL)
+    for _ in range(18):
+        ctl.admit()
+    # Nothing is queued yet, but 17 admitted turns wait behind the first.
+    with pytest.raises(Overloaded):
+        ctl.admit()
+    ctl.turn_finished()
+    ctl.admit()
+    assert (ctl.turns(), ctl.shed) == (18, 1)
+
+
+def test_a_step_is_only_counted_when_it_is_skipped():
+    ctl = controller(max_in_flight=1)
+    ctl.record(5.0, CALL)
+    assert not ctl.degraded_step("scene_extraction")
+    with queued(ctl, waiting=1):
+        assert ctl.degraded_step("scene_extraction")
+        assert not ctl.degraded_step("fresh_answer")  # needs the cached level
+    assert ctl.degraded == {"scene_extraction": 1, "rewrite_retry": 0, "fresh_answer": 0}
+
+
+def test_metrics_render_as_prometheus_text():
+    ctl = controller()
+    ctl.record(5.0, CALL)
+    text = prometheus_text([ctl.metrics()])
+    assert 'dnd_llm_queue_depth{host="http://test:11434"} 0' in text
+    assert 'dnd_llm_shed_total{host="http://test:11434"} 0' in text
+    assert 'dnd_llm_degraded_total{host="http://test:11434",step="rewrite_retry"} 0' in text
+
+
+# --- the model client -------------------------------------------------------
+
+def test_every_model_call_takes_a_slot_and_reports_its_timing(monkeypatch):
+    from src.models.llm import create_llm
+
+    monkeypatch.setenv("OLLAMA_HOST", "http://admission-client-test:11434")
+    llm = create_llm("dungeon_master")
+    ctl = admission_for(llm.base_url)
+    seen = []
+
+    def invoke(self, *args, **kwargs):
+        seen.append(ctl.in_flight())
+        return AIMessage(content="ok", response_metadata=CALL)
+
+    monkeypatch.setattr(type(llm).__mro__[1], "invoke", invoke)
+    llm.invoke("hello")
+
+    assert seen == [1]
+    assert ctl.in_flight() == 0
+    assert ctl.calls == 1 and ctl.metrics()["tokens_per_second"] == 25.0
+
+
+# --- what each level skips --------------------------------------------------
+
+def test_under_load_the_dm_narrates_without_extracting_the_scene(monkeypatch):
+    from tests.test_dungeon_master import make_dm, state
+
+    pinned = pin(monkeypatch, LEAN)
+    dm = make_dm(scene={"location": "the crypt", "items_gained": [], "effects": []})
+    command = dm.process_task(state())
+    asyncio.run(dm.aprocess_task(state()))
+
+    assert command.update["messages"][0].content == "You push open the door."
+    assert "game_state" not in command.update
+    assert dm.extractor.calls == []
+    assert pinned.degraded["scene_extraction"] == 2
+
+
+def test_under_load_a_missed_retrieval_is_not_rewritten(monkeypatch):
+    from tests.test_researcher import doc, make_agent
+
+    pinned = pin(monkeypatch, LEAN)
+    agent, store = make_agent(monkeypatch, [([doc("weak match")], 0.05)])
+    docs, info = agent.retrieve("how does grappling work")
+
+    assert agent.rewriter.calls == 0
+    assert store.queries == ["how does grappling work"]
+    assert info["rewrite_skipped"] is True and docs
+    assert pinned.degraded["rewrite_retry"] == 1
+
+
+def test_deeper_load_serves_a_repeated_question_from_recent_answers(monkeypatch):
+    from tests.test_dungeon_master import StubLLM
+    from tests.test_researcher import doc, make_agent
+
+    agent, _ = make_agent(monkeypatch, [([doc("Grappling rules")], 0.9)])
+    agent.llm = StubLLM(AIMessage(content="Make an Athletics check."))
+    first = agent.process_task({"messages": [], "current_task": "How does grappling work?"})
+
+    pinned = pin(monkeypatch, CACHED)
+    again = asyncio.run(agent.aprocess_task(
+        {"messages": [], "current_task": "how does  grappling work?"}))
+
+    assert len(agent.llm.calls) == 1
+    assert again.update["messages"][0].content == first.update["messages"][0].content
+    assert pinned.degraded["fresh_answer"] == 1
+
+
+def test_a_new_question_is_answered_fresh_even_under_deep_load(monkeypatch):
+    from tests.test_dungeon_master import StubLLM
+    from tests.test_researcher import make_agent
+
+    pinned = pin(monkeypatch, CACHED)
+    agent, _ = make_agent(monkeypatch, [])
+    agent.llm = StubLLM(AIMessage(content="Twelve."))
+    command = agent.process_task({"messages": [], "current_task": "How many hit dice?"})
+
+    assert command.update["messages"][0].content.startswith("Twelve.")
+    assert pinned.degraded["fresh_answer"] == 0
+
+
+# --- the server -------------------------------------------------------------
+
+def test_the_server_sheds_turns_but_still_rolls_written_dice(monkeypatch):
+    pytest.importorskip("aiohttp", reason="aiohttp not installed")
+    from aiohttp.test_utils import TestClient, TestServer
+
+    from src.agents.dice_roller import DiceRollerAgent
+    from src.graph.game_orchestrator import create_game_graph, create_sqlite_checkpointer
+    from src.server.app import create_app
+    from tests.test_graph_smoke import streaming_dm
+
+    streaming_dm(monkeypatch, "The goblin flees.")
+    game_graph = create_game_graph(checkpointer=create_sqlite_checkpointer(":memory:"))
+    pinned = Pinned(SHED)
+
+    async def main():
+        app = create_app(game_graph, DiceRollerAgent(), admission=pinned)
+        async with TestClient(TestServer(app)) as client:
+            refused = await client.post("/sessions/t/turns", json={"text": "I attack"})
+            rolled = await client.post("/sessions/t/turns", json={"text": "roll 1d20"})
+            await rolled.text()
+            async with client.ws_connect("/ws") as ws:
+                await ws.receive_json()
+                await ws.send_json({"text": "I attack"})
+                ws_events = [await ws.receive_json(), await ws.receive_json()]
+            metrics = await (await client.get("/metrics")).text()
+            return (refused.status, refused.headers.get("Retry-After"),
+                    rolled.status, ws_events, metrics)
+
+    status, retry_after, rolled, ws_events, metrics = asyncio.run(main())
+    assert (status, retry_after, rolled) == (503, "120", 200)
+    assert ws_events[0]["type"] == "error" and ws_events[0]["retry_after"] == 120.0
+    assert ws_events[1] == {"type": "done"}
+    assert pinned.shed == 2
+    assert 'dnd_llm_shed_total{host="http://pinned:11434"} 2' in metrics
+    assert "dnd_server_active_turns 0" in metrics
@@ -0,0 +1,243 @@
+"""Contract tests for the researcher's semantic answer cache.
+
+No embedding model: questions are embedded as bags of words, so two questions
+are as similar as their vocabularies and the threshold is easy to reason
+about. What is pinned is when a kept answer is served, that an answer whose
+passages have changed is never served, and that the cache survives a restart
+and can be inspected and purged from the command line.
+"""
+
+import asyncio
+import re
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.messages import AIMessage
+
+import src.agents.researcher as researcher_module
+from src.data.answer_cache import AnswerCache, content_digest, open_answer_cache
+
+pytestmark = pytest.mark.integration
+
+VOCABULARY = ["how", "does", "grappling", "work", "rules", "for", "escape", "a",
+              "grapple", "what", "are", "the", "i", "do", "shove"]
+
+
+class BagOfWords:
+    """Embeddings by word counts over a fixed vocabulary."""
+
+    def __init__(self):
+        self.embedded = []
+
+    def embed_query(self, text):
+        self.embedded.append(text)
+        words = re.findall(r"[a-z]+", text.lower())
+        return [float(words.count(w)) for w in VOCABULARY]
+
+
+class Short(BagOfWords):
+    """A different model: fewer dimensions."""
+
+    def embed_query(self, text):
+        return super().embed_query(text)[:5]
+
+
+def current(passages):
+    return True
+
+
+def cache(tmp_path, threshold=0.8, **kwargs):
+    return AnswerCache(str(tmp_path / "answers.db"), BagOfWords(), threshold=threshold, **kwargs)
+
+
+def keep(store, question, answer="Make an Athletics check.", passages=(("p1", "d1"),)):
+    store.store(question, store.embed(question), answer, list(passages))
+
+
+# --- the cache --------------------------------------------------------------
+
+def test_a_reworded_question_gets_the_kept_answer(tmp_path):
+    store = cache(tmp_path)
+    keep(store, "How does grappling work?")
+    hit = store.lookup(store.embed("how does grappling work"), current)
+    assert hit.answer == "Make an Athletics check."
+    assert hit.passages == [("p1", "d1")] and hit.similarity == pytest.approx(1.0)
+
+
+def test_a_different_question_about_the_same_rule_misses(tmp_path):
+    store = cache(tmp_path)
+    keep(store, "How does grappling work?")
+    assert store.lookup(store.embed("How do I escape a grapple?"), current) is None
+    assert (store.stats()["hits"], store.stats()["misses"]) == (0, 1)
+
+
+def test_an_answer_whose_passages_changed_is_deleted_not_served(tmp_path):
+    store = cache(tmp_path)
+    keep(store, "How does grappling work?")
+    assert store.lookup(store.embed("How does grappling work?"), lambda p: False) is None
+    assert store.stats()["stale"] == 1 and store.entries() == []
+    assert store.lookup(store.embed("How does grappling work?"), current) is None
+
+
+def test_kept_answers_and_counters_survive_a_restart(tmp_path):
+    store = cache(tmp_path)
+    keep(store, "How does grappling work?")
+    store.lookup(store.embed("How does grappling work?"), current)
+    store.close()
+
+    reopened = cache(tmp_path)
+    assert reopened.lookup(reopened.embed("how does grappling work"), current) is not None
+    stats = reopened.stats()
+    assert (stats["entries"], stats["lookups"], stats["hits"], stats["hit_rate"]) == (1, 2, 2, 1.0)
+
+
+def test_the_least_recently_used_answer_is_evicted(tmp_path):
+    store = cache(tmp_path, max_entries=2)
+    keep(store, "How does grappling work?")
+    keep(store, "How do I escape a grapple?")
+    store.lookup(store.embed("How does grappling work?"), current)
+    keep(store, "How does shove work?")
+
+    assert [e["question"] for e in store.entries()] == [
+        "How does grappling work?", "How does shove work?"]
+
+
+def test_answers_from_another_embedding_model_are_dropped(tmp_path):
+    keep(cache(tmp_path), "How does grappling work?")
+    store = AnswerCache(str(tmp_path / "answers.db"), Short(), threshold=0.8)
+    assert store.lookup(store.embed("How does grappling work?"), current) is None
+    keep(store, "How does shove work?")
+    assert [e["question"] for e in store.entries()] == ["How does shove work?"]
+
+
+def test_purge_by_question_text_and_by_staleness(tmp_path):
+    store = cache(tmp_path)
+    keep(store, "How does grappling work?", passages=[("p1", "old")])
+    keep(store, "How do I escape a grapple?", passages=[("p2", "d2")])
+    keep(store, "How does shove work?", passages=[("p3", "d3")])
+
+    assert store.purge(matching="ESCAPE") == 1
+    assert store.purge(stale=lambda passages: passages[0][1] != "old") == 1
+    assert [e["question"] for e in store.entries()] == ["How does shove work?"]
+    assert store.purge() == 1 and store.stats()["entries"] == 0
+
+
+def test_the_cache_is_off_without_an_index_or_when_disabled(tmp_path, monkeypatch):
+    assert open_answer_cache(None, str(tmp_path / "a.db")) is None
+    monkeypatch.setenv("DND_ANSWER_CACHE", "0")
+    assert open_answer_cache(BagOfWords(), str(tmp_path / "a.db")) is None
+
+
+# --- the researcher ---------------------------------------------------------
+
+class IndexedStore:
+    """A vector store whose passages have ids, and that can be asked for them."""
+
+    def __init__(self, docs):
+        self.embeddings = BagOfWords()
+        self.docs = {d.id: d for d in docs}
+        self.searches = 0
+
+    def similarity_search_with_relevance_scores(self, query, k=4):
+        self.embeddings.embed_query(query)
+        return self.similarity_search_by_vector_with_relevance_scores(None, k)
+
+    def similarity_search_by_vector_with_relevance_scores(self, vector, k=4):
+        self.searches += 1
+        return [(d, 0.1) for d in self.docs.values()]
+
+    def _select_relevance_score_fn(self):
+        return lambda distance: 1.0 - distance
+
+    def as_retriever(self, **kwargs):
+        return self
+
+    def get(self, ids, include=()):
+        found = [i for i in ids if i in self.docs]
+        return {"ids": found, "documents": [self.docs[i].page_content for i in found]}
+
+
+def make_researcher(monkeypatch, tmp_path):
+    from tests.test_dungeon_master import StubLLM
+
+    monkeypatch.setenv("DND_ANSWER_CACHE_DB", str(tmp_path / "answers.db"))
+    monkeypatch.setenv("DND_ANSWER_CACHE_THRESHOLD", "0.8")
+    rules = Document(id="phb-195", page_content="Grappling: make an Athletics check.",
+                     metadata={"book": "Player's Handbook", "page_number": 195})
+    store = IndexedStore([rules])
+    monkeypatch.setattr(researcher_module, "load_vectorstore", lambda: store)
+    agent = researcher_module.ResearcherAgent()
+    agent.llm = StubLLM(AIMessage(content="Make an Athletics check."))
+    return agent, store
+
+
+def ask(agent, question):
+    return agent.process_task({"messages": [], "current_task": question})
+
+
+def test_a_reworded_question_is_answered_from_the_cache_with_its_sources(monkeypatch, tmp_path):
+    agent, store = make_researcher(monkeypatch, tmp_path)
+    first = ask(agent, "How does grappling work?").update["messages"][0].content
+    again = asyncio.run(agent.aprocess_task(
+        {"messages": [], "current_task": "how does grappling work"}))
+
+    assert len(agent.llm.calls) == 1 and store.searches == 1
+    assert again.update["messages"][0].content == first
+    assert "Passages consulted" in first
+    assert agent.answer_cache.stats()["hits"] == 1
+
+
+def test_a_cache_miss_searches_with_the_vector_it_already_has(monkeypatch, tmp_path):
+    agent, store = make_researcher(monkeypatch, tmp_path)
+    ask(agent, "How does grappling work?")
+    assert store.embeddings.embedded == ["How does grappling work?"]
+
+
+def test_passages_are_checked_outside_the_cache_lock(tmp_path):
+    store = cache(tmp_path)
+    keep(store, "How does grappling work?")
+
+    def unlocked(passages):
+        assert not store._lock.locked()
+        return True
+
+    assert store.lookup(store.embed("how does grappling work"), unlocked) is not None
+
+
+def test_a_changed_passage_sends_the_question_back_to_the_model(monkeypatch, tmp_path):
+    agent, store = make_researcher(monkeypatch, tmp_path)
+    ask(agent, "How does grappling work?")
+    store.docs["phb-195"].page_content = "Grappling (errata): make an Athletics check."
+    ask(agent, "how does grappling work")
+
+    assert len(agent.llm.calls) == 2
+    kept = agent.answer_cache.entries()
+    assert [p for _, p in kept[0]["passages"]] == [
+        content_digest("Grappling (errata): make an Athletics check.")]
+
+
+# --- the command line -------------------------------------------------------
+
+def run_cli(monkeypatch, capsys, *argv):
+    import sys
+
+    from scripts.answer_cache import main
+
+    monkeypatch.setattr(sys, "argv", ["answer_cache.py", *argv])
+    assert main() == 0
+    return capsys.readouterr().out
+
+
+def test_the_command_line_reports_and_purges(monkeypatch, capsys, tmp_path):
+    db = str(tmp_path / "answers.db")
+    store = AnswerCache(db, BagOfWords(), threshold=0.8)
+    keep(store, "How does grappling work?")
+    keep(store, "How does shove work?")
+    store.lookup(store.embed("how does grappling work"), current)
+    store.close()
+
+    assert "2 entries" in run_cli(monkeypatch, capsys, "--db", db, "stats")
+    assert "How does shove work?" in run_cli(monkeypatch, capsys, "--db", db, "list")
+    assert "purged 1 entries; 1 left" in run_cli(
+        monkeypatch, capsys, "--db", db, "purge", "--matching", "shove")
+    assert "hit rate 100.0%" in run_cli(monkeypatch, capsys, "--db", db, "stats")
@@ -0,0 +1,124 @@
+"""Contract tests for archiving cold messages out of the live state.
+
+The live channel stays bounded however long the campaign runs, and the archive
+followed by the live channel is always the whole campaign, in order.
+"""
+
+import pytest
+
+pytestmark = pytest.mark.integration
+
+pytest.importorskip("langgraph.checkpoint.sqlite", reason="full dependency stack not installed")
+
+from langchain_core.messages import HumanMessage  # noqa: E402
+
+from src.agents.dice_roller import DiceRollerAgent  # noqa: E402
+from src.graph.archive import MessageArchive, archive_cold_messages  # noqa: E402
+from src.graph.game_orchestrator import (  # noqa: E402
+    create_game_graph,
+    create_sqlite_checkpointer,
+    run_fast_dice_turn,
+)
+from src.graph.retention import RetentionPolicy, compact  # noqa: E402
+
+CONFIG = {"configurable": {"thread_id": "long-campaign"}}
+HORIZON, BATCH = 4, 6
+
+
+def session(saver):
+    return create_game_graph(checkpointer=saver), DiceRollerAgent(), MessageArchive(saver)
+
+
+def play(game_graph, dice_roller, archive, turns, config=CONFIG):
+    """Written-out rolls: two messages a turn, no model needed."""
+    for i in range(turns):
+        text = f"roll 1d{i + 2}"
+        turn = {"messages": [HumanMessage(content=text)], "current_task": text}
+        assert run_fast_dice_turn(game_graph, dice_roller, turn, config) is not None
+        archive_cold_messages(game_graph, archive, config, HORIZON, BATCH)
+
+
+def live(game_graph, config=CONFIG):
+    return game_graph.get_state(config).values["messages"]
+
+
+@pytest.fixture
+def saver():
+    return create_sqlite_checkpointer(":memory:")
+
+
+def test_the_live_channel_stays_bounded(saver):
+    game_graph, dice_roller, archive = session(saver)
+    play(game_graph, dice_roller, archive, 30)
+    assert len(live(game_graph)) < HORIZON + BATCH
+    assert archive.count(CONFIG) + len(live(game_graph)) == 60
+
+
+def test_the_transcript_is_the_whole_campaign_in_order(saver):
+    game_graph, dice_roller, archive = session(saver)
+    play(game_graph, dice_roller, archive, 30)
+    players = [m.content for m in archive.transcript(CONFIG) if isinstance(m, HumanMessage)]
+    assert players == [f"roll 1d{i + 2}" for i in range(30)]
+
+
+def test_fetch_reads_a_slice_by_transcript_position(saver):
+    game_graph, dice_roller, archive = session(saver)
+    play(game_graph, dice_roller, archive, 30)
+    assert [m.content for m in archive.fetch(CONFIG, 2, 4)][0] == "roll 1d3"
+    assert len(archive.fetch(CONFIG, 2, 4)) == 2
+
+
+def test_nothing_moves_below_the_horizon_plus_the_batch(saver):
+    game_graph, dice_roller, archive = session(saver)
+    play(game_graph, dice_roller, archive, (HORIZON + BATCH) // 2 - 1)
+    assert archive.count(CONFIG) == 0
+
+
+def test_a_turn_below_the_threshold_loads_no_messages(saver, monkeypatch):
+    game_graph, dice_roller, archive = session(saver)
+    play(game_graph, dice_roller, archive, 2)
+    monkeypatch.setattr(game_graph, "get_state",
+                        lambda *a, **k: pytest.fail("the whole state was read"))
+    assert saver.count_messages(CONFIG) == 4
+    assert archive_cold_messages(game_graph, archive, CONFIG, HORIZON, BATCH) == 0
+
+
+def test_a_zero_horizon_turns_archiving_off(saver):
+    game_graph, dice_roller, archive = session(saver)
+    play(game_graph, dice_roller, archive, 10)
+    before = len(live(game_graph))
+    assert archive_cold_messages(game_graph, archive, CONFIG, horizon=0) == 0
+    assert len(live(game_graph)) == before
+
+
+def test_archiving_the_same_messages_twice_stores_them_once(saver):
+    game_graph, dice_roller, archive = session(saver)
+    play(game_graph, dice_roller, archive, 4)
+    messages = live(game_graph)
+    assert archive.append(CONFIG, messages[:3]) == 3
+    assert archive.append(CONFIG, messages[:5]) == 2
+    assert [m.id for m in archive.fetch(CONFIG)] == [m.id for m in messages[:5]]
+
+
+def test_pruning_checkpoints_keeps_archived_messages(saver):
+    game_graph, dice_roller, archive = session(saver)
+    play(game_graph, dice_roller, archive, 30)
+    compact(saver, RetentionPolicy(keep_last=1))
+    assert len(archive.transcript(CONFIG)) == 60
+
+
+def test_the_saver_lets_go_of_archived_messages(saver):
+    game_graph, dice_roller, archive = session(saver)
+    play(game_graph, dice_roller, archive, 30)
+    key = ("long-campaign", "")
+    assert len(saver._logged[key]) < HORIZON + BATCH
+
+
+def test_a_sharded_archive_lives_in_the_thread_shard(tmp_path):
+    saver = create_sqlite_checkpointer(str(tmp_path / "game.db"), readers=0, shards=4)
+    game_graph, dice_roller, archive = session(saver)
+    play(game_graph, dice_roller, archive, 12)
+    shard = saver.shard_for(CONFIG)
+    rows = shard.conn.execute("SELECT COUNT(*) FROM message_archive").fetchone()[0]
+    assert rows == archive.count(CONFIG) > 0
+    assert len(archive.transcript(CONFIG)) == 24
@@ -0,0 +1,82 @@
+"""Contract tests for the compressing checkpoint serializer."""
+
+import sqlite3
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+pytestmark = pytest.mark.integration
+
+pytest.importorskip("langgraph.checkpoint.sqlite", reason="full dependency stack not installed")
+
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer  # noqa: E402
+
+from src.graph.compressed_serde import (  # noqa: E402
+    CURRENT_VERSION,
+    ENV_COMPRESS,
+    ZDICT_SIZE,
+    CompressingSerializer,
+    load_zdict,
+)
+from src.graph.message_log import MessageLogSaver  # noqa: E402
+from tests.test_message_log import THREAD, campaign  # noqa: E402
+
+NARRATION = AIMessage(
+    content="Torchlight gutters across wet stone; the passage forks ahead. To the left "
+            "you hear water dripping, and to the right a low growl. What do you do?",
+    name="dungeon_master", id="b8a7e0c2-5f0e-4d8e-9a51-0c3f4e2d1a77",
+)
+
+
+def test_a_message_round_trips_smaller():
+    serde = CompressingSerializer(compress=True)
+    type_, blob = serde.dumps_typed(NARRATION)
+    plain = JsonPlusSerializer().dumps_typed(NARRATION)[1]
+    assert type_ == f"msgpack+z{CURRENT_VERSION}"
+    assert len(blob) < len(plain) * 0.6
+    restored = serde.loads_typed((type_, blob))
+    assert (restored.content, restored.name, restored.id) == (
+        NARRATION.content, NARRATION.name, NARRATION.id)
+
+
+def test_a_blob_under_the_threshold_is_stored_plain():
+    serde = CompressingSerializer(compress=True, min_bytes=10_000)
+    assert serde.dumps_typed(NARRATION) == JsonPlusSerializer().dumps_typed(NARRATION)
+
+
+def test_turning_it_off_writes_plain_but_still_reads_compressed(monkeypatch):
+    compressed = CompressingSerializer(compress=True).dumps_typed(NARRATION)
+    monkeypatch.setenv(ENV_COMPRESS, "off")
+    serde = CompressingSerializer()
+    assert serde.dumps_typed(NARRATION)[0] == "msgpack"
+    assert serde.loads_typed(compressed).content == NARRATION.content
+
+
+def test_blobs_written_before_compression_still_load():
+    old = JsonPlusSerializer().dumps_typed(HumanMessage(content="I open the door."))
+    assert CompressingSerializer(compress=True).loads_typed(old).content == "I open the door."
+
+
+def test_an_unknown_format_is_an_error_not_garbage():
+    serde = CompressingSerializer(compress=True)
+    _, blob = serde.dumps_typed(NARRATION)
+    with pytest.raises(ValueError):
+        serde.loads_typed(("msgpack+z999", blob))
+    with pytest.raises(ValueError):
+        serde.loads_typed(("msgpack+lz4", blob))
+
+
+def test_the_dictionary_fits_the_zlib_window():
+    assert 0 < len(load_zdict(CURRENT_VERSION)) <= ZDICT_SIZE
+
+
+def test_a_plain_database_resumes_under_a_compressing_saver():
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    _, messages = campaign(MessageLogSaver(conn, serde=JsonPlusSerializer()), 5)
+    restored = MessageLogSaver(conn).get_tuple(THREAD).checkpoint["channel_values"]["messages"]
+    assert [m.content for m in restored] == [m.content for m in messages]
+    # New rows beside the old ones are compressed, and the mix reads back.
+    campaign(MessageLogSaver(conn), 6)
+    types = {t for (t,) in conn.execute("SELECT DISTINCT type FROM message_log")}
+    assert types == {"msgpack", f"msgpack+z{CURRENT_VERSION}"}
+    assert len(MessageLogSaver(conn).get_tuple(THREAD).checkpoint["channel_values"]["messages"]) == 12
@@ -0,0 +1,135 @@
+"""Contract tests for compressing retrieved passages to the question's sentences.
+
+No embedding model: sentences are embedded as bags of words over a small
+vocabulary, so a sentence is as close to the question as the words they
+share. What is pinned is how passages are split, that the best sentences win
+the budget, and that every kept sentence still carries its passage's heading
+and citation.
+"""
+
+import re
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.messages import AIMessage
+
+import src.agents.researcher as researcher_module
+from src.pipelines.compressor import compress_passages, split_units
+
+pytestmark = pytest.mark.integration
+
+VOCABULARY = ["armor", "class", "goblin", "hit", "points", "speed", "stealth",
+              "nimble", "escape", "scimitar", "grapple", "athletics", "check"]
+
+GOBLIN = """# Goblin
+Small humanoid (goblinoid), neutral evil
+Armor Class 15 (leather armor, shield)
+Hit Points 7 (2d6)
+Speed 30 ft.
+Skills Stealth +6
+Nimble Escape. The goblin can take the Disengage or Hide action as a bonus action on each of its turns.
+Scimitar. Melee Weapon Attack: +4 to hit, reach 5 ft., one target. Hit: 5 (1d6 + 2) slashing damage."""
+
+GRAPPLING = """# Making an Attack
+When you want to grab a creature, you can use the Attack action to make a special melee attack, a grapple. Using at least one free hand, you try to seize the target by making a grapple check, an Athletics check contested by the target's Athletics or Acrobatics check. If you succeed, you subject the target to the grappled condition."""
+
+
+class BagOfWords:
+    def __init__(self):
+        self.batches = []
+
+    def _embed(self, text):
+        words = re.findall(r"[a-z]+", text.lower())
+        return [float(words.count(w)) for w in VOCABULARY]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+    def embed_documents(self, texts):
+        self.batches.append(len(texts))
+        return [self._embed(t) for t in texts]
+
+
+def passage(text, name, category="Monsters"):
+    return Document(id=name.lower(), page_content=text,
+                    metadata={"source": "SRD 5.1", "category": category, "name": name})
+
+
+def test_a_stat_block_splits_by_line_and_prose_by_sentence():
+    heading, units = split_units(GOBLIN)
+    assert heading == "# Goblin"
+    assert units[1] == "Armor Class 15 (leather armor, shield)"
+    assert "Nimble Escape." in units and "Melee Weapon Attack: +4 to hit, reach 5 ft., one target." in units
+
+    _, prose = split_units(GRAPPLING)
+    assert len(prose) == 3 and prose[0].startswith("When you want to grab")
+
+
+def test_the_sentences_most_like_the_question_are_kept_in_their_order():
+    embeddings = BagOfWords()
+    docs = [passage(GOBLIN, "Goblin"), passage(GRAPPLING, "Making an Attack", "Rules")]
+
+    kept = compress_passages("What is a goblin's armor class and hit points?", docs,
+                             embeddings, budget=15)
+
+    assert [d.metadata["name"] for d in kept] == ["Goblin"]
+    assert kept[0].page_content.splitlines() == [
+        "# Goblin", "Armor Class 15 (leather armor, shield)", "Hit Points 7 (2d6)"]
+    assert kept[0].id == "goblin" and kept[0].metadata == docs[0].metadata
+    assert embeddings.batches == [len(split_units(GOBLIN)[1]) + 3]  # one batch
+
+
+def test_passages_that_already_fit_are_not_embedded():
+    embeddings = BagOfWords()
+    docs = [passage(GOBLIN, "Goblin")]
+    assert compress_passages("goblin", docs, embeddings, budget=1000) is docs
+    assert embeddings.batches == []
+
+
+# --- the researcher ---------------------------------------------------------
+
+class Store:
+    embeddings = BagOfWords()
+
+    def __init__(self, docs):
+        self.docs = docs
+
+    def similarity_search_with_relevance_scores(self, query, k=4):
+        return [(d, 0.5) for d in self.docs]
+
+    def as_retriever(self, **kwargs):
+        return self
+
+
+def make_researcher(monkeypatch, budget="15"):
+    from tests.test_dungeon_master import StubLLM
+
+    monkeypatch.setenv("DND_ANSWER_CACHE", "0")
+    monkeypatch.setenv("DND_COMPRESS_BUDGET", budget)
+    store = Store([passage(GOBLIN, "Goblin"), passage(GRAPPLING, "Making an Attack", "Rules")])
+    monkeypatch.setattr(researcher_module, "load_vectorstore", lambda: store)
+    agent = researcher_module.ResearcherAgent()
+    agent.llm = StubLLM(AIMessage(content="Fifteen."))
+    return agent
+
+
+def prompt_of(agent):
+    return "\n".join(m.content for m in agent.llm.calls[0].to_messages())
+
+
+def test_the_prompt_gets_the_compressed_passages_under_their_citations(monkeypatch):
+    agent = make_researcher(monkeypatch)
+    command = agent.process_task({"messages": [],
+                                  "current_task": "What is a goblin's armor class and hit points?"})
+
+    prompt = prompt_of(agent)
+    assert "[SRD 5.1, Monsters: Goblin]\n# Goblin\nArmor Class 15" in prompt
+    assert "Scimitar" not in prompt and "grapple check" not in prompt
+    answer = command.update["messages"][0].content
+    assert "SRD 5.1, Monsters: Goblin" in answer and "Making an Attack" not in answer
+
+
+def test_a_zero_budget_sends_passages_whole(monkeypatch):
+    agent = make_researcher(monkeypatch, budget="0")
+    agent.process_task({"messages": [], "current_task": "What is a goblin's armor class?"})
+    assert "Scimitar" in prompt_of(agent) and "grapple check" in prompt_of(agent)
@@ -0,0 +1,119 @@
+"""Contract tests for assembling retrieved pieces of an entry into one passage.
+
+Pieces are built by hand the way the SRD loader heads them. What is pinned is
+that an entry's heading and the splitter's overlap reach the prompt once, that
+the order of entries survives, that a piece widened to its whole entry stays
+inside the turn's budget, and that documents without ordinals are left alone.
+"""
+
+import pytest
+from langchain_core.documents import Document
+
+from src.pipelines.context import (
+    assemble_passages,
+    entry_key,
+    expand_to_entries,
+    join_overlapping,
+)
+
+pytestmark = pytest.mark.integration
+
+FIRST = ("When you want to grab a creature, you can use the Attack action to make "
+         "a special melee attack, a grapple.")
+SECOND = ("a special melee attack, a grapple. Using at least one free hand, you try "
+          "to seize the target by making a grapple check.")
+FOURTH = "You can use the Attack action to make a special melee attack to shove a creature."
+
+
+def piece(name, index, body, category="Rules"):
+    return Document(id=f"{name}-{index}", page_content=f"# {name}\n{body}",
+                    metadata={"source": "SRD 5.1", "category": category,
+                              "name": name, "chunk_index": index})
+
+
+def test_overlapping_text_is_kept_once():
+    joined = join_overlapping(FIRST, SECOND)
+    assert joined.count("a special melee attack, a grapple.") == 1
+    assert joined.startswith("When you want") and joined.endswith("grapple check.")
+
+
+def test_text_that_does_not_overlap_is_joined_on_a_new_line():
+    assert join_overlapping("Cover.", "Half cover.") == "Cover.\nHalf cover."
+
+
+def test_neighbouring_pieces_become_one_passage_under_one_heading():
+    second, first = piece("Making an Attack", 1, SECOND), piece("Making an Attack", 0, FIRST)
+    [merged] = assemble_passages([second, first])
+
+    assert merged.page_content.count("# Making an Attack") == 1
+    assert merged.page_content == f"# Making an Attack\n{join_overlapping(FIRST, SECOND)}"
+    assert merged.metadata["chunks"] == [0, 1] and merged.id == "Making an Attack-0"
+
+
+def test_pieces_with_a_gap_are_joined_with_an_ellipsis():
+    [merged] = assemble_passages([piece("Making an Attack", 0, FIRST),
+                                  piece("Making an Attack", 3, FOURTH)])
+    assert merged.page_content == f"# Making an Attack\n{FIRST}\n…\n{FOURTH}"
+
+
+def test_entries_keep_the_order_of_their_best_piece():
+    cover = piece("Cover", 0, "Walls, trees, creatures, and other obstacles can provide cover.")
+    pdf = Document(page_content="Grappling, p. 195", metadata={"book": "Player's Handbook"})
+    docs = [piece("Making an Attack", 1, SECOND), cover, pdf,
+            piece("Making an Attack", 0, FIRST), piece("Making an Attack", 1, SECOND)]
+
+    assembled = assemble_passages(docs)
+
+    assert [d.metadata.get("name") for d in assembled] == ["Making an Attack", "Cover", None]
+    assert assembled[1] is cover and assembled[2] is pdf
+    assert assembled[0].metadata["chunks"] == [0, 1]
+
+
+def test_an_index_without_ordinals_is_passed_through():
+    old = Document(page_content="# Cover\nHalf cover.",
+                   metadata={"source": "SRD 5.1", "category": "Rules", "name": "Cover"})
+    assert entry_key(old) is None
+    assert assemble_passages([old, old]) == [old, old]
+
+
+# --- whole entries ------------------------------------------------------------
+
+DRAGON = "\n".join(["# Adult Red Dragon", "Huge dragon, chaotic evil", "Armor Class 19",
+                    "Actions", "Multiattack. The dragon makes three attacks.",
+                    "Legendary Actions", "Tail Attack. The dragon makes a tail attack."])
+
+
+def dragon_piece(index, body):
+    doc = piece("Adult Red Dragon", index, body, category="Monsters")
+    doc.metadata["entry_id"] = "dragon"
+    return doc
+
+
+def test_a_matched_piece_is_widened_to_its_entry():
+    matched = dragon_piece(0, "Huge dragon, chaotic evil\nArmor Class 19")
+    [whole] = expand_to_entries([matched], {"dragon": DRAGON}, budget=1000)
+
+    assert whole.page_content == DRAGON and whole.metadata["expanded"] is True
+    assert whole.id == matched.id and whole.metadata["name"] == "Adult Red Dragon"
+
+
+def test_an_entry_over_the_budget_is_cut_from_where_the_match_starts():
+    matched = dragon_piece(2, "Multiattack. The dragon makes three attacks.")
+    [cut] = expand_to_entries([matched], {"dragon": DRAGON}, budget=28)
+
+    assert cut.page_content == ("# Adult Red Dragon\nMultiattack. The dragon makes three "
+                                "attacks.\nLegendary Actions")
+    assert len(cut.page_content) // 4 <= 28
+
+
+def test_the_budget_is_shared_and_a_spent_one_sends_the_piece():
+    matched = dragon_piece(0, "Huge dragon, chaotic evil")
+    first = piece("Making an Attack", 0, FIRST * 4)
+    kept = expand_to_entries([first, matched], {"dragon": DRAGON}, budget=100)
+
+    assert kept[0] is first and kept[1] is matched
+
+
+def test_documents_the_store_does_not_have_pass_through():
+    old = piece("Cover", 0, "Half cover.")
+    assert expand_to_entries([old], {}, budget=1000) == [old]
@@ -5,6 +5,7 @@ makes these tests possible without a daemon — the parser is stubbed, and the
 arithmetic underneath is real.
 """
 
+import asyncio
 import re
 
 import pytest
@@ -15,6 +16,7 @@ from src.agents.dice_roller import (
     DiceRollerAgent,
     extract_dice_expression,
     extract_roll_flags,
+    roll_literal_request,
 )
 
 pytestmark = pytest.mark.integration  # constructing the agent imports the stack
@@ -31,6 +33,9 @@ class StubParser:
             raise self.result
         return self.result
 
+    async def ainvoke(self, *args, **kwargs):
+        return self.invoke(*args, **kwargs)
+
 
 def make_agent(parsed):
     agent = DiceRollerAgent()
@@ -179,6 +184,15 @@ def test_the_model_is_consulted_only_when_no_dice_are_named():
     assert 1 <= total_of(result) <= 20
 
 
+def test_the_async_path_parses_and_rolls_the_same_way():
+    agent = make_agent(parsed("1d20", description="initiative"))
+    written = asyncio.run(agent.aprocess_task(state("roll 2d6+3")))
+    asked = asyncio.run(agent.aprocess_task(state("roll for initiative")))
+    assert len(agent.parser.calls) == 1
+    assert 5 <= total_of(written.update["messages"][0].content) <= 15
+    assert 1 <= total_of(asked.update["messages"][0].content) <= 20
+
+
 @pytest.mark.parametrize("invented", [
     {"dice_notation": "1d20", "modifier": 2},    # in the modifier field
     {"dice_notation": "1d20+2", "modifier": 0},  # folded into the notation
@@ -281,6 +295,8 @@ def test_parse_errors_are_raised_not_swallowed():
     agent = make_agent({"dice_notation": "nonsense", "modifier": 0})
     with pytest.raises(DiceParseError):
         agent._parse_dice_request("roll something")
+    with pytest.raises(DiceParseError):
+        asyncio.run(agent._aparse_dice_request("roll something"))
 
 
 def test_the_node_always_returns_a_command_with_a_message():
@@ -291,3 +307,52 @@ def test_the_node_always_returns_a_command_with_a_message():
         assert isinstance(message, AIMessage)
         assert message.name == "dice_roller"
         assert message.content.strip()
+
+
+# --- multi-intent turns -----------------------------------------------------
+
+def test_a_literal_request_rolls_without_the_parser():
+    result, details = roll_literal_request("roll 1d20+5 to hit")
+    assert details["dice_notation"] == "1d20"
+    assert details["modifier"] == 5
+    assert 6 <= total_of(result) <= 25
+
+
+def test_a_literal_request_without_notation_is_an_error():
+    with pytest.raises(DiceParseError):
+        roll_literal_request("roll for initiative")
+
+
+def test_a_pre_rolled_turn_reports_the_roll_it_was_given():
+    """The supervisor rolled when it split the turn. Rolling again would show
+    the player a different number from the one the narration describes."""
+    agent = make_agent(RuntimeError("the parser must not be called"))
+    result, details = roll_literal_request("roll 1d20+5")
+    command = agent.process_task({
+        **state("roll 1d20+5"),
+        "turn_roll": {"request": "roll 1d20+5", "result": result, "dice_roll": details},
+    })
+
+    assert command.update["messages"][0].content == result
+    assert agent.parser.calls == []
+
+
+def test_a_pre_rolled_turn_leaves_last_response_to_the_narration():
+    """Both branches finish in the same step; two writes to `last_response`
+    there would be a graph error."""
+    result, details = roll_literal_request("roll 1d20")
+    command = make_agent(None).process_task({
+        **state("roll 1d20"),
+        "turn_roll": {"request": "roll 1d20", "result": result, "dice_roll": details},
+    })
+    assert "last_response" not in command.update
+
+
+def test_a_roll_outside_the_graph_returns_the_nodes_update():
+    agent = make_agent(RuntimeError("the parser must not be called"))
+    update = agent.roll_outside_graph("roll 2d6+3")
+
+    message = update["messages"][0]
+    assert message.name == "dice_roller"
+    assert update["last_response"] == message.content
+    assert 5 <= total_of(message.content) <= 15
@@ -5,6 +5,8 @@ stubs. What is pinned here is what the agent does with a given model output —
 context assembly, world-state merging, termination, and failure handling.
 """
 
+import asyncio
+
 import pytest
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 
@@ -24,6 +26,9 @@ class StubLLM:
             raise self.result
         return self.result
 
+    async def ainvoke(self, *args, **kwargs):
+        return self.invoke(*args, **kwargs)
+
 
 def make_dm(narration="You push open the door.", scene=None):
     dm = DungeonMaster()
@@ -48,6 +53,18 @@ def state(task="I open the door", messages=None, world=None):
 
 # --- the basic contract -----------------------------------------------------
 
+def test_the_async_path_narrates_and_extracts_like_the_sync_one():
+    scene = {"location": "the crypt", "items_gained": ["a key"], "effects": []}
+    sync, async_ = make_dm(scene=scene), make_dm(scene=scene)
+    expected = sync.process_task(state())
+    command = asyncio.run(async_.aprocess_task(state()))
+
+    assert command.update["messages"][0].content == expected.update["messages"][0].content
+    assert command.update["game_state"] == expected.update["game_state"]
+    assert async_.llm.calls == sync.llm.calls
+
+
+
 def test_narration_is_returned_as_a_named_message():
     dm = make_dm("You push open the door.")
     command = dm.process_task(state())
@@ -137,6 +154,17 @@ def test_no_briefing_when_nothing_is_established():
     assert "Established so far" not in dm.llm.calls[0][0].content
 
 
+def test_a_roll_made_with_the_action_is_put_in_front_of_the_model():
+    dm = make_dm()
+    dm.process_task({
+        **state("I swing at the goblin"),
+        "turn_roll": {"result": "🎲 Rolled 1d20+5: **17**\nRolls: [12]", "dice_roll": {}},
+    })
+    system = dm.llm.calls[0][0].content
+    assert "already rolled for this action: 🎲 Rolled 1d20+5: **17**." in system
+    assert "Rolls: [12]" not in system
+
+
 # --- world state ------------------------------------------------------------
 
 def test_scene_updates_are_folded_into_game_state():
@@ -0,0 +1,225 @@
+"""Contract tests for micro-batched embeddings and the shared embedding service.
+
+No sentence-transformers: the model is a fake that records the size of every
+batch it is given, and is held at a gate where a test needs queries to pile
+up behind a batch in progress. What is pinned is that concurrent queries share
+forward passes, that a batch never exceeds its cap, that a failure reaches
+every query in the batch, and that separate clients of one socket are batched
+together by one model.
+"""
+
+import asyncio
+import functools
+import socket
+import threading
+import time
+
+import pytest
+
+import src.data.vectorstore as vectorstore_module
+from src.data.embedding_service import (
+    BatchedEmbeddings,
+    EmbeddingBatcher,
+    EmbeddingServer,
+    EmbeddingServiceError,
+    RemoteEmbeddings,
+)
+
+pytestmark = pytest.mark.integration
+
+
+class CountingModel:
+    """Embeds a text as [len(text), 1.0]. Records every batch's size."""
+
+    def __init__(self, gate=None, error=None):
+        self.batches = []
+        self.gate = gate
+        self.error = error
+
+    def embed_documents(self, texts):
+        self.batches.append(len(texts))
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.error is not None:
+            raise self.error
+        return [[float(len(t)), 1.0] for t in texts]
+
+
+def concurrently(fn, args):
+    results = {}
+    threads = [threading.Thread(target=lambda i=i, a=a: results.__setitem__(i, fn(a)))
+               for i, a in enumerate(args)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return [results[i] for i in range(len(args))]
+
+
+def test_concurrent_queries_share_one_forward_pass():
+    model = CountingModel()
+    embeddings = BatchedEmbeddings(model, max_batch=8, max_wait_ms=1000)
+    texts = [f"question {'x' * i}" for i in range(8)]
+
+    vectors = concurrently(embeddings.embed_query, texts)
+
+    assert model.batches == [8]
+    assert vectors == [[float(len(t)), 1.0] for t in texts]
+
+
+def test_queries_that_queue_behind_a_batch_go_in_the_next_one():
+    gate = threading.Event()
+    model = CountingModel(gate=gate)
+    batcher = EmbeddingBatcher(model.embed_documents, max_batch=4, max_wait_ms=0)
+
+    first = batcher.submit("first")
+    while not model.batches:
+        time.sleep(0.001)
+    rest = [batcher.submit(f"q{i}") for i in range(6)]
+    gate.set()
+
+    assert first.result(5) == [5.0, 1.0]
+    assert [f.result(5) for f in rest] == [[2.0, 1.0]] * 6
+    assert model.batches == [1, 4, 2]
+    assert batcher.metrics()["largest_batch"] == 4
+
+
+def test_a_lone_query_waits_no_longer_than_max_wait():
+    embeddings = BatchedEmbeddings(CountingModel(), max_batch=32, max_wait_ms=20)
+    started = time.monotonic()
+    embeddings.embed_query("alone")
+    assert time.monotonic() - started < 0.5
+
+
+def test_a_failed_batch_fails_every_query_in_it():
+    model = CountingModel(error=RuntimeError("out of memory"))
+    embeddings = BatchedEmbeddings(model, max_batch=4, max_wait_ms=500)
+
+    def embed(text):
+        try:
+            return embeddings.embed_query(text)
+        except RuntimeError as exc:
+            return str(exc)
+
+    assert concurrently(embed, ["a", "b", "c", "d"]) == ["out of memory"] * 4
+    assert model.batches == [4]
+
+
+def test_async_queries_are_batched_with_the_rest():
+    model = CountingModel()
+    embeddings = BatchedEmbeddings(model, max_batch=3, max_wait_ms=1000)
+
+    async def main():
+        return await asyncio.gather(*(embeddings.aembed_query(t) for t in ["a", "bb", "ccc"]))
+
+    assert asyncio.run(main()) == [[1.0, 1.0], [2.0, 1.0], [3.0, 1.0]]
+    assert model.batches == [3]
+
+
+def test_documents_are_already_a_batch_and_go_straight_to_the_model():
+    model = CountingModel()
+    BatchedEmbeddings(model, max_batch=2).embed_documents(["a", "b", "c"])
+    assert model.batches == [3]
+
+
+# --- the socket service -----------------------------------------------------
+
+@pytest.fixture
+def service(tmp_path):
+    """An embedding service on a socket, run on its own loop in a thread."""
+    model = CountingModel()
+    server = EmbeddingServer(model, "test-model", str(tmp_path / "embed.sock"),
+                             max_batch=8, max_wait_ms=1000)
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+
+    def run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(server.start())
+        ready.set()
+        loop.run_forever()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    ready.wait(5)
+    yield server, model
+    asyncio.run_coroutine_threadsafe(server.stop(), loop).result(5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+
+
+def test_clients_of_one_service_share_its_batches(service):
+    server, model = service
+    clients = [RemoteEmbeddings(server.path, "test-model") for _ in range(4)]
+    queries = [(clients[i % 4], f"q{'x' * i}") for i in range(8)]
+
+    vectors = concurrently(lambda pair: pair[0].embed_query(pair[1]), queries)
+
+    assert model.batches == [8]
+    assert vectors == [[float(len(text)), 1.0] for _, text in queries]
+    assert clients[0].metrics()["mean_batch"] == 8.0
+    for client in clients:
+        client.close()
+
+
+def test_a_client_for_another_model_is_refused(service):
+    server, model = service
+    client = RemoteEmbeddings(server.path, "another-model")
+    with pytest.raises(EmbeddingServiceError, match="test-model"):
+        client.embed_query("q")
+    assert model.batches == []
+
+
+def test_create_embeddings_uses_the_service_and_falls_back_without_it(
+        service, monkeypatch, tmp_path):
+    server, _ = service
+    monkeypatch.setattr(vectorstore_module, "_EMBEDDINGS", {})
+    monkeypatch.setenv("DND_EMBEDDINGS_SOCKET", server.path)
+    remote = vectorstore_module.create_embeddings("test-model")
+    assert isinstance(remote, RemoteEmbeddings)
+    assert vectorstore_module.create_embeddings("test-model") is remote
+
+    monkeypatch.setenv("DND_EMBEDDINGS_SOCKET", str(tmp_path / "nobody.sock"))
+    monkeypatch.setattr(vectorstore_module, "HuggingFaceEmbeddings",
+                        lambda model_name: CountingModel())
+    local = vectorstore_module.create_embeddings("other-model")
+    assert isinstance(local, BatchedEmbeddings)
+
+
+def test_a_dead_kept_connection_is_retried_on_a_new_one(service):
+    server, _ = service
+    client = RemoteEmbeddings(server.path, "test-model")
+    client.embed_query("first")
+    # What a service restart leaves behind: a kept socket nobody answers.
+    sock, _ = client._idle[0]
+    sock.shutdown(socket.SHUT_RDWR)
+
+    assert client.embed_query("second") == [6.0, 1.0]
+    client.close()
+
+
+@pytest.fixture
+def silent_socket(tmp_path):
+    """A socket that accepts connections and never replies."""
+    path = str(tmp_path / "silent.sock")
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    listener.listen(4)
+    yield path
+    listener.close()
+
+
+def test_a_timeout_is_a_service_error(silent_socket):
+    client = RemoteEmbeddings(silent_socket, "test-model", timeout=0.2)
+    with pytest.raises(EmbeddingServiceError, match="timed out"):
+        client.embed_query("q")
+
+
+def test_a_service_that_times_out_falls_back_to_the_local_model(silent_socket, monkeypatch):
+    monkeypatch.setattr(vectorstore_module, "_EMBEDDINGS", {})
+    monkeypatch.setenv("DND_EMBEDDINGS_SOCKET", silent_socket)
+    monkeypatch.setattr(vectorstore_module, "RemoteEmbeddings",
+                        functools.partial(RemoteEmbeddings, timeout=0.2))
+    monkeypatch.setattr(vectorstore_module, "HuggingFaceEmbeddings",
+                        lambda model_name: CountingModel())
+    assert isinstance(vectorstore_module.create_embeddings("test-model"), BatchedEmbeddings)
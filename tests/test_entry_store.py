@@ -0,0 +1,46 @@
+"""Contract tests for the store of whole SRD entries beside the index.
+
+Written to a temporary directory; no index and no embedding model. What is
+pinned is that an entry comes back exactly as it went in, that a rebuild
+replaces the store rather than adding to it, and that an index without a
+store is answered with None rather than an error.
+"""
+
+import pytest
+from langchain_core.documents import Document
+
+from src.data.entry_store import (
+    ENTRY_STORE_FILE,
+    EntryStore,
+    build_entry_store,
+    open_entry_store,
+)
+
+pytestmark = pytest.mark.integration
+
+
+def entry(entry_id, text):
+    return Document(page_content=text, metadata={"entry_id": entry_id, "name": "Adult Red Dragon"})
+
+
+def test_an_entry_comes_back_as_it_was_stored(tmp_path):
+    text = "# Adult Red Dragon\nLegendary Actions\nTail Attack. — 2d8 + 8"
+    build_entry_store([entry("dragon", text)], str(tmp_path)).close()
+
+    store = open_entry_store(str(tmp_path))
+    assert store.get("dragon") == text
+    assert store.get("goblin") is None
+    assert len(store) == 1
+
+
+def test_a_rebuild_replaces_the_store(tmp_path):
+    build_entry_store([entry("old", "# Old\ntext")], str(tmp_path)).close()
+    build_entry_store([entry("new", "# New\ntext")], str(tmp_path)).close()
+
+    store = EntryStore(str(tmp_path / ENTRY_STORE_FILE))
+    assert store.get("old") is None and store.get("new") == "# New\ntext"
+
+
+def test_an_index_without_a_store_has_none(tmp_path):
+    assert open_entry_store(str(tmp_path)) is None
+    assert not (tmp_path / ENTRY_STORE_FILE).exists()
@@ -0,0 +1,156 @@
+"""Contract tests for glossary expansion before the rewriter.
+
+No index and no model: the store scores a query by whether it names the
+passage's rule, and the rewriter is a stub that counts its calls. What is
+pinned is how a question is restated, that every variant is embedded in one
+batch, and that the rewriter only runs when every variant misses too.
+"""
+
+import json
+
+import pytest
+from langchain_core.documents import Document
+
+import src.agents.researcher as researcher_module
+from scripts.mine_glossary import mine, recoveries
+from src.pipelines.expansion import expand_query, read_mined_glossary, title_glossary
+
+pytestmark = pytest.mark.integration
+
+GLOSSARY = {
+    "knocked out": ("unconscious", "death saving throws"),
+    "ac": ("armor class",),
+    "hp": ("hit points",),
+    "sneak": ("stealth", "hiding"),
+    **title_glossary(["sneak attack", "gibbering mouther", "goblin"]),
+}
+
+
+def test_a_phrase_is_replaced_by_the_rules_terms():
+    assert expand_query("What happens when I'm knocked out?", GLOSSARY) == [
+        "what happens when i'm unconscious death saving throws"]
+
+
+def test_several_phrases_give_the_combined_variant_first():
+    assert expand_query("goblin AC and HP", GLOSSARY) == [
+        "goblin armor class and hit points", "goblin armor class and hp",
+        "goblin ac and hit points"]
+
+
+def test_an_srd_name_already_asked_is_left_alone():
+    assert expand_query("How does sneak attack work?", GLOSSARY) == []
+    assert expand_query("Can I sneak past?", GLOSSARY) == ["can i stealth hiding past"]
+
+
+def test_a_word_of_exactly_one_title_stands_for_it():
+    assert expand_query("what does a mouther do", GLOSSARY) == [
+        "what does a gibbering mouther do"]
+    assert "attack" not in title_glossary(["sneak attack", "making an attack"])
+
+
+def test_a_mined_glossary_is_read_and_a_broken_one_ignored(tmp_path):
+    path = tmp_path / "glossary.json"
+    path.write_text(json.dumps({"Stabby": ["sneak attack"]}))
+    assert read_mined_glossary(str(path)) == {"stabby": ("sneak attack",)}
+    path.write_text("{not json")
+    assert read_mined_glossary(str(path)) == {}
+    assert read_mined_glossary(str(tmp_path / "missing.json")) == {}
+
+
+# --- mining the logs ----------------------------------------------------------
+
+def rewrite_entry(query, rewritten, score=0.05, retried=0.4):
+    return {"agent": "researcher", "query": query,
+            "metadata": {"rewritten": True, "rewritten_query": rewritten, "score": score,
+                         "retried_score": retried, "relevant": retried >= 0.25}}
+
+
+def test_words_a_successful_rewrite_dropped_are_paired_with_the_names_it_added():
+    entries = [
+        rewrite_entry("can my rogue do the stabby thing", "How does Sneak Attack work?"),
+        rewrite_entry("is stabby better with a rapier", "Does Sneak Attack work with a rapier?"),
+        rewrite_entry("stabby once a turn?", "Sneak Attack", retried=0.1),  # still missed
+    ]
+    assert mine(entries, min_support=2) == {"stabby": ["sneak attack"]}
+    assert mine(entries, min_support=3) == {}
+    assert recoveries(entries) == {"rewrite": 2, "still missed": 1}
+
+
+# --- the researcher -----------------------------------------------------------
+
+def rule(name):
+    return Document(id=name, page_content=f"# {name}\nrule text",
+                    metadata={"source": "SRD 5.1", "category": "Rules", "name": name})
+
+
+class Embeddings:
+    def __init__(self):
+        self.batches = []
+
+    def embed_documents(self, texts):
+        self.batches.append(list(texts))
+        return list(texts)  # the "vector" is the text; the store scores it
+
+
+class Store:
+    """Scores 0.5 for a query naming `Unconscious`, 0.05 otherwise."""
+
+    def __init__(self):
+        self.embeddings = Embeddings()
+        self.queries = []
+
+    def _scored(self, query):
+        self.queries.append(query)
+        return [(rule("Unconscious"), 0.5 if "unconscious" in query.lower() else 0.05)]
+
+    def similarity_search_with_relevance_scores(self, query, k=4):
+        return self._scored(query)
+
+    def similarity_search_by_vector_with_relevance_scores(self, vector, k=4):
+        return [(doc, 1 - score) for doc, score in self._scored(vector)]  # a distance
+
+    def _select_relevance_score_fn(self):
+        return lambda distance: 1 - distance
+
+    def as_retriever(self, **kwargs):
+        return self
+
+
+def make_agent(monkeypatch):
+    from tests.test_researcher import StubRewriter
+
+    monkeypatch.setenv("DND_ANSWER_CACHE", "0")
+    store = Store()
+    monkeypatch.setattr(researcher_module, "load_vectorstore", lambda: store)
+    agent = researcher_module.ResearcherAgent()
+    agent.glossary = GLOSSARY
+    agent.rewriter = StubRewriter("Unconscious")
+    return agent, store
+
+
+def test_a_glossary_hit_saves_the_rewrite(monkeypatch):
+    agent, store = make_agent(monkeypatch)
+    docs, info = agent.retrieve("what happens when I'm knocked out")
+
+    assert info["relevant"] is True and info["rewritten"] is False
+    assert info["glossary_query"] == "what happens when i'm unconscious death saving throws"
+    assert info["glossary_score"] == 0.5
+    assert agent.rewriter.calls == 0
+    assert store.embeddings.batches == [[info["glossary_query"]]]
+
+
+def test_variants_are_embedded_in_one_batch_and_the_rewrite_runs_if_all_miss(monkeypatch):
+    agent, store = make_agent(monkeypatch)
+    docs, info = agent.retrieve("the goblin's AC and HP")
+
+    assert len(store.embeddings.batches) == 1 and len(store.embeddings.batches[0]) == 3
+    assert agent.rewriter.calls == 1
+    assert info["rewritten"] is True and info["relevant"] is True
+
+
+def test_no_glossary_phrase_goes_straight_to_the_rewrite(monkeypatch):
+    agent, store = make_agent(monkeypatch)
+    agent.retrieve("the thing with the dice")
+
+    assert store.embeddings.batches == []
+    assert agent.rewriter.calls == 1
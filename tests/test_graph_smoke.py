@@ -43,7 +43,7 @@ def test_default_state_declares_every_field():
     """Guards the GameState contract that PR-03 will rewrite."""
     state = create_default_game_state()
     expected = {
-        "messages", "current_task", "active_agent", "game_state", "players",
+        "messages", "current_task", "turn_roll", "active_agent", "game_state", "players",
         "npcs", "current_speaker", "turn_order", "last_response",
         "requires_player_input",
     }
@@ -63,3 +63,219 @@ def test_default_game_state_is_a_dict():
     PR-03 fixes the collision; this test pins the factory's side of the contract.
     """
     assert isinstance(create_default_game_state()["game_state"], dict)
+
+
+def test_a_split_turn_answers_from_both_workers_in_one_run(monkeypatch):
+    """'I swing — roll 1d20+5' fans out to dice_roller and dungeon_master in one
+    step. Both must land, and `last_response` must be the narration."""
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    import src.agents.dungeon_master as dungeon_master
+
+    class StubLLM:
+        def __init__(self, result):
+            self.result = result
+
+        def invoke(self, messages, *args, **kwargs):
+            return self.result
+
+        def with_structured_output(self, *args, **kwargs):
+            return StubLLM({"location": "", "items_gained": [], "effects": []})
+
+    monkeypatch.setattr(dungeon_master, "create_llm",
+                        lambda *a, **k: StubLLM(AIMessage(content="Your blade bites.")))
+
+    text = "I swing at the goblin — roll 1d20+5"
+    out = create_game_graph().invoke(
+        {"messages": [HumanMessage(content=text)], "current_task": text}
+    )
+
+    names = [getattr(m, "name", None) for m in out["messages"][1:]]
+    assert sorted(names) == ["dice_roller", "dungeon_master"]
+    assert out["last_response"] == "Your blade bites."
+
+
+def test_both_halves_of_a_split_turn_see_the_same_roll(monkeypatch):
+    """`turn_roll` is a declared field, and the dice node and the DM node are
+    handed the one roll the supervisor made."""
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    import src.agents.dungeon_master as dungeon_master
+    from src.agents.dice_roller import DiceRollerAgent
+
+    seen = {}
+    record = DiceRollerAgent._record_pre_rolled
+
+    def spy(self, message, roll):
+        seen["dice_roller"] = roll
+        return record(self, message, roll)
+
+    class StubLLM:
+        def invoke(self, messages, *args, **kwargs):
+            seen.setdefault("dungeon_master", messages[0].content)  # the narration, not the extractor
+            return AIMessage(content="Your blade bites.")
+
+        def with_structured_output(self, *args, **kwargs):
+            return StubLLM()
+
+    monkeypatch.setattr(DiceRollerAgent, "_record_pre_rolled", spy)
+    monkeypatch.setattr(dungeon_master, "create_llm", lambda *a, **k: StubLLM())
+
+    text = "I swing at the goblin — roll 1d20+5"
+    create_game_graph().invoke({"messages": [HumanMessage(content=text)], "current_task": text})
+
+    rolled = seen["dice_roller"]["result"].splitlines()[0]
+    assert f"already rolled for this action: {rolled}" in seen["dungeon_master"]
+
+
+# --- the dice fast lane -----------------------------------------------------
+
+def fast_lane_graph():
+    from langgraph.checkpoint.memory import InMemorySaver
+
+    from src.agents.dice_roller import DiceRollerAgent
+
+    return create_game_graph(checkpointer=InMemorySaver()), DiceRollerAgent()
+
+
+def dice_turn(text):
+    from langchain_core.messages import HumanMessage
+
+    return {"messages": [HumanMessage(content=text)], "current_task": text}
+
+
+def test_a_written_roll_lands_in_the_thread_without_running_the_graph():
+    from src.graph.game_orchestrator import run_fast_dice_turn
+
+    game_graph, dice_roller = fast_lane_graph()
+    config = {"configurable": {"thread_id": "fast"}}
+    message = run_fast_dice_turn(game_graph, dice_roller, dice_turn("roll 2d6+3"), config)
+
+    snapshot = game_graph.get_state(config)
+    assert [m.content for m in snapshot.values["messages"]] == ["roll 2d6+3", message.content]
+    assert snapshot.values["last_response"] == message.content
+    assert snapshot.next == (), "nothing is left pending for the next turn to resume"
+
+
+def test_the_next_turn_runs_the_graph_on_the_same_thread():
+    from src.graph.game_orchestrator import run_fast_dice_turn
+
+    game_graph, dice_roller = fast_lane_graph()
+    config = {"configurable": {"thread_id": "fast"}}
+    run_fast_dice_turn(game_graph, dice_roller, dice_turn("roll 1d20"), config)
+    out = game_graph.invoke(dice_turn("roll 1d8"), config)
+
+    assert [m.content for m in out["messages"]][::2] == ["roll 1d20", "roll 1d8"]
+
+
+@pytest.mark.parametrize(
+    "text",
+    ["roll for initiative",      # a roll, but the dice come from the model
+     "I open the door",          # not a roll at all
+     "what does 2d6 mean",       # notation in a question
+     "I swing at the goblin — roll 1d20+5"],  # an action to narrate as well
+)
+def test_anything_else_is_left_to_the_graph(text):
+    from src.graph.game_orchestrator import run_fast_dice_turn
+
+    game_graph, dice_roller = fast_lane_graph()
+    config = {"configurable": {"thread_id": "fast"}}
+    assert run_fast_dice_turn(game_graph, dice_roller, dice_turn(text), config) is None
+    assert not game_graph.get_state(config).values, "the thread was not touched"
+
+
+# --- the turn API -----------------------------------------------------------
+
+def streaming_dm(monkeypatch, narration="Your blade bites deep."):
+    """A DM whose narration streams token by token, as `ChatOllama` does."""
+    from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+    from langchain_core.messages import AIMessage
+    from langchain_core.runnables import RunnableLambda
+
+    import src.agents.dungeon_master as dungeon_master
+
+    class FakeNarrator(GenericFakeChatModel):
+        def with_structured_output(self, *args, **kwargs):
+            return RunnableLambda(
+                lambda _: {"location": "", "items_gained": [], "effects": []}
+            )
+
+    monkeypatch.setattr(
+        dungeon_master, "create_llm",
+        lambda *a, **k: FakeNarrator(messages=iter([AIMessage(content=narration)] * 10)),
+    )
+
+
+def test_run_turn_returns_only_what_the_turn_appended():
+    from langgraph.checkpoint.memory import InMemorySaver
+
+    from src.graph.game_orchestrator import run_turn
+
+    game_graph = create_game_graph(checkpointer=InMemorySaver())
+    config = {"configurable": {"thread_id": "turns"}}
+    run_turn(game_graph, dice_turn("roll 1d20"), config)
+    result = run_turn(game_graph, dice_turn("roll 1d8"), config)
+
+    assert [m.name for m in result.messages] == ["dice_roller"]
+    assert result.messages[0].content.startswith("🎲 Rolled 1d8")
+
+
+def test_run_turn_collects_both_halves_of_a_split_turn(monkeypatch):
+    from src.graph.game_orchestrator import run_turn
+
+    streaming_dm(monkeypatch)
+    result = run_turn(create_game_graph(), dice_turn("I swing at the goblin — roll 1d20+5"), {})
+    assert sorted(m.name for m in result.messages) == ["dice_roller", "dungeon_master"]
+
+
+def test_narration_tokens_reach_the_callback_as_they_stream(monkeypatch):
+    from src.graph.game_orchestrator import run_turn
+
+    streaming_dm(monkeypatch, "Your blade bites deep.")
+    tokens = []
+    result = run_turn(create_game_graph(), dice_turn("I attack the goblin"), {},
+                      on_token=lambda node, text: tokens.append((node, text)))
+
+    assert len(tokens) > 1, "the narration arrives in pieces, not at the end"
+    assert {node for node, _ in tokens} == {"dungeon_master"}
+    assert "".join(text for _, text in tokens) == "Your blade bites deep."
+    assert result.streamed == {"dungeon_master": "Your blade bites deep."}
+
+
+def test_arun_turn_streams_and_collects_as_run_turn_does(monkeypatch):
+    import asyncio
+
+    from src.graph.game_orchestrator import arun_turn, create_sqlite_checkpointer
+
+    streaming_dm(monkeypatch, "Your blade bites deep.")
+    tokens = []
+
+    async def on_token(node, text):
+        tokens.append((node, text))
+
+    game_graph = create_game_graph(checkpointer=create_sqlite_checkpointer(":memory:"))
+    config = {"configurable": {"thread_id": "async"}}
+    result = asyncio.run(arun_turn(game_graph, dice_turn("I swing at the goblin — roll 1d20+5"),
+                                   config, on_token=on_token))
+
+    assert sorted(m.name for m in result.messages) == ["dice_roller", "dungeon_master"]
+    assert len(tokens) > 1
+    assert "".join(text for _, text in tokens) == "Your blade bites deep."
+    assert len(game_graph.get_state(config).values["messages"]) == 3
+
+
+def test_the_async_fast_lane_lands_a_roll_in_the_thread():
+    import asyncio
+
+    from src.agents.dice_roller import DiceRollerAgent
+    from src.graph.game_orchestrator import arun_fast_dice_turn, create_sqlite_checkpointer
+
+    game_graph = create_game_graph(checkpointer=create_sqlite_checkpointer(":memory:"))
+    config = {"configurable": {"thread_id": "async-roll"}}
+    rolled = asyncio.run(arun_fast_dice_turn(game_graph, DiceRollerAgent(),
+                                             dice_turn("roll 1d8"), config))
+
+    assert rolled.content.startswith("🎲 Rolled 1d8")
+    snapshot = game_graph.get_state(config)
+    assert [m.type for m in snapshot.values["messages"]] == ["human", "ai"]
+    assert snapshot.next == ()
@@ -0,0 +1,197 @@
+"""Contract tests for `MessageLogSaver`.
+
+What is pinned: a checkpoint read back is the checkpoint that was written, each
+message is stored once however many checkpoints hold it, and databases written
+by the stock `SqliteSaver` keep working and can be migrated.
+"""
+
+import asyncio
+import sqlite3
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+pytestmark = pytest.mark.integration
+
+pytest.importorskip("langgraph.checkpoint.sqlite", reason="full dependency stack not installed")
+
+from langgraph.checkpoint.base import empty_checkpoint  # noqa: E402
+from langgraph.checkpoint.base.id import uuid6  # noqa: E402
+from langgraph.checkpoint.sqlite import SqliteSaver  # noqa: E402
+
+from src.graph.compressed_serde import CompressingSerializer  # noqa: E402
+from src.graph.message_log import (  # noqa: E402
+    MESSAGE_LOG_KEY,
+    MessageLogSaver,
+    ranges_of,
+    seqs_of,
+)
+
+THREAD = {"configurable": {"thread_id": "campaign", "checkpoint_ns": ""}}
+
+
+def checkpoint_of(messages):
+    checkpoint = empty_checkpoint()
+    checkpoint["id"] = str(uuid6())
+    checkpoint["channel_values"] = {"messages": messages, "current_task": "x"}
+    return checkpoint
+
+
+def campaign(saver, turns, config=THREAD):
+    messages = []
+    for i in range(turns):
+        messages = messages + [HumanMessage(content=f"turn {i}", id=f"h{i}"),
+                               AIMessage(content=f"reply {i}", id=f"a{i}")]
+        config = saver.put(config, checkpoint_of(messages), {}, {})
+    return config, messages
+
+
+def rows(conn, table):
+    return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def stored_messages_value(conn):
+    # The stock saver, to see what is stored rather than what is rehydrated.
+    saver = SqliteSaver(conn, serde=CompressingSerializer())
+    return saver.get_tuple(THREAD).checkpoint["channel_values"]["messages"]
+
+
+@pytest.fixture
+def conn():
+    return sqlite3.connect(":memory:", check_same_thread=False)
+
+
+def test_ranges_round_trip():
+    assert ranges_of([4, 5, 6, 9, 10]) == [[4, 7], [9, 11]]
+    assert seqs_of([[4, 7], [9, 11]]) == [4, 5, 6, 9, 10]
+    assert ranges_of([]) == []
+
+
+def test_each_message_is_stored_once(conn):
+    saver = MessageLogSaver(conn)
+    campaign(saver, 50)
+    assert rows(conn, "message_log") == 100
+
+
+def test_the_checkpoint_holds_a_range_not_the_history(conn):
+    campaign(MessageLogSaver(conn), 50)
+    assert stored_messages_value(conn) == {MESSAGE_LOG_KEY: [[0, 100]]}
+
+
+def test_a_checkpoint_reads_back_as_it_was_written(conn):
+    _, messages = campaign(MessageLogSaver(conn), 5)
+    # A fresh saver: nothing cached, everything from the table.
+    restored = MessageLogSaver(conn).get_tuple(THREAD).checkpoint["channel_values"]["messages"]
+    assert [(m.id, m.content) for m in restored] == [(m.id, m.content) for m in messages]
+
+
+def test_the_async_methods_read_and_write_the_same_store(conn):
+    saver = MessageLogSaver(conn)
+    config, messages = campaign(saver, 2)
+
+    async def resume_and_continue():
+        found = await saver.aget_tuple(THREAD)
+        more = found.checkpoint["channel_values"]["messages"] + [HumanMessage(content="x", id="h9")]
+        await saver.aput(config, checkpoint_of(more), {}, {})
+        return [t async for t in saver.alist(THREAD)]
+
+    listed = asyncio.run(resume_and_continue())
+    assert [len(t.checkpoint["channel_values"]["messages"]) for t in listed] == [5, 4, 2]
+    assert rows(conn, "message_log") == 5
+
+
+def test_every_checkpoint_in_the_history_keeps_its_own_length(conn):
+    campaign(MessageLogSaver(conn), 3)
+    lengths = [len(t.checkpoint["channel_values"]["messages"])
+               for t in MessageLogSaver(conn).list(THREAD)]
+    assert lengths == [6, 4, 2]
+
+
+def test_a_replaced_message_is_written_again_and_splits_the_range(conn):
+    saver = MessageLogSaver(conn)
+    config, messages = campaign(saver, 2)
+    edited = [messages[0], AIMessage(content="reply 0, revised", id="a0"), *messages[2:]]
+    saver.put(config, checkpoint_of(edited), {}, {})
+
+    assert stored_messages_value(conn) == {MESSAGE_LOG_KEY: [[0, 1], [4, 5], [2, 4]]}
+    restored = MessageLogSaver(conn).get_tuple(THREAD).checkpoint["channel_values"]["messages"]
+    assert [m.content for m in restored] == ["turn 0", "reply 0, revised", "turn 1", "reply 1"]
+
+
+def test_a_removed_message_leaves_a_gap_in_the_range(conn):
+    saver = MessageLogSaver(conn)
+    config, messages = campaign(saver, 2)
+    saver.put(config, checkpoint_of([messages[0], *messages[2:]]), {}, {})
+
+    assert stored_messages_value(conn) == {MESSAGE_LOG_KEY: [[0, 1], [2, 4]]}
+    assert rows(conn, "message_log") == 4
+
+
+def test_a_resumed_campaign_does_not_rewrite_its_history(conn):
+    campaign(MessageLogSaver(conn), 10)
+    saver = MessageLogSaver(conn)
+    found = saver.get_tuple(THREAD)
+    messages = found.checkpoint["channel_values"]["messages"]
+    saver.put(found.config, checkpoint_of(messages + [HumanMessage(content="more", id="m")]), {}, {})
+    assert rows(conn, "message_log") == 21
+
+
+def test_a_slice_reads_only_what_it_asks_for(conn):
+    campaign(MessageLogSaver(conn), 10)
+    saver = MessageLogSaver(conn)
+    assert [m.content for m in saver.get_messages(THREAD, -2)] == ["turn 9", "reply 9"]
+    assert len(saver._loaded.get(("campaign", ""), {})) == 2
+
+
+def test_delete_thread_removes_its_messages(conn):
+    saver = MessageLogSaver(conn)
+    campaign(saver, 3)
+    saver.delete_thread("campaign")
+    assert rows(conn, "message_log") == 0
+    assert saver.get_tuple(THREAD) is None
+
+
+def test_the_caches_stay_bounded_across_many_threads(conn):
+    saver = MessageLogSaver(conn, cached_threads=4)
+    for i in range(20):
+        campaign(saver, 2, {"configurable": {"thread_id": f"t{i}", "checkpoint_ns": ""}})
+    recent = [(f"t{i}", "") for i in range(16, 20)]
+    for cache in (saver._logged, saver._loaded, saver._next_seq, saver._last_put):
+        assert list(cache) == recent
+
+    # An evicted thread reads its history back and goes on without rewriting it.
+    first = {"configurable": {"thread_id": "t0", "checkpoint_ns": ""}}
+    found = saver.get_tuple(first)
+    messages = found.checkpoint["channel_values"]["messages"]
+    saver.put(found.config, checkpoint_of(messages + [HumanMessage(content="more", id="m")]), {}, {})
+    assert rows(conn, "message_log") == 20 * 4 + 1
+
+
+# --- migrating a stock database ---------------------------------------------
+
+def test_a_stock_database_is_read_as_it_is(conn):
+    _, messages = campaign(SqliteSaver(conn), 3)
+    restored = MessageLogSaver(conn).get_tuple(THREAD).checkpoint["channel_values"]["messages"]
+    assert [m.content for m in restored] == [m.content for m in messages]
+
+
+def test_migrate_collapses_the_duplicated_history(conn):
+    campaign(SqliteSaver(conn), 20)
+    saver = MessageLogSaver(conn)
+
+    assert saver.migrate() == 20
+    assert rows(conn, "message_log") == 40
+    assert stored_messages_value(conn) == {MESSAGE_LOG_KEY: [[0, 40]]}
+
+
+def test_a_migrated_campaign_continues_where_it_left_off(conn):
+    campaign(SqliteSaver(conn), 4)
+    MessageLogSaver(conn).migrate()
+
+    saver = MessageLogSaver(conn)
+    found = saver.get_tuple(THREAD)
+    messages = found.checkpoint["channel_values"]["messages"]
+    assert [m.content for m in messages][-2:] == ["turn 3", "reply 3"]
+
+    saver.put(found.config, checkpoint_of(messages + [HumanMessage(content="on", id="n")]), {}, {})
+    assert rows(conn, "message_log") == 9
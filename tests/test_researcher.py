@@ -6,12 +6,15 @@ the agent turns retrieved passages into a prompt, when it corrects a query, and
 what it promises the player about sources.
 """
 
+import asyncio
+import threading
+
 import pytest
 from langchain_core.documents import Document
 from langchain_core.messages import AIMessage, HumanMessage
 
 import src.agents.researcher as researcher_module
-from src.agents.researcher import RELEVANCE_THRESHOLD, ResearcherAgent
+from src.agents.researcher import RELEVANCE_THRESHOLD, ResearcherAgent, select_passages
 
 pytestmark = pytest.mark.integration
 
@@ -59,6 +62,9 @@ class StubRewriter:
             raise self.result
         return self.result
 
+    async def ainvoke(self, *args, **kwargs):
+        return self.invoke(*args, **kwargs)
+
 
 def make_agent(monkeypatch, results, rewritten="rewritten question"):
     store = StubStore(results)
@@ -200,6 +206,50 @@ def test_no_index_degrades_to_a_bare_answer(monkeypatch):
     assert info["rag_used"] is False
 
 
+# --- choosing passages ------------------------------------------------------
+
+def test_passages_far_below_the_best_are_not_sent():
+    """The old index's "sneak attack" chunks: only the 0.301 one was unrelated."""
+    a, b, c, d = (doc(x) for x in "abcd")
+    assert select_passages([(a, 0.428), (b, 0.369), (c, 0.349), (d, 0.301)],
+                           margin=0.1) == [a, b, c]
+
+
+def test_passages_are_sent_best_first_within_the_token_budget():
+    long, short, best = doc("x" * 400), doc("y" * 40), doc("z" * 200)
+    kept = select_passages([(long, 0.5), (short, 0.48), (best, 0.55)], margin=0.1, budget=70)
+    # best (50 tokens) fits; long (100) does not; the short one after it does.
+    assert kept == [best, short]
+
+
+def test_the_best_passage_goes_even_over_budget():
+    huge = doc("x" * 10_000)
+    assert select_passages([(huge, 0.5)], budget=10) == [huge]
+    assert select_passages([]) == []
+
+
+def test_a_second_entry_is_preferred_over_another_piece_of_the_first():
+    def piece(name, index):
+        return Document(page_content=f"# {name}\n{'x' * 40}",
+                        metadata={"source": "SRD 5.1", "category": "Rules",
+                                  "name": name, "chunk_index": index})
+
+    first, second, other = piece("Making an Attack", 0), piece("Making an Attack", 1), piece("Cover", 0)
+    scored = [(first, 0.50), (second, 0.48), (other, 0.46)]
+    # Room for two of the three: the penalty decides which two.
+    assert select_passages(scored, margin=0.1, budget=28) == [first, other]
+    assert select_passages(scored, margin=0.1, budget=28, penalty=0) == [first, second]
+
+
+def test_the_retrieval_suite_names_real_srd_entries():
+    from scripts.bench_retrieval import RETRIEVAL_SUITE
+    from src.config import SRD_DIRECTORY
+    from src.data.srd_loader import load_srd_documents
+
+    names = {d.metadata["name"] for d in load_srd_documents(SRD_DIRECTORY)}
+    assert all(expected <= names for _, expected in RETRIEVAL_SUITE)
+
+
 # --- the node contract ------------------------------------------------------
 
 class StubLLM:
@@ -211,6 +261,9 @@ class StubLLM:
             raise self.result
         return AIMessage(content=self.result)
 
+    async def ainvoke(self, *args, **kwargs):
+        return self.invoke(*args, **kwargs)
+
 
 def test_the_answer_carries_sources_and_terminates(monkeypatch):
     agent, _ = make_agent(monkeypatch, [([doc("text", page=89)], 0.5)])
@@ -253,8 +306,170 @@ def test_a_model_failure_still_returns_a_command(monkeypatch):
     assert "daemon down" in command.update["messages"][0].content
 
 
+def test_the_async_path_retrieves_off_the_event_loop(monkeypatch):
+    agent, store = make_agent(monkeypatch, [([doc("miss")], 0.0), ([doc("hit")], 0.5)])
+    agent.llm = StubLLM("Rogues deal extra damage.")
+    threads = []
+    search = store.similarity_search_with_relevance_scores
+
+    def recording_search(query, k=4):
+        threads.append(threading.current_thread().name)
+        return search(query, k)
+
+    store.similarity_search_with_relevance_scores = recording_search
+    command = asyncio.run(agent.aprocess_task({
+        "current_task": "sneak attack",
+        "messages": [HumanMessage(content="sneak attack")],
+    }))
+
+    assert store.queries == ["sneak attack", "rewritten question"]
+    assert all(name.startswith("retrieval") for name in threads)
+    assert command.update["messages"][0].content.startswith("Rogues deal extra damage.")
+
+
+# --- extractive answers ----------------------------------------------------
+
+GRAPPLED = "# Grappled\n- A grappled creature's speed becomes 0."
+
+
+def entry(text=GRAPPLED, name="Grappled", chunk_count=1):
+    return Document(page_content=text, metadata={
+        "source": "SRD 5.1", "category": "Conditions", "name": name,
+        "book": "SRD 5.1 (Conditions)", "chunk_count": chunk_count})
+
+
+def ask(agent, question):
+    logged = []
+    agent._log_interaction = lambda **kwargs: logged.append(kwargs)
+    command = agent.process_task({"current_task": question,
+                                  "messages": [HumanMessage(content=question)]})
+    return command.update["messages"][0].content, logged[-1]["metadata"]
+
+
+def test_a_short_entry_the_question_names_is_shown_as_written(monkeypatch):
+    agent, _ = make_agent(monkeypatch, [([entry(), doc("other")], 0.5)])
+    agent.llm = StubLLM(RuntimeError("the model must not be called"))
+
+    content, metadata = ask(agent, "What does the grappled condition do?")
+
+    assert content.startswith("**Grappled**\n- A grappled creature's speed becomes 0.")
+    assert "SRD 5.1, Conditions: Grappled" in content
+    assert "Player's Handbook" not in content
+    assert metadata["extractive"] is True
+
+
+@pytest.mark.parametrize("question,top,score", [
+    ("Can I cast fire bolt while grappled?", entry(), 0.5),        # names two entries
+    ("What does the grappled condition do?", entry(chunk_count=3), 0.5),  # a piece
+    ("What does the grappled condition do?", entry("# Grappled\n" + "x" * 900), 0.5),
+    ("What does the grappled condition do?", doc("no name"), 0.5),  # the PDF index
+    ("What does the grappled condition do?", entry(), 0.1),         # a weak match
+    ("Tell me about restrained", entry(), 0.5),                     # names another
+])
+def test_anything_less_than_an_exact_short_entry_is_answered_by_the_model(
+        monkeypatch, question, top, score):
+    agent, _ = make_agent(monkeypatch, [([top], score), ([top], score)])
+    agent.llm = StubLLM("Generated.")
+
+    content, metadata = ask(agent, question)
+
+    assert content.startswith("Generated.")
+    assert "extractive" not in metadata
+
+
+def test_a_glossary_variant_match_is_not_shown_as_written(monkeypatch):
+    agent, _ = make_agent(monkeypatch, [])
+    question = "What does the grappled condition do?"
+    assert agent._extractive(question, [entry()], {"relevant": True}) is not None
+    info = {"relevant": True, "glossary_query": question + " grappled"}
+    assert agent._extractive(question, [entry()], info) is None
+
+
+def test_extractive_answers_can_be_turned_off(monkeypatch):
+    monkeypatch.setenv("DND_EXTRACTIVE_MAX_CHARS", "0")
+    agent, _ = make_agent(monkeypatch, [([entry()], 0.5)])
+    agent.llm = StubLLM("Generated.")
+    assert ask(agent, "What is grappled?")[0].startswith("Generated.")
+
+
 def test_the_generator_module_is_gone():
     """Dead in every sense: no importers, needed network at construction, and
     `from langchain import hub` no longer imports on LangChain 1.x."""
     with pytest.raises(ImportError):
         import src.pipelines.generator  # noqa: F401
+
+
+# --- kept rewrites and known misses -----------------------------------------
+
+class Collection:
+    def __init__(self, collection_id="c1", count=3082):
+        self.id, self._count = collection_id, count
+
+    def count(self):
+        return self._count
+
+
+def make_cached_agent(monkeypatch, tmp_path, results, collection=None):
+    monkeypatch.setenv("DND_REWRITE_CACHE_DB", str(tmp_path / "rewrites.db"))
+    store = StubStore(results)
+    store._collection = collection or Collection()
+    monkeypatch.setattr(researcher_module, "load_vectorstore", lambda: store)
+    agent = ResearcherAgent()
+    agent.rewriter = StubRewriter("Can a character use Sneak Attack after Hiding?")
+    return agent, store
+
+
+def test_a_rewrite_that_matched_is_reused_without_the_model(monkeypatch, tmp_path):
+    question = "can my guy do the thing where he hides and stabs"
+    agent, _ = make_cached_agent(monkeypatch, tmp_path,
+                                 [([doc("miss")], 0.09), ([doc("hit")], 0.4)])
+    agent.retrieve(question)
+    assert agent.rewriter.calls == 1
+
+    again, store = make_cached_agent(monkeypatch, tmp_path,
+                                     [([doc("miss")], 0.09), ([doc("hit")], 0.4)])
+    docs, info = again.retrieve("Can my guy do the thing where he  HIDES and stabs")
+
+    assert again.rewriter.calls == 0
+    assert store.queries[1] == "Can a character use Sneak Attack after Hiding?"
+    assert info["rewrite_cache"] == "rewrite" and info["relevant"] is True
+
+
+def test_a_question_no_retry_could_match_is_not_retried(monkeypatch, tmp_path):
+    agent, _ = make_cached_agent(monkeypatch, tmp_path,
+                                 [([doc("miss")], 0.02), ([doc("still")], 0.03)])
+    agent.retrieve("what's the weather in Waterdeep")
+
+    again, store = make_cached_agent(monkeypatch, tmp_path, [([doc("miss")], 0.02)])
+    docs, info = again.retrieve("what's the weather in Waterdeep")
+
+    assert again.rewriter.calls == 0 and len(store.queries) == 1
+    assert info["rewrite_cache"] == "miss" and docs
+
+
+def test_a_rebuilt_index_forgets_what_was_kept(monkeypatch, tmp_path):
+    agent, _ = make_cached_agent(monkeypatch, tmp_path,
+                                 [([doc("miss")], 0.02), ([doc("still")], 0.03)])
+    agent.retrieve("what's the weather in Waterdeep")
+
+    rebuilt, _ = make_cached_agent(monkeypatch, tmp_path,
+                                   [([doc("miss")], 0.02), ([doc("still")], 0.03)],
+                                   collection=Collection("c2"))
+    docs, info = rebuilt.retrieve("what's the weather in Waterdeep")
+
+    assert rebuilt.rewriter.calls == 1 and "rewrite_cache" not in info
+    assert len(rebuilt.rewrite_cache) == 1
+
+
+def test_a_grown_glossary_forgets_the_known_misses(monkeypatch, tmp_path):
+    agent, _ = make_cached_agent(monkeypatch, tmp_path,
+                                 [([doc("miss")], 0.02), ([doc("still")], 0.03)])
+    agent.retrieve("what's the weather in Waterdeep")
+
+    mined = {**agent.glossary, "waterdeep": ("city",)}
+    monkeypatch.setattr(researcher_module, "load_glossary", lambda: mined)
+    again, _ = make_cached_agent(monkeypatch, tmp_path,
+                                 [([doc("miss")], 0.02), ([doc("still")], 0.03)])
+    docs, info = again.retrieve("what's the weather in Waterdeep")
+
+    assert "rewrite_cache" not in info and again.rewriter.calls == 1
@@ -0,0 +1,141 @@
+"""Contract tests for checkpoint retention.
+
+Pruning keeps the newest checkpoints and every milestone, takes pending writes
+and orphaned message rows with it, and never leaves the latest checkpoint
+unreadable.
+"""
+
+import sqlite3
+
+import pytest
+from langchain_core.messages import AIMessage
+
+pytestmark = pytest.mark.integration
+
+pytest.importorskip("langgraph.checkpoint.sqlite", reason="full dependency stack not installed")
+
+from langgraph.checkpoint.sqlite import SqliteSaver  # noqa: E402
+
+from src.graph.message_log import MessageLogSaver  # noqa: E402
+from src.graph.retention import (  # noqa: E402
+    BackgroundCompactor,
+    RetentionPolicy,
+    compact,
+    prune_thread,
+    storage_report,
+    tag_milestone,
+)
+from tests.test_message_log import THREAD, campaign, checkpoint_of, rows  # noqa: E402
+
+
+@pytest.fixture
+def conn():
+    return sqlite3.connect(":memory:", check_same_thread=False)
+
+
+def checkpoint_ids(saver):
+    return [t.config["configurable"]["checkpoint_id"] for t in saver.list(THREAD)]
+
+
+def test_only_the_newest_checkpoints_are_kept(conn):
+    saver = MessageLogSaver(conn)
+    campaign(saver, 30)
+    newest = checkpoint_ids(saver)[:5]
+
+    result = prune_thread(saver, "campaign", policy=RetentionPolicy(keep_last=5))
+    assert result.checkpoints == 25
+    assert checkpoint_ids(saver) == newest
+
+
+def test_the_latest_checkpoint_still_reads_back_whole(conn):
+    saver = MessageLogSaver(conn)
+    _, messages = campaign(saver, 30)
+    prune_thread(saver, "campaign", policy=RetentionPolicy(keep_last=1))
+
+    restored = MessageLogSaver(conn).get_tuple(THREAD).checkpoint["channel_values"]["messages"]
+    assert [m.content for m in restored] == [m.content for m in messages]
+
+
+def test_a_milestone_survives_any_age(conn):
+    saver = MessageLogSaver(conn)
+    config, _ = campaign(saver, 3)
+    milestone = tag_milestone(saver, config, "entered the crypt")
+    campaign(saver, 20, config)
+
+    prune_thread(saver, "campaign", policy=RetentionPolicy(keep_last=2))
+    assert milestone["configurable"]["checkpoint_id"] in checkpoint_ids(saver)
+    assert len(checkpoint_ids(saver)) == 3
+
+
+def test_pending_writes_go_with_their_checkpoint(conn):
+    saver = MessageLogSaver(conn)
+    config, _ = campaign(saver, 1)
+    saver.put_writes(config, [("current_task", "x")], task_id="t")
+    campaign(saver, 5, config)
+
+    result = prune_thread(saver, "campaign", policy=RetentionPolicy(keep_last=2))
+    assert result.writes == 1
+    assert rows(conn, "writes") == 0
+
+
+def test_a_message_only_old_checkpoints_used_is_dropped(conn):
+    saver = MessageLogSaver(conn)
+    config, messages = campaign(saver, 2)
+    edited = [messages[0], AIMessage(content="reply 0, revised", id="a0"), *messages[2:]]
+    config = saver.put(config, checkpoint_of(edited), {}, {})
+
+    result = prune_thread(saver, "campaign", policy=RetentionPolicy(keep_last=1))
+    assert result.messages == 1, "the original reply 0"
+    assert rows(conn, "message_log") == 4
+
+
+def test_a_dry_run_changes_nothing(conn):
+    saver = MessageLogSaver(conn)
+    campaign(saver, 10)
+    result = compact(saver, RetentionPolicy(keep_last=2), dry_run=True)
+    assert result.checkpoints == 8
+    assert rows(conn, "checkpoints") == 10
+
+
+def test_the_stock_saver_is_pruned_too(conn):
+    saver = SqliteSaver(conn)
+    campaign(saver, 10)
+    compact(saver, RetentionPolicy(keep_last=3))
+    assert rows(conn, "checkpoints") == 3
+
+
+def test_the_report_counts_each_thread(conn):
+    saver = MessageLogSaver(conn)
+    campaign(saver, 4)
+    other = {"configurable": {"thread_id": "other", "checkpoint_ns": ""}}
+    campaign(saver, 1, other)
+
+    report = {t.thread_id: t for t in storage_report(saver)}
+    assert report["campaign"].checkpoints == 4
+    assert report["campaign"].message_rows == 8
+    assert report["other"].message_rows == 2
+    assert report["campaign"].total_bytes > report["other"].total_bytes
+
+
+def test_keep_last_must_keep_the_latest():
+    with pytest.raises(ValueError):
+        RetentionPolicy(keep_last=0)
+
+
+def test_the_background_compactor_prunes_without_being_asked(conn):
+    saver = MessageLogSaver(conn)
+    campaign(saver, 10)
+    compactor = BackgroundCompactor(saver, RetentionPolicy(keep_last=2), interval=0.01).start()
+    try:
+        for _ in range(200):
+            if compactor.last_result is not None:
+                break
+            compactor._stop.wait(0.01)
+    finally:
+        compactor.stop(timeout=1)
+    assert rows(conn, "checkpoints") == 2
+
+
+def test_a_zero_interval_never_starts_a_thread(conn):
+    compactor = BackgroundCompactor(MessageLogSaver(conn), interval=0).start()
+    assert compactor._thread is None
@@ -0,0 +1,193 @@
+"""Contract tests for the multi-session game server.
+
+One graph serves every session; each session gets its own turn's tokens, in
+order, at the pace its client reads them. The DM is a streaming stub, so no
+model daemon is needed.
+"""
+
+import asyncio
+import json
+
+import pytest
+
+pytestmark = pytest.mark.integration
+
+pytest.importorskip("aiohttp", reason="aiohttp not installed")
+pytest.importorskip("langgraph.checkpoint.sqlite", reason="full dependency stack not installed")
+
+from aiohttp.test_utils import TestClient, TestServer  # noqa: E402
+
+from src.agents.dice_roller import DiceRollerAgent  # noqa: E402
+from src.graph.game_orchestrator import create_game_graph, create_sqlite_checkpointer  # noqa: E402
+from src.server.app import SERVER_KEY, GameServer, create_app  # noqa: E402
+from tests.test_graph_smoke import streaming_dm  # noqa: E402
+
+NARRATION = "The goblin staggers back, clutching its arm, and flees into the dark."
+
+
+@pytest.fixture
+def game_graph(monkeypatch):
+    streaming_dm(monkeypatch, NARRATION)
+    return create_game_graph(checkpointer=create_sqlite_checkpointer(":memory:"))
+
+
+def serve(game_graph, scenario, **kwargs):
+    """Runs `scenario(client)` against a live server on a free port."""
+    async def main():
+        app = create_app(game_graph, DiceRollerAgent(), **kwargs)
+        async with TestClient(TestServer(app)) as client:
+            return await scenario(client)
+    return asyncio.run(main())
+
+
+async def play_ws(client, text, thread_id=None):
+    """Opens a session, plays one turn, returns (thread_id, events)."""
+    path = f"/ws?thread_id={thread_id}" if thread_id else "/ws"
+    async with client.ws_connect(path) as ws:
+        session = await ws.receive_json()
+        await ws.send_json({"text": text})
+        events = []
+        while (event := await ws.receive_json())["type"] != "done":
+            events.append(event)
+    return session["thread_id"], events
+
+
+def narration(events):
+    return "".join(e["text"] for e in events if e["type"] == "token")
+
+
+def test_a_turn_streams_its_narration_token_by_token(game_graph):
+    async def scenario(client):
+        return await play_ws(client, "I attack the goblin")
+
+    _, events = serve(game_graph, scenario)
+    tokens = [e for e in events if e["type"] == "token"]
+    assert len(tokens) > 1
+    assert {e["node"] for e in tokens} == {"dungeon_master"}
+    assert narration(events) == NARRATION
+
+
+def test_concurrent_sessions_keep_to_their_own_campaigns(game_graph):
+    async def scenario(client):
+        return await asyncio.gather(*(play_ws(client, f"I attack goblin {i}")
+                                      for i in range(4)))
+
+    sessions = serve(game_graph, scenario)
+    assert len({thread_id for thread_id, _ in sessions}) == 4
+    for i, (thread_id, events) in enumerate(sessions):
+        assert narration(events) == NARRATION
+        state = game_graph.get_state({"configurable": {"thread_id": thread_id}}).values
+        players = [m.content for m in state["messages"] if m.type == "human"]
+        assert players == [f"I attack goblin {i}"]
+
+
+def test_a_session_resumes_its_campaign_by_thread_id(game_graph):
+    async def scenario(client):
+        thread_id, _ = await play_ws(client, "I attack the goblin")
+        await play_ws(client, "I attack it again", thread_id)
+        return thread_id
+
+    thread_id = serve(game_graph, scenario)
+    state = game_graph.get_state({"configurable": {"thread_id": thread_id}}).values
+    assert [m.content for m in state["messages"] if m.type == "human"] == [
+        "I attack the goblin", "I attack it again"]
+
+
+def test_a_written_roll_posts_through_the_fast_lane(game_graph):
+    async def scenario(client):
+        response = await client.post("/sessions/table-1/turns", json={"text": "roll 2d6+3"})
+        return [json.loads(line) for line in (await response.text()).splitlines()]
+
+    events = serve(game_graph, scenario)
+    assert events[0]["name"] == "dice_roller"
+    assert events[0]["content"].startswith("🎲 Rolled 2d6 + 3")
+    assert events[1:] == [{"type": "done"}]
+
+
+def test_a_second_turn_while_one_runs_is_refused(game_graph):
+    async def scenario(client):
+        async with client.ws_connect("/ws") as ws:
+            await ws.receive_json()
+            await ws.send_json({"text": "I attack the goblin"})
+            await ws.send_json({"text": "I attack again"})
+            events = []
+            while (event := await ws.receive_json())["type"] != "done":
+                events.append(event)
+        return events
+
+    events = serve(game_graph, scenario)
+    assert [e["error"] for e in events if e["type"] == "error"] == ["a turn is already running"]
+    assert narration(events) == NARRATION
+
+
+def test_a_slow_reader_gets_every_token_in_order(game_graph):
+    async def scenario(client):
+        async with client.ws_connect("/ws") as ws:
+            await ws.receive_json()
+            await ws.send_json({"text": "I attack the goblin"})
+            events = []
+            while (event := await ws.receive_json())["type"] != "done":
+                events.append(event)
+                await asyncio.sleep(0.01)
+        return events
+
+    assert narration(serve(game_graph, scenario, buffer=1)) == NARRATION
+
+
+def test_a_stalled_client_frees_its_worker(game_graph):
+    server = GameServer(game_graph, DiceRollerAgent(), workers=1, buffer=1, send_timeout=5)
+
+    async def main():
+        async def never_reads(event):
+            await asyncio.Event().wait()
+
+        first, second = server.session("stalled"), server.session("next")
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(server.play(first, "I attack the goblin", never_reads), 0.5)
+        events = []
+
+        async def collect(event):
+            events.append(event)
+
+        # One worker: this only runs once the stalled turn has given up, and
+        # well inside `send_timeout`.
+        await asyncio.wait_for(server.play(second, "I attack the goblin", collect), 3)
+        return events
+
+    assert narration(asyncio.run(main())) == NARRATION
+    assert server.active_turns == 0
+
+
+def test_sessions_stay_bounded_however_many_thread_ids_arrive(game_graph):
+    async def scenario(client):
+        for i in range(10):
+            response = await client.post(f"/sessions/random-{i}/turns", json={"text": "roll 1d4"})
+            await response.text()
+        return client.server.app
+
+    app = serve(game_graph, scenario, max_sessions=3)
+    server = app[SERVER_KEY]
+    assert list(server.sessions) == ["random-7", "random-8", "random-9"]
+
+
+def test_idle_sessions_expire_when_a_new_one_is_made(game_graph):
+    server = GameServer(game_graph, DiceRollerAgent(), session_ttl=0)
+
+    async def main():
+        held = server.session("held")
+        server.leave(server.session("left"))
+        server.session("new")
+        return held
+
+    asyncio.run(main())
+    assert list(server.sessions) == ["held", "new"], "a connected session is kept"
+
+
+def test_a_new_session_is_refused_when_every_slot_is_held(game_graph):
+    async def scenario(client):
+        async with client.ws_connect("/ws") as ws:
+            await ws.receive_json()
+            response = await client.post("/sessions/another/turns", json={"text": "roll 1d4"})
+            return response.status
+
+    assert serve(game_graph, scenario, max_sessions=1) == 503
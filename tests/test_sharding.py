@@ -0,0 +1,140 @@
+"""Contract tests for sharded checkpoints and the rebalance tool.
+
+A thread lives in exactly one shard, chosen the same way in every process, and
+the shard count cannot change under existing files without a rebalance.
+"""
+
+import sqlite3
+import sys
+
+import pytest
+
+pytestmark = pytest.mark.integration
+
+pytest.importorskip("langgraph.checkpoint.sqlite", reason="full dependency stack not installed")
+
+from src.graph.game_orchestrator import create_sqlite_checkpointer  # noqa: E402
+from src.graph.retention import RetentionPolicy, compact, storage_report  # noqa: E402
+from src.graph.sharding import (  # noqa: E402
+    ShardedSaver,
+    existing_shard_paths,
+    shard_index,
+    shard_paths,
+)
+from tests.test_message_log import campaign  # noqa: E402
+
+THREADS = [f"campaign-{i}" for i in range(12)]
+
+
+def config_of(thread_id):
+    return {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+
+
+def threads_in(path):
+    conn = sqlite3.connect(path)
+    try:
+        return {t for (t,) in conn.execute("SELECT DISTINCT thread_id FROM checkpoints")}
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def db(tmp_path):
+    return str(tmp_path / "game.db")
+
+
+def play(saver, turns=3):
+    for thread_id in THREADS:
+        campaign(saver, turns, config_of(thread_id))
+
+
+def test_the_shard_is_stable_and_in_range():
+    # A fixed value: the same thread must map to the same file in every
+    # process, which the per-process salted `hash()` would not.
+    assert shard_index("campaign", 4) == 1
+    assert all(0 <= shard_index(t, 8) < 8 for t in THREADS)
+
+
+def test_each_thread_lives_in_its_own_shard_only(db):
+    saver = create_sqlite_checkpointer(db, readers=0, shards=4)
+    assert isinstance(saver, ShardedSaver)
+    play(saver)
+    for i, path in enumerate(shard_paths(db, 4)):
+        assert threads_in(path) == {t for t in THREADS if shard_index(t, 4) == i}
+
+
+def test_a_thread_reads_back_from_its_shard(db):
+    saver = create_sqlite_checkpointer(db, readers=0, shards=4)
+    play(saver)
+    reopened = create_sqlite_checkpointer(db, readers=0, shards=4)
+    for thread_id in THREADS:
+        messages = reopened.get_tuple(config_of(thread_id)).checkpoint["channel_values"]["messages"]
+        assert len(messages) == 6
+
+
+def test_listing_without_a_thread_merges_the_shards_newest_first(db):
+    saver = create_sqlite_checkpointer(db, readers=0, shards=4)
+    play(saver, turns=2)
+    ids = [t.config["configurable"]["checkpoint_id"] for t in saver.list(None)]
+    assert len(ids) == len(THREADS) * 2
+    assert ids == sorted(ids, reverse=True)
+    assert len(list(saver.list(None, limit=5))) == 5
+
+
+def test_retention_covers_every_shard(db):
+    saver = create_sqlite_checkpointer(db, readers=0, shards=4)
+    play(saver, turns=4)
+    result = compact(saver, RetentionPolicy(keep_last=1))
+    assert result.checkpoints == len(THREADS) * 3
+    assert {t.thread_id for t in storage_report(saver)} == set(THREADS)
+
+
+def test_a_different_shard_count_over_existing_files_is_refused(db):
+    create_sqlite_checkpointer(db, readers=0, shards=4)
+    with pytest.raises(ValueError, match="rebalance"):
+        create_sqlite_checkpointer(db, readers=0, shards=8)
+
+
+def test_going_back_to_one_file_over_existing_shards_is_refused(db):
+    play(create_sqlite_checkpointer(db, readers=0, shards=4))
+    with pytest.raises(ValueError, match="rebalance"):
+        create_sqlite_checkpointer(db, readers=0, shards=1)
+
+
+def test_sharding_a_populated_single_file_is_refused(db):
+    play(create_sqlite_checkpointer(db, readers=0, shards=1))
+    with pytest.raises(ValueError, match="rebalance"):
+        create_sqlite_checkpointer(db, readers=0, shards=4)
+    assert existing_shard_paths(db) == [], "no shard files were created"
+
+
+def test_an_empty_single_file_can_be_sharded(db):
+    create_sqlite_checkpointer(db, readers=0, shards=1).setup()
+    create_sqlite_checkpointer(db, readers=0, shards=4)
+
+
+def rebalance(monkeypatch, db, shards):
+    monkeypatch.setattr(sys, "argv", ["rebalance_shards.py", "--db", db, "--shards", str(shards)])
+    from scripts.rebalance_shards import main
+    assert main() == 0
+
+
+def test_rebalancing_moves_every_thread_to_its_new_shard(db, monkeypatch):
+    play(create_sqlite_checkpointer(db, readers=0, shards=1))
+    rebalance(monkeypatch, db, 4)
+    assert threads_in(db) == set()
+    saver = create_sqlite_checkpointer(db, readers=0, shards=4)
+    for thread_id in THREADS:
+        assert saver.get_tuple(config_of(thread_id)) is not None
+
+    rebalance(monkeypatch, db, 2)
+    assert existing_shard_paths(db) == shard_paths(db, 2)
+    for i, path in enumerate(shard_paths(db, 2)):
+        assert threads_in(path) == {t for t in THREADS if shard_index(t, 2) == i}
+    saver = create_sqlite_checkpointer(db, readers=0, shards=2)
+    messages = saver.get_tuple(config_of(THREADS[0])).checkpoint["channel_values"]["messages"]
+    assert len(messages) == 6
+
+    rebalance(monkeypatch, db, 1)
+    assert threads_in(db) == set(THREADS)
+    assert existing_shard_paths(db) == []
@@ -0,0 +1,137 @@
+"""Contract tests for category shards and the router that picks them.
+
+The router reads the real vendored corpus. The shards are real Chroma
+collections in a temporary directory, embedded as bags of words over a small
+vocabulary so no model is needed. What is pinned is which categories a
+question routes to, that shards share the main collection's ids and scores,
+and that a routed search that misses falls back to the whole index.
+"""
+
+import json
+import re
+from pathlib import Path
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+import src.data.shards as shards_module
+from src.data.shards import SHARD_MANIFEST, ShardedVectorStore, build_shards, load_shards
+from src.pipelines.shard_router import route_categories
+
+pytestmark = pytest.mark.integration
+
+
+def test_a_named_monster_routes_to_monsters():
+    assert route_categories("what's the AC of an owlbear") == ["Monsters"]
+    assert "Monsters" in route_categories("What's a goblin's armor class?")
+
+
+def test_keywords_route_without_a_name():
+    assert route_categories("which spells can a wizard cast as a ritual?")[-1] == "Spells"
+    assert route_categories("how much does it cost") == ["Equipment"]
+
+
+def test_a_name_in_two_categories_routes_to_both():
+    assert set(route_categories("how fast is a camel")) >= {"Equipment", "Monsters"}
+
+
+def test_a_question_that_names_nothing_routes_nowhere():
+    assert route_categories("can I fight from horseback?") == []
+
+
+# --- the shards ---------------------------------------------------------------
+
+VOCABULARY = ["goblin", "owlbear", "armor", "fireball", "fire", "grapple", "spell"]
+
+
+class BagOfWords(Embeddings):
+    def _embed(self, text):
+        words = re.findall(r"[a-z]+", text.lower())
+        vector = [float(words.count(w)) for w in VOCABULARY] + [0.1]
+        norm = sum(x * x for x in vector) ** 0.5
+        return [x / norm for x in vector]
+
+    def embed_documents(self, texts):
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+def chunk(i, text, category, name):
+    return Document(id=f"chunk-{i}", page_content=text,
+                    metadata={"source": "SRD 5.1", "category": category, "name": name})
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    from langchain_chroma import Chroma
+
+    monkeypatch.setattr(shards_module, "create_embeddings", BagOfWords)
+    docs = [chunk(0, "goblin armor", "Monsters", "Goblin"),
+            chunk(1, "owlbear", "Monsters", "Owlbear"),
+            chunk(2, "fireball fire spell", "Spells", "Fireball"),
+            chunk(3, "goblin fire spell armor", "Spells", "Goblin Fire"),
+            chunk(4, "grapple", "Rules", "Making an Attack")]
+    store = Chroma.from_documents(docs, BagOfWords(), persist_directory=str(tmp_path),
+                                  collection_name="main")
+    return store, str(tmp_path)
+
+
+def test_every_chunk_lands_in_its_category_with_its_id(index):
+    store, directory = index
+    assert build_shards(store, directory) == {"Monsters": 2, "Spells": 2, "Rules": 1}
+
+    manifest = json.loads((Path(directory) / SHARD_MANIFEST).read_text())
+    assert manifest["Monsters"] == {"collection": "srd_monsters", "chunks": 2}
+    shards = load_shards(directory)
+    assert sorted(shards["Spells"].get()["ids"]) == ["chunk-2", "chunk-3"]
+
+
+def test_routed_search_ranks_within_the_shard_and_keeps_the_scores(index):
+    store, directory = index
+    build_shards(store, directory)
+    sharded = ShardedVectorStore(store, load_shards(directory),
+                                 lambda q: ["Monsters"], min_score=0.0)
+
+    routed = sharded.similarity_search_with_relevance_scores("goblin armor", k=3)
+    whole = dict((d.id, s) for d, s in store.similarity_search_with_relevance_scores(
+        "goblin armor", k=5))
+
+    assert [d.id for d, _ in routed] == ["chunk-0", "chunk-1"]
+    assert all(score == pytest.approx(whole[d.id]) for d, score in routed)
+
+
+def test_a_routed_miss_falls_back_to_the_whole_index(index):
+    store, directory = index
+    build_shards(store, directory)
+    sharded = ShardedVectorStore(store, load_shards(directory),
+                                 lambda q: ["Rules"], min_score=0.5)
+
+    found = sharded.similarity_search_with_relevance_scores("fireball", k=1)
+    assert found[0][0].id == "chunk-2"
+    assert sharded.get(ids=["chunk-4"])["documents"] == ["grapple"]  # the main collection's
+
+
+def test_a_routed_miss_embeds_the_query_once(index):
+    store, directory = index
+    build_shards(store, directory)
+    embedded = []
+
+    class Counting(BagOfWords):
+        def embed_query(self, text):
+            embedded.append(text)
+            return super().embed_query(text)
+
+    store._embedding_function = Counting()
+    sharded = ShardedVectorStore(store, load_shards(directory),
+                                 lambda q: ["Rules"], min_score=0.5)
+
+    assert sharded.similarity_search_with_relevance_scores("fireball", k=1)[0][0].id == "chunk-2"
+    assert embedded == ["fireball"]
+
+
+def test_an_index_without_shards_opens_none(tmp_path):
+    assert load_shards(str(tmp_path)) == {}
+    assert shards_module.open_sharded(object(), str(tmp_path), route_categories, 0.25) is None
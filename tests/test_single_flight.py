@@ -0,0 +1,211 @@
+"""Contract tests for single-flight coalescing of researcher answers.
+
+No daemon: the leader's model is a fake chat model held at a gate until the
+followers have joined, so the overlap is certain rather than a timing
+accident. What is pinned is that identical requests make one model call, that
+every follower gets the leader's tokens in order — including those sent before
+it joined — and that a leader's failure reaches its followers.
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+
+import src.agents.researcher as researcher_module
+from src.utils.single_flight import Flight, ReplayChat, SingleFlight
+
+pytestmark = pytest.mark.integration
+
+ANSWER = "Make a grapple check: Athletics against Athletics or Acrobatics."
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+class GatedModel(GenericFakeChatModel):
+    """Answers `ANSWER` — streamed word by word — once `gate` is set. Counts calls."""
+
+    gate: threading.Event
+    calls: list
+
+    def _generate(self, *args, **kwargs):
+        # Both the streaming and the plain path of the fake come through here.
+        self.calls.append(1)
+        self.gate.wait(5)
+        return super()._generate(*args, **kwargs)
+
+
+def gated_model():
+    return GatedModel(messages=iter([AIMessage(content=ANSWER)] * 10),
+                      gate=threading.Event(), calls=[])
+
+
+# --- flights ----------------------------------------------------------------
+
+def test_a_late_subscriber_gets_the_backlog_then_the_live_tokens():
+    flight = Flight("k")
+    flight.publish("Make")
+    tokens = []
+    reader = threading.Thread(target=lambda: tokens.extend(flight.tokens()))
+    reader.start()
+    wait_until(lambda: tokens == ["Make"] or flight._subscribers)
+    flight.publish(" a")
+    flight.publish(" check")
+    flight.finish(AIMessage(content="Make a check"))
+    reader.join(5)
+    assert tokens == ["Make", " a", " check"]
+
+
+def test_the_first_request_leads_and_the_rest_follow_until_it_lands():
+    flights = SingleFlight()
+    first, led = flights.join("k")
+    second, followed = flights.join("k")
+    assert (led, followed, first is second) == (True, False, True)
+
+    flights.land(first, "answer")
+    assert second.outcome() == "answer"
+    _, led_again = flights.join("k")
+    assert led_again and (flights.led, flights.followed) == (2, 1)
+
+
+def test_a_cancelled_leader_fails_its_followers_with_an_ordinary_error():
+    flights = SingleFlight()
+    flight, _ = flights.join("k")
+    flights.land(flight, error=asyncio.CancelledError())
+    with pytest.raises(RuntimeError, match="abandoned"):
+        flight.outcome()
+
+
+def test_a_replay_of_an_unstreamed_answer_arrives_whole():
+    flight = Flight("k")
+    flight.finish(AIMessage(content=ANSWER))
+    chunks = [c.content for c in ReplayChat(flight=flight).stream([HumanMessage(content="q")])]
+    assert "".join(chunks) == ANSWER
+
+
+def test_an_async_replay_streams_the_leaders_tokens():
+    flight = Flight("k")
+
+    async def main():
+        async def lead():
+            for token in ["Make", " a", " check"]:
+                await asyncio.sleep(0.01)
+                flight.publish(token)
+            flight.finish(AIMessage(content="Make a check"))
+
+        leader = asyncio.create_task(lead())
+        chunks = [c.content async for c in ReplayChat(flight=flight).astream("q")]
+        await leader
+        return chunks
+
+    assert [c for c in asyncio.run(main()) if c] == ["Make", " a", " check"]
+
+
+# --- the researcher ---------------------------------------------------------
+
+def make_researcher(monkeypatch):
+    from tests.test_researcher import make_agent
+
+    agent, _ = make_agent(monkeypatch, [])
+    agent.vectorstore = None  # no retrieval: the key is the question and the model
+    agent.llm = gated_model()
+    return agent
+
+
+def ask(agent, question):
+    return agent.process_task({"messages": [], "current_task": question})
+
+
+def test_identical_concurrent_questions_share_one_generation(monkeypatch):
+    agent = make_researcher(monkeypatch)
+    answers = {}
+
+    def player(i, question):
+        answers[i] = ask(agent, question).update["messages"][0].content
+
+    players = [threading.Thread(target=player, args=(i, q)) for i, q in enumerate(
+        ["How does grappling work?", "how does grappling  work?", "How does GRAPPLING work?"])]
+    for thread in players:
+        thread.start()
+    wait_until(lambda: agent.flights.followed == 2)
+    agent.llm.gate.set()
+    for thread in players:
+        thread.join(5)
+
+    assert agent.llm.calls == [1]
+    assert set(answers.values()) == {ANSWER}
+    assert agent.flights.in_flight() == 0
+
+
+def test_different_questions_are_not_coalesced(monkeypatch):
+    agent = make_researcher(monkeypatch)
+    agent.llm.gate.set()
+    ask(agent, "How does grappling work?")
+    ask(agent, "How does shoving work?")
+    assert len(agent.llm.calls) == 2 and agent.flights.followed == 0
+
+
+def test_async_followers_share_the_leaders_generation(monkeypatch):
+    agent = make_researcher(monkeypatch)
+
+    async def main():
+        turns = [asyncio.create_task(agent.aprocess_task(
+            {"messages": [], "current_task": "How does grappling work?"})) for _ in range(3)]
+        while agent.flights.followed < 2:
+            await asyncio.sleep(0.005)
+        agent.llm.gate.set()
+        return await asyncio.gather(*turns)
+
+    commands = asyncio.run(main())
+    assert agent.llm.calls == [1]
+    assert {c.update["messages"][0].content for c in commands} == {ANSWER}
+
+
+def test_a_follower_streams_the_shared_answer_in_its_own_turn(monkeypatch):
+    """Through the real graph: the follower's player sees the tokens live."""
+    from langgraph.checkpoint.memory import InMemorySaver
+
+    from src.graph.game_orchestrator import create_game_graph, run_turn
+
+    model = gated_model()
+    flights = []
+
+    class Recorded(SingleFlight):
+        def __init__(self):
+            super().__init__()
+            flights.append(self)
+
+    monkeypatch.setattr(researcher_module, "create_llm", lambda *a, **k: model)
+    monkeypatch.setattr(researcher_module, "SingleFlight", Recorded)
+    monkeypatch.setattr(researcher_module, "load_vectorstore",
+                        lambda: (_ for _ in ()).throw(researcher_module.VectorStoreMissingError()))
+    game_graph = create_game_graph(checkpointer=InMemorySaver())
+    tokens = {0: [], 1: []}
+
+    def player(i):
+        turn = {"messages": [HumanMessage(content="How does grappling work?")],
+                "current_task": "How does grappling work?"}
+        run_turn(game_graph, turn, {"configurable": {"thread_id": f"p{i}"}},
+                 on_token=lambda node, text: tokens[i].append((node, text)))
+
+    players = [threading.Thread(target=player, args=(i,)) for i in range(2)]
+    for thread in players:
+        thread.start()
+    wait_until(lambda: flights and flights[0].followed == 1)
+    model.gate.set()
+    for thread in players:
+        thread.join(10)
+
+    assert model.calls == [1]
+    for i in (0, 1):
+        assert len(tokens[i]) > 1
+        assert {node for node, _ in tokens[i]} == {"researcher"}
+        assert "".join(text for _, text in tokens[i]) == ANSWER
@@ -0,0 +1,87 @@
+"""Contract tests for the tuned checkpoint connection and its reader pool."""
+
+import sqlite3
+
+import pytest
+
+pytestmark = pytest.mark.integration
+
+pytest.importorskip("langgraph.checkpoint.sqlite", reason="full dependency stack not installed")
+
+from src.graph.game_orchestrator import create_sqlite_checkpointer  # noqa: E402
+from src.graph.sqlite_connection import (  # noqa: E402
+    DEFAULT_SQLITE_PRAGMAS,
+    ENV_SQLITE_PRAGMAS,
+    ReaderPool,
+    connect_sqlite,
+    resolve_pragmas,
+)
+from tests.test_message_log import THREAD, campaign  # noqa: E402
+
+
+def pragma(conn, name):
+    return conn.execute(f"PRAGMA {name}").fetchone()[0]
+
+
+def test_the_defaults_apply_without_overrides(monkeypatch):
+    monkeypatch.delenv(ENV_SQLITE_PRAGMAS, raising=False)
+    assert resolve_pragmas() == DEFAULT_SQLITE_PRAGMAS
+
+
+def test_the_environment_and_then_the_caller_override(monkeypatch):
+    monkeypatch.setenv(ENV_SQLITE_PRAGMAS, "synchronous=FULL, mmap_size=0")
+    pragmas = resolve_pragmas({"mmap_size": 1024})
+    assert pragmas["synchronous"] == "FULL"
+    assert pragmas["mmap_size"] == "1024"
+    assert pragmas["journal_mode"] == "WAL"
+
+
+def test_a_malformed_override_is_an_error(monkeypatch):
+    monkeypatch.setenv(ENV_SQLITE_PRAGMAS, "synchronous")
+    with pytest.raises(ValueError):
+        resolve_pragmas()
+
+
+def test_a_pragma_name_cannot_smuggle_sql():
+    with pytest.raises(ValueError):
+        connect_sqlite(":memory:", {"synchronous; DROP TABLE checkpoints": "1"})
+
+
+def test_the_connection_is_tuned(tmp_path, monkeypatch):
+    monkeypatch.delenv(ENV_SQLITE_PRAGMAS, raising=False)
+    conn = connect_sqlite(str(tmp_path / "game.db"))
+    assert pragma(conn, "journal_mode") == "wal"
+    assert pragma(conn, "synchronous") == 1  # NORMAL
+    assert pragma(conn, "busy_timeout") == 5000
+
+
+def test_pooled_readers_see_committed_writes_and_cannot_write(tmp_path):
+    db = str(tmp_path / "game.db")
+    writer = connect_sqlite(db)
+    writer.execute("CREATE TABLE t (x)")
+    writer.execute("INSERT INTO t VALUES (1)")
+    writer.commit()
+
+    pool = ReaderPool(db, size=2)
+    with pool.cursor() as cur:
+        assert cur.execute("SELECT x FROM t").fetchall() == [(1,)]
+        with pytest.raises(sqlite3.OperationalError):
+            cur.execute("INSERT INTO t VALUES (2)")
+
+
+def test_the_checkpointer_reads_through_its_pool(tmp_path):
+    saver = create_sqlite_checkpointer(str(tmp_path / "game.db"), readers=2)
+    assert saver.readers is not None
+    _, messages = campaign(saver, 5)
+
+    fresh = create_sqlite_checkpointer(str(tmp_path / "game.db"), readers=2)
+    restored = fresh.get_tuple(THREAD).checkpoint["channel_values"]["messages"]
+    assert [m.content for m in restored] == [m.content for m in messages]
+
+
+def test_an_in_memory_database_gets_no_pool():
+    assert create_sqlite_checkpointer(":memory:").readers is None
+
+
+def test_zero_readers_means_no_pool(tmp_path):
+    assert create_sqlite_checkpointer(str(tmp_path / "game.db"), readers=0).readers is None
@@ -12,6 +12,7 @@ from src.data.srd_loader import (
     SRD_FILES,
     chunk_entry,
     load_srd_documents,
+    load_srd_entries,
     merge_shared_entries,
     render_monster,
     render_spell,
@@ -125,6 +126,38 @@ def test_rule_sections_are_split_but_stay_findable(documents):
     assert all(d.page_content.startswith("# Making an Attack") for d in attack)
 
 
+def test_every_piece_records_how_many_pieces_its_entry_has(documents):
+    """The researcher shows a one-piece entry as written; a piece of a longer
+    one is never the whole answer."""
+    assert [d.metadata["chunk_count"] for d in find(documents, "Grappled")] == [1]
+    attack = find(documents, "Making an Attack")
+    assert {d.metadata["chunk_count"] for d in attack} == {len(attack)}
+
+
+def test_every_piece_records_its_place_in_its_entry(documents):
+    """Context assembly puts retrieved pieces back in order by it."""
+    assert [d.metadata["chunk_index"] for d in find(documents, "Grappled")] == [0]
+    attack = find(documents, "Making an Attack")
+    assert [d.metadata["chunk_index"] for d in attack] == list(range(len(attack)))
+
+
+def test_entries_with_one_name_are_told_apart(documents):
+    """The barbarian's and the monk's Unarmored Defense are different text."""
+    defenses = find(documents, "Unarmored Defense")
+    assert len({d.metadata["entry_id"] for d in defenses}) == len(defenses) > 1
+
+
+def test_a_whole_entry_is_its_pieces_before_splitting(documents):
+    entries = {e.metadata["entry_id"]: e for e in load_srd_entries(SRD_DIRECTORY)}
+    grappled = find(documents, "Grappled")[0]
+    assert entries[grappled.metadata["entry_id"]].page_content == grappled.page_content
+
+    attack = find(documents, "Making an Attack")
+    whole = entries[attack[0].metadata["entry_id"]].page_content
+    assert whole.startswith("# Making an Attack\n")
+    assert all(piece.page_content.split("\n", 1)[1][:100] in whole for piece in attack)
+
+
 # --- deduplication ----------------------------------------------------------
 
 def test_shared_features_are_merged_not_repeated():
@@ -6,15 +6,29 @@ pins the *contract* (what the supervisor does with a given router answer) rather
 than the model's judgement, which is not a thing tests can assert on.
 """
 
+import asyncio
+
 import pytest
 from langchain_core.messages import AIMessage, HumanMessage
 
+from src.agents.routing_cases import ROUTING_CASES
 from src.agents.supervisor import (
     AGENT_TYPES,
+    CERTAIN,
+    LIKELY,
+    PREFILTER_RULES,
+    ROUTING_LETTERS,
     ROUTING_OPTIONS,
     GameSupervisor,
+    classify_request,
+    mentioned_srd_entry,
     prefilter_route,
+    read_letter_decision,
+    resolve_prefilter_tier,
+    resolve_router_mode,
+    split_intents,
 )
+from src.data.srd_loader import mentioned_srd_entries
 
 pytestmark = pytest.mark.integration  # constructing the agent imports the stack
 
@@ -47,10 +61,10 @@ def test_prefilter_catches_unambiguous_rolls(request_text):
         "explain why 2d6 beats 1d12",
         # Notation as description, not a request to roll.
         "my sword does 2d6 slashing damage",
-        # No notation at all.
-        "I open the door",
-        "how does sneak attack work",
+        # No notation, and no other rule's surface form either.
         "roll with it",          # roll verb, no notation
+        "I wonder how grappling works",
+        "what do I see",
         "",
         "   ",
     ],
@@ -60,6 +74,151 @@ def test_prefilter_defers_to_the_model_when_unsure(request_text):
     assert prefilter_route(request_text) is None
 
 
+@pytest.mark.parametrize("tier", [CERTAIN, LIKELY])
+@pytest.mark.parametrize("request_text, expected", ROUTING_CASES)
+def test_prefilter_never_contradicts_the_labelled_set(request_text, expected, tier):
+    assert prefilter_route(request_text, tier) in (None, expected)
+
+
+# --- the rule table ---------------------------------------------------------
+
+# (request, destination, rule, tier). Every rule, at every tier it can produce.
+RULE_TABLE_CASES = [
+    ("roll a d20", "dice_roller", "dice_notation", CERTAIN),
+    ("2d6+1d8", "dice_roller", "dice_notation", CERTAIN),
+    ("thanks, that's all", "FINISH", "finish_phrase", CERTAIN),
+    ("ok cool", "FINISH", "finish_phrase", CERTAIN),
+    ("Goodbye!", "FINISH", "finish_phrase", CERTAIN),
+    ("thank you so much", "FINISH", "finish_phrase", CERTAIN),
+    ("how does sneak attack work", "researcher", "rules_question", CERTAIN),
+    ("explain grappling", "researcher", "rules_question", CERTAIN),
+    ("what is the AC of a goblin", "researcher", "rules_question", CERTAIN),
+    ("how much damage does fireball do", "researcher", "rules_question", CERTAIN),
+    ("what is a mimic", "researcher", "rules_question", CERTAIN),
+    ("can a wizard cast two spells in one turn", "researcher", "rules_question", LIKELY),
+    ("what is the goblin doing", "researcher", "rules_question", LIKELY),
+    ("I open the door", "dungeon_master", "first_person_action", CERTAIN),
+    ("I carefully search the room", "dungeon_master", "first_person_action", CERTAIN),
+    ("we sneak past the guards", "dungeon_master", "first_person_action", CERTAIN),
+    ("let's head back to town", "dungeon_master", "first_person_action", CERTAIN),
+    ("I try to pick the lock", "dungeon_master", "first_person_action", CERTAIN),
+    ("I whistle a tune", "dungeon_master", "first_person_action", LIKELY),
+]
+
+
+@pytest.mark.parametrize("request_text, destination, rule, tier", RULE_TABLE_CASES)
+def test_the_rule_table(request_text, destination, rule, tier):
+    match = classify_request(request_text)
+    assert (match.destination, match.rule, match.tier) == (destination, rule, tier)
+
+
+@pytest.mark.parametrize(
+    "request_text",
+    [
+        "ok so what happens if I fall off the cliff",   # social opener, real question
+        "thanks, and what does the door look like",
+        "I wonder how grappling works",                 # thinking, not acting
+        "I roll for stealth",                           # no notation: the model decides
+        "I attack the goblin, do I have advantage?",    # a question despite the verb
+        "what do I see",                                # a scene question
+        "how does the weather look",                    # no SRD name
+        "what does d20 mean",
+    ],
+)
+def test_rules_do_not_fire_on_lookalikes(request_text):
+    assert classify_request(request_text) is None
+
+
+@pytest.mark.parametrize(
+    "request_text",
+    [
+        "how much damage did the goblin take",
+        "how many hit points does the goblin have left",
+        "how many hit points do I have now",
+    ],
+)
+def test_in_scene_stat_questions_are_left_to_the_model(request_text):
+    """A stat term asks about the SRD only when the fight's state is not in it."""
+    assert classify_request(request_text).tier == LIKELY
+    assert prefilter_route(request_text) is None
+
+
+def test_only_certain_rules_route_by_default():
+    assert prefilter_route("I whistle a tune") is None
+    assert prefilter_route("I whistle a tune", LIKELY) == "dungeon_master"
+
+
+def test_prefilter_tier_is_read_from_the_environment(monkeypatch):
+    monkeypatch.setenv("DND_PREFILTER_TIER", "likely")
+    assert resolve_prefilter_tier() == LIKELY
+    with pytest.raises(ValueError, match="tier"):
+        resolve_prefilter_tier("maybe")
+
+
+def test_every_rule_names_a_routing_option():
+    assert {destination for _, destination, _ in PREFILTER_RULES} <= set(ROUTING_OPTIONS)
+
+
+def test_entry_names_match_on_word_boundaries():
+    assert mentioned_srd_entry("how does rage work") == "rage"
+    assert mentioned_srd_entry("that was outrageous") is None
+    assert mentioned_srd_entry("how many hit points do goblins have") == "hit points"
+    assert mentioned_srd_entry("tell me about goblins") == "goblin"
+
+
+def test_every_named_entry_is_found_once_and_longest_first():
+    assert mentioned_srd_entries("can I cast fire bolt while grappled") == ["fire bolt", "grappled"]
+    assert mentioned_srd_entries("how does sneak attack work") == ["sneak attack"]
+    assert mentioned_srd_entries("goblins and more goblins") == ["goblin"]
+
+
+def test_a_prefiltered_finish_still_says_something():
+    supervisor, stub = make_supervisor({"next": "researcher"})
+    command = supervisor.process_task(state("ok cool"))
+
+    assert command.goto == "__end__"
+    assert command.update["active_agent"] == "FINISH"
+    assert command.update["messages"][0].content.strip()
+    assert stub.calls == []
+
+
+def test_a_likely_match_still_asks_the_model_and_logs_the_hint(monkeypatch):
+    supervisor, stub = make_supervisor({"next": "dungeon_master"})
+    logged = {}
+    monkeypatch.setattr(
+        supervisor, "_log_interaction",
+        lambda query, response, metadata=None: logged.update(metadata or {}),
+    )
+    command = supervisor.process_task(state("what is the goblin doing"))
+
+    assert command.goto == "dungeon_master"
+    assert len(stub.calls) == 1
+    assert logged["prefilter_hint"] == {
+        "routed_to": "researcher", "rule": "rules_question", "tier": LIKELY,
+    }
+
+
+def test_a_likely_tier_supervisor_routes_likely_matches_itself():
+    supervisor = GameSupervisor(prefilter_tier=LIKELY)
+    supervisor.llm = StubRouter({"next": "researcher"})
+    command = supervisor.process_task(state("I whistle a tune"))
+
+    assert command.goto == "dungeon_master"
+    assert supervisor.llm.calls == []
+
+
+def test_prefilter_logs_the_rule_and_tier(monkeypatch):
+    supervisor, _ = make_supervisor({"next": "researcher"})
+    logged = {}
+    monkeypatch.setattr(
+        supervisor, "_log_interaction",
+        lambda query, response, metadata=None: logged.update(metadata or {}),
+    )
+    supervisor.process_task(state("I open the door"))
+    assert logged["router"] == "prefilter"
+    assert (logged["rule"], logged["tier"]) == ("first_person_action", CERTAIN)
+
+
 def test_prefilter_returns_only_real_agent_types():
     assert prefilter_route("roll a d20") in AGENT_TYPES
 
@@ -79,6 +238,9 @@ class StubRouter:
             raise self.result
         return self.result
 
+    async def ainvoke(self, *args, **kwargs):
+        return self.invoke(*args, **kwargs)
+
 
 def make_supervisor(result):
     supervisor = GameSupervisor()
@@ -99,6 +261,14 @@ def test_llm_decision_becomes_the_destination(agent):
     assert command.update["active_agent"] == agent
 
 
+@pytest.mark.parametrize("agent", AGENT_TYPES)
+def test_the_async_path_routes_the_same_way(agent):
+    supervisor, stub = make_supervisor({"next": agent})
+    command = asyncio.run(supervisor.aprocess_task(state("something ambiguous")))
+    assert command.goto == agent
+    assert len(stub.calls) == 1
+
+
 def test_finish_terminates_the_graph_but_still_says_something():
     """A turn that ends with no message at all is indistinguishable from a hang."""
     supervisor, _ = make_supervisor({"next": "FINISH"})
@@ -148,15 +318,15 @@ def test_routes_on_the_current_task_not_the_message_tail():
     supervisor, stub = make_supervisor({"next": "researcher"})
     supervisor.process_task(
         state(
-            current_task="how does sneak attack work",
+            current_task="is sneak attack once per turn",
             messages=[
-                HumanMessage(content="how does sneak attack work"),
+                HumanMessage(content="is sneak attack once per turn"),
                 AIMessage(content="🎲 Rolled 2d10: **14**", name="dice_roller"),
             ],
         )
     )
     routed_on = stub.calls[0][-1].content
-    assert routed_on == "how does sneak attack work"
+    assert routed_on == "is sneak attack once per turn"
     assert "Rolled" not in routed_on
 
 
@@ -197,3 +367,201 @@ def test_both_routers_log_their_decision(tmp_path, monkeypatch):
         supervisor.process_task(state(request_text))
         assert logged["router"] == expected_router
         assert logged["routed_to"] in ROUTING_OPTIONS + ["__end__"]
+
+
+# --- single-token routing ---------------------------------------------------
+
+def letter_reply(content, top=None):
+    """An AIMessage shaped like Ollama's reply with `top_logprobs` set."""
+    metadata = {}
+    if top is not None:
+        metadata["logprobs"] = [{
+            "token": content,
+            "logprob": dict(top).get(content, -9.0),
+            "top_logprobs": [{"token": t, "logprob": lp} for t, lp in top],
+        }]
+    return AIMessage(content=content, response_metadata=metadata)
+
+
+def make_letter_supervisor(result):
+    supervisor = GameSupervisor(router_mode="letter")
+    stub = StubRouter(result)
+    supervisor.llm = stub
+    return supervisor, stub
+
+
+def test_router_mode_defaults_to_json_schema(monkeypatch):
+    monkeypatch.delenv("DND_ROUTER_MODE", raising=False)
+    assert resolve_router_mode() == "json_schema"
+
+
+def test_router_mode_is_read_from_the_environment(monkeypatch):
+    monkeypatch.setenv("DND_ROUTER_MODE", "Letter")
+    assert resolve_router_mode() == "letter"
+
+
+def test_an_unknown_router_mode_is_refused():
+    with pytest.raises(ValueError, match="router mode"):
+        resolve_router_mode("vibes")
+
+
+def test_letter_mode_stops_after_one_token():
+    supervisor = GameSupervisor(router_mode="letter")
+    assert supervisor.llm.num_predict == 1
+    assert supervisor.llm.top_logprobs == len(ROUTING_LETTERS)
+
+
+def test_every_letter_names_a_routing_option():
+    assert sorted(ROUTING_LETTERS.values()) == sorted(ROUTING_OPTIONS)
+
+
+@pytest.mark.parametrize("letter, agent", sorted(ROUTING_LETTERS.items()))
+def test_each_letter_routes_to_its_agent(letter, agent):
+    assert read_letter_decision(letter_reply(letter)) == (agent, None)
+
+
+@pytest.mark.parametrize("content", [" B", "b", "B.", "(B)", '"B"'])
+def test_letter_decoration_is_tolerated(content):
+    assert read_letter_decision(letter_reply(content))[0] == "researcher"
+
+
+def test_confidence_is_renormalised_over_the_option_letters():
+    # B: 0.6, A: 0.2, plus 0.2 on a non-option token that must not count.
+    reply = letter_reply("B", top=[("B", -0.5108), ("A", -1.6094), ("The", -1.6094)])
+    goto, confidence = read_letter_decision(reply)
+    assert goto == "researcher"
+    assert confidence == pytest.approx(0.75, abs=1e-3)
+
+
+def test_logprobs_rescue_a_reply_that_is_not_a_letter():
+    reply = letter_reply(" ", top=[(" ", -0.1), ("C", -1.0), ("A", -3.0)])
+    goto, confidence = read_letter_decision(reply)
+    assert goto == "dice_roller"
+    assert 0.5 < confidence < 1.0
+
+
+def test_a_reply_with_no_option_letter_is_unroutable():
+    assert read_letter_decision(letter_reply("Z")) == (None, None)
+
+
+def test_letter_mode_routes_and_logs_its_confidence(monkeypatch):
+    supervisor, _ = make_letter_supervisor(
+        letter_reply("A", top=[("A", -0.05), ("B", -3.0)])
+    )
+    logged = {}
+    monkeypatch.setattr(
+        supervisor, "_log_interaction",
+        lambda query, response, metadata=None: logged.update(metadata or {}),
+    )
+    command = supervisor.process_task(state("the bridge looks rotten"))
+
+    assert command.goto == "dungeon_master"
+    assert logged["router_mode"] == "letter"
+    assert 0.9 < logged["confidence"] <= 1.0
+
+
+def test_letter_mode_failures_end_the_turn_too():
+    supervisor, _ = make_letter_supervisor(letter_reply("?"))
+    command = supervisor.process_task(state("some input"))
+    assert command.goto == "__end__"
+    assert "could not" in command.update["messages"][0].content.lower()
+
+
+# --- multi-intent turns -----------------------------------------------------
+
+@pytest.mark.parametrize(
+    "request_text, action, dice",
+    [
+        ("I swing at the goblin — roll 1d20+5", "I swing at the goblin", "roll 1d20+5"),
+        ("I draw my sword and charge, rolling 1d20+5",
+         "I draw my sword and charge", "rolling 1d20+5"),
+        ("I attack the goblin and roll 1d20+5", "I attack the goblin", "roll 1d20+5"),
+        ("I swing at the goblin. Roll d20", "I swing at the goblin", "Roll d20"),
+    ],
+)
+def test_an_action_and_a_roll_are_split(request_text, action, dice):
+    split = split_intents(request_text)
+    assert (split.action, split.dice) == (action, dice)
+
+
+@pytest.mark.parametrize(
+    "request_text",
+    [
+        "roll 2d6+3 for damage",                 # one intent
+        "roll 1d20 - 1",                         # arithmetic, not a clause break
+        "roll a d20, roll 2d6",                  # two rolls, no action
+        "my sword does 2d6, I think",            # notation, but not a roll request
+        "I attack the goblin",                   # no dice at all
+    ],
+)
+def test_single_intent_turns_are_not_split(request_text):
+    assert split_intents(request_text) is None
+
+
+def fan_out_state(text):
+    return {"current_task": text, "messages": [HumanMessage(content=text)]}
+
+
+def test_a_split_turn_fans_out_to_both_workers_without_the_model():
+    supervisor, stub = make_supervisor({"next": "researcher"})
+    command = supervisor.process_task(fan_out_state("I swing at the goblin — roll 1d20+5"))
+
+    assert [send.node for send in command.goto] == ["dice_roller", "dungeon_master"]
+    assert stub.calls == [], "both halves had an obvious surface form"
+
+
+def test_both_branches_carry_the_same_roll():
+    supervisor, _ = make_supervisor({"next": "researcher"})
+    command = supervisor.process_task(fan_out_state("I swing at the goblin — roll 1d20+5"))
+
+    dice, narration = (send.arg for send in command.goto)
+    assert dice["turn_roll"] is narration["turn_roll"]
+    assert dice["turn_roll"]["dice_roll"]["dice_notation"] == "1d20"
+    assert dice["turn_roll"]["dice_roll"]["modifier"] == 5
+    assert narration["current_task"] == "I swing at the goblin"
+
+
+def test_an_unrecognised_action_is_routed_by_the_model():
+    supervisor, stub = make_supervisor({"next": "dungeon_master"})
+    command = supervisor.process_task(
+        fan_out_state("the rope bridge sways under me — roll 1d20+2")
+    )
+
+    assert [send.node for send in command.goto] == ["dice_roller", "dungeon_master"]
+    assert stub.calls[0][-1].content == "the rope bridge sways under me"
+
+
+def test_a_roll_beside_a_non_narrative_half_routes_whole():
+    """Only narration is split off. Anything else gets the old single route."""
+    supervisor, _ = make_supervisor({"next": "researcher"})
+    command = supervisor.process_task(
+        fan_out_state("is sneak attack once per turn, roll 1d20")
+    )
+    assert command.goto == "researcher"
+
+
+@pytest.mark.parametrize(
+    "request_text, routed_on",
+    [
+        # The whole turn is a certain roll; only the action needs the model.
+        ("the rope bridge sways under me — roll 1d20+2", "the rope bridge sways under me"),
+        # Neither half is certain; the whole turn is asked about once.
+        ("I whistle a tune, 1d20", "I whistle a tune, 1d20"),
+        ("is sneak attack once per turn, roll 1d20", "is sneak attack once per turn, roll 1d20"),
+    ],
+)
+def test_a_split_turn_makes_one_router_call_at_most(request_text, routed_on):
+    supervisor, stub = make_supervisor({"next": "dungeon_master"})
+    supervisor.process_task(fan_out_state(request_text))
+    assert [call[-1].content for call in stub.calls] == [routed_on]
+
+    stub.calls.clear()
+    asyncio.run(supervisor.aprocess_task(fan_out_state(request_text)))
+    assert [call[-1].content for call in stub.calls] == [routed_on]
+
+
+def test_the_whole_turn_decision_splits_off_the_roll():
+    supervisor, stub = make_supervisor({"next": "dungeon_master"})
+    command = supervisor.process_task(fan_out_state("I whistle a tune, 1d20"))
+    assert [send.node for send in command.goto] == ["dice_roller", "dungeon_master"]
+    assert len(stub.calls) == 1